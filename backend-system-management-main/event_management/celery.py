@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
 
 # Configuration de Celery
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_management.settings')
@@ -34,6 +35,42 @@ app.conf.beat_schedule = {
         'task': 'events.tasks.check_scheduled_reminders',
         'schedule': 60.0,  # Vérifier toutes les minutes
     },
+    'dispatch-outbox-messages': {
+        'task': 'events.tasks.dispatch_outbox_messages',
+        'schedule': 60.0,  # Livrer les emails/SMS en attente toutes les minutes
+    },
+    'refresh-daily-rollups': {
+        'task': 'events.tasks.refresh_daily_rollups',
+        'schedule': 300.0,  # Agrégats des tableaux de bord (jours modifiés) toutes les 5 minutes
+    },
+    'dispatch-export-jobs': {
+        'task': 'events.tasks.dispatch_export_jobs',
+        'schedule': 60.0,  # Exports Excel dont la publication s'est perdue
+    },
+    'purge-export-jobs': {
+        'task': 'events.tasks.purge_export_jobs',
+        'schedule': crontab(hour=4, minute=0),  # Fichiers d'export expirés (EXPORT_RETENTION_DAYS), chaque nuit
+    },
+    'dispatch-analytics-export-jobs': {
+        'task': 'events.tasks.dispatch_analytics_export_jobs',
+        'schedule': 60.0,  # Exports Parquet dont la publication s'est perdue
+    },
+    'dispatch-training-jobs': {
+        'task': 'events.tasks.dispatch_training_jobs',
+        'schedule': 60.0,  # Entraînements ML dont la publication s'est perdue
+    },
+    'schedule-model-training': {
+        'task': 'events.tasks.schedule_model_training',
+        'schedule': 7 * 24 * 3600.0,  # Réentraînement incrémental hebdomadaire
+    },
+    'refresh-trend-snapshots': {
+        'task': 'events.tasks.refresh_trend_snapshots',
+        'schedule': 600.0,  # Tendances émergentes (fenêtres du tableau de bord) toutes les 10 minutes
+    },
+    'score-upcoming-events': {
+        'task': 'events.tasks.score_upcoming_events',
+        'schedule': crontab(hour=3, minute=0),  # Prédictions par lot des événements à venir, chaque nuit
+    },
 }
 
 @app.task(bind=True)
@@ -233,6 +233,70 @@ TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
 TWILIO_FROM_NUMBER = config('TWILIO_FROM_NUMBER', default='')
 
+# 🎯 Cache partagé entre les workers gunicorn et Celery : révocations et scans des
+# QR, instantanés des tableaux de bord, index des prix, verrous. Redis si REDIS_URL
+# est défini, sinon table de cache en base (créée par la migration 0034 ou par
+# `python manage.py createcachetable`). Jamais de cache local au processus.
+# Avec la table de cache, chaque lecture est un SELECT et chaque écriture un
+# COUNT(*) de la table, un SELECT et un INSERT/UPDATE : un scan de QR signé coûte
+# alors 7 requêtes SQL (13 si l'état du billet manque). Redis est requis pour
+# que le contrôle d'accès ne dépende pas de la base.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'events',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'events_cache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+# Images PNG/SVG des QR mises en cache : seulement avec Redis, la table de cache
+# en base n'a pas vocation à stocker des images (rendu à chaque appel sinon)
+QR_IMAGE_CACHE = config('QR_IMAGE_CACHE', default=bool(REDIS_URL), cast=bool)
+
+# 🎯 Contrôle d'accès par QR signé : présences écrites par lots
+QR_ATTENDANCE_BATCH_SIZE = config('QR_ATTENDANCE_BATCH_SIZE', default=50, cast=int)
+QR_ATTENDANCE_FLUSH_SECONDS = config('QR_ATTENDANCE_FLUSH_SECONDS', default=2.0, cast=float)
+
+# Instantanés des tableaux de bord (events/snapshots.py) : servis frais pendant
+# DASHBOARD_SNAPSHOT_TTL secondes, puis périmés pendant le recalcul en arrière-plan
+DASHBOARD_SNAPSHOT_TTL = config('DASHBOARD_SNAPSHOT_TTL', default=60, cast=int)
+DASHBOARD_SNAPSHOT_MAX_STALE = config('DASHBOARD_SNAPSHOT_MAX_STALE', default=3600, cast=int)
+# Tendances émergentes : recalculées par la tâche refresh_trend_snapshots (toutes les
+# 10 minutes) dans le cache partagé ci-dessus, lues par les workers web, servies
+# périmées au plus une journée si la tâche ne tourne plus
+TRENDS_SNAPSHOT_TTL = config('TRENDS_SNAPSHOT_TTL', default=900, cast=int)
+TRENDS_SNAPSHOT_MAX_STALE = config('TRENDS_SNAPSHOT_MAX_STALE', default=86400, cast=int)
+
+# Export analytique Parquet (events/columnar.py, commande export_analytics_dataset)
+ANALYTICS_EXPORT_DIR = config('ANALYTICS_EXPORT_DIR', default=os.path.join(BASE_DIR, 'analytics_exports'))
+
+# Exports Excel des inscriptions (données personnelles) : hors de MEDIA_ROOT, jamais
+# servis par /media/, seulement par export_job_download ; supprimés après
+# EXPORT_RETENTION_DAYS jours par la tâche purge_export_jobs
+EXPORTS_ROOT = config('EXPORTS_ROOT', default=os.path.join(BASE_DIR, 'private_exports'))
+EXPORT_RETENTION_DAYS = config('EXPORT_RETENTION_DAYS', default=7, cast=int)
+
+# Modèles ML (events/ml_registry.py) chargés par wsgi.py avant le fork des workers
+ML_PRELOAD_MODELS = config('ML_PRELOAD_MODELS', default=True, cast=bool)
+# Entraînement (tâche Celery train_model) : cœurs utilisés, arbres ajoutés par
+# réentraînement incrémental, taille maximale de la forêt avant réentraînement complet
+ML_TRAINING_N_JOBS = config('ML_TRAINING_N_JOBS', default=1, cast=int)
+ML_WARM_START_TREES = config('ML_WARM_START_TREES', default=25, cast=int)
+ML_MAX_TREES = config('ML_MAX_TREES', default=300, cast=int)
+# Sans modèle, une prédiction demande un entraînement au plus une fois par période
+# (un entraînement terminé, même faute de données, suspend les demandes)
+ML_TRAINING_BACKOFF_HOURS = config('ML_TRAINING_BACKOFF_HOURS', default=6, cast=int)
+
 # ===== CONFIGURATION CELERY =====
 # 🎯 Configuration simple avec base de données Django
 CELERY_BROKER_URL = 'memory://'
@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
+import gc
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,4 +15,15 @@ from django.core.wsgi import get_wsgi_application
 # os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings_railway')
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_management.settings')
 
-application = get_wsgi_application() 
\ No newline at end of file
+application = get_wsgi_application()
+
+# Modèles ML chargés avant le fork des workers (gunicorn --preload) : pages
+# partagées en copie sur écriture, gc.freeze() évite que le ramasse-miettes
+# ne les touche dans chaque worker
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, 'ML_PRELOAD_MODELS', True):
+    from events.ml_registry import registry  # noqa: E402
+
+    registry.preload()
+    gc.freeze()
@@ -6,15 +6,20 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.models import User
-from django.db.models import Count, Sum, Q, Avg
+from django.db import transaction
+from django.db.models import Count, Sum, Q, Avg, Max
+from django.http import FileResponse
+from django.urls import reverse
 from django.utils import timezone
 from datetime import datetime, timedelta
 import os
 from django.conf import settings
 
-from .models import Event, EventRegistration, UserProfile, RefundRequest
+from . import rollups, snapshots, timeseries
+from .models import Event, EventRegistration, EventStats, UserProfile, RefundRequest
 from .permissions import IsSuperAdmin, IsOrganizerOrSuperAdmin, super_admin_required
 from .serializers import EventSerializer, EventListSerializer
+from .pagination import EventKeysetPagination, wants_keyset_pagination
 
 
 class SuperAdminViewSet(viewsets.ViewSet):
@@ -25,138 +30,9 @@ class SuperAdminViewSet(viewsets.ViewSet):
     
     @action(detail=False, methods=['get'])
     def global_stats(self, request):
-        """Statistiques globales de la plateforme"""
+        """Statistiques globales de la plateforme (instantané, voir events.snapshots)"""
         try:
-            # Statistiques générales
-            total_users = User.objects.count()
-            total_organizers = UserProfile.objects.filter(role='organizer').count()
-            total_participants = UserProfile.objects.filter(role='participant').count()
-            total_events = Event.objects.count()
-            published_events = Event.objects.filter(status='published').count()
-            pending_events = Event.objects.filter(status='draft').count()
-            total_registrations = EventRegistration.objects.count()
-            confirmed_registrations = EventRegistration.objects.filter(
-                status__in=['confirmed', 'attended']
-            ).count()
-            
-            # Revenus globaux (excluant les remboursements traités)
-            try:
-                total_revenue = EventRegistration.objects.filter(
-                    payment_status='paid'
-                ).exclude(
-                    refund_request__status='processed'
-                ).aggregate(total=Sum('price_paid')).get('total') or 0
-            except Exception as e:
-                # Si la relation refund_request n'existe pas, calculer sans exclusion
-                total_revenue = EventRegistration.objects.filter(
-                    payment_status='paid'
-                ).aggregate(total=Sum('price_paid')).get('total') or 0
-            
-            # Remboursements
-            total_refunds = RefundRequest.objects.filter(status='processed').count()
-            total_refund_amount = RefundRequest.objects.filter(
-                status='processed'
-            ).aggregate(total=Sum('refund_amount')).get('total') or 0
-            
-            # Statistiques sur 30 derniers jours
-            thirty_days_ago = timezone.now() - timedelta(days=30)
-            
-            # Statistiques de modération
-            try:
-                from .models import EventHistory
-                moderation_actions = EventHistory.objects.count()
-                recent_moderations = EventHistory.objects.filter(
-                    created_at__gte=thirty_days_ago
-                ).count()
-                
-                # Répartition des actions de modération
-                moderation_breakdown = {}
-                for action in ['approve', 'reject', 'suspend', 'publish']:
-                    count = EventHistory.objects.filter(action=action).count()
-                    moderation_breakdown[action] = count
-            except Exception as e:
-                # Si EventHistory n'existe pas encore, utiliser des valeurs par défaut
-                moderation_actions = 0
-                recent_moderations = 0
-                moderation_breakdown = {
-                    'approve': 0,
-                    'reject': 0,
-                    'suspend': 0,
-                    'publish': 0
-                }
-            new_users_30d = User.objects.filter(date_joined__gte=thirty_days_ago).count()
-            new_events_30d = Event.objects.filter(created_at__gte=thirty_days_ago).count()
-            new_registrations_30d = EventRegistration.objects.filter(
-                registered_at__gte=thirty_days_ago
-            ).count()
-            
-            # Top organisateurs (par nombre d'événements)
-            try:
-                top_organizers = User.objects.filter(
-                    events_organized__isnull=False
-                ).annotate(
-                    event_count=Count('events_organized')
-                ).order_by('-event_count')[:5]
-            except Exception as e:
-                top_organizers = []
-            
-            # Événements les plus populaires
-            try:
-                popular_events = Event.objects.filter(
-                    status='published'
-                ).annotate(
-                    registration_count=Count('registrations')
-                ).order_by('-registration_count')[:5]
-            except Exception as e:
-                popular_events = []
-            
-            return Response({
-                'general_stats': {
-                    'total_users': total_users,
-                    'total_organizers': total_organizers,
-                    'total_participants': total_participants,
-                    'total_events': total_events,
-                    'published_events': published_events,
-                    'pending_events': pending_events,
-                    'total_registrations': total_registrations,
-                    'confirmed_registrations': confirmed_registrations,
-                    'total_revenue': float(total_revenue),
-                    'total_refunds': total_refunds,
-                    'total_refund_amount': float(total_refund_amount),
-                    'active_users': total_users,  # Pour l'instant, tous les utilisateurs
-                },
-                'moderation_stats': {
-                    'total_actions': moderation_actions,
-                    'recent_actions': recent_moderations,
-                    'breakdown': moderation_breakdown
-                },
-                'recent_activity': {
-                    'new_users_30d': new_users_30d,
-                    'new_events_30d': new_events_30d,
-                    'new_registrations_30d': new_registrations_30d,
-                },
-                'top_organizers': [
-                    {
-                        'id': user.id,
-                        'username': user.username,
-                        'full_name': f"{user.first_name} {user.last_name}".strip(),
-                        'event_count': user.event_count,
-                        'email': user.email,
-                    }
-                    for user in top_organizers
-                ],
-                'popular_events': [
-                    {
-                        'id': event.id,
-                        'title': event.title,
-                        'organizer': event.organizer.username,
-                        'registration_count': event.registration_count,
-                        'start_date': event.start_date,
-                    }
-                    for event in popular_events
-                ]
-            })
-            
+            return snapshots.response(snapshots.get('admin:global_stats', _global_stats_data))
         except Exception as e:
             return Response(
                 {'error': f'Erreur lors du calcul des statistiques: {str(e)}'},
@@ -167,7 +43,7 @@ class SuperAdminViewSet(viewsets.ViewSet):
     def all_events(self, request):
         """Récupérer tous les événements de la plateforme"""
         try:
-            events = Event.objects.all().order_by('-created_at')
+            events = Event.objects.with_list_stats().order_by('-created_at')
             
             # Filtrage optionnel
             status_filter = request.query_params.get('status')
@@ -178,7 +54,16 @@ class SuperAdminViewSet(viewsets.ViewSet):
             if organizer_filter:
                 events = events.filter(organizer__username__icontains=organizer_filter)
             
-            # Pagination
+            # Pagination keyset (start_date, id) si un curseur est fourni ou sans numéro de page
+            if wants_keyset_pagination(request):
+                paginator = EventKeysetPagination()
+                paginator.opt_in = False
+                paginator.page_size = 20
+                events_page = paginator.paginate_queryset(events, request)
+                serializer = EventListSerializer(events_page, many=True)
+                return paginator.get_paginated_response(serializer.data)
+            
+            # Pagination par numéro de page (compatibilité)
             page_size = int(request.query_params.get('page_size', 20))
             page = int(request.query_params.get('page', 1))
             start_idx = (page - 1) * page_size
@@ -444,7 +329,7 @@ class SuperAdminViewSet(viewsets.ViewSet):
         """Récupérer l'historique de modération d'un événement"""
         try:
             event = Event.objects.get(id=pk)
-            history = event.history.all().order_by('-created_at')
+            history = event.history.select_related('user').order_by('-timestamp')
             
             history_data = []
             for h in history:
@@ -460,7 +345,7 @@ class SuperAdminViewSet(viewsets.ViewSet):
                         'first_name': h.user.first_name,
                         'last_name': h.user.last_name,
                     } if h.user else None,
-                    'created_at': h.created_at,
+                    'created_at': h.timestamp,
                 })
             
             return Response(history_data)
@@ -622,6 +507,127 @@ class SuperAdminViewSet(viewsets.ViewSet):
             )
 
 
+def _global_stats_data():
+    """Calcul des statistiques globales de SuperAdminViewSet.global_stats"""
+    # Statistiques générales
+    total_users = User.objects.count()
+    total_organizers = UserProfile.objects.filter(role='organizer').count()
+    total_participants = UserProfile.objects.filter(role='participant').count()
+    total_events = Event.objects.count()
+    published_events = Event.objects.filter(status='published').count()
+    pending_events = Event.objects.filter(status='draft').count()
+    
+    # Inscriptions, revenus et remboursements : agrégats quotidiens
+    platform = rollups.totals()
+    total_registrations = platform['registrations']
+    confirmed_registrations = platform['confirmed_count'] + platform['attended_count']
+    
+    # Revenus globaux (excluant les remboursements traités)
+    total_revenue = platform['paid_revenue'] - platform['refunded_paid_revenue']
+    
+    # Remboursements
+    total_refunds = platform['refunds_processed']
+    total_refund_amount = platform['refund_amount']
+    
+    # Statistiques sur 30 derniers jours
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    
+    # Statistiques de modération
+    try:
+        from .models import EventHistory
+        moderation_actions = EventHistory.objects.count()
+        recent_moderations = EventHistory.objects.filter(
+            created_at__gte=thirty_days_ago
+        ).count()
+        
+        # Répartition des actions de modération
+        moderation_breakdown = {}
+        for action in ['approve', 'reject', 'suspend', 'publish']:
+            count = EventHistory.objects.filter(action=action).count()
+            moderation_breakdown[action] = count
+    except Exception as e:
+        # Si EventHistory n'existe pas encore, utiliser des valeurs par défaut
+        moderation_actions = 0
+        recent_moderations = 0
+        moderation_breakdown = {
+            'approve': 0,
+            'reject': 0,
+            'suspend': 0,
+            'publish': 0
+        }
+    recent = rollups.totals(*rollups.last_days(30))
+    new_users_30d = recent['new_users']
+    new_events_30d = recent['new_events']
+    new_registrations_30d = recent['registrations']
+    
+    # Top organisateurs (par nombre d'événements)
+    try:
+        top_organizers = User.objects.filter(
+            events_organized__isnull=False
+        ).annotate(
+            event_count=Count('events_organized')
+        ).order_by('-event_count')[:5]
+    except Exception as e:
+        top_organizers = []
+    
+    # Événements les plus populaires
+    try:
+        popular_events = Event.objects.filter(
+            status='published'
+        ).select_related('organizer').annotate(
+            registration_count=EventStats.total_registrations_expression()
+        ).order_by('-registration_count')[:5]
+    except Exception as e:
+        popular_events = []
+    
+    return {
+        'general_stats': {
+            'total_users': total_users,
+            'total_organizers': total_organizers,
+            'total_participants': total_participants,
+            'total_events': total_events,
+            'published_events': published_events,
+            'pending_events': pending_events,
+            'total_registrations': total_registrations,
+            'confirmed_registrations': confirmed_registrations,
+            'total_revenue': float(total_revenue),
+            'total_refunds': total_refunds,
+            'total_refund_amount': float(total_refund_amount),
+            'active_users': total_users,  # Pour l'instant, tous les utilisateurs
+        },
+        'moderation_stats': {
+            'total_actions': moderation_actions,
+            'recent_actions': recent_moderations,
+            'breakdown': moderation_breakdown
+        },
+        'recent_activity': {
+            'new_users_30d': new_users_30d,
+            'new_events_30d': new_events_30d,
+            'new_registrations_30d': new_registrations_30d,
+        },
+        'top_organizers': [
+            {
+                'id': user.id,
+                'username': user.username,
+                'full_name': f"{user.first_name} {user.last_name}".strip(),
+                'event_count': user.event_count,
+                'email': user.email,
+            }
+            for user in top_organizers
+        ],
+        'popular_events': [
+            {
+                'id': event.id,
+                'title': event.title,
+                'organizer': event.organizer.username,
+                'registration_count': event.registration_count,
+                'start_date': event.start_date,
+            }
+            for event in popular_events
+        ]
+    }
+
+
 # =====================================
 # VUES FONCTION SUPPLÉMENTAIRES
 # =====================================
@@ -631,43 +637,27 @@ class SuperAdminViewSet(viewsets.ViewSet):
 def platform_analytics(request):
     """Analytics avancées de la plateforme"""
     try:
-        # Analyse temporelle (7 derniers jours)
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        daily_stats = []
-        
-        for i in range(7):
-            date = seven_days_ago + timedelta(days=i)
-            day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            new_users = User.objects.filter(
-                date_joined__gte=day_start,
-                date_joined__lt=day_end
-            ).count()
-            
-            new_events = Event.objects.filter(
-                created_at__gte=day_start,
-                created_at__lt=day_end
-            ).count()
-            
-            new_registrations = EventRegistration.objects.filter(
-                registered_at__gte=day_start,
-                registered_at__lt=day_end
-            ).count()
-            
-            daily_revenue = EventRegistration.objects.filter(
-                registered_at__gte=day_start,
-                registered_at__lt=day_end,
-                payment_status='paid'
-            ).aggregate(total=Sum('price_paid')).get('total') or 0
-            
-            daily_stats.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'new_users': new_users,
-                'new_events': new_events,
-                'new_registrations': new_registrations,
-                'revenue': float(daily_revenue),
-            })
+        # Analyse temporelle (7 derniers jours par défaut) : une requête GROUP BY par table
+        try:
+            start, end, granularity = timeseries.parse_range(request.query_params, default_days=7)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        daily_stats = [
+            {
+                'date': row['date'],
+                'new_users': row['users'],
+                'new_events': row['events'],
+                'new_registrations': row['registrations'],
+                'revenue': row['revenue'],
+            }
+            for row in timeseries.series(
+                start, end, granularity,
+                registrations=EventRegistration.objects.all(),
+                events=Event.objects.all(),
+                users=User.objects.all(),
+            )
+        ]
         
         # Répartition des rôles
         role_distribution = {}
@@ -1368,9 +1358,33 @@ def bulk_confirm_registrations(request):
             'errors': []
         }
         
+        from .models import EventHistory
+        
+        # 🎯 PERF : Inscriptions, places occupées par événement et historique en une
+        # requête chacun ; par inscription ne restent que les écritures de save()
+        registrations = {
+            str(pk): registration for pk, registration in EventRegistration.objects.select_related(
+                'event', 'ticket_type'
+            ).in_bulk([registration_id for registration_id in registration_ids if str(registration_id).isdigit()]).items()
+        }
+        confirmed_counts = dict(
+            EventRegistration.objects.filter(
+                event_id__in={registration.event_id for registration in registrations.values()},
+                status__in=EventRegistration.SEAT_HOLDING_STATUSES,
+            ).order_by().values('event_id').annotate(count=Count('pk')).values_list('event_id', 'count')
+        )
+        sold_counts = {}
+        history = []
+        
         for registration_id in registration_ids:
             try:
-                registration = EventRegistration.objects.select_related('event', 'ticket_type').get(id=registration_id)
+                registration = registrations.get(str(registration_id))
+                if registration is None:
+                    results['failed'].append({
+                        'id': registration_id,
+                        'error': 'Inscription non trouvée'
+                    })
+                    continue
                 
                 if registration.status != 'pending':
                     results['failed'].append({
@@ -1382,8 +1396,7 @@ def bulk_confirm_registrations(request):
                 # Vérifier la capacité
                 event = registration.event
                 if event.place_type == 'limited' and event.max_capacity is not None:
-                    current_confirmed = event.registrations.filter(status__in=['confirmed', 'attended']).count()
-                    if current_confirmed >= event.max_capacity:
+                    if confirmed_counts.get(event.id, 0) >= event.max_capacity:
                         results['failed'].append({
                             'id': registration_id,
                             'error': 'Événement à capacité maximale'
@@ -1391,8 +1404,9 @@ def bulk_confirm_registrations(request):
                         continue
                 
                 # Vérifier la capacité du type de billet
-                if registration.ticket_type and registration.ticket_type.quantity is not None:
-                    if registration.ticket_type.sold_count >= registration.ticket_type.quantity:
+                ticket_type = registration.ticket_type
+                if ticket_type and ticket_type.quantity is not None:
+                    if sold_counts.get(ticket_type.id, ticket_type.sold_count) >= ticket_type.quantity:
                         results['failed'].append({
                             'id': registration_id,
                             'error': 'Type de billet indisponible'
@@ -1404,38 +1418,43 @@ def bulk_confirm_registrations(request):
                 registration.confirmed_at = timezone.now()
                 registration.save(update_fields=['status', 'confirmed_at', 'updated_at'])
                 
-                # 🎯 CORRECTION : Les compteurs sont gérés par EventRegistration.save()
+                # 🎯 Les compteurs sont réservés atomiquement par EventRegistration.save()
+                if registration.status != 'confirmed':
+                    results['failed'].append({
+                        'id': registration_id,
+                        'error': 'Capacité atteinte - inscription placée en liste d\'attente'
+                    })
+                    continue
                 
-                if registration.ticket_type:
-                    ticket_type = registration.ticket_type
-                    ticket_type.sold_count = ticket_type.sold_count + 1
-                    ticket_type.save(update_fields=['sold_count'])
+                confirmed_counts[event.id] = confirmed_counts.get(event.id, 0) + 1
+                if ticket_type and ticket_type.quantity is not None:
+                    sold_counts[ticket_type.id] = sold_counts.get(ticket_type.id, ticket_type.sold_count) + 1
                 
                 # Créer un historique
-                from .models import EventHistory
-                EventHistory.objects.create(
+                history.append(EventHistory(
                     event=event,
                     user=request.user,
                     action='registration_confirmed_bulk',
                     field_name='status',
                     old_value='pending',
-                    new_value='confirmed',
-                    details=f'Inscription confirmée en lot par {request.user.username}'
-                )
+                    new_value='confirmed'
+                ))
                 
                 results['confirmed'].append(registration_id)
                 
-            except EventRegistration.DoesNotExist:
-                results['failed'].append({
-                    'id': registration_id,
-                    'error': 'Inscription non trouvée'
-                })
             except Exception as e:
                 results['errors'].append({
                     'id': registration_id,
                     'error': str(e)
                 })
         
+        EventHistory.objects.bulk_create(history)
+        
+        # 🎯 PERF : QR codes pré-générés en arrière-plan, hors de la requête
+        if results['confirmed']:
+            from .tasks import publish_qr_pregeneration
+            transaction.on_commit(lambda: publish_qr_pregeneration(results['confirmed']))
+        
         return Response({
             'message': f'Opération terminée. {len(results["confirmed"])} confirmées, {len(results["failed"])} échouées',
             'results': results
@@ -1483,17 +1502,35 @@ def predictive_analytics_dashboard(request):
         
         # Statistiques des modèles ML
         print("🔍 DEBUG: Vérification des modèles ML...")
+        from .ml_registry import registry
+        from .predictive_analytics import FILL_RATE_MODEL
+        model_metadata = registry.metadata(FILL_RATE_MODEL)
         model_status = {
-            'fill_rate_predictor': 'available' if os.path.exists(os.path.join(settings.BASE_DIR, 'ml_models', 'fill_rate_predictor.joblib')) else 'not_trained',
-            'last_training': None
+            'fill_rate_predictor': 'available' if model_metadata else 'not_trained',
+            'last_training': None,
+            'version': model_metadata['version'] if model_metadata else None,
+            'metadata': model_metadata,
         }
         
         # Vérifier la date du dernier entraînement
-        model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'fill_rate_predictor.joblib')
+        model_path = registry.path(FILL_RATE_MODEL)
         if os.path.exists(model_path):
             model_age = timezone.now() - datetime.fromtimestamp(os.path.getmtime(model_path), tz=timezone.utc)
             model_status['last_training'] = model_age.days
         
+        # Prédictions de la nuit : résumé et événements à venir les moins bien partis
+        from .models import PredictionSnapshot
+        from .serializers import PredictionSnapshotSerializer
+        upcoming_predictions = PredictionSnapshot.objects.filter(
+            event__status='published', event__start_date__gte=timezone.now()
+        )
+        predictions = upcoming_predictions.aggregate(
+            events=Count('pk'), avg_fill_rate=Avg('predicted_fill_rate'), computed_at=Max('computed_at')
+        )
+        predictions['lowest_fill_rate'] = PredictionSnapshotSerializer(
+            upcoming_predictions.select_related('event').order_by('predicted_fill_rate')[:10], many=True
+        ).data
+        
         print("🔍 DEBUG: Préparation de la réponse...")
         return Response({
             'status': 'success',
@@ -1501,6 +1538,7 @@ def predictive_analytics_dashboard(request):
             'insights': insights,
             'trends': trends,
             'model_status': model_status,
+            'predictions': predictions,
             'summary': {
                 'total_insights': len(insights.get('global_insights', [])),
                 'emerging_trends': len(trends.get('emerging_trends', [])),
@@ -1519,32 +1557,57 @@ def predictive_analytics_dashboard(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+def _training_job_data(request, job):
+    return {
+        'id': job.id,
+        'model_name': job.model_name,
+        'status': job.status,
+        'stage': job.stage or None,
+        'mode': job.mode or None,
+        'progress': job.progress,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'built_trees': job.built_trees,
+        'total_trees': job.total_trees,
+        'force_retrain': job.force_retrain,
+        'scheduled': job.scheduled,
+        'training_result': job.result or None,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'status_url': request.build_absolute_uri(reverse('training_job_status', args=[job.id])),
+    }
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsSuperAdmin])
 def train_ml_models(request):
-    """Entraîne ou retraîne les modèles de machine learning"""
-    try:
-        from .predictive_analytics import get_predictive_service
-        
-        # Récupérer une instance du service
-        predictive_service = get_predictive_service()
-        
-        force_retrain = request.data.get('force_retrain', False)
-        
-        # Entraîner le modèle de prédiction de remplissage
-        training_result = predictive_service.train_fill_rate_predictor(force_retrain)
-        
-        return Response({
-            'status': 'success',
-            'training_result': training_result,
-            'message': 'Entraînement des modèles terminé'
-        })
-        
-    except Exception as e:
-        return Response(
-            {'error': f'Erreur lors de l\'entraînement: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    """
+    Entraîne ou retraîne les modèles de machine learning en arrière-plan
+    (tâche Celery) ; l'avancement se suit sur status_url
+    """
+    from .models import TrainingJob
+    from .predictive_analytics import FILL_RATE_MODEL
+
+    force_retrain = bool(request.data.get('force_retrain', False))
+    job = TrainingJob.enqueue(FILL_RATE_MODEL, user=request.user, force_retrain=force_retrain)
+    return Response({
+        'status': 'queued',
+        'job': _training_job_data(request, job),
+        'message': 'Entraînement des modèles lancé'
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def training_job_status(request, job_id):
+    """Statut, avancement et résultat d'un entraînement"""
+    from .models import TrainingJob
+
+    job = TrainingJob.objects.filter(id=job_id).first()
+    if job is None:
+        return Response({'error': 'Entraînement non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_training_job_data(request, job))
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsSuperAdmin])
@@ -2032,3 +2095,85 @@ def reject_organizer_account(request):
         )
 
 
+
+
+def _analytics_export_job_data(request, job):
+    return {
+        'id': job.id,
+        'status': job.status,
+        'tables': job.tables or None,
+        'since': job.since or None,
+        'rows': job.result or None,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'status_url': request.build_absolute_uri(reverse('analytics_export_job_status', args=[job.id])),
+    }
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def analytics_export(request):
+    """
+    GET : manifeste du dernier export Parquet (tables, partitions, liens) et dernier job.
+    POST : créer un job d'export exécuté par Celery ; l'avancement se suit sur status_url.
+    Body optionnel : { tables: [...], since: "AAAA-MM" }
+    """
+    from . import columnar
+    from .models import AnalyticsExportJob
+
+    if request.method == 'POST':
+        tables = request.data.get('tables') or None
+        since = request.data.get('since') or None
+        if tables is not None and (not isinstance(tables, list) or set(tables) - set(columnar.TABLES)):
+            return Response(
+                {'error': f"tables doit être une liste parmi {', '.join(columnar.TABLES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if since is not None and not columnar.PARTITION_RE.match(f'month={since}'):
+            return Response({'error': 'since doit être au format AAAA-MM'}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = AnalyticsExportJob.enqueue(tables, since, user=request.user)
+        return Response({'status': 'queued', 'job': _analytics_export_job_data(request, job)},
+                        status=status.HTTP_202_ACCEPTED)
+
+    last_job = AnalyticsExportJob.objects.first()
+    last_job = _analytics_export_job_data(request, last_job) if last_job else None
+    manifest = columnar.read_manifest()
+    if manifest is None:
+        return Response({'manifest': None, 'last_job': last_job, 'message': 'Aucun export Parquet disponible'})
+    for name, table in manifest['tables'].items():
+        for month, partition in table['partitions'].items():
+            partition['url'] = request.build_absolute_uri(
+                reverse('analytics_export_file', kwargs={'table': name, 'month': month})
+            )
+    return Response({'manifest': manifest, 'last_job': last_job})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def analytics_export_job_status(request, job_id):
+    """Statut et lignes écrites d'un export Parquet"""
+    from .models import AnalyticsExportJob
+
+    job = AnalyticsExportJob.objects.filter(id=job_id).first()
+    if job is None:
+        return Response({'error': 'Export non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_analytics_export_job_data(request, job))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def analytics_export_file(request, table, month):
+    """Télécharger une partition Parquet (table, mois AAAA-MM)"""
+    from . import columnar
+
+    path = dict(columnar.partitions(table)).get(month) if table in columnar.TABLES else None
+    if path is None:
+        return Response({'error': 'Partition non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=f'{table}_{month}.parquet',
+        content_type='application/vnd.apache.parquet',
+    )
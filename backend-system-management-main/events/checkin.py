@@ -0,0 +1,345 @@
+"""
+Contrôle d'accès à l'entrée : validation des QR signés depuis le cache partagé
+(la base n'est lue que si l'état du billet y manque), présences enregistrées
+par lots, manifeste hors ligne et synchronisation des scans par lots.
+
+Un scan lit deux entrées du cache (état du billet, événement) et en ajoute une
+(marque de scan). Avec Redis, ce sont trois allers-retours et aucune requête
+SQL. Avec la table de cache en base (sans REDIS_URL), le même scan coûte 7
+requêtes SQL, 13 si l'état du billet manque dans le cache (voir
+benchmark_qr_scans).
+"""
+import atexit
+import base64
+import hashlib
+import logging
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import qr
+from .models import Event, EventRegistration, EventStats
+
+logger = logging.getLogger(__name__)
+
+EVENT_INFO_TIMEOUT = 60 * 5
+SCAN_MARK_TIMEOUT = 60 * 60 * 24
+
+# Manifeste hors ligne : une entrée de 13 octets par jeton, triée par empreinte
+# (empreinte 8 octets, index du billet, index de la session, drapeaux)
+MANIFEST_VERSION = 1
+MANIFEST_RECORD = struct.Struct('>QHHB')
+MANIFEST_HASH_BYTES = 8
+MANIFEST_NONE_INDEX = 0xFFFF
+MANIFEST_FLAG_ATTENDED = 1
+MAX_SYNC_SCANS = 5000
+
+
+class AttendanceBuffer:
+    """
+    Tampon des présences scannées. Les passages confirmé -> présent sont écrits
+    par un UPDATE par événement, dès que `batch_size` scans sont en attente ou
+    au plus tard `flush_interval` secondes après le premier.
+
+    Le tampon est propre au processus : un scan est confirmé au poste avant
+    l'écriture en base. Un worker arrêté normalement vide son tampon (atexit) ;
+    un worker tué brutalement perd au plus `batch_size` présences, dont le
+    double scan reste refusé (marque dans le cache partagé). Avec
+    QR_ATTENDANCE_BATCH_SIZE = 1, chaque présence est écrite avant la réponse.
+    """
+
+    def __init__(self, batch_size=50, flush_interval=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = defaultdict(set)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, event_id, registration_id):
+        with self._lock:
+            if registration_id in self._pending[event_id]:
+                return
+            self._pending[event_id].add(registration_id)
+            self._size += 1
+            full = self._size >= self.batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Écrire les présences en attente. Retourne le nombre d'inscriptions passées à 'présent'."""
+        with self._lock:
+            pending, self._pending, self._size = self._pending, defaultdict(set), 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+
+        marked = 0
+        try:
+            for event_id, registration_ids in pending.items():
+                marked += mark_attended(event_id, registration_ids)
+        except Exception as e:
+            logger.error(f"Présences: écriture du lot impossible, nouvel essai au prochain flush: {e}")
+            with self._lock:
+                for event_id, registration_ids in pending.items():
+                    self._pending[event_id] |= registration_ids
+                    self._size += len(registration_ids)
+        return marked
+
+
+def mark_attended(event_id, registration_ids):
+    """
+    Passer un lot d'inscriptions confirmées à 'présent' en un seul UPDATE.
+    Équivalent à save() pour cette transition : les deux statuts occupent une
+    place, seuls les compteurs de statut de EventStats changent.
+    """
+    registration_ids = list(registration_ids)
+    with transaction.atomic():
+        marked = EventRegistration.objects.filter(
+            event_id=event_id, pk__in=registration_ids, status='confirmed'
+        ).update(status='attended', updated_at=timezone.now())
+        EventStats.apply_delta(event_id, confirmed_count=-marked, attended_count=marked)
+        # UPDATE sans save() : l'état publié aux postes de contrôle est relu en base
+        transaction.on_commit(lambda: qr.forget_states(registration_ids))
+    if marked < len(registration_ids):
+        # Déjà présents, ou billets révoqués dont la version n'était pas connue du poste
+        logger.info(f"Présences: {len(registration_ids) - marked} scan(s) sans effet pour l'événement {event_id}")
+    return marked
+
+
+attendance_buffer = AttendanceBuffer(
+    batch_size=getattr(settings, 'QR_ATTENDANCE_BATCH_SIZE', 50),
+    flush_interval=getattr(settings, 'QR_ATTENDANCE_FLUSH_SECONDS', 2.0),
+)
+atexit.register(attendance_buffer.flush)
+
+
+def get_event_info(event_id):
+    """(organizer_id, titre) de l'événement, mis en cache pour les postes de contrôle"""
+    key = f"checkin:event:{event_id}"
+    info = cache.get(key)
+    if info is None:
+        info = Event.objects.filter(pk=event_id).values_list('organizer_id', 'title').first()
+        if info is None:
+            return None
+        cache.set(key, info, EVENT_INFO_TIMEOUT)
+    return info
+
+
+def scan_signed_token(token, user, mark_attended=True):
+    """
+    Valider un QR signé : signature HMAC, version et statut du billet (état
+    publié dans le cache partagé, relu en base s'il manque) et droits du
+    scanneur. Retourne (données, statut HTTP).
+
+    Avec mark_attended, le statut renvoyé est 'attended' dès le premier scan
+    alors que l'écriture en base passe par attendance_buffer (quelques
+    secondes au plus, voir AttendanceBuffer).
+    """
+    parsed = qr.parse_token(token)
+    if parsed is None:
+        return {"valid": False, "error": "QR code invalide"}, 400
+    event_id, registration_id, version = parsed
+
+    state = qr.ticket_state(registration_id)
+    if state is None:
+        return {"valid": False}, 404
+    current_version, current_status = state
+    if current_version != version:
+        return {"valid": False, "registration_id": registration_id, "error": "Billet révoqué"}, 410
+    if current_status not in qr.QR_STATUSES:
+        return {
+            "valid": False,
+            "registration_id": registration_id,
+            "status": current_status,
+            "error": "Inscription non confirmée",
+        }, 409
+
+    event_info = get_event_info(event_id)
+    if event_info is None:
+        return {"valid": False}, 404
+    organizer_id, title = event_info
+
+    if user.is_authenticated and organizer_id != user.id and not user.is_staff:
+        return {"error": "Vous n'êtes pas autorisé à scanner ce QR code"}, 403
+
+    data = {
+        "valid": True,
+        "registration_id": registration_id,
+        "status": current_status,
+        "event": {
+            "id": event_id,
+            "title": title,
+        },
+        "already_scanned": current_status == 'attended',
+    }
+    if mark_attended and current_status == 'confirmed':
+        # Premier passage : cache.add est atomique sur le cache partagé, un double
+        # scan est refusé quel que soit le worker qui le reçoit
+        first_scan = cache.add(f"checkin:scan:{registration_id}:{version}", 1, SCAN_MARK_TIMEOUT)
+        if first_scan:
+            attendance_buffer.add(event_id, registration_id)
+        data["status"] = "attended"
+        data["already_scanned"] = not first_scan
+    return data, 200
+
+
+def remember_scans(registration_versions):
+    """Marquer des inscriptions comme scannées pour le contrôle en ligne (double scan)"""
+    cache.set_many(
+        {f"checkin:scan:{registration_id}:{version}": 1 for registration_id, version in registration_versions},
+        SCAN_MARK_TIMEOUT,
+    )
+
+
+def token_hash(token):
+    """Empreinte d'un jeton dans le manifeste (les scanners calculent la même)"""
+    return int.from_bytes(hashlib.sha256(token.encode()).digest()[:MANIFEST_HASH_BYTES], 'big')
+
+
+def normalize_token(token):
+    """Ramener un contenu historique EVENT:..|REG:..|TOKEN:.. au jeton brut"""
+    token = token.strip()
+    if '|' in token:
+        for part in token.split('|'):
+            if part.startswith('TOKEN:'):
+                return part[len('TOKEN:'):]
+    return token
+
+
+def build_manifest(event):
+    """
+    Manifeste des billets valides d'un événement pour les scanners hors ligne.
+    Chaque inscription confirmée ou présente apparaît deux fois : jeton signé
+    (QR actuels) et jeton brut (QR et SMS émis avant la signature).
+    """
+    ticket_types = list(event.ticket_types.order_by('pk').values('id', 'name'))
+    session_types = list(event.session_types.order_by('pk').values('id', 'name'))
+    ticket_index = {ticket['id']: i for i, ticket in enumerate(ticket_types)}
+    session_index = {session['id']: i for i, session in enumerate(session_types)}
+
+    entries = []
+    rows = EventRegistration.objects.filter(
+        event=event, status__in=qr.QR_STATUSES
+    ).values_list('pk', 'qr_version', 'qr_token', 'ticket_type_id', 'session_type_id', 'status')
+    for registration_id, version, raw_token, ticket_type_id, session_type_id, status in rows.iterator(chunk_size=2000):
+        record = (
+            ticket_index.get(ticket_type_id, MANIFEST_NONE_INDEX),
+            session_index.get(session_type_id, MANIFEST_NONE_INDEX),
+            MANIFEST_FLAG_ATTENDED if status == 'attended' else 0,
+        )
+        entries.append((token_hash(qr.sign_token(event.pk, registration_id, version)),) + record)
+        if raw_token:
+            entries.append((token_hash(raw_token),) + record)
+    entries.sort()
+
+    buffer = bytearray(MANIFEST_RECORD.size * len(entries))
+    for i, entry in enumerate(entries):
+        MANIFEST_RECORD.pack_into(buffer, i * MANIFEST_RECORD.size, *entry)
+
+    return {
+        "version": MANIFEST_VERSION,
+        "event_id": event.pk,
+        "generated_at": timezone.now().isoformat(),
+        "hash": f"sha256[:{MANIFEST_HASH_BYTES}]",
+        "record_format": MANIFEST_RECORD.format,
+        "record_size": MANIFEST_RECORD.size,
+        "count": len(entries),
+        "ticket_types": ticket_types,
+        "session_types": session_types,
+        "entries": base64.b64encode(bytes(buffer)).decode(),
+    }
+
+
+def bulk_check_in(event_id, tokens):
+    """
+    Appliquer un lot de scans hors ligne. Idempotent : renvoyer le même lot
+    ne change rien, chaque jeton reçoit un résultat
+    (checked_in, already_checked_in, duplicate, revoked, not_confirmed, invalid).
+    """
+    results = [None] * len(tokens)
+    seen = {}
+    signed = {}
+    legacy = defaultdict(list)
+
+    for i, token in enumerate(tokens):
+        token = normalize_token(str(token))
+        if token in seen:
+            results[i] = 'duplicate'
+            continue
+        seen[token] = i
+        if qr.is_signed_token(token):
+            parsed = qr.parse_token(token)
+            if parsed is None or parsed[0] != event_id:
+                results[i] = 'invalid'
+            else:
+                signed[i] = parsed[1:]
+        else:
+            legacy[token].append(i)
+
+    registration_ids = {registration_id for registration_id, _ in signed.values()}
+    current = {}
+    query = Q(pk__in=registration_ids)
+    if legacy:
+        query |= Q(qr_token__in=list(legacy))
+    if registration_ids or legacy:
+        current = {
+            row[0]: row for row in EventRegistration.objects.filter(query, event_id=event_id)
+            .values_list('pk', 'qr_version', 'status', 'qr_token')
+        }
+
+    by_token = {row[3]: row for row in current.values() if row[3]}
+    to_mark = {}
+    for i, (registration_id, version) in signed.items():
+        row = current.get(registration_id)
+        results[i] = _classify(row, version, to_mark, i)
+    for token, indexes in legacy.items():
+        row = by_token.get(token)
+        for i in indexes:
+            results[i] = _classify(row, row[1] if row else None, to_mark, i)
+
+    # 🎯 Un seul UPDATE ensembliste pour tout le lot
+    marked = mark_attended(event_id, to_mark) if to_mark else 0
+    if marked < len(to_mark):
+        # Statut modifié entre la lecture et l'écriture : relire les lignes concernées
+        attended = set(
+            EventRegistration.objects.filter(pk__in=to_mark, status='attended').values_list('pk', flat=True)
+        )
+        for registration_id, i in to_mark.items():
+            if registration_id not in attended:
+                results[i] = 'not_confirmed'
+    remember_scans((pk, current[pk][1]) for pk, i in to_mark.items() if results[i] == 'checked_in')
+
+    summary = defaultdict(int)
+    for result in results:
+        summary[result] += 1
+    return {"marked": marked, "summary": dict(summary), "results": results}
+
+
+def _classify(row, version, to_mark, index):
+    if row is None:
+        return 'invalid'
+    registration_id, current_version, status, _ = row
+    if current_version != version:
+        return 'revoked'
+    if status == 'attended':
+        return 'already_checked_in'
+    if status != 'confirmed':
+        return 'not_confirmed'
+    if registration_id in to_mark:
+        # Même billet présenté sous ses deux formes (signée et historique)
+        return 'duplicate'
+    to_mark[registration_id] = index
+    return 'checked_in'
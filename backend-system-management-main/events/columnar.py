@@ -0,0 +1,381 @@
+"""
+Export analytique en Parquet (Arrow) pour l'équipe BI et l'entraînement des
+modèles : une table par modèle, partitionnée par mois (`month=AAAA-MM`, heure
+locale), typée à partir des champs Django.
+
+Les lignes sont lues mois par mois, par pages de clés primaires (voir
+exports.iter_values), et écrites au fil de l'eau : un seul fichier ouvert à
+la fois, mémoire bornée par `chunk_size`. Les partitions sont écrites dans un
+répertoire temporaire puis substituées mois par mois. Les colonnes
+personnelles (emails, téléphones, jetons, IP) ne sont pas exportées.
+
+Export incrémental (`since`) : une ligne reste dans le mois de sa date de
+partition. Sont réécrits les mois à partir de `since` et les mois plus
+anciens qui contiennent une ligne modifiée depuis (`updated_at`) ; une table
+sans `updated_at` est réécrite entièrement. Les suppressions dans les mois
+antérieurs à `since` ne sont vues que par un export complet.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+
+from .models import AnalyticsExportJob, Event, EventRegistration, RefundRequest, TicketType, VirtualEventInteraction
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 10000
+MANIFEST_NAME = '_manifest.json'
+PARTITION_RE = re.compile(r'^month=(\d{4}-\d{2})$')
+# Un seul export à la fois (tâche Celery ou commande) : ils partagent le répertoire temporaire
+EXPORT_LOCK = 'analytics_export:lock'
+
+# nom: (modèle, champ de partition, colonnes)
+TABLES = {
+    'events': (Event, 'created_at', (
+        'id', 'organizer_id', 'category_id', 'title', 'event_type', 'place_type', 'status',
+        'access_type', 'is_free', 'is_featured', 'is_public', 'enable_waitlist', 'price',
+        'max_capacity', 'current_registrations', 'start_date', 'end_date', 'created_at',
+        'published_at', 'updated_at',
+    )),
+    'registrations': (EventRegistration, 'registered_at', (
+        'id', 'event_id', 'user_id', 'is_guest_registration', 'guest_country', 'status',
+        'ticket_type_id', 'session_type_id', 'price_paid', 'payment_status', 'payment_provider',
+        'registered_at', 'confirmed_at', 'cancelled_at', 'updated_at',
+    )),
+    'refunds': (RefundRequest, 'created_at', (
+        'id', 'registration_id', 'status', 'amount_paid', 'refund_percentage', 'refund_amount',
+        'processed_at', 'processed_by_id', 'created_at', 'updated_at',
+    )),
+    'interactions': (VirtualEventInteraction, 'created_at', (
+        'id', 'event_id', 'user_id', 'interaction_type', 'rating', 'created_at',
+    )),
+    'ticket_types': (TicketType, 'created_at', (
+        'id', 'event_id', 'name', 'price', 'discount_price', 'discount_percent',
+        'is_discount_active', 'quantity', 'is_vip', 'sold_count', 'sale_start', 'sale_end',
+        'created_at',
+    )),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("pyarrow non installé pour l'export Parquet")
+    return pyarrow
+
+
+def default_directory():
+    return getattr(settings, 'ANALYTICS_EXPORT_DIR', os.path.join(settings.BASE_DIR, 'analytics_exports'))
+
+
+def _arrow_type(pa, field):
+    internal = field.get_internal_type()
+    if field.is_relation or internal in ('AutoField', 'BigAutoField', 'BigIntegerField', 'IntegerField',
+                                         'PositiveIntegerField', 'PositiveSmallIntegerField', 'SmallIntegerField'):
+        return pa.int64()
+    if internal == 'BooleanField':
+        return pa.bool_()
+    if internal == 'DecimalField':
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if internal == 'FloatField':
+        return pa.float64()
+    if internal == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    if internal == 'DateField':
+        return pa.date32()
+    return pa.string()
+
+
+def schema(name):
+    """Schéma Arrow d'une table, déduit des champs du modèle"""
+    pa = _pyarrow()
+    model, _, columns = TABLES[name]
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return pa.schema([
+        pa.field(column, _arrow_type(pa, fields[column]), nullable=fields[column].null)
+        for column in columns
+    ])
+
+
+def _month(value):
+    return timezone.localtime(value).strftime('%Y-%m') if value else None
+
+
+def month_start(month):
+    """Début (aware, heure locale) d'un mois AAAA-MM"""
+    return timezone.make_aware(datetime.strptime(month, '%Y-%m'))
+
+
+class _PartitionWriter:
+    """Écrit les lignes d'une table mois par mois ; un seul fichier Parquet ouvert"""
+
+    def __init__(self, directory, table_schema, chunk_size):
+        self.pa = _pyarrow()
+        self.directory = directory
+        self.schema = table_schema
+        self.chunk_size = chunk_size
+        self.month = None
+        self.writer = None
+        self.columns = [[] for _ in table_schema.names]
+        self.rows = {}
+
+    def add(self, month, values):
+        if month != self.month:
+            self._close()
+            self.month = month
+            self.rows[month] = 0
+        for column, value in zip(self.columns, values):
+            column.append(value)
+        self.rows[month] += 1
+        if len(self.columns[0]) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.columns[0]:
+            return
+        if self.writer is None:
+            path = os.path.join(self.directory, f'month={self.month}')
+            os.makedirs(path, exist_ok=True)
+            self.writer = self.pa.parquet.ParquetWriter(
+                os.path.join(path, 'part-0.parquet'), self.schema, compression='snappy'
+            )
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(
+            [self.pa.array(column, type=field.type) for column, field in zip(self.columns, self.schema)],
+            schema=self.schema,
+        ))
+        self.columns = [[] for _ in self.schema.names]
+
+    def _close(self):
+        self._flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def close(self):
+        self._close()
+        return self.rows
+
+
+def _next_month(month):
+    year, number = map(int, month.split('-'))
+    return f'{year + number // 12}-{number % 12 + 1:02d}'
+
+
+def _months(queryset, date_field, since):
+    """
+    Mois à réécrire, triés : tous les mois de la table sans `since`, sinon
+    les mois à partir de `since` et ceux des lignes modifiées depuis.
+    """
+    from .exports import iter_values
+
+    bounds = queryset.aggregate(first=models.Min(date_field), last=models.Max(date_field))
+    if bounds['first'] is None:
+        return []
+    first, last = _month(bounds['first']), _month(bounds['last'])
+    months = set()
+    if since is None or not _has_updated_at(queryset.model):
+        month = first
+    else:
+        month = max(first, since)
+        updated = queryset.filter(updated_at__gte=month_start(since), **{f'{date_field}__lt': month_start(since)})
+        months.update(_month(values[0]) for values in iter_values(updated, (date_field,)))
+    while month <= last:
+        months.add(month)
+        month = _next_month(month)
+    return sorted(months)
+
+
+def _has_updated_at(model):
+    return any(field.name == 'updated_at' for field in model._meta.concrete_fields)
+
+
+def export_table(name, directory=None, since=None, chunk_size=CHUNK_SIZE):
+    """
+    (Ré)écrire les partitions d'une table : toutes, ou avec `since` (AAAA-MM)
+    les mois à partir de `since` et ceux des lignes modifiées depuis. Les
+    autres partitions sont conservées. Retourne {mois: lignes} des
+    partitions écrites.
+    """
+    from .exports import iter_values
+
+    directory = directory or default_directory()
+    model, date_field, columns = TABLES[name]
+    table_dir = os.path.join(directory, name)
+    staging = os.path.join(directory, f'.{name}.tmp')
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    queryset = model.objects.all()
+    months = _months(queryset, date_field, since)
+    writer = _PartitionWriter(staging, schema(name), chunk_size)
+    try:
+        for month in months:
+            in_month = queryset.filter(**{
+                f'{date_field}__gte': month_start(month),
+                f'{date_field}__lt': month_start(_next_month(month)),
+            })
+            for values in iter_values(in_month, columns, chunk_size):
+                writer.add(month, values)
+    finally:
+        written = writer.close()
+
+    # Substitution mois par mois ; les mois relus devenus vides disparaissent
+    os.makedirs(table_dir, exist_ok=True)
+    for entry in os.listdir(table_dir):
+        match = PARTITION_RE.match(entry)
+        if match and (since is None or match.group(1) in months or match.group(1) >= since) and match.group(1) not in written:
+            shutil.rmtree(os.path.join(table_dir, entry))
+    for month in written:
+        target = os.path.join(table_dir, f'month={month}')
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(os.path.join(staging, f'month={month}'), target)
+    shutil.rmtree(staging, ignore_errors=True)
+    logger.info(f"Export Parquet {name}: {sum(written.values())} ligne(s), {len(written)} mois")
+    return written
+
+
+def export(tables=None, directory=None, since=None, chunk_size=CHUNK_SIZE):
+    """Exporter les tables demandées (défaut : toutes) puis réécrire le manifeste"""
+    directory = directory or default_directory()
+    os.makedirs(directory, exist_ok=True)
+    results = {}
+    for name in tables or TABLES:
+        results[name] = export_table(name, directory, since, chunk_size)
+    write_manifest(directory)
+    return results
+
+
+def partitions(name, directory=None):
+    """Fichiers d'une table : [(mois, chemin)] triés par mois"""
+    table_dir = os.path.join(directory or default_directory(), name)
+    if not os.path.isdir(table_dir):
+        return []
+    result = []
+    for entry in sorted(os.listdir(table_dir)):
+        match = PARTITION_RE.match(entry)
+        path = os.path.join(table_dir, entry, 'part-0.parquet')
+        if match and os.path.exists(path):
+            result.append((match.group(1), path))
+    return result
+
+
+def write_manifest(directory=None):
+    """Manifeste JSON : schéma, lignes et taille de chaque partition (métadonnées Parquet)"""
+    pa = _pyarrow()
+    directory = directory or default_directory()
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'generated_at': timezone.now().isoformat(),
+        'partitioning': 'month (heure locale, hive: month=AAAA-MM)',
+        'tables': {},
+    }
+    for name in TABLES:
+        files = partitions(name, directory)
+        manifest['tables'][name] = {
+            'columns': {field.name: str(field.type) for field in schema(name)},
+            'rows': 0,
+            'partitions': {},
+        }
+        for month, path in files:
+            rows = pa.parquet.read_metadata(path).num_rows
+            manifest['tables'][name]['partitions'][month] = {'rows': rows, 'bytes': os.path.getsize(path)}
+            manifest['tables'][name]['rows'] += rows
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+    return manifest
+
+
+def read_manifest(directory=None):
+    path = os.path.join(directory or default_directory(), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_table(name, columns=None, since=None, directory=None):
+    """
+    Table Arrow d'un export (toutes partitions ou à partir de `since`), avec la
+    colonne `month`. `.to_pandas()` pour un DataFrame.
+    """
+    pa = _pyarrow()
+    files = [(month, path) for month, path in partitions(name, directory) if since is None or month >= since]
+    tables = []
+    for month, path in files:
+        table = pa.parquet.read_table(path, columns=columns)
+        tables.append(table.append_column('month', pa.array([month] * table.num_rows, type=pa.string())))
+    if not tables:
+        table = schema(name).empty_table()
+        if columns:
+            table = table.select(columns)
+        return table.append_column('month', pa.array([], type=pa.string()))
+    return pa.concat_tables(tables)
+
+
+def read_frame(name, columns=None, since=None, directory=None):
+    """DataFrame pandas d'un export, montants décimaux convertis en float64"""
+    pa = _pyarrow()
+    table = read_table(name, columns, since, directory)
+    fields = [
+        pa.field(field.name, pa.float64(), field.nullable) if pa.types.is_decimal(field.type) else field
+        for field in table.schema
+    ]
+    return table.cast(pa.schema(fields)).to_pandas()
+
+
+def run_job(job_id):
+    """
+    Exécuter un AnalyticsExportJob en attente sous le verrou des exports.
+    Verrou déjà pris (commande en cours) : le job reste en attente, le
+    balayage le reprendra. Le passage pending -> running est atomique.
+    Retourne le statut final, ou None si le job n'a pas été exécuté.
+    """
+    if not cache.add(EXPORT_LOCK, 1, settings.CELERY_TASK_TIME_LIMIT):
+        return None
+    try:
+        claimed = AnalyticsExportJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', started_at=timezone.now()
+        )
+        if not claimed:
+            return None
+        job = AnalyticsExportJob.objects.get(pk=job_id)
+        try:
+            results = export(tables=job.tables or None, since=job.since or None)
+            job.result = {name: sum(written.values()) for name, written in results.items()}
+            job.status = 'completed'
+        except Exception as e:
+            logger.error(f"Export Parquet {job_id}: échec: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+        return job.status
+    finally:
+        cache.delete(EXPORT_LOCK)
+
+
+def due_job_ids(delay=timedelta(minutes=1), limit=5):
+    """
+    Jobs en attente dont la publication a pu se perdre (broker indisponible,
+    worker arrêté) ; les jobs interrompus passent d'abord en échec.
+    """
+    stale = AnalyticsExportJob.fail_stale()
+    if stale:
+        logger.warning(f"Exports Parquet: {stale} job(s) interrompu(s) marqué(s) en échec")
+    return list(
+        AnalyticsExportJob.objects.filter(status='pending', created_at__lte=timezone.now() - delay)
+        .order_by('created_at').values_list('pk', flat=True)[:limit]
+    )
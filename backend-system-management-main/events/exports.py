@@ -0,0 +1,273 @@
+"""
+Export des inscriptions d'un événement, ligne par ligne : les inscriptions
+sont lues par paquets de clés primaires croissantes (pk > dernier pk lu,
+LIMIT chunk_size) et le CSV est envoyé au fur et à mesure
+(StreamingHttpResponse), sans construire le fichier en mémoire. PyMySQL
+charge tout le résultat d'une requête côté client, `.iterator()` ne
+limiterait pas la mémoire sur MySQL.
+
+Les exports Excel sont générés par Celery (ExportJob) en mode write-only
+d'openpyxl, largeurs de colonnes fixées d'avance, puis écrits sous un nom
+aléatoire dans le stockage privé des exports (settings.EXPORTS_ROOT, hors de
+MEDIA_ROOT). Les jobs terminés depuis plus de EXPORT_RETENTION_DAYS jours
+sont supprimés avec leur fichier (purge_expired).
+"""
+import csv
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import EventRegistration, ExportJob
+from .rollups import day_start
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+LINES_PER_BLOCK = 500
+# Fréquence d'écriture de l'avancement d'un ExportJob
+PROGRESS_EVERY = 5000
+FILTER_PARAMS = ('status', 'ticket_type', 'date_from', 'date_to')
+# Un job encore "en cours" après la limite dure des tâches Celery a perdu son worker
+STALE_RUNNING_DELAY = timedelta(seconds=settings.CELERY_TASK_TIME_LIMIT)
+
+HEADERS = [
+    'ID Inscription', 'Username', 'Email', 'Nom', 'Prénom', 'Status',
+    'Type de Billet', 'Prix Payé', 'Date d\'inscription', 'Statut Paiement',
+    'Demande de Remboursement', 'Statut Remboursement'
+]
+# Largeurs Excel fixées d'avance : le mode write-only ne permet pas de relire les cellules
+COLUMN_WIDTHS = [14, 20, 32, 24, 20, 12, 20, 12, 20, 16, 26, 22]
+PRICE_COLUMN = HEADERS.index('Prix Payé')
+
+# Colonnes lues en base : pas d'instances de modèles, une jointure par relation
+FIELDS = (
+    'id', 'is_guest_registration', 'guest_full_name', 'guest_email',
+    'user__username', 'user__email', 'user__first_name', 'user__last_name',
+    'status', 'ticket_type__name', 'price_paid', 'registered_at', 'payment_status',
+    'refund_request__status',
+)
+
+
+def _date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"{name} doit être au format AAAA-MM-JJ")
+
+
+def registrations(event, params):
+    """
+    Inscriptions de l'événement filtrées par les paramètres de requête :
+    `status` (un ou plusieurs, séparés par des virgules), `ticket_type` (id),
+    `date_from` / `date_to` (AAAA-MM-JJ, inclus). Lève ValueError si un
+    filtre est invalide.
+    """
+    queryset = EventRegistration.objects.filter(event=event)
+
+    if params.get('status'):
+        statuses = [value.strip() for value in params['status'].split(',') if value.strip()]
+        unknown = set(statuses) - set(dict(EventRegistration.STATUS_CHOICES))
+        if unknown:
+            raise ValueError(f"Statut inconnu: {', '.join(sorted(unknown))}")
+        queryset = queryset.filter(status__in=statuses)
+
+    if params.get('ticket_type'):
+        try:
+            queryset = queryset.filter(ticket_type_id=int(params['ticket_type']))
+        except ValueError:
+            raise ValueError("ticket_type doit être un identifiant numérique")
+
+    if params.get('date_from'):
+        queryset = queryset.filter(registered_at__gte=day_start(_date(params['date_from'], 'date_from')))
+    if params.get('date_to'):
+        last = _date(params['date_to'], 'date_to')
+        queryset = queryset.filter(registered_at__lt=day_start(last + timedelta(days=1)))
+
+    return queryset.order_by('pk')
+
+
+def iter_values(queryset, fields, chunk_size=CHUNK_SIZE):
+    """
+    Tuples `fields` de toutes les lignes du queryset, lus par pages de
+    `chunk_size` en ordre de clé primaire : une requête par page, au plus
+    une page en mémoire quel que soit le pilote de base de données.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(page.values_list('pk', *fields)[:chunk_size])
+        for values in chunk:
+            yield values[1:]
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1][0]
+
+
+def rows(queryset, chunk_size=CHUNK_SIZE):
+    """Lignes d'export (mêmes colonnes que HEADERS), inscriptions d'invités comprises"""
+    for values in iter_values(queryset, FIELDS, chunk_size):
+        (pk, is_guest, guest_name, guest_email, username, email, first_name, last_name,
+         reg_status, ticket_name, price_paid, registered_at, payment_status, refund_status) = values
+        if is_guest or username is None:
+            # Invité sans compte (ou compte supprimé) : nom complet dans « Nom »
+            username, email, first_name, last_name = '', guest_email, guest_name, ''
+        yield [
+            pk,
+            username,
+            email or '',
+            first_name or '',
+            last_name or '',
+            reg_status,
+            ticket_name or 'Standard',
+            str(price_paid or 0),
+            timezone.localtime(registered_at).strftime('%Y-%m-%d %H:%M'),
+            payment_status or 'Non défini',
+            'Oui' if refund_status else 'Non',
+            refund_status or 'Aucune',
+        ]
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : chaque ligne est renvoyée au lieu d'être écrite"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(queryset, chunk_size):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADERS)
+    try:
+        # Lignes envoyées par blocs : un morceau HTTP par ligne coûterait cher sur 500k lignes
+        block = []
+        for row in rows(queryset, chunk_size):
+            block.append(writer.writerow(row))
+            if len(block) >= LINES_PER_BLOCK:
+                yield ''.join(block)
+                block = []
+        if block:
+            yield ''.join(block)
+    except Exception as e:
+        # Les en-têtes HTTP sont déjà partis : on ne peut plus renvoyer une 500
+        logger.error(f"Export CSV interrompu: {e}")
+        raise
+
+
+def csv_response(queryset, filename, chunk_size=CHUNK_SIZE):
+    """Réponse CSV en streaming : les premiers octets partent avant la fin de la lecture"""
+    response = StreamingHttpResponse(_csv_lines(queryset, chunk_size), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ---------------------------------------------------------------- Excel
+
+
+def job_filters(params):
+    """Filtres à enregistrer sur un ExportJob (paramètres de requête reconnus)"""
+    return {name: params[name] for name in FILTER_PARAMS if params.get(name)}
+
+
+def write_xlsx(job, path):
+    """Écrire l'export du job dans `path` en mode write-only, avancement compris"""
+    try:
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+    except ImportError:
+        raise RuntimeError("openpyxl non installé pour l'export Excel")
+
+    queryset = registrations(job.event, job.filters)
+    job.total_rows = queryset.count()
+    ExportJob.objects.filter(pk=job.pk).update(total_rows=job.total_rows)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Inscriptions')
+    for index, width in enumerate(COLUMN_WIDTHS, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+    ws.append(HEADERS)
+
+    processed = 0
+    for row in rows(queryset):
+        row[PRICE_COLUMN] = float(row[PRICE_COLUMN])
+        ws.append(row)
+        processed += 1
+        if processed % PROGRESS_EVERY == 0:
+            ExportJob.objects.filter(pk=job.pk).update(processed_rows=processed)
+    wb.save(path)
+    job.processed_rows = processed
+
+
+def run_job(job_id):
+    """
+    Générer le fichier d'un ExportJob en attente. Le passage pending -> running
+    est atomique : un job publié deux fois (tâche + balayage) n'est traité
+    qu'une fois. Retourne le statut final, ou None si le job était déjà pris.
+    """
+    claimed = ExportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    job = ExportJob.objects.select_related('event').get(pk=job_id)
+
+    fd, path = tempfile.mkstemp(suffix=f'.{job.format}')
+    os.close(fd)
+    try:
+        write_xlsx(job, path)
+        with open(path, 'rb') as f:
+            job.file.save(f"{uuid.uuid4().hex}.{job.format}", File(f), save=False)
+        job.status = 'completed'
+    except Exception as e:
+        logger.error(f"Export {job_id}: échec de la génération: {e}")
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        os.remove(path)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'error', 'total_rows', 'processed_rows', 'finished_at'])
+    return job.status
+
+
+def due_job_ids(delay=timedelta(minutes=1), limit=20):
+    """
+    Jobs en attente dont la publication a pu se perdre (broker indisponible,
+    worker arrêté). Les jobs restés en cours au-delà de la limite de temps des
+    tâches Celery (worker tué) passent en échec : l'export peut être relancé.
+    """
+    now = timezone.now()
+    stale = ExportJob.objects.filter(status='running', started_at__lt=now - STALE_RUNNING_DELAY).update(
+        status='failed', error='Export interrompu (worker arrêté)', finished_at=now
+    )
+    if stale:
+        logger.warning(f"Exports: {stale} job(s) interrompu(s) marqué(s) en échec")
+    return list(
+        ExportJob.objects.filter(status='pending', created_at__lte=now - delay)
+        .order_by('created_at').values_list('pk', flat=True)[:limit]
+    )
+
+
+def purge_expired(days=None):
+    """
+    Supprimer les jobs terminés (ou en échec) depuis plus de `days` jours
+    (défaut : EXPORT_RETENTION_DAYS) et leurs fichiers. Retourne le nombre
+    de jobs supprimés.
+    """
+    days = settings.EXPORT_RETENTION_DAYS if days is None else days
+    expired = ExportJob.objects.filter(
+        status__in=['completed', 'failed'], finished_at__lt=timezone.now() - timedelta(days=days)
+    )
+    purged = 0
+    for job in expired:
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        purged += 1
+    return purged
@@ -0,0 +1,118 @@
+"""
+Features des modèles prédictifs, calculées colonne par colonne (pandas /
+NumPy) à partir d'une liste de dicts ou d'un DataFrame d'événements.
+
+Ville, pays et catégorie sont encodés par un hachage stable (BLAKE2b) : le
+`hash()` de Python est salé par processus (PYTHONHASHSEED), ce qui donnait des
+encodages différents à l'entraînement, dans chaque worker gunicorn et dans
+Celery. La description du pipeline (`PIPELINE`) est enregistrée avec le
+modèle ; un modèle entraîné avec un autre pipeline doit être réentraîné.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+FEATURE_NAMES = [
+    'price', 'max_capacity', 'duration_hours', 'organizer_events_count',
+    'organizer_avg_rating', 'days_until_event', 'category_popularity',
+    'tags_count', 'weekday', 'month', 'hour', 'winter', 'spring',
+    'summer', 'autumn', 'city_encoding', 'country_encoding',
+    'category_encoding', 'price_ratio'
+]
+
+# Colonnes numériques et valeur par défaut (clé absente ou vide)
+NUMERIC_DEFAULTS = {
+    'price': 0.0,
+    'max_capacity': 10,
+    'duration_hours': 2.0,
+    'organizer_events_count': 0,
+    'organizer_avg_rating': 0.0,
+    'days_until_event': 0,
+    'category_popularity': 5,
+    'tags_count': 0,
+}
+# Nombre de valeurs d'encodage par colonne texte (0 = vide)
+HASH_BUCKETS = {'city': 1000, 'country': 100, 'category': 50}
+# Valeurs temporelles sans date de début (août, été)
+DEFAULT_TEMPORAL = {'weekday': 0, 'month': 8, 'hour': 12}
+
+PIPELINE = {
+    'version': 2,
+    'hash': 'blake2b-64',
+    'buckets': HASH_BUCKETS,
+    'features': FEATURE_NAMES,
+}
+
+
+def stable_hash(value, buckets):
+    """Encodage d'une chaîne dans [0, buckets), identique d'un processus à l'autre"""
+    digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % buckets
+
+
+def encode(values, buckets):
+    """Encodage stable d'une colonne texte : un hachage par valeur distincte, 0 pour les vides"""
+    # Conversion et hachage sur les seules valeurs distinctes
+    codes, uniques = pd.factorize(values.fillna(''))
+    uniques = [str(value).strip() for value in uniques]
+    encoded = np.array([stable_hash(value, buckets) if value else 0 for value in uniques], dtype=np.int64)
+    return encoded[codes] if len(uniques) else np.zeros(len(values), dtype=np.int64)
+
+
+def _column(df, name, default):
+    if name not in df:
+        return pd.Series(default, index=df.index)
+    return df[name]
+
+
+def build(events):
+    """
+    Matrice de features (float64, colonnes dans l'ordre de FEATURE_NAMES) et
+    cible (taux de remplissage dans [0, 1]) pour une liste de dicts ou un
+    DataFrame d'événements.
+    """
+    df = events if isinstance(events, pd.DataFrame) else pd.DataFrame.from_records(list(events))
+    if df.empty:
+        return np.empty((0, len(FEATURE_NAMES))), np.empty(0)
+    columns = {}
+
+    for name, default in NUMERIC_DEFAULTS.items():
+        columns[name] = pd.to_numeric(_column(df, name, default), errors='coerce').fillna(default).astype(float)
+
+    # Features temporelles : seules les valeurs de type date sont prises en compte
+    start_dates = _column(df, 'start_date', None)
+    if pd.api.types.is_datetime64_any_dtype(start_dates):
+        has_date = start_dates.notna()
+    else:
+        has_date = start_dates.map(lambda value: hasattr(value, 'weekday')).astype(bool)
+    dates = pd.to_datetime(start_dates.where(has_date), utc=True)
+    for name, default in DEFAULT_TEMPORAL.items():
+        values = dates.dt.weekday if name == 'weekday' else getattr(dates.dt, name)
+        columns[name] = values.where(has_date, default).astype(float)
+    month = columns['month']
+    columns['winter'] = month.isin([12, 1, 2]).astype(float)
+    columns['spring'] = month.isin([3, 4, 5]).astype(float)
+    columns['summer'] = month.isin([6, 7, 8]).astype(float)
+    columns['autumn'] = month.isin([9, 10, 11]).astype(float)
+
+    # Features géographiques et catégorie (hachage stable)
+    for name, buckets in HASH_BUCKETS.items():
+        columns[f'{name}_encoding'] = encode(_column(df, name, ''), buckets).astype(float)
+
+    # Prix relatif (défaut : le prix de l'événement lui-même)
+    price = columns['price']
+    similar = pd.to_numeric(_column(df, 'avg_price_similar_events', np.nan), errors='coerce').fillna(price)
+    columns['price_ratio'] = (price / similar.clip(lower=1.0)).where(similar > 0, 1.0)
+
+    X = np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in FEATURE_NAMES])
+
+    # Cible : ratio, ou nombre absolu d'inscrits rapporté à la capacité
+    fill_rate = pd.to_numeric(_column(df, 'fill_rate', 0.0), errors='coerce').fillna(0.0)
+    max_capacity = columns['max_capacity']
+    y = np.where(
+        fill_rate > 1,
+        np.minimum(1.0, fill_rate / max_capacity.where(max_capacity != 0, np.nan)),
+        fill_rate.clip(0.0, 1.0),
+    )
+    return X, np.nan_to_num(np.asarray(y, dtype=np.float64))
@@ -0,0 +1,202 @@
+"""
+Forêt aléatoire compilée : les arbres d'un RandomForestRegressor entraîné
+sont aplatis en tableaux NumPy contigus (feature, threshold, children —
+colonnes droite, gauche —, value), un fichier .npy par tableau, ouverts en
+mmap. Le chargement ne désérialise aucun objet sklearn et les pages sont
+partagées entre les workers par le cache du système.
+
+L'évaluation parcourt tous les arbres pour un paquet de lignes en même
+temps, un niveau de profondeur par itération : les feuilles bouclent sur
+elles-mêmes, `max_depth` itérations suffisent. Ce parcours gagne sur les
+petits lots (requêtes du tableau de bord) ; au-delà de SKLEARN_MIN_ROWS
+lignes, le modèle sklearn reprend la main. Les features sont en
+float32 comme dans sklearn ; les seuils (float64 dans sklearn) sont
+arrondis au float32 inférieur, ce qui donne exactement les mêmes
+comparaisons pour une valeur float32 : les prédictions par arbre sont
+identiques.
+
+Disposition sur disque, à côté du fichier joblib :
+
+    <nom>.forest/current.json    version active et métadonnées (scaler, pipeline)
+    <nom>.forest/<version>/*.npy tableaux des nœuds
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+FORMAT_VERSION = 2
+ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+META_NAME = 'current.json'
+# Versions conservées (un worker peut encore lire la précédente)
+KEEP_VERSIONS = 2
+# Lignes évaluées ensemble : tableaux (arbres, lignes) dans le cache du processeur
+BLOCK_ROWS = 512
+# À partir de cette taille de lot, tree.predict de sklearn (Cython) est plus
+# rapide que le parcours NumPy (benchmark_forest_evaluator) : les gros lots
+# (scoring de nuit) passent par le modèle sklearn
+SKLEARN_MIN_ROWS = 2000
+
+
+def directory_for(model_path):
+    """Répertoire de la forêt compilée d'un fichier de modèle joblib"""
+    return f'{os.path.splitext(model_path)[0]}.forest'
+
+
+def _float32_floor(values):
+    """Plus grand float32 <= chaque valeur : x <= seuil32 équivaut à x <= seuil pour x float32"""
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def flatten(model):
+    """Nœuds de tous les arbres concaténés ; indices des enfants globaux, feuilles rebouclées"""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    counts = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+
+    feature, threshold, children, value = [], [], [], []
+    for offset, tree in zip(roots, trees):
+        nodes = np.arange(tree.node_count, dtype=np.int64) + offset
+        is_leaf = tree.children_left == -1
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(_float32_floor(np.where(is_leaf, 0.0, tree.threshold)))
+        # Colonne 0 : enfant droit (x > seuil), colonne 1 : enfant gauche (x <= seuil)
+        children.append(np.column_stack([
+            np.where(is_leaf, nodes, tree.children_right + offset),
+            np.where(is_leaf, nodes, tree.children_left + offset),
+        ]).astype(np.int32))
+        value.append(tree.value[:, 0, 0].astype(np.float64))
+
+    arrays = {
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'children': np.concatenate(children),
+        'value': np.concatenate(value),
+        'roots': roots.astype(np.int32),
+    }
+    max_depth = max(tree.max_depth for tree in trees)
+    return arrays, max_depth
+
+
+def export(model_path, model, scaler, version, **metadata):
+    """
+    Écrire la forêt compilée d'un modèle (et les paramètres du scaler) à côté
+    de son fichier joblib. Les tableaux sont écrits dans un répertoire par
+    version, puis current.json est remplacé atomiquement.
+    """
+    directory = directory_for(model_path)
+    arrays, max_depth = flatten(model)
+    version_dir = os.path.join(directory, str(version))
+    tmp_dir = f'{version_dir}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(array))
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(tmp_dir, version_dir)
+
+    meta = dict(
+        metadata,
+        format_version=FORMAT_VERSION,
+        version=version,
+        n_trees=len(arrays['roots']),
+        n_nodes=len(arrays['feature']),
+        n_features=int(model.n_features_in_),
+        max_depth=int(max_depth),
+        scaler_mean=scaler.mean_.tolist(),
+        scaler_scale=scaler.scale_.tolist(),
+    )
+    meta_path = os.path.join(directory, META_NAME)
+    with open(f'{meta_path}.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(f'{meta_path}.tmp', meta_path)
+
+    # Anciennes versions : les plus récentes sont conservées
+    versions = sorted(
+        (entry for entry in os.listdir(directory) if os.path.isdir(os.path.join(directory, entry))
+         and not entry.endswith('.tmp')),
+        key=lambda entry: os.path.getmtime(os.path.join(directory, entry)),
+    )
+    for entry in versions[:-KEEP_VERSIONS]:
+        if entry != str(version):
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    return meta
+
+
+class CompiledForest:
+    """Forêt compilée ouverte en mmap ; `data` et `version` comme un LoadedModel du registre"""
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.data = meta
+        version_dir = os.path.join(directory, str(meta['version']))
+        for name in ARRAYS:
+            # Vue ndarray sur le mmap (sans la sous-classe np.memmap à chaque indexation)
+            setattr(self, name, np.asarray(np.load(os.path.join(version_dir, f'{name}.npy'), mmap_mode='r')))
+        self.mean = np.asarray(meta['scaler_mean'], dtype=np.float64)
+        self.scale = np.asarray(meta['scaler_scale'], dtype=np.float64)
+        self.max_depth = meta['max_depth']
+
+    @property
+    def version(self):
+        return self.data['version']
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict_trees(self, features):
+        """
+        Prédictions de chaque arbre pour un lot de features brutes (non
+        standardisées) : matrice (arbres, lignes)
+        """
+        # Même calcul que StandardScaler.transform, puis float32 comme sklearn ;
+        # colonnes contiguës : une feature d'un paquet de lignes est une tranche
+        X = ((np.asarray(features, dtype=np.float64) - self.mean) / self.scale).astype(np.float32)
+        columns = np.ascontiguousarray(X.T)
+        n_rows = len(X)
+        children = self.children.reshape(-1)
+        predictions = np.empty((self.n_trees, n_rows))
+        for start in range(0, n_rows, BLOCK_ROWS):
+            block = np.ascontiguousarray(columns[:, start:start + BLOCK_ROWS])
+            width = block.shape[1]
+            flat = block.reshape(-1)
+            rows = np.arange(width, dtype=np.int32)[None, :]
+            nodes = np.repeat(self.roots[:, None], width, axis=1)
+            # Tampons réutilisés à chaque niveau (pas d'allocation dans la boucle)
+            shape = nodes.shape
+            index = np.empty(shape, dtype=np.int32)
+            values = np.empty(shape, dtype=np.float32)
+            thresholds = np.empty(shape, dtype=np.float32)
+            go_left = np.empty(shape, dtype=bool)
+            for _ in range(self.max_depth):
+                # Valeur de la feature du nœud pour chaque ligne : flat[feature * width + ligne]
+                np.take(self.feature, nodes, out=index)
+                index *= width
+                index += rows
+                np.take(flat, index, out=values)
+                np.take(self.threshold, nodes, out=thresholds)
+                np.less_equal(values, thresholds, out=go_left)
+                # children[n] = [droite, gauche] : 2n + go_left
+                nodes *= 2
+                nodes += go_left
+                nodes = np.take(children, nodes)
+            predictions[:, start:start + width] = self.value[nodes]
+        return predictions
+
+
+def load(directory):
+    """Forêt compilée active d'un répertoire ; None si aucune n'a été exportée"""
+    meta_path = os.path.join(directory, META_NAME)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    if meta.get('format_version') != FORMAT_VERSION:
+        return None
+    return CompiledForest(directory, meta)
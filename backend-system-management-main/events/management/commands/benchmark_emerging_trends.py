@@ -0,0 +1,194 @@
+import os
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.db.models import Avg, Count, F, Max, Min, Q, StdDev
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from events import rollups, snapshots, timeseries
+from events.models import Category, Event, EventRegistration, Tag
+from events.predictive_analytics import get_predictive_service
+
+
+class Command(BaseCommand):
+    help = 'Benchmark des tendances émergentes : requêtes sur les tables, agrégats quotidiens, instantané'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days-back', type=int, default=90, help='Période analysée en jours (défaut: 90)')
+        parser.add_argument('--repeat', type=int, default=5, help='Mesures par scénario, médiane retenue (défaut: 5)')
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Événements générés (generate_load_dataset) pour chaque mesure (défaut: 1000 10000)'
+        )
+        parser.add_argument('--current', action='store_true', help='Mesurer la base telle quelle, sans générer de données')
+        parser.add_argument(
+            '--registrations-per-event',
+            type=float,
+            default=20,
+            help='Inscriptions moyennes par événement généré (défaut: 20)'
+        )
+        parser.add_argument('--prefix', default='trends_bench', help='Préfixe des données générées (défaut: trends_bench)')
+
+    def handle(self, *args, **options):
+        """
+        Compare l'ancien calcul (jointures multiples sur Category et Tag, deux
+        COUNT par semaine sur les tables) au calcul depuis les agrégats
+        quotidiens et à la lecture de l'instantané par le tableau de bord,
+        vérifie que les comptages sont identiques et affiche temps et nombre
+        de requêtes. Chaque taille de --sizes est générée par
+        generate_load_dataset (agrégats reconstruits), mesurée puis supprimée ;
+        avec --current, les agrégats de la base doivent être à jour
+        (build_daily_rollups).
+        """
+        days_back = options['days_back']
+        if options['current']:
+            rows = [self._benchmark(days_back, options['repeat'])]
+        else:
+            rows = []
+            try:
+                for size in options['sizes']:
+                    self._generate(options['prefix'], size, options['registrations_per_event'])
+                    rows.append(self._benchmark(days_back, options['repeat']))
+            finally:
+                self._generate(options['prefix'], None, None)
+
+        self.stdout.write(
+            f'\n{"événements":>11}{"inscriptions":>14}{"ancien ms":>11}{"req.":>6}'
+            f'{"agrégats ms":>13}{"req.":>6}{"instantané ms":>15}{"req.":>6}'
+        )
+        for events, registrations, measures in rows:
+            self.stdout.write(f'{events:>11}{registrations:>14}' + ''.join(
+                f'{ms:>{width}.2f}{queries:>6}' for (ms, queries), width in zip(measures, (11, 13, 15))
+            ))
+        self.stdout.write(self.style.SUCCESS('\nComptages identiques entre les tables et les agrégats'))
+
+    def _generate(self, prefix, size, registrations_per_event):
+        """Remplacer les données générées par `size` événements (None : seulement les supprimer)"""
+        with open(os.devnull, 'w') as devnull:
+            if size is None:
+                call_command('generate_load_dataset', prefix=prefix, flush_only=True, stdout=devnull)
+            else:
+                self.stdout.write(f'Génération de {size} événements...')
+                call_command(
+                    'generate_load_dataset',
+                    prefix=prefix,
+                    flush=True,
+                    events=size,
+                    users=max(size * 2, 100),
+                    registrations_per_event=registrations_per_event,
+                    stdout=devnull,
+                )
+            call_command('build_daily_rollups', all=True, stdout=devnull)
+
+    def _benchmark(self, days_back, repeat):
+        # Journal des requêtes plein après la génération : CaptureQueriesContext compterait 0
+        reset_queries()
+        service = get_predictive_service()
+        legacy, legacy_ms, legacy_queries = self._measure(lambda: self._legacy(days_back), repeat)
+        current, compute_ms, compute_queries = self._measure(
+            lambda: service._compute_emerging_trends(days_back), repeat
+        )
+        self._compare(legacy, current)
+
+        snapshots.invalidate(service._trends_key(days_back))
+        service.refresh_emerging_trends(days_back)
+        cached, cached_ms, cached_queries = self._measure(
+            lambda: service.detect_emerging_trends(days_back), repeat
+        )
+        if cached['status'] != 'success' or cached['snapshot']['stale']:
+            raise CommandError('Instantané des tendances indisponible')
+        return Event.objects.count(), EventRegistration.objects.count(), [
+            (legacy_ms, legacy_queries),
+            (compute_ms, compute_queries),
+            (cached_ms, cached_queries),
+        ]
+
+    @staticmethod
+    def _legacy(days_back):
+        """
+        Ancien detect_emerging_trends (hors insights) : comptages sur les
+        tables, dont la boucle de deux COUNT par semaine, sur les mêmes
+        semaines que le calcul actuel
+        """
+        today = timezone.localdate()
+        start_date = rollups.day_start(today - timedelta(days=days_back))
+        end_date = rollups.day_start(today + timedelta(days=1))
+        categories = Category.objects.annotate(
+            recent_events=Count('event', filter=Q(event__created_at__gte=start_date), distinct=True),
+            total_events=Count('event', distinct=True),
+            recent_registrations=Count('event__registrations', filter=Q(event__registrations__registered_at__gte=start_date), distinct=True),
+            avg_price=Avg('event__price'),
+        ).filter(recent_events__gt=0).order_by('-recent_events', 'name')[:10]
+        tags = Tag.objects.annotate(
+            recent_usage=Count('event', filter=Q(event__created_at__gte=start_date), distinct=True),
+            total_usage=Count('event', distinct=True),
+            growth_rate=(F('recent_usage') * 100.0) / F('total_usage')
+        ).filter(recent_usage__gt=0).order_by('-growth_rate', 'name')[:10]
+        weeks = []
+        for week in timeseries.buckets(start_date, end_date, 'week'):
+            week_start = rollups.day_start(week.date())
+            week_end = rollups.day_start(week.date() + timedelta(days=7))
+            week_events = Event.objects.filter(created_at__gte=week_start, created_at__lt=week_end).count()
+            week_registrations = EventRegistration.objects.filter(
+                registered_at__gte=week_start, registered_at__lt=week_end
+            ).count()
+            weeks.append((week.strftime(timeseries.DATE_FORMATS['week']), week_events, week_registrations))
+        prices = Event.objects.filter(created_at__gte=start_date).aggregate(
+            avg_price=Avg('price'), min_price=Min('price'), max_price=Max('price'), price_std=StdDev('price')
+        )
+        return {
+            # Mêmes bornes de validation que le calcul actuel (comptages plafonnés à 1000)
+            'categories': {
+                row['name']: (row['recent_events'], row['total_events'])
+                for row in get_predictive_service().validate_category_data([
+                    {
+                        'name': category.name,
+                        'recent_events': category.recent_events,
+                        'total_events': category.total_events,
+                        'avg_price': category.avg_price,
+                        'avg_fill_rate': None,
+                    }
+                    for category in categories
+                ])
+            },
+            'tags': {tag.name: (tag.recent_usage, tag.total_usage) for tag in tags},
+            'weeks': weeks,
+            'prices': prices,
+        }
+
+    @staticmethod
+    def _compare(legacy, current):
+        checks = {
+            'catégories': (
+                legacy['categories'],
+                {row['name']: (row['recent_events'], row['total_events']) for row in current['category_trends']},
+            ),
+            'tags': (
+                legacy['tags'],
+                {row['name']: (row['recent_usage'], row['total_usage']) for row in current['tag_trends']},
+            ),
+            'semaines': (
+                legacy['weeks'],
+                [(row['week'], row['events_created'], row['registrations']) for row in current['temporal_trends']],
+            ),
+        }
+        for label, (expected, actual) in checks.items():
+            if expected != actual:
+                raise CommandError(f'{label} : comptages différents (agrégats quotidiens à jour ? build_daily_rollups)')
+
+    @staticmethod
+    def _measure(func, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                result = func()
+                timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings), len(queries)
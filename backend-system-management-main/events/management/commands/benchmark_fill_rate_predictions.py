@@ -0,0 +1,119 @@
+import contextlib
+import os
+import statistics
+import time
+from datetime import timedelta
+
+import joblib
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from events.ml_registry import registry
+from events.models import Event
+from events.predictive_analytics import FILL_RATE_MODEL, PRICE_CANDIDATES, get_predictive_service
+
+
+class Command(BaseCommand):
+    help = 'Benchmark des prédictions de remplissage : boucle par ligne contre prédiction par lot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=200, help='Taille du lot d\'événements (défaut: 200)')
+        parser.add_argument('--repeat', type=int, default=5, help='Mesures par scénario, médiane retenue (défaut: 5)')
+
+    def handle(self, *args, **options):
+        """
+        Compare l'ancienne prédiction ligne par ligne (model.predict puis un
+        tree.predict par arbre pour la confiance, modèle relu à chaque appel
+        avant le registre) aux prédictions par lot, vérifie que les résultats
+        sont identiques et affiche l'accélération.
+        """
+        service = get_predictive_service()
+        model_data = registry.get(FILL_RATE_MODEL)
+        if model_data is None:
+            raise CommandError('Aucun modèle entraîné : lancez l\'entraînement (admin/train_ml_models/)')
+        self.stdout.write(
+            f'Modèle {FILL_RATE_MODEL} version {model_data.version} '
+            f'({len(model_data["model"].estimators_)} arbres)'
+        )
+
+        events = self._events(options['events'])
+        event = events[0]
+        candidates = [
+            dict(event, price=price)
+            for price in np.linspace(max(event['price'], 1.0) * 0.5, max(event['price'], 1.0) * 2.0, PRICE_CANDIDATES)
+        ]
+        scenarios = [
+            (f'{PRICE_CANDIDATES} prix candidats', candidates, True),
+            (f'{len(events)} événements', events, False),
+        ]
+
+        self.stdout.write(f'\n{"scénario":<24}{"boucle ms":>12}{"lot ms":>10}{"accélération":>15}')
+        for label, rows, with_reload in scenarios:
+            legacy, legacy_ms = self._measure(lambda: [self._legacy_predict(service, model_data, row) for row in rows], options['repeat'])
+            batch, batch_ms = self._measure(lambda: service.predict_events_fill_rate(rows), options['repeat'])
+            current = [(result['prediction'], result['confidence']) for result in batch]
+            # Arrondi à 4 décimales : tolérer un écart d'une unité sur le dernier chiffre
+            if not np.allclose(current, legacy, rtol=0, atol=1.5e-4):
+                raise CommandError(f'{label} : prédictions différentes entre la boucle et le lot')
+            self.stdout.write(f'{label:<24}{legacy_ms:>12.1f}{batch_ms:>10.1f}{legacy_ms / batch_ms:>14.1f}x')
+            if with_reload:
+                # Avant le registre, chaque prédiction relisait le fichier joblib
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+                    _, reload_ms = self._measure(lambda: [joblib.load(registry.path(FILL_RATE_MODEL)) for _ in rows], 1)
+                self.stdout.write(
+                    f'{"  + relecture du modèle":<24}{legacy_ms + reload_ms:>12.1f}{batch_ms:>10.1f}'
+                    f'{(legacy_ms + reload_ms) / batch_ms:>14.1f}x'
+                )
+        self.stdout.write(self.style.SUCCESS('\nPrédictions identiques entre la boucle et le lot'))
+
+    def _events(self, count):
+        queryset = Event.objects.select_related('category').order_by('-pk')[:count]
+        events = [
+            {
+                'price': float(event.price),
+                'max_capacity': event.max_capacity or 100,
+                'category': event.category.name if event.category else '',
+                'city': event.location.split(',')[0] if event.location else '',
+                'country': event.location.split(',')[-1].strip() if event.location else '',
+                'start_date': event.start_date,
+                'duration_hours': 2,
+                'tags_count': 0,
+            }
+            for event in queryset
+        ]
+        # Base vide : événements synthétiques pour compléter le lot
+        now = timezone.now()
+        rng = np.random.default_rng(42)
+        while len(events) < count:
+            events.append({
+                'price': float(rng.integers(0, 200)),
+                'max_capacity': int(rng.integers(10, 500)),
+                'category': f'Catégorie {len(events) % 7}',
+                'city': 'Paris',
+                'country': 'France',
+                'start_date': now + timedelta(days=int(rng.integers(1, 120))),
+                'duration_hours': 2,
+                'tags_count': int(rng.integers(0, 5)),
+            })
+        return events
+
+    @staticmethod
+    def _legacy_predict(service, model_data, event_data):
+        """Ancien predict_event_fill_rate (hors relecture du modèle) : une ligne, un tree.predict par arbre"""
+        model = model_data['model']
+        features, _ = service.prepare_event_features([event_data])
+        features_scaled = model_data['scaler'].transform(features)
+        prediction = max(0.0, min(1.0, model.predict(features_scaled)[0]))
+        predictions_trees = [tree.predict(features_scaled)[0] for tree in model.estimators_]
+        confidence = 1.0 - (np.std(predictions_trees) / max(np.mean(predictions_trees), 0.1))
+        confidence = max(0.1, min(1.0, confidence))
+        return round(float(prediction), 4), round(float(confidence), 4)
+
+    @staticmethod
+    def _measure(func, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
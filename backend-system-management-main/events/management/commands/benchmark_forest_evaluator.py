@@ -0,0 +1,89 @@
+import contextlib
+import os
+import statistics
+import time
+
+import joblib
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from events import forest
+from events.ml_registry import registry
+from events.predictive_analytics import FILL_RATE_MODEL
+
+
+class Command(BaseCommand):
+    help = 'Forêt compilée : parité avec sklearn (prédictions par arbre) et latence par taille de lot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 20, 1000, 10000], help='Tailles de lot (défaut: 1 20 1000 10000)')
+        parser.add_argument('--repeat', type=int, default=7, help='Mesures par taille, médiane retenue (défaut: 7)')
+        parser.add_argument('--parity-rows', type=int, default=20000, help='Lignes comparées à sklearn (défaut: 20000)')
+
+    def handle(self, *args, **options):
+        """
+        Exporte la forêt compilée du modèle courant si elle manque ou date
+        d'une autre version, vérifie que chaque arbre donne exactement la même
+        prédiction que sklearn, puis compare les temps de chargement et la
+        latence de StandardScaler + tree.predict par arbre au parcours compilé.
+        """
+        model_data = registry.get(FILL_RATE_MODEL)
+        if model_data is None:
+            raise CommandError('Aucun modèle entraîné : lancez l\'entraînement (admin/train_ml_models/)')
+        model, scaler = model_data['model'], model_data['scaler']
+
+        directory = forest.directory_for(registry.path(FILL_RATE_MODEL))
+        compiled = forest.load(directory)
+        if compiled is None or compiled.version != model_data.version:
+            forest.export(
+                registry.path(FILL_RATE_MODEL), model, scaler, model_data.version,
+                metrics=model_data.data.get('metrics'),
+                feature_names=model_data.data.get('feature_names'),
+                feature_pipeline=model_data.data.get('feature_pipeline'),
+            )
+            self.stdout.write(f'Forêt compilée exportée dans {directory}')
+        compiled = forest.load(directory)
+        self.stdout.write(
+            f'Modèle {FILL_RATE_MODEL} version {compiled.version} : {compiled.n_trees} arbres, '
+            f'{compiled.data["n_nodes"]} nœuds, profondeur {compiled.max_depth}'
+        )
+
+        # Chargement : désérialisation joblib contre ouverture des tableaux en mmap
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+            _, joblib_ms = self._measure(lambda: joblib.load(registry.path(FILL_RATE_MODEL)), 1)
+        _, mmap_ms = self._measure(lambda: forest.load(directory), 3)
+        self.stdout.write(f'Chargement : joblib {joblib_ms:.1f} ms, forêt compilée {mmap_ms:.2f} ms')
+
+        # Lignes synthétiques autour des moyennes du scaler : elles tombent des
+        # deux côtés des seuils, y compris sur les features catégorielles hachées
+        rng = np.random.default_rng(42)
+        rows = scaler.mean_ + scaler.scale_ * rng.normal(size=(max(options['parity_rows'], max(options['sizes'])), len(scaler.mean_)))
+
+        parity = rows[:options['parity_rows']]
+        expected = self._sklearn_trees(model, scaler, parity)
+        if not np.array_equal(compiled.predict_trees(parity), expected):
+            raise CommandError('Prédictions par arbre différentes entre sklearn et la forêt compilée')
+        self.stdout.write(self.style.SUCCESS(f'Parité : {len(parity)} lignes x {compiled.n_trees} arbres identiques à sklearn'))
+
+        self.stdout.write(f'\n{"lot":>8}{"sklearn ms":>13}{"compilée ms":>14}{"accélération":>15}{"retenu":>10}')
+        for size in options['sizes']:
+            batch = rows[:size]
+            _, sklearn_ms = self._measure(lambda: self._sklearn_trees(model, scaler, batch), options['repeat'])
+            _, compiled_ms = self._measure(lambda: compiled.predict_trees(batch), options['repeat'])
+            # Chemin choisi par predict_fill_rates pour cette taille de lot
+            chosen = 'sklearn' if size >= forest.SKLEARN_MIN_ROWS else 'compilée'
+            self.stdout.write(f'{size:>8}{sklearn_ms:>13.2f}{compiled_ms:>14.2f}{sklearn_ms / compiled_ms:>14.1f}x{chosen:>10}')
+
+    @staticmethod
+    def _sklearn_trees(model, scaler, features):
+        """Chemin sklearn de predict_fill_rates : matrice (arbres, lignes)"""
+        features_scaled = scaler.transform(features)
+        return np.stack([tree.predict(features_scaled) for tree in model.estimators_])
+
+    @staticmethod
+    def _measure(func, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
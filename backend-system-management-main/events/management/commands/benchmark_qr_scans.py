@@ -0,0 +1,128 @@
+import contextlib
+import os
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from events import checkin, qr
+from events.models import Category, Event, EventRegistration, EventStats
+from events.views import EventRegistrationViewSet
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark du contrôle à l\'entrée : scans/s avec jeton historique vs QR signé'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scans', type=int, default=500, help='Scans par méthode (défaut: 500)')
+        parser.add_argument('--keep', action='store_true', help='Conserver les données de test')
+
+    def handle(self, *args, **options):
+        """
+        Crée un événement avec 2 x --scans inscriptions confirmées, scanne la
+        première moitié avec l'ancien jeton (lecture + save() par scan) et la
+        seconde avec le QR signé (présences écrites par lots), puis vérifie
+        que toutes les inscriptions sont présentes et que EventStats est juste.
+        """
+        scans = options['scans']
+        run_id = uuid.uuid4().hex[:8]
+        event, organizer, registrations = self._create_fixtures(run_id, scans * 2)
+        legacy, signed = registrations[:scans], registrations[scans:]
+        view = EventRegistrationViewSet.as_view({'post': 'verify_qr'})
+        factory = APIRequestFactory()
+
+        def scan(token):
+            request = factory.post('/api/registrations/verify_qr/', {'token': token, 'mark_attended': True}, format='json')
+            force_authenticate(request, user=organizer)
+            response = view(request)
+            if response.status_code != 200:
+                raise CommandError(f'Scan refusé ({response.status_code}): {response.data}')
+
+        try:
+            legacy_tokens = [registration.qr_token for registration in legacy]
+            signed_tokens = [qr.build_payload(registration) for registration in signed]
+
+            results = []
+            results.append(('Jeton historique (DB + save)',) + self._measure(scan, legacy_tokens))
+            results.append(('QR signé (HMAC + lot)',) + self._measure(scan, signed_tokens, checkin.attendance_buffer.flush))
+
+            started = time.perf_counter()
+            for token in signed_tokens:
+                qr.parse_token(token)
+            elapsed = time.perf_counter() - started
+            results.append(('Signature seule (parse_token)', scans / elapsed, 0))
+
+            self.stdout.write(f'{"Méthode":<32}{"scans/s":>12}{"requêtes/scan":>16}')
+            for label, rate, queries in results:
+                self.stdout.write(f'{label:<32}{rate:>12.0f}{queries:>16.2f}')
+            self.stdout.write(f'Accélération : x{results[1][1] / results[0][1]:.1f}')
+            # Avec la table de cache en base, chaque opération du cache est une requête SQL
+            self.stdout.write(f'Cache : {settings.CACHES["default"]["BACKEND"]}')
+
+            self._check(event, scans * 2)
+            self.stdout.write(self.style.SUCCESS('Présences et statistiques cohérentes'))
+        finally:
+            if not options['keep']:
+                event.delete()
+                User.objects.filter(username__startswith=f'qrbench_{run_id}').delete()
+
+    def _measure(self, scan, tokens, finish=None):
+        # Les print() de débogage des vues sont masqués pendant la mesure
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for token in tokens:
+                    scan(token)
+                if finish:
+                    finish()
+                elapsed = time.perf_counter() - started
+        return len(tokens) / elapsed, len(queries) / len(tokens)
+
+    def _create_fixtures(self, run_id, count):
+        organizer = User.objects.create(username=f'qrbench_{run_id}_org')
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        now = timezone.now()
+        event = Event.objects.create(
+            title=f'QR benchmark {run_id}',
+            description='Événement généré par benchmark_qr_scans',
+            short_description='QR benchmark',
+            organizer=organizer,
+            category=category,
+            start_date=now + timedelta(hours=1),
+            end_date=now + timedelta(hours=3),
+            location='Benchmark',
+            status='published',
+            place_type='unlimited',
+            is_free=True,
+        )
+        User.objects.bulk_create([User(username=f'qrbench_{run_id}_{i}') for i in range(count)])
+        users = User.objects.filter(username__startswith=f'qrbench_{run_id}_').exclude(pk=organizer.pk).order_by('pk')
+        EventRegistration.objects.bulk_create([
+            EventRegistration(
+                event=event,
+                user=user,
+                status='confirmed',
+                payment_status='paid',
+                confirmed_at=now,
+                qr_token=uuid.uuid4().hex,
+            )
+            for user in users
+        ])
+        EventStats.rebuild(event_ids=[event.pk])
+        registrations = list(EventRegistration.objects.filter(event=event).order_by('pk'))
+        return event, organizer, registrations
+
+    def _check(self, event, expected):
+        attended = EventRegistration.objects.filter(event=event, status='attended').count()
+        stats = EventStats.objects.get(event=event)
+        if attended != expected or stats.attended_count != expected or stats.confirmed_count != 0:
+            raise CommandError(
+                f'Incohérence : {attended} présents, stats {stats.attended_count} présents / '
+                f'{stats.confirmed_count} confirmés (attendu {expected})'
+            )
@@ -0,0 +1,128 @@
+import contextlib
+import os
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from events import timeseries
+from events.admin_views import platform_analytics
+from events.models import Event, EventRegistration
+from events.views import EventViewSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark des séries temporelles : requêtes et temps selon la longueur de la période'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            nargs='+',
+            default=[7, 30, 90, 365],
+            help='Longueurs de période à mesurer (défaut: 7 30 90 365)'
+        )
+        parser.add_argument('--organizer', help='Organisateur pour /events/statistics/ (défaut: le plus actif)')
+
+    def handle(self, *args, **options):
+        """
+        Compare la boucle historique (deux requêtes par jour) au GROUP BY de
+        events.timeseries, vérifie que les séries sont identiques, puis mesure
+        les endpoints statistics et admin/analytics : le nombre de requêtes
+        doit rester constant quand la période s'allonge.
+        """
+        organizer = self._organizer(options['organizer'])
+        registrations = EventRegistration.objects.filter(event__organizer=organizer)
+        self.stdout.write(f'Organisateur : {organizer.username} ({registrations.count()} inscriptions)')
+
+        self.stdout.write(f'\n{"jours":>6}{"boucle req.":>14}{"boucle s":>10}{"GROUP BY req.":>15}{"GROUP BY s":>12}')
+        for days in options['days']:
+            start, end = timeseries.last_days(days)
+            (legacy, legacy_queries, legacy_time) = self._measure(lambda: self._legacy_series(registrations, start, days))
+            (rows, queries, elapsed) = self._measure(
+                lambda: timeseries.series(start, end, 'day', registrations=registrations)
+            )
+            current = [(row['date'], row['registrations'], row['revenue']) for row in rows]
+            if current != legacy:
+                raise CommandError(f'Séries différentes sur {days} jours')
+            self.stdout.write(f'{days:>6}{legacy_queries:>14}{legacy_time:>10.3f}{queries:>15}{elapsed:>12.3f}')
+
+        self.stdout.write(f'\n{"granularité":<12}' + ''.join(f'{f"{days} j":>10}' for days in options['days']))
+        for granularity in timeseries.GRANULARITIES:
+            counts = []
+            for days in options['days']:
+                if granularity == 'hour' and days > 31:
+                    counts.append('-')
+                    continue
+                start, end = timeseries.last_days(days)
+                counts.append(self._measure(lambda: timeseries.series(
+                    start, end, granularity,
+                    registrations=EventRegistration.objects.all(),
+                    events=Event.objects.all(),
+                    users=User.objects.all(),
+                ))[1])
+            self.stdout.write(f'{granularity:<12}' + ''.join(f'{count:>10}' for count in counts))
+
+        self.stdout.write(f'\n{"endpoint":<24}' + ''.join(f'{f"{days} j":>10}' for days in options['days']))
+        endpoints = [('events/statistics/', EventViewSet.as_view({'get': 'statistics'}), organizer)]
+        admin = User.objects.filter(
+            Q(is_staff=True) | Q(is_superuser=True) | Q(profile__role='super_admin')
+        ).first()
+        if admin:
+            endpoints.append(('admin/analytics/', platform_analytics, admin))
+        else:
+            self.stdout.write('admin/analytics/ ignoré : aucun super administrateur')
+        factory = APIRequestFactory()
+        for label, view, user in endpoints:
+            counts = set()
+            line = f'{label:<24}'
+            for days in options['days']:
+                request = factory.get(f'/api/{label}', {'days': days})
+                force_authenticate(request, user=user)
+                response, queries, _ = self._measure(lambda: view(request))
+                if response.status_code != 200:
+                    raise CommandError(f'{label} a répondu {response.status_code}')
+                counts.add(queries)
+                line += f'{queries:>10}'
+            self.stdout.write(line)
+            if len(counts) > 1:
+                raise CommandError(f'{label} : le nombre de requêtes dépend de la période')
+        self.stdout.write(self.style.SUCCESS('\nNombre de requêtes constant quelle que soit la période'))
+
+    def _organizer(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Utilisateur inconnu : {username}')
+        row = (
+            Event.objects.values('organizer').annotate(n=Count('registrations')).order_by('-n').first()
+        )
+        if row is None:
+            raise CommandError('Aucun événement : lancez generate_load_dataset')
+        return User.objects.get(pk=row['organizer'])
+
+    def _legacy_series(self, registrations, start, days):
+        """Ancienne boucle de EventViewSet.statistics : deux requêtes par jour"""
+        rows = []
+        for i in range(days):
+            day = (start + timedelta(days=i)).date()
+            count = registrations.filter(registered_at__date=day).count()
+            revenue = registrations.filter(
+                registered_at__date=day, payment_status='paid'
+            ).aggregate(total=Sum('price_paid'))['total'] or 0
+            rows.append((day.strftime('%Y-%m-%d'), count, float(revenue)))
+        return rows
+
+    def _measure(self, func):
+        # Les print() de débogage des vues sont masqués pendant la mesure
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                result = func()
+                elapsed = time.perf_counter() - started
+        return result, len(queries), elapsed
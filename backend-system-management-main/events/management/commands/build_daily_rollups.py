@@ -0,0 +1,40 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from events import rollups
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Date invalide (AAAA-MM-JJ attendu) : {value}')
+
+
+class Command(BaseCommand):
+    help = 'Construit les agrégats quotidiens des tableaux de bord (jours modifiés, période ou historique complet)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recalculer tout l\'historique')
+        parser.add_argument('--since', type=_date, help='Premier jour à recalculer (AAAA-MM-JJ)')
+        parser.add_argument('--until', type=_date, help='Dernier jour à recalculer (défaut: aujourd\'hui)')
+
+    def handle(self, *args, **options):
+        """
+        Sans option, même traitement que la tâche périodique : seuls les jours
+        modifiés depuis le dernier calcul (historique complet au premier
+        lancement). --all ou --since pour un rattrapage, par exemple après des
+        suppressions en masse.
+        """
+        started = time.perf_counter()
+        if options['all'] or options['since']:
+            days = rollups.backfill(first=options['since'], last=options['until'])
+        elif options['until']:
+            raise CommandError('--until s\'utilise avec --since ou --all')
+        else:
+            days = rollups.refresh()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{days} jour(s) d\'agrégats recalculé(s) en {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from events import features
+
+CITIES = ['Paris', 'Lyon', 'Marseille', 'Lomé', 'Dakar', 'Montréal', 'Bruxelles', '']
+COUNTRIES = ['France', 'Togo', 'Sénégal', 'Canada', 'Belgique', '']
+CATEGORIES = ['Technologie', 'Musique', 'Sport', 'Art & Culture', 'Business', 'Unknown']
+
+
+class Command(BaseCommand):
+    help = 'Vérifie que la matrice de features est identique octet par octet dans plusieurs interpréteurs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Interpréteurs lancés (défaut: 2)')
+        parser.add_argument('--rows', type=int, default=5000, help='Événements synthétiques (défaut: 5000)')
+        parser.add_argument('--emit', action='store_true', help='Usage interne : écrire les empreintes en JSON')
+
+    def handle(self, *args, **options):
+        """
+        Lance des interpréteurs avec des PYTHONHASHSEED différents ; chacun
+        construit la matrice de features d'un jeu synthétique fixe et renvoie
+        son empreinte SHA-256. Les empreintes doivent être identiques ; celles
+        de l'ancien encodage par hash() sont affichées pour comparaison.
+        """
+        if options['emit']:
+            self.stdout.write(json.dumps(self._fingerprints(options['rows'])))
+            return
+
+        results = []
+        for seed in range(1, max(options['processes'], 2) + 1):
+            env = dict(os.environ, PYTHONHASHSEED=str(seed))
+            output = subprocess.run(
+                [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'check_feature_determinism',
+                 '--emit', '--rows', str(options['rows'])],
+                env=env, capture_output=True, text=True,
+            )
+            if output.returncode != 0:
+                raise CommandError(f'Interpréteur PYTHONHASHSEED={seed} en échec :\n{output.stderr}')
+            results.append((seed, json.loads(output.stdout.strip().splitlines()[-1])))
+
+        self.stdout.write(f'{"PYTHONHASHSEED":<16}{"features":<20}{"hash() (ancien)":<20}')
+        for seed, fingerprints in results:
+            self.stdout.write(f'{seed:<16}{fingerprints["features"][:16]:<20}{fingerprints["builtin_hash"][:16]:<20}')
+
+        if len({fingerprints['features'] for _, fingerprints in results}) != 1:
+            raise CommandError('Matrices de features différentes entre les interpréteurs')
+        if len({fingerprints['builtin_hash'] for _, fingerprints in results}) == 1:
+            self.stdout.write(self.style.WARNING('hash() identique entre les interpréteurs (PYTHONHASHSEED ignoré ?)'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Matrices de features identiques dans {len(results)} interpréteurs '
+            f'({options["rows"]} lignes, pipeline v{features.PIPELINE["version"]})'
+        ))
+
+    @staticmethod
+    def _events(count):
+        rng = np.random.default_rng(2024)
+        start = datetime(2024, 1, 1, 9, tzinfo=dt_timezone.utc)
+        return [
+            {
+                'price': float(rng.integers(0, 300)),
+                'max_capacity': int(rng.integers(10, 1000)),
+                'start_date': start + timedelta(hours=int(rng.integers(0, 24 * 365))),
+                'days_until_event': int(rng.integers(0, 120)),
+                'tags_count': int(rng.integers(0, 6)),
+                'organizer_events_count': int(rng.integers(0, 40)),
+                'city': CITIES[int(rng.integers(len(CITIES)))],
+                'country': COUNTRIES[int(rng.integers(len(COUNTRIES)))],
+                'category': CATEGORIES[int(rng.integers(len(CATEGORIES)))],
+                'fill_rate': float(rng.random()),
+            }
+            for _ in range(count)
+        ]
+
+    def _fingerprints(self, count):
+        events = self._events(count)
+        X, y = features.build(events)
+        # Ancien encodage, salé par processus
+        builtin = np.array([
+            [abs(hash(event['city'])) % 1000, abs(hash(event['country'])) % 100, abs(hash(event['category'])) % 50]
+            for event in events
+        ])
+        return {
+            'features': hashlib.sha256(X.tobytes() + y.tobytes()).hexdigest(),
+            'builtin_hash': hashlib.sha256(builtin.tobytes()).hexdigest(),
+        }
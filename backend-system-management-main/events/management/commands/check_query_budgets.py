@@ -0,0 +1,505 @@
+import contextlib
+import json
+import os
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from events import checkin, qr
+from events import urls as events_urls
+from events.models import (
+    AnalyticsExportJob, Category, CustomReminder, Event, EventHistory, EventRegistration, ExportJob, RefundRequest, TrainingJob,
+    SessionType, Tag, TicketType, UserProfile, VirtualEvent, VirtualEventInteraction,
+)
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'query_budgets.json'
+
+# Endpoints GET qui appellent des services externes (streaming, IA, santé du serveur) :
+# leur coût n'est pas représentatif et ils ne doivent pas être déclenchés par un test
+EXTERNAL_ENDPOINTS = {
+    'get_stream_status',
+    'get_streaming_instructions',
+    'test_platform_connection',
+    'list_platforms',
+    'join_stream',
+    'ai_chat',
+    'ai_suggestions',
+    'ai_help_event',
+    'ai_info',
+    'detailed_health_check',
+    'system_health_check',
+}
+
+# Paramètres de requête obligatoires : nom de l'endpoint -> paramètre rempli avec l'événement de test
+EVENT_QUERY_PARAMS = {
+    'virtual_interaction-event-interactions': 'event_id',
+    'virtual_interaction-interaction-stats': 'event_id',
+    'get_market_analysis': 'event_id',
+}
+
+# Endpoints réservés au participant inscrit (inscription confirmée et payée à l'événement de test)
+PARTICIPANT_ENDPOINTS = {
+    'get_stream_access_form',
+    'virtual_event-access-info',
+}
+
+class Command(BaseCommand):
+    help = 'Budget de requêtes SQL par endpoint GET de events/urls.py, par endpoint POST critique et par opération de modèle, comparé à une baseline JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Fichier baseline JSON')
+        parser.add_argument('--update', action='store_true', help='Réécrire la baseline avec les mesures actuelles')
+        parser.add_argument('--events', type=int, default=8, help='Événements du jeu de données (défaut: 8)')
+        parser.add_argument('--registrations', type=int, default=12, help='Inscriptions par événement (défaut: 12)')
+        parser.add_argument('--repeat', type=int, default=3, help='Appels par endpoint pour le temps médian (défaut: 3)')
+        parser.add_argument('--only', help='Ne mesurer que les clés contenant ce texte')
+        parser.add_argument(
+            '--time-factor',
+            type=float,
+            default=None,
+            help='Échouer aussi si le temps dépasse baseline x facteur (désactivé par défaut)'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Construit un jeu de données synthétique dans une transaction annulée à la fin,
+        appelle chaque endpoint GET (en tant qu'organisateur, ou super admin pour
+        admin/...) et mesure requêtes SQL et temps. Une régression N+1 apparaît comme
+        un dépassement de budget et comme un diff de la baseline.
+        """
+        baseline_path = Path(options['baseline'])
+        baseline = {}
+        if baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text())
+        cache_backend = settings.CACHES['default']['BACKEND']
+        if not options['update'] and baseline.get('cache', cache_backend) != cache_backend:
+            raise CommandError(
+                f"Baseline mesurée avec le cache {baseline['cache']}, cache actuel {cache_backend} : "
+                f"budgets non comparables"
+            )
+
+        with transaction.atomic():
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                dataset = self._build_dataset(options['events'], options['registrations'])
+                try:
+                    endpoints, skipped = self._measure_endpoints(dataset, options)
+                    endpoints.update(self._measure_writes(dataset, options))
+                    operations = self._measure_operations(dataset, options)
+                finally:
+                    for file in dataset['files']:
+                        file.delete(save=False)
+            transaction.set_rollback(True)
+
+        results = {
+            # Avec la table de cache en base, chaque opération du cache est comptée comme requête
+            'cache': settings.CACHES['default']['BACKEND'],
+            'dataset': {'events': options['events'], 'registrations': options['registrations']},
+            'endpoints': endpoints,
+            'operations': operations,
+        }
+        failures = self._report(results, baseline, skipped, options)
+
+        if options['update']:
+            errors = [
+                key for section in ('endpoints', 'operations') for key, measured in results[section].items()
+                if measured.get('status') is not None and not 200 <= measured['status'] < 300
+            ]
+            if errors:
+                raise CommandError('Baseline non écrite, réponse(s) hors 2xx : ' + ', '.join(errors))
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True, ensure_ascii=False) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline écrite : {baseline_path}'))
+        elif failures:
+            raise CommandError(f'{len(failures)} budget(s) dépassé(s) : ' + ', '.join(failures))
+
+    # ------------------------------------------------------------------ données
+
+    def _build_dataset(self, event_count, registration_count):
+        now = timezone.now()
+        admin = User.objects.create(username='budget_admin', is_staff=True, is_superuser=True)
+        UserProfile.objects.create(user=admin, role='super_admin')
+        organizer = User.objects.create(username='budget_organizer', email='organizer@example.com')
+        UserProfile.objects.create(user=organizer, role='organizer', status_approval='approved')
+        participants = [
+            User.objects.create(username=f'budget_user_{i}', email=f'user{i}@example.com')
+            for i in range(registration_count)
+        ]
+        for participant in participants:
+            UserProfile.objects.create(user=participant, role='participant')
+
+        category = Category.objects.create(name='Budget category')
+        tags = [Tag.objects.create(name=f'budget-tag-{i}') for i in range(3)]
+        statuses = ['confirmed', 'confirmed', 'confirmed', 'pending', 'waitlisted', 'cancelled', 'attended']
+
+        events = []
+        for i in range(event_count):
+            is_virtual = i % 4 == 3
+            event = Event.objects.create(
+                title=f'Budget event {i}',
+                description='Événement généré par check_query_budgets',
+                short_description='Budget',
+                organizer=organizer,
+                category=category,
+                start_date=now + timedelta(days=i - 2),
+                end_date=now + timedelta(days=i - 2, hours=2),
+                location='Budget',
+                status='published',
+                place_type='unlimited',
+                price=Decimal('20.00') if i % 2 else Decimal('0'),
+                is_free=not i % 2,
+                event_type='virtual' if is_virtual else 'physical',
+            )
+            event.tags.set(tags)
+            if is_virtual:
+                VirtualEvent.objects.create(event=event, platform='zoom', meeting_id='budget',
+                                            meeting_url='https://zoom.example.com/j/budget')
+            ticket_type = TicketType.objects.create(event=event, name='Standard', price=event.price, quantity=None)
+            session_type = SessionType.objects.create(event=event, name='Matin')
+            CustomReminder.objects.create(event=event, created_by=organizer, title='Rappel', message='Rappel')
+            EventHistory.objects.create(event=event, user=organizer, action='created')
+
+            for j, participant in enumerate(participants):
+                registration = EventRegistration(
+                    event=event,
+                    user=participant,
+                    ticket_type=ticket_type,
+                    session_type=session_type,
+                    status=statuses[j % len(statuses)],
+                    payment_status='paid' if event.price else 'pending',
+                    price_paid=event.price,
+                )
+                registration.save(allow_overbooking=True)
+                if registration.status == 'cancelled' and event.price:
+                    RefundRequest.objects.create(
+                        registration=registration,
+                        amount_paid=event.price,
+                        refund_percentage=100,
+                        refund_amount=event.price,
+                        expires_at=now + timedelta(days=7),
+                    )
+                if is_virtual:
+                    VirtualEventInteraction.objects.create(
+                        event=event, user=participant, interaction_type='rating', rating=1 + j % 5
+                    )
+            events.append(event)
+
+        registrations = EventRegistration.objects.filter(event__in=events)
+        export_job = ExportJob.objects.create(event=events[-1], requested_by=organizer)
+        # Export terminé pour le téléchargement (fichier supprimé en fin de mesure, hors transaction)
+        completed_export_job = ExportJob.objects.create(event=events[-1], requested_by=organizer, status='completed')
+        completed_export_job.file.save('budget.csv', ContentFile(b'id\n'), save=True)
+        training_job = TrainingJob.objects.create(requested_by=admin)
+        analytics_export_job = AnalyticsExportJob.objects.create(requested_by=admin)
+        return {
+            'files': [completed_export_job.file],
+            'admin': admin,
+            'organizer': organizer,
+            'participant': participants[0],
+            'event': events[-1],
+            'physical_event': events[-2],
+            'category': category,
+            'tag': tags[0],
+            'kwargs': {
+                'event_id': events[-1].pk,
+                'registration_id': registrations.filter(status='waitlisted').values_list('pk', flat=True).first(),
+                'refund_id': RefundRequest.objects.values_list('pk', flat=True).first(),
+                'refund_request_id': RefundRequest.objects.values_list('pk', flat=True).first(),
+                'platform': 'zoom',
+                'job_id': export_job.pk,
+                # Valeur propre à une route : '<nom de la route>:<paramètre>'
+                'training_job_status:job_id': training_job.pk,
+                'analytics_export_job_status:job_id': analytics_export_job.pk,
+                'export_job_download:job_id': completed_export_job.pk,
+                'admin-event-history:pk': events[-1].pk,
+            },
+            'pk': {
+                'event': events[-1].pk,
+                'registration': registrations.filter(
+                    event=events[-2], user=participants[0], status='confirmed'
+                ).values_list('pk', flat=True).first(),
+                'category': category.pk,
+                'category_detail': category.pk,
+                'tag': tags[0].pk,
+                'tag_detail': tags[0].pk,
+                'history': EventHistory.objects.filter(event=events[-1]).values_list('pk', flat=True).first(),
+                'admin': organizer.pk,
+                'virtual_event': VirtualEvent.objects.filter(event=events[-1]).values_list('pk', flat=True).first(),
+                'virtual_interaction': VirtualEventInteraction.objects.values_list('pk', flat=True).first(),
+                'custom_reminder': CustomReminder.objects.filter(event=events[-1]).values_list('pk', flat=True).first(),
+            },
+        }
+
+    # ---------------------------------------------------------------- endpoints
+
+    def _iter_patterns(self, patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from self._iter_patterns(pattern.url_patterns)
+            else:
+                yield pattern
+
+    @staticmethod
+    def _allows_get(callback):
+        actions = getattr(callback, 'actions', None)
+        if actions is not None:
+            return 'get' in actions
+        view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+        if view_class is None:
+            # Vue fonction Django : les méthodes ne sont pas introspectables, un refus donne 405
+            return True
+        return hasattr(view_class, 'get')
+
+    def _measure_endpoints(self, dataset, options):
+        endpoints = {}
+        skipped = []
+        admin_client = APIClient()
+        admin_client.force_authenticate(dataset['admin'])
+        organizer_client = APIClient()
+        organizer_client.force_authenticate(dataset['organizer'])
+        participant_client = APIClient()
+        participant_client.force_authenticate(dataset['participant'])
+
+        seen = set()
+        for pattern in self._iter_patterns(events_urls.urlpatterns):
+            name = pattern.name
+            groups = set(pattern.pattern.regex.groupindex)
+            if not name or 'format' in groups or name in seen:
+                continue
+            seen.add(name)
+            key = f'GET {name}'
+            if options['only'] and options['only'] not in key:
+                continue
+            if name in EXTERNAL_ENDPOINTS:
+                skipped.append((key, 'service externe'))
+                continue
+            if not self._allows_get(pattern.callback):
+                skipped.append((key, 'pas de GET'))
+                continue
+
+            kwargs = {}
+            for group in groups:
+                if f'{name}:{group}' in dataset['kwargs']:
+                    kwargs[group] = dataset['kwargs'][f'{name}:{group}']
+                elif group == 'pk':
+                    basename = name.rsplit('-', 1)[0].split('-')[0]
+                    kwargs['pk'] = dataset['pk'].get(basename)
+                else:
+                    kwargs[group] = dataset['kwargs'].get(group)
+            if any(value is None for value in kwargs.values()):
+                skipped.append((key, 'aucune donnée pour ' + ', '.join(k for k, v in kwargs.items() if v is None)))
+                continue
+
+            url = reverse(name, kwargs=kwargs)
+            if name in EVENT_QUERY_PARAMS:
+                url += f"?{EVENT_QUERY_PARAMS[name]}={dataset['event'].pk}"
+            if url.startswith('/api/admin'):
+                client = admin_client
+            elif name.startswith('registration-') or name in PARTICIPANT_ENDPOINTS:
+                client = participant_client
+            else:
+                client = organizer_client
+            if client is organizer_client and client.get(url).status_code in (401, 403):
+                # Réservé au super admin (catégories, tags...) : mesurer avec le bon rôle
+                client = admin_client
+            endpoints[key] = self._measure(lambda: client.get(url), options['repeat'])
+        return endpoints, skipped
+
+    def _measure_writes(self, dataset, options):
+        """
+        Endpoints POST des chemins d'écriture chauds. Chaque appel reçoit des
+        données neuves (inscriptions créées avant la mesure, hors comptage).
+        """
+        event = dataset['physical_event']
+        admin_client = APIClient()
+        admin_client.force_authenticate(dataset['admin'])
+        organizer_client = APIClient()
+        organizer_client.force_authenticate(dataset['organizer'])
+
+        def registrations(status, count):
+            created = []
+            for _ in range(count):
+                user = User.objects.create(username=f'budget_post_{time.perf_counter_ns()}')
+                registration = EventRegistration(event=event, user=user, status=status)
+                registration.save(allow_overbooking=True)
+                created.append(registration)
+            return created
+
+        def create_registration():
+            client = APIClient()
+            client.force_authenticate(User.objects.create(username=f'budget_post_{time.perf_counter_ns()}'))
+            url = reverse('registration-list')
+            return lambda: client.post(url, {'event': event.pk}, format='json')
+
+        def scan():
+            token = qr.build_payload(registrations('confirmed', 1)[0])
+            url = reverse('verify_qr')
+
+            def call():
+                response = organizer_client.post(url, {'token': token, 'mark_attended': True}, format='json')
+                # Présence écrite dans la mesure (tampon vidé comme avec QR_ATTENDANCE_BATCH_SIZE = 1)
+                checkin.attendance_buffer.flush()
+                return response
+            return call
+
+        def bulk_confirm():
+            ids = [registration.pk for registration in registrations('pending', 5)]
+            url = reverse('bulk_confirm_registrations')
+            return lambda: admin_client.post(url, {'registration_ids': ids}, format='json')
+
+        def bulk_checkin():
+            tokens = [qr.build_payload(registration) for registration in registrations('confirmed', 5)]
+            url = reverse('event-bulk-checkin', kwargs={'pk': event.pk})
+            return lambda: organizer_client.post(url, {'tokens': tokens}, format='json')
+
+        endpoints = {}
+        for key, prepare in [
+            ('POST registration-list', create_registration),
+            ('POST verify_qr', scan),
+            ('POST bulk_confirm_registrations (5)', bulk_confirm),
+            ('POST event-bulk-checkin (5)', bulk_checkin),
+        ]:
+            if options['only'] and options['only'] not in key:
+                continue
+            endpoints[key] = self._measure(prepare, options['repeat'], prepared=True)
+        return endpoints
+
+    # -------------------------------------------------------------- opérations
+
+    def _measure_operations(self, dataset, options):
+        """Coût des écritures de modèles (baseline des optimisations de save())"""
+        event = dataset['event']
+        operations = {}
+
+        def registration(status, *related):
+            queryset = EventRegistration.objects.filter(event=event, status=status)
+            return (queryset.select_related(*related) if related else queryset).first()
+
+        def save_notes():
+            instance = registration('confirmed')
+            instance.notes = 'Budget'
+            return lambda: instance.save()
+
+        def confirm():
+            instance = registration('pending')
+            instance.status = 'confirmed'
+            return lambda: instance.save()
+
+        def cancel():
+            instance = registration('confirmed')
+            instance.status = 'cancelled'
+            return lambda: instance.save()
+
+        def confirm_loaded():
+            # Événement et billet chargés (chemin des traitements en lot) : seules restent les écritures
+            instance = registration('pending', 'event', 'ticket_type')
+            instance.status = 'confirmed'
+            return lambda: instance.save()
+
+        def cancel_loaded():
+            instance = registration('confirmed', 'event', 'ticket_type')
+            instance.status = 'cancelled'
+            return lambda: instance.save()
+
+        def create():
+            user = User.objects.create(username=f'budget_new_{time.perf_counter_ns()}')
+            instance = EventRegistration(event=event, user=user, status='confirmed')
+            return lambda: instance.save()
+
+        def save_event():
+            instance = Event.objects.get(pk=event.pk)
+            instance.title = instance.title
+            return lambda: instance.save()
+
+        def save_profile():
+            instance = UserProfile.objects.get(user=dataset['participant'])
+            return lambda: instance.save()
+
+        for key, prepare in [
+            ('EventRegistration.save (notes)', save_notes),
+            ('EventRegistration.save (confirmation)', confirm),
+            ('EventRegistration.save (annulation)', cancel),
+            ('EventRegistration.save (confirmation, relations chargées)', confirm_loaded),
+            ('EventRegistration.save (annulation, relations chargées)', cancel_loaded),
+            ('EventRegistration.save (création)', create),
+            ('Event.save (sans changement de prix)', save_event),
+            ('UserProfile.save', save_profile),
+        ]:
+            if options['only'] and options['only'] not in key:
+                continue
+            operations[key] = self._measure(prepare, 1, prepared=True)
+        return operations
+
+    # ---------------------------------------------------------------- mesures
+
+    @staticmethod
+    def _measure(call, repeat, prepared=False):
+        """Requêtes du premier appel (cache en base compris), temps médian sur `repeat` appels (cache vidé)"""
+        timings = []
+        queries = None
+        for _ in range(max(repeat, 1)):
+            func = call() if prepared else call
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = func()
+                if getattr(response, 'streaming', False):
+                    # Réponse en streaming : les requêtes partent pendant la lecture du corps
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            if queries is None:
+                queries = len(captured.captured_queries)
+                status_code = getattr(response, 'status_code', None)
+        result = {'queries': queries, 'ms': round(statistics.median(timings), 1)}
+        if status_code is not None:
+            result['status'] = status_code
+        return result
+
+    def _report(self, results, baseline, skipped, options):
+        failures = []
+        for section in ('endpoints', 'operations'):
+            self.stdout.write(self.style.MIGRATE_HEADING(section))
+            expected_section = baseline.get(section, {})
+            for key, measured in sorted(results[section].items()):
+                expected = expected_section.get(key)
+                line = f'  {key:<60}{measured["queries"]:>5} req {measured["ms"]:>9.1f} ms'
+                if measured.get('status') is not None:
+                    line += f'  [{measured["status"]}]'
+                if measured.get('status') is not None and not 200 <= measured['status'] < 300:
+                    # Une réponse d'erreur ne mesure pas l'endpoint : jamais une baseline valide
+                    failures.append(key)
+                    self.stdout.write(self.style.ERROR(f'{line}  statut attendu 2xx'))
+                elif expected is None:
+                    self.stdout.write(line + '  (nouveau)')
+                elif expected.get('status') != measured.get('status'):
+                    failures.append(key)
+                    self.stdout.write(self.style.ERROR(f'{line}  statut attendu {expected.get("status")}'))
+                elif measured['queries'] > expected['queries']:
+                    failures.append(key)
+                    self.stdout.write(self.style.ERROR(f'{line}  > budget {expected["queries"]}'))
+                elif options['time_factor'] and measured['ms'] > expected['ms'] * options['time_factor']:
+                    failures.append(key)
+                    self.stdout.write(self.style.ERROR(f'{line}  > {expected["ms"]} ms x{options["time_factor"]}'))
+                elif measured['queries'] < expected['queries']:
+                    self.stdout.write(self.style.SUCCESS(f'{line}  (budget {expected["queries"]})'))
+                else:
+                    self.stdout.write(line)
+            for key in sorted(set(expected_section) - set(results[section])):
+                if not options['only']:
+                    self.stdout.write(self.style.WARNING(f'  {key}: absent de cette exécution'))
+
+        for key, reason in skipped:
+            self.stdout.write(f'  ignoré : {key} ({reason})')
+        if baseline.get('dataset') and baseline['dataset'] != results['dataset']:
+            self.stdout.write(self.style.WARNING('Jeu de données différent de la baseline : comparaison indicative'))
+        return failures
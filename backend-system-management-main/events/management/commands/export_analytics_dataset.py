@@ -0,0 +1,54 @@
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from events import columnar
+
+
+def _month(value):
+    if not re.match(r'^\d{4}-\d{2}$', value):
+        raise CommandError(f'Mois invalide (AAAA-MM attendu) : {value}')
+    return value
+
+
+class Command(BaseCommand):
+    help = 'Exporte événements, inscriptions, remboursements, interactions et billets en Parquet partitionné par mois'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Répertoire de sortie (défaut: ANALYTICS_EXPORT_DIR)')
+        parser.add_argument('--tables', nargs='+', choices=list(columnar.TABLES), help='Tables à exporter (défaut: toutes)')
+        parser.add_argument('--since', type=_month, help='Réécrire les mois à partir de AAAA-MM et ceux des lignes modifiées depuis')
+        parser.add_argument('--chunk-size', type=int, default=columnar.CHUNK_SIZE, help='Lignes lues et écrites par paquet')
+
+    def handle(self, *args, **options):
+        """
+        Sans --since, toutes les partitions sont réécrites. Avec --since, sont
+        réécrits les mois à partir de AAAA-MM et les mois antérieurs qui
+        contiennent une ligne modifiée depuis (updated_at) ; les lignes
+        supprimées dans ces mois antérieurs restent jusqu'au prochain export
+        complet. Le verrou des exports (columnar.EXPORT_LOCK) est pris : un
+        seul export à la fois écrit dans le répertoire temporaire.
+        """
+        directory = options['output'] or columnar.default_directory()
+        if not cache.add(columnar.EXPORT_LOCK, 1, settings.CELERY_TASK_TIME_LIMIT):
+            raise CommandError('Export Parquet déjà en cours')
+        started = time.perf_counter()
+        try:
+            results = columnar.export(
+                tables=options['tables'],
+                directory=directory,
+                since=options['since'],
+                chunk_size=options['chunk_size'],
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        finally:
+            cache.delete(columnar.EXPORT_LOCK)
+
+        for name, written in results.items():
+            self.stdout.write(f'{name:<15}{sum(written.values()):>10} ligne(s){len(written):>6} mois')
+        self.stdout.write(self.style.SUCCESS(
+            f'Export Parquet écrit dans {directory} en {time.perf_counter() - started:.1f}s'
+        ))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from events.models import Event, EventRegistration
+from django.db.models import Count, Q
+from events.models import Event, EventRegistration, TicketType
 
 
 class Command(BaseCommand):
@@ -7,31 +8,52 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         """
-        Recalcule et corrige les compteurs d'inscriptions pour tous les événements.
-        Seules les inscriptions confirmées et assistées sont comptées.
+        Recalcule et corrige les compteurs de places utilisés par SeatReservation.
+        Seules les inscriptions confirmées et assistées sont comptées :
+        - billets à quantité limitée -> TicketType.sold_count
+        - billets par défaut (ou sans quantité) -> Event.current_registrations
         """
-        events = Event.objects.all()
+        holding = Q(status__in=EventRegistration.SEAT_HOLDING_STATUSES)
         fixed_count = 0
-        
-        for event in events:
-            # Compter les inscriptions confirmées et assistées
-            confirmed_count = event.registrations.filter(
-                status__in=['confirmed', 'attended']
-            ).count()
-            
+
+        default_counts = dict(
+            EventRegistration.objects.filter(holding)
+            .filter(Q(ticket_type__isnull=True) | Q(ticket_type__quantity__isnull=True))
+            .order_by().values_list('event_id').annotate(count=Count('pk'))
+        )
+        for event in Event.objects.only('id', 'title', 'current_registrations'):
+            confirmed_count = default_counts.get(event.id, 0)
+
             # Mettre à jour le compteur si nécessaire
             if event.current_registrations != confirmed_count:
                 old_count = event.current_registrations
-                event.current_registrations = confirmed_count
-                event.save(update_fields=['current_registrations'])
-                
+                Event.objects.filter(pk=event.pk).update(current_registrations=confirmed_count)
+
                 self.stdout.write(
                     self.style.SUCCESS(
                         f'Événement "{event.title}": {old_count} → {confirmed_count} inscriptions'
                     )
                 )
                 fixed_count += 1
-        
+
+        ticket_counts = dict(
+            EventRegistration.objects.filter(holding, ticket_type__quantity__isnull=False)
+            .order_by().values_list('ticket_type_id').annotate(count=Count('pk'))
+        )
+        for ticket_type in TicketType.objects.filter(quantity__isnull=False).only('id', 'name', 'sold_count'):
+            sold_count = ticket_counts.get(ticket_type.id, 0)
+
+            if ticket_type.sold_count != sold_count:
+                old_count = ticket_type.sold_count
+                TicketType.objects.filter(pk=ticket_type.pk).update(sold_count=sold_count)
+
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'Billet "{ticket_type.name}": {old_count} → {sold_count} vendus'
+                    )
+                )
+                fixed_count += 1
+
         if fixed_count == 0:
             self.stdout.write(
                 self.style.SUCCESS('Tous les compteurs sont déjà corrects.')
@@ -39,7 +61,6 @@ class Command(BaseCommand):
         else:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'Corrigé {fixed_count} événement(s) avec des compteurs incorrects.'
+                    f'Corrigé {fixed_count} compteur(s) incorrect(s).'
                 )
             )
-
@@ -0,0 +1,440 @@
+import contextlib
+import hashlib
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from events.models import (
+    Category, Event, EventRegistration, EventStats, NotificationLog, RefundRequest,
+    SeatReservation, SessionType, Tag, TicketType, UserProfile, VirtualEventInteraction,
+)
+
+CATEGORY_NAMES = [
+    'Conférence', 'Concert', 'Atelier', 'Sport', 'Networking', 'Formation', 'Festival',
+    'Exposition', 'Théâtre', 'Meetup tech', 'Gastronomie', 'Bien-être', 'Cinéma', 'Salon professionnel',
+]
+COUNTRIES = ['CA', 'FR', 'BE', 'CH', 'SN', 'CI', 'CM', 'MA', 'TG', 'BJ', 'US']
+CITIES = ['Montréal', 'Paris', 'Dakar', 'Abidjan', 'Lomé', 'Bruxelles', 'Genève', 'Québec', 'Lyon', 'Douala']
+TICKET_NAMES = ['Standard', 'VIP', 'Étudiant', 'Early bird']
+SESSION_NAMES = ['Matin', 'Après-midi', 'Soirée']
+NOTIFICATION_TYPES = ['reminder_1d', 'reminder_1h', 'reminder_day', 'thank_you']
+
+
+@contextlib.contextmanager
+def manual_timestamps(*fields):
+    """Désactiver auto_now_add le temps d'un bulk_create pour écrire des dates réalistes"""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Command(BaseCommand):
+    help = 'Génère un jeu de données volumineux et déterministe (bulk_create, sans effets de bord de save())'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Utilisateurs (défaut: 100000)')
+        parser.add_argument('--events', type=int, default=50000, help='Événements (défaut: 50000)')
+        parser.add_argument(
+            '--registrations-per-event',
+            type=float,
+            default=40,
+            help='Inscriptions moyennes par événement (défaut: 40, soit 2M pour 50k événements)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Graine aléatoire (défaut: 42)')
+        parser.add_argument(
+            '--anchor',
+            help='Date de référence AAAA-MM-JJ (défaut: aujourd\'hui) ; même graine + même date = mêmes données'
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Lignes par bulk_create (défaut: 5000)')
+        parser.add_argument('--prefix', default='load', help='Préfixe des données générées (défaut: load)')
+        parser.add_argument('--flush', action='store_true', help='Supprimer d\'abord les données générées avec ce préfixe')
+        parser.add_argument(
+            '--flush-only',
+            action='store_true',
+            help='Supprimer les données générées avec ce préfixe sans en générer'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Utilisateurs, catégories/tags, événements (billets, sessions), inscriptions,
+        interactions virtuelles, notifications et remboursements, écrits par lots
+        avec bulk_create. save() n'est jamais appelé (pas de QR, pas de réservation) :
+        les compteurs de places et EventStats sont reconstruits à la fin par des
+        requêtes ensemblistes.
+        """
+        # Deux flux distincts : le résultat ne dépend pas de --chunk-size
+        self.rng = random.Random(options['seed'])
+        self.related_rng = random.Random(options['seed'] + 1)
+        self.chunk_size = options['chunk_size']
+        self.prefix = options['prefix']
+        # Jetons QR uniques en base : propres au préfixe, sans changer les tirages du jeu de données
+        self.token_salt = int.from_bytes(hashlib.blake2b(self.prefix.encode(), digest_size=16).digest(), 'big')
+        anchor = (
+            datetime.strptime(options['anchor'], '%Y-%m-%d').date() if options['anchor']
+            else timezone.localdate()
+        )
+        self.anchor = timezone.make_aware(datetime.combine(anchor, dt_time(12, 0)))
+
+        if options['flush_only']:
+            self._flush()
+            return
+        if options['flush']:
+            self._flush()
+        elif User.objects.filter(username__startswith=f'{self.prefix}_user_').exists():
+            raise CommandError(f'Des données "{self.prefix}" existent déjà : utilisez --flush ou un autre --prefix')
+
+        started = time.perf_counter()
+        user_ids, organizer_ids = self._step('Utilisateurs', self._create_users, options['users'])
+        categories, tags = self._step('Catégories et tags', self._create_taxonomy)
+        events = self._step('Événements', self._create_events, options['events'], organizer_ids, categories, tags)
+        self._step(
+            'Inscriptions, interactions, notifications, remboursements',
+            self._create_registrations, events, user_ids, options['registrations_per_event'],
+        )
+        self._step('Compteurs de places', SeatReservation.rebuild_counters)
+        self._step('Statistiques', EventStats.rebuild)
+        self.stdout.write(self.style.SUCCESS(f'Jeu de données généré en {time.perf_counter() - started:.1f}s'))
+
+    def _step(self, label, func, *args):
+        started = time.perf_counter()
+        self.stdout.write(f'{label}...')
+        result = func(*args)
+        self.stdout.write(f'  {label} : {time.perf_counter() - started:.1f}s')
+        return result
+
+    def _bulk_create(self, model, objects):
+        for start in range(0, len(objects), self.chunk_size):
+            with transaction.atomic():
+                model.objects.bulk_create(objects[start:start + self.chunk_size])
+
+    def _flush(self):
+        events = Event.objects.filter(slug__startswith=f'{self.prefix}-')
+        self.stdout.write(f'Suppression de {events.count()} événement(s) générés...')
+        while True:
+            ids = list(events.values_list('pk', flat=True)[:self.chunk_size])
+            if not ids:
+                break
+            Event.objects.filter(pk__in=ids).delete()
+        User.objects.filter(username__startswith=f'{self.prefix}_').delete()
+        Category.objects.filter(name__startswith=f'[{self.prefix}] ').delete()
+        Tag.objects.filter(name__startswith=f'{self.prefix}-').delete()
+
+    # ------------------------------------------------------------ utilisateurs
+
+    def _create_users(self, count):
+        rng = self.rng
+        users = []
+        for i in range(count):
+            users.append(User(
+                username=f'{self.prefix}_user_{i}',
+                email=f'{self.prefix}.user{i}@example.com',
+                first_name=f'Prénom{i % 997}',
+                last_name=f'Nom{i % 1009}',
+                password='!',
+                date_joined=self.anchor - timedelta(days=rng.randint(0, 900), seconds=rng.randint(0, 86399)),
+            ))
+        self._bulk_create(User, users)
+        user_ids = list(
+            User.objects.filter(username__startswith=f'{self.prefix}_user_').order_by('pk').values_list('pk', flat=True)
+        )
+
+        # ~2 % d'organisateurs, quelques comptes en attente d'approbation
+        profiles = []
+        organizer_ids = []
+        for user_id in user_ids:
+            is_organizer = rng.random() < 0.02
+            if is_organizer:
+                organizer_ids.append(user_id)
+            profiles.append(UserProfile(
+                user_id=user_id,
+                role='organizer' if is_organizer else 'participant',
+                status_approval='pending' if is_organizer and rng.random() < 0.05 else 'approved',
+                country=rng.choice(COUNTRIES),
+                phone=f'+1514{rng.randint(1000000, 9999999)}' if rng.random() < 0.6 else '',
+            ))
+        self._bulk_create(UserProfile, profiles)
+        if not organizer_ids:
+            organizer_ids = user_ids[:1]
+        return user_ids, organizer_ids
+
+    # --------------------------------------------------------------- taxonomie
+
+    def _create_taxonomy(self):
+        categories = [
+            Category.objects.get_or_create(name=f'[{self.prefix}] {name}')[0] for name in CATEGORY_NAMES
+        ]
+        tags = [Tag.objects.get_or_create(name=f'{self.prefix}-tag-{i}')[0] for i in range(60)]
+        return categories, tags
+
+    # -------------------------------------------------------------- événements
+
+    def _create_events(self, count, organizer_ids, categories, tags):
+        rng = self.rng
+        # Popularité des catégories et des organisateurs : distribution à longue traîne
+        category_weights = [1 / (rank + 1) for rank in range(len(categories))]
+        organizer_weights = [rng.paretovariate(1.2) for _ in organizer_ids]
+
+        events = []
+        for i in range(count):
+            start = self.anchor + timedelta(days=rng.uniform(-540, 180))
+            start = start.replace(minute=0, second=0, microsecond=0)
+            is_past = start < self.anchor
+            is_free = rng.random() < 0.4
+            price = Decimal('0') if is_free else Decimal(str(round(min(max(rng.lognormvariate(3.3, 0.7), 5), 300))))
+            limited = rng.random() < 0.7
+            roll = rng.random()
+            if roll < 0.04:
+                event_status = 'cancelled'
+            elif roll < 0.08 and not is_past:
+                event_status = 'draft'
+            else:
+                event_status = 'completed' if is_past and rng.random() < 0.5 else 'published'
+            event_type = 'virtual' if rng.random() < 0.2 else 'physical'
+            events.append(Event(
+                title=f'Événement {i}',
+                slug=f'{self.prefix}-{i}',
+                description='Événement généré par generate_load_dataset',
+                short_description=f'Événement de charge {i}',
+                event_type=event_type,
+                start_date=start,
+                end_date=start + timedelta(hours=rng.choice([2, 3, 4, 8, 24])),
+                location=rng.choice(CITIES),
+                place_type='limited' if limited else 'unlimited',
+                max_capacity=int(min(max(rng.lognormvariate(4.2, 0.9), 20), 5000)) if limited else None,
+                price=price,
+                is_free=is_free,
+                category=rng.choices(categories, weights=category_weights)[0],
+                organizer_id=rng.choices(organizer_ids, weights=organizer_weights)[0],
+                status=event_status,
+                created_at=min(start - timedelta(days=rng.uniform(7, 120)), self.anchor),
+                published_at=None if event_status == 'draft'
+                else min(start - timedelta(days=rng.uniform(1, 90)), self.anchor),
+            ))
+        with manual_timestamps(Event._meta.get_field('created_at')):
+            self._bulk_create(Event, events)
+
+        rows = list(
+            Event.objects.filter(slug__startswith=f'{self.prefix}-')
+            .values_list('pk', 'slug', 'start_date', 'created_at', 'price', 'place_type', 'max_capacity', 'event_type', 'status')
+        )
+        rows.sort(key=lambda row: int(row[1].rsplit('-', 1)[1]))
+
+        event_tags = []
+        ticket_types = []
+        session_types = []
+        Through = Event.tags.through
+        for row in rows:
+            event_id, price = row[0], row[4]
+            for tag in rng.sample(tags, rng.randint(1, 4)):
+                event_tags.append(Through(event_id=event_id, tag_id=tag.pk))
+            if price and rng.random() < 0.5:
+                for rank, name in enumerate(rng.sample(TICKET_NAMES, rng.randint(1, 3))):
+                    ticket_types.append(TicketType(
+                        event_id=event_id,
+                        name=name,
+                        price=(price * Decimal(str(1 + rank * 0.5))).quantize(Decimal('1')),
+                        quantity=rng.choice([None, 50, 100, 200, 500]),
+                    ))
+            if rng.random() < 0.15:
+                for order, name in enumerate(SESSION_NAMES[:rng.randint(2, 3)]):
+                    session_types.append(SessionType(event_id=event_id, name=name, display_order=order))
+        self._bulk_create(Through, event_tags)
+        self._bulk_create(TicketType, ticket_types)
+        self._bulk_create(SessionType, session_types)
+
+        tickets_by_event = {}
+        for ticket_id, event_id, price in TicketType.objects.filter(
+            event__slug__startswith=f'{self.prefix}-'
+        ).order_by('pk').values_list('pk', 'event_id', 'price'):
+            tickets_by_event.setdefault(event_id, []).append((ticket_id, price))
+        sessions_by_event = {}
+        for session_id, event_id in SessionType.objects.filter(
+            event__slug__startswith=f'{self.prefix}-'
+        ).order_by('pk').values_list('pk', 'event_id'):
+            sessions_by_event.setdefault(event_id, []).append(session_id)
+
+        return [
+            {
+                'id': row[0],
+                'start_date': row[2],
+                'created_at': row[3],
+                'price': row[4],
+                'capacity': row[6] if row[5] == 'limited' else None,
+                'is_virtual': row[7] == 'virtual',
+                'status': row[8],
+                'tickets': tickets_by_event.get(row[0], []),
+                'sessions': sessions_by_event.get(row[0], []),
+            }
+            for row in rows
+        ]
+
+    # ------------------------------------------------------------ inscriptions
+
+    def _create_registrations(self, events, user_ids, per_event):
+        rng = self.rng
+        # Tailles tirées d'abord : le découpage en lots ne décale pas le flux aléatoire
+        # (log-normale autour de la moyenne demandée, bornée par la capacité + liste d'attente)
+        sized = []
+        for event in events:
+            if event['status'] == 'draft':
+                continue
+            size = int(rng.lognormvariate(0, 0.8) * per_event * 0.73)
+            if event['capacity']:
+                size = min(size, int(event['capacity'] * 1.1))
+            size = min(size, len(user_ids))
+            if size > 0:
+                sized.append((event, size))
+
+        pending_events = []
+        pending_size = 0
+        total = 0
+        chunks = 0
+        for event, size in sized:
+            pending_events.append((event, size))
+            pending_size += size
+            if pending_size >= self.chunk_size:
+                total += self._write_registration_chunk(pending_events, user_ids)
+                pending_events, pending_size = [], 0
+                chunks += 1
+                if chunks % 20 == 0:
+                    self.stdout.write(f'  {total} inscriptions')
+        if pending_events:
+            total += self._write_registration_chunk(pending_events, user_ids)
+        self.stdout.write(f'  {total} inscriptions au total')
+
+    def _write_registration_chunk(self, events, user_ids):
+        rng = self.rng
+        registrations = []
+        for event, size in events:
+            is_past = event['start_date'] < self.anchor
+            confirmed = 0
+            window = max((event['start_date'] - event['created_at']).total_seconds(), 3600)
+            for user_id in rng.sample(user_ids, size):
+                # Les inscriptions se concentrent à l'approche de l'événement
+                registered_at = event['start_date'] - timedelta(seconds=window * (1 - rng.betavariate(2.5, 1.2)))
+                registered_at = min(registered_at, self.anchor)
+                ticket_id, price = rng.choice(event['tickets']) if event['tickets'] else (None, event['price'])
+
+                if event['status'] == 'cancelled':
+                    status = 'cancelled'
+                elif event['capacity'] and confirmed >= event['capacity']:
+                    status = 'waitlisted'
+                else:
+                    roll = rng.random()
+                    if is_past:
+                        status = 'attended' if roll < 0.72 else 'no_show' if roll < 0.85 else 'cancelled'
+                    else:
+                        status = 'confirmed' if roll < 0.78 else 'pending' if roll < 0.9 else 'cancelled'
+                if status in ('confirmed', 'attended', 'no_show'):
+                    confirmed += 1
+
+                paid = price and status in ('confirmed', 'attended', 'no_show', 'cancelled')
+                payment_status = 'unpaid'
+                if paid:
+                    payment_status = 'refunded' if status == 'cancelled' and rng.random() < 0.5 else 'paid'
+                elif price and status == 'pending':
+                    payment_status = 'pending'
+
+                guest = rng.random() < 0.05
+                registrations.append(EventRegistration(
+                    event_id=event['id'],
+                    user_id=None if guest else user_id,
+                    is_guest_registration=guest,
+                    guest_full_name=f'Invité {user_id}' if guest else None,
+                    guest_email=f'{self.prefix}.guest{user_id}.{event["id"]}@example.com' if guest else None,
+                    guest_country=rng.choice(COUNTRIES) if guest else None,
+                    status=status,
+                    ticket_type_id=ticket_id,
+                    session_type_id=rng.choice(event['sessions']) if event['sessions'] else None,
+                    price_paid=price if paid else Decimal('0'),
+                    payment_status=payment_status,
+                    payment_provider='stripe' if paid else '',
+                    qr_token='%032x' % (rng.getrandbits(128) ^ self.token_salt),
+                    registered_at=registered_at,
+                    confirmed_at=min(registered_at + timedelta(minutes=rng.randint(0, 120)), self.anchor)
+                    if status in ('confirmed', 'attended', 'no_show') else None,
+                    cancelled_at=min(registered_at + timedelta(days=rng.uniform(0, 10)), self.anchor)
+                    if status == 'cancelled' else None,
+                ))
+
+        with manual_timestamps(EventRegistration._meta.get_field('registered_at')):
+            self._bulk_create(EventRegistration, registrations)
+
+        # bulk_create ne renvoie pas les clés sous MySQL : relecture par qr_token
+        token_to_id = dict(
+            EventRegistration.objects.filter(qr_token__in=[r.qr_token for r in registrations])
+            .values_list('qr_token', 'pk')
+        )
+        event_meta = {event['id']: event for event, _ in events}
+        self._create_related(registrations, token_to_id, event_meta)
+        return len(registrations)
+
+    def _create_related(self, registrations, token_to_id, event_meta):
+        rng = self.related_rng
+        interactions = []
+        notifications = []
+        refunds = []
+        for registration in registrations:
+            registration_id = token_to_id[registration.qr_token]
+            event = event_meta[registration.event_id]
+            holds = registration.status in ('confirmed', 'attended', 'no_show')
+
+            if event['is_virtual'] and registration.user_id and holds and event['start_date'] < self.anchor:
+                for interaction_type, probability in (('like', 0.3), ('comment', 0.1), ('share', 0.05), ('rating', 0.25)):
+                    if rng.random() < probability:
+                        interactions.append(VirtualEventInteraction(
+                            event_id=registration.event_id,
+                            user_id=registration.user_id,
+                            interaction_type=interaction_type,
+                            content='Super événement !' if interaction_type == 'comment' else '',
+                            rating=rng.choices([1, 2, 3, 4, 5], weights=[1, 2, 5, 12, 10])[0]
+                            if interaction_type == 'rating' else None,
+                            created_at=event['start_date'] + timedelta(minutes=rng.randint(0, 180)),
+                        ))
+
+            if holds and event['start_date'] < self.anchor:
+                for notification_type in NOTIFICATION_TYPES:
+                    if rng.random() < 0.6:
+                        notifications.append(NotificationLog(
+                            event_id=registration.event_id,
+                            registration_id=registration_id,
+                            type=notification_type,
+                            created_at=event['start_date'] - timedelta(hours=rng.choice([24, 1, 6, -2])),
+                        ))
+
+            if registration.status == 'cancelled' and registration.price_paid:
+                percentage = rng.choice([100, 100, 80, 50])
+                refund_status = 'processed' if registration.payment_status == 'refunded' else rng.choice(
+                    ['pending', 'approved', 'rejected', 'expired']
+                )
+                refunds.append(RefundRequest(
+                    registration_id=registration_id,
+                    status=refund_status,
+                    reason='Empêchement',
+                    amount_paid=registration.price_paid,
+                    refund_percentage=percentage,
+                    refund_amount=(registration.price_paid * percentage / 100).quantize(Decimal('0.01')),
+                    processed_at=min(registration.cancelled_at + timedelta(days=2), self.anchor)
+                    if refund_status == 'processed' else None,
+                    expires_at=registration.cancelled_at + timedelta(days=30),
+                    created_at=registration.cancelled_at,
+                ))
+
+        with manual_timestamps(
+            VirtualEventInteraction._meta.get_field('created_at'),
+            NotificationLog._meta.get_field('created_at'),
+            RefundRequest._meta.get_field('created_at'),
+        ):
+            self._bulk_create(VirtualEventInteraction, interactions)
+            self._bulk_create(NotificationLog, notifications)
+            self._bulk_create(RefundRequest, refunds)
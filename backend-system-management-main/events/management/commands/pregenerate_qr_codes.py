@@ -0,0 +1,62 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from events import qr
+from events.models import EventRegistration
+
+
+class Command(BaseCommand):
+    help = 'Pré-génère les QR codes des inscriptions confirmées (rendu réparti sur les cœurs CPU)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event-id', type=int, action='append', help='Limiter à un événement (répétable)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Nombre de processus de rendu (défaut: nombre de cœurs)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Inscriptions chargées par lot (défaut: 1000)')
+        parser.add_argument('--force', action='store_true', help='Régénérer aussi les QR codes existants')
+
+    def handle(self, *args, **options):
+        """
+        À lancer avant l'ouverture des portes d'un grand événement : les images sont
+        rendues en parallèle puis stockées (fichier + cache), l'accueil ne paie plus
+        le rendu au premier scan ou au premier affichage du billet.
+        """
+        if qr.qrcode is None:
+            raise CommandError("La bibliothèque qrcode n'est pas installée")
+
+        registrations = EventRegistration.objects.filter(
+            status__in=qr.QR_STATUSES,
+            event__event_type='physical',
+        ).exclude(qr_token__isnull=True).exclude(qr_token='')
+        if options['event_id']:
+            registrations = registrations.filter(event_id__in=options['event_id'])
+        if not options['force']:
+            registrations = registrations.filter(Q(qr_code='') | Q(qr_code__isnull=True))
+
+        ids = list(registrations.order_by('id').values_list('id', flat=True))
+        if not ids:
+            self.stdout.write(self.style.SUCCESS('Aucun QR code à générer.'))
+            return
+
+        self.stdout.write(f'{len(ids)} QR code(s) à générer avec {options["workers"]} processus...')
+        started = time.perf_counter()
+        generated = 0
+        batch_size = options['batch_size']
+        for start in range(0, len(ids), batch_size):
+            batch = list(EventRegistration.objects.select_related('event').filter(id__in=ids[start:start + batch_size]))
+            if options['force']:
+                for registration in batch:
+                    registration.qr_code = ''
+            generated += qr.pregenerate(batch, workers=options['workers'])
+            self.stdout.write(f'  {generated}/{len(ids)}')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'{generated} QR code(s) générés en {elapsed:.2f}s ({generated / elapsed:.0f}/s)')
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from events.outbox import deliver, due_message_ids
+
+
+class Command(BaseCommand):
+    help = 'Livre les messages en attente de l\'outbox (emails, SMS et QR des inscriptions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=500,
+            help='Nombre maximum de messages traités (défaut: 500)'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Équivalent de la tâche périodique dispatch_outbox_messages, pour les
+        déploiements sans worker Celery (cron).
+        """
+        message_ids = due_message_ids(limit=options['limit'])
+        self.stdout.write(f'{len(message_ids)} message(s) à livrer...')
+
+        results = [deliver(message_id) for message_id in message_ids]
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{results.count(True)} envoyé(s), {results.count(False)} échec(s).')
+        )
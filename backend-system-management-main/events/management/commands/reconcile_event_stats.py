@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from events.models import EventStats
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit la table EventStats à partir des inscriptions et des interactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--event-id',
+            type=int,
+            action='append',
+            dest='event_ids',
+            help='Reconstruit uniquement cet événement (option répétable)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Nombre d\'événements traités par lot (défaut: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Recalcule les statistiques par GROUP BY, par lots d'événements, puis
+        remplace les lignes existantes. À lancer après des mises à jour en masse
+        qui contournent EventRegistration.save().
+        """
+        event_ids = options['event_ids']
+        chunk_size = options['chunk_size']
+
+        if event_ids:
+            self.stdout.write(f'Reconstruction des statistiques pour {len(event_ids)} événement(s)...')
+        else:
+            self.stdout.write('Reconstruction des statistiques pour tous les événements...')
+
+        written = EventStats.rebuild(event_ids=event_ids, chunk_size=chunk_size)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{written} ligne(s) de statistiques reconstruite(s).')
+        )
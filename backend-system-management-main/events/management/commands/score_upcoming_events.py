@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from events.predictive_analytics import get_predictive_service
+
+
+class Command(BaseCommand):
+    help = 'Calcule les prédictions (remplissage, prix optimal, concurrence) de tous les événements à venir'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-fill-rate', type=float, default=0.8, help='Taux de remplissage cible (défaut: 0.8)')
+
+    def handle(self, *args, **options):
+        """Même traitement que la tâche de nuit score_upcoming_events, à la demande"""
+        started = time.perf_counter()
+        result = get_predictive_service().score_upcoming_events(options['target_fill_rate'])
+        if result['status'] != 'success':
+            raise CommandError(result['message'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['scored']} événement(s) à venir notés avec le modèle {result['model_version']} "
+            f"en {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,157 @@
+import contextlib
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+from events.models import Category, Event, EventRegistration, TicketType
+
+
+class Command(BaseCommand):
+    help = 'Test de charge : inscriptions concurrentes sur un seul événement, vérification exacte des compteurs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--capacity', type=int, default=50, help='Capacité de l\'événement (défaut: 50)')
+        parser.add_argument('--attempts', type=int, default=200, help='Nombre d\'inscriptions simultanées (défaut: 200)')
+        parser.add_argument('--workers', type=int, default=16, help='Nombre de threads (défaut: 16)')
+        parser.add_argument('--cancel', type=int, default=10, help='Annulations concurrentes après le remplissage (défaut: 10)')
+        parser.add_argument(
+            '--ticket-type',
+            action='store_true',
+            help='Réserver sur un type de billet à quantité limitée plutôt que sur le billet par défaut'
+        )
+        parser.add_argument('--keep', action='store_true', help='Conserver les données de test')
+
+    def handle(self, *args, **options):
+        """
+        Crée un événement de test, lance toutes les inscriptions en parallèle
+        (chaque thread a sa propre connexion), puis vérifie que le nombre de
+        confirmés, la liste d'attente et les compteurs sont exactement cohérents.
+        """
+        capacity = options['capacity']
+        attempts = options['attempts']
+        run_id = uuid.uuid4().hex[:8]
+
+        event, ticket_type, user_ids = self._create_fixtures(run_id, capacity, attempts, options['ticket_type'])
+        self.stdout.write(
+            f'Événement #{event.id} : {attempts} inscriptions concurrentes pour {capacity} places '
+            f'({options["workers"]} threads, contingent {"billet" if ticket_type else "par défaut"})'
+        )
+
+        try:
+            started = time.perf_counter()
+            self._run_concurrently(
+                options['workers'],
+                lambda user_id: EventRegistration(
+                    event_id=event.id,
+                    user_id=user_id,
+                    ticket_type=ticket_type,
+                    status='confirmed',
+                    payment_status='paid',
+                ).save(),
+                user_ids,
+            )
+            elapsed = time.perf_counter() - started
+
+            expected_confirmed = min(capacity, attempts)
+            self._check(event, ticket_type, expected_confirmed, attempts - expected_confirmed)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Remplissage OK en {elapsed:.2f}s : {expected_confirmed} confirmés, '
+                    f'{attempts - expected_confirmed} en liste d\'attente'
+                )
+            )
+
+            cancel_ids = list(
+                EventRegistration.objects.filter(event=event, status='confirmed')
+                .values_list('id', flat=True)[:options['cancel']]
+            )
+            self._run_concurrently(options['workers'], self._cancel, cancel_ids)
+            self._check(event, ticket_type, expected_confirmed - len(cancel_ids), attempts - expected_confirmed)
+            self.stdout.write(self.style.SUCCESS(f'Annulations OK : {len(cancel_ids)} place(s) libérée(s)'))
+        finally:
+            if not options['keep']:
+                organizer_id = event.organizer_id
+                event.delete()
+                User.objects.filter(id__in=user_ids + [organizer_id]).delete()
+
+    def _create_fixtures(self, run_id, capacity, attempts, with_ticket_type):
+        organizer = User.objects.create(username=f'stress_org_{run_id}')
+        category, _ = Category.objects.get_or_create(name='Stress test')
+        now = timezone.now()
+        event = Event.objects.create(
+            title=f'Stress test {run_id}',
+            description='Événement généré par stress_test_registrations',
+            short_description='Stress test',
+            organizer=organizer,
+            category=category,
+            start_date=now + timedelta(days=7),
+            end_date=now + timedelta(days=7, hours=2),
+            location='Stress test',
+            status='published',
+            place_type='limited',
+            max_capacity=None if with_ticket_type else capacity,
+            is_free=True,
+            enable_waitlist=True,
+        )
+        ticket_type = None
+        if with_ticket_type:
+            ticket_type = TicketType.objects.create(event=event, name='Stress', quantity=capacity)
+
+        User.objects.bulk_create([
+            User(username=f'stress_{run_id}_{i}') for i in range(attempts)
+        ])
+        user_ids = list(
+            User.objects.filter(username__startswith=f'stress_{run_id}_').values_list('id', flat=True)
+        )
+        return event, ticket_type, user_ids
+
+    @staticmethod
+    def _cancel(registration_id):
+        registration = EventRegistration.objects.get(pk=registration_id)
+        registration.status = 'cancelled'
+        registration.save()
+
+    def _run_concurrently(self, workers, func, items):
+        def worker(item):
+            try:
+                for attempt in range(20):
+                    try:
+                        return func(item)
+                    except OperationalError:
+                        # SQLite : base verrouillée par un autre écrivain, on réessaie
+                        if connection.vendor != 'sqlite':
+                            raise
+                        time.sleep(0.05 * (attempt + 1))
+                raise CommandError(f'Écriture impossible après plusieurs tentatives ({item})')
+            finally:
+                connection.close()
+
+        # Les print() de débogage des modèles sont masqués pendant la charge
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(worker, items))
+
+    def _check(self, event, ticket_type, expected_confirmed, expected_waitlisted):
+        registrations = EventRegistration.objects.filter(event=event)
+        confirmed = registrations.filter(status__in=EventRegistration.SEAT_HOLDING_STATUSES).count()
+        waitlisted = registrations.filter(status='waitlisted').count()
+        if ticket_type:
+            counter = TicketType.objects.values_list('sold_count', flat=True).get(pk=ticket_type.pk)
+        else:
+            counter = Event.objects.values_list('current_registrations', flat=True).get(pk=event.pk)
+
+        errors = []
+        if confirmed != expected_confirmed:
+            errors.append(f'confirmés: {confirmed} (attendu {expected_confirmed})')
+        if waitlisted != expected_waitlisted:
+            errors.append(f'liste d\'attente: {waitlisted} (attendu {expected_waitlisted})')
+        if counter != confirmed:
+            errors.append(f'compteur de places: {counter} (confirmés {confirmed})')
+        if errors:
+            raise CommandError('Incohérence détectée - ' + ', '.join(errors))
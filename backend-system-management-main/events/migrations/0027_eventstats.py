@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0026_restore_enable_waitlist_for_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventStats',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='events.event', verbose_name='Événement')),
+                ('pending_count', models.IntegerField(default=0, verbose_name='Inscriptions en attente')),
+                ('confirmed_count', models.IntegerField(default=0, verbose_name='Inscriptions confirmées')),
+                ('cancelled_count', models.IntegerField(default=0, verbose_name='Inscriptions annulées')),
+                ('attended_count', models.IntegerField(default=0, verbose_name='Participants présents')),
+                ('no_show_count', models.IntegerField(default=0, verbose_name='Participants absents')),
+                ('waitlisted_count', models.IntegerField(default=0, verbose_name="Inscriptions en liste d'attente")),
+                ('like_count', models.IntegerField(default=0, verbose_name="J'aime")),
+                ('comment_count', models.IntegerField(default=0, verbose_name='Commentaires')),
+                ('share_count', models.IntegerField(default=0, verbose_name='Partages')),
+                ('rating_count', models.IntegerField(default=0, verbose_name='Évaluations')),
+                ('rating_sum', models.IntegerField(default=0, verbose_name='Somme des notes')),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Revenus payés')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': "Statistiques d'événement",
+                'verbose_name_plural': "Statistiques d'événements",
+            },
+        ),
+    ]
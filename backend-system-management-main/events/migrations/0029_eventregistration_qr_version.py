@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0028_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventregistration',
+            name='qr_version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Version du QR code'),
+        ),
+    ]
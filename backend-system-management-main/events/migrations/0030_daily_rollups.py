@@ -0,0 +1,153 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0029_eventregistration_qr_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('pending_count', models.IntegerField(default=0, verbose_name='Inscriptions en attente')),
+                ('confirmed_count', models.IntegerField(default=0, verbose_name='Inscriptions confirmées')),
+                ('cancelled_count', models.IntegerField(default=0, verbose_name='Inscriptions annulées')),
+                ('attended_count', models.IntegerField(default=0, verbose_name='Participants présents')),
+                ('no_show_count', models.IntegerField(default=0, verbose_name='Participants absents')),
+                ('waitlisted_count', models.IntegerField(default=0, verbose_name="Inscriptions en liste d'attente")),
+                ('paid_count', models.IntegerField(default=0, verbose_name='Inscriptions payées')),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Revenus payés')),
+                ('refunds_processed', models.IntegerField(default=0, verbose_name='Remboursements traités')),
+                ('refund_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Montant remboursé')),
+                ('refunded_paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Revenus payés remboursés')),
+                ('new_events', models.IntegerField(default=0, verbose_name='Événements créés')),
+                ('built_at', models.DateTimeField(verbose_name='Calculé le')),
+            ],
+            options={
+                'verbose_name': 'Agrégat quotidien de catégorie',
+                'verbose_name_plural': 'Agrégats quotidiens de catégories',
+            },
+        ),
+        migrations.CreateModel(
+            name='EventDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('pending_count', models.IntegerField(default=0, verbose_name='Inscriptions en attente')),
+                ('confirmed_count', models.IntegerField(default=0, verbose_name='Inscriptions confirmées')),
+                ('cancelled_count', models.IntegerField(default=0, verbose_name='Inscriptions annulées')),
+                ('attended_count', models.IntegerField(default=0, verbose_name='Participants présents')),
+                ('no_show_count', models.IntegerField(default=0, verbose_name='Participants absents')),
+                ('waitlisted_count', models.IntegerField(default=0, verbose_name="Inscriptions en liste d'attente")),
+                ('paid_count', models.IntegerField(default=0, verbose_name='Inscriptions payées')),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Revenus payés')),
+                ('refunds_processed', models.IntegerField(default=0, verbose_name='Remboursements traités')),
+                ('refund_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Montant remboursé')),
+                ('refunded_paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Revenus payés remboursés')),
+                ('new_events', models.IntegerField(default=0, verbose_name='Événements créés')),
+                ('built_at', models.DateTimeField(verbose_name='Calculé le')),
+            ],
+            options={
+                'verbose_name': "Agrégat quotidien d'événement",
+                'verbose_name_plural': "Agrégats quotidiens d'événements",
+            },
+        ),
+        migrations.CreateModel(
+            name='OrganizerDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('pending_count', models.IntegerField(default=0, verbose_name='Inscriptions en attente')),
+                ('confirmed_count', models.IntegerField(default=0, verbose_name='Inscriptions confirmées')),
+                ('cancelled_count', models.IntegerField(default=0, verbose_name='Inscriptions annulées')),
+                ('attended_count', models.IntegerField(default=0, verbose_name='Participants présents')),
+                ('no_show_count', models.IntegerField(default=0, verbose_name='Participants absents')),
+                ('waitlisted_count', models.IntegerField(default=0, verbose_name="Inscriptions en liste d'attente")),
+                ('paid_count', models.IntegerField(default=0, verbose_name='Inscriptions payées')),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Revenus payés')),
+                ('refunds_processed', models.IntegerField(default=0, verbose_name='Remboursements traités')),
+                ('refund_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Montant remboursé')),
+                ('refunded_paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Revenus payés remboursés')),
+                ('new_events', models.IntegerField(default=0, verbose_name='Événements créés')),
+                ('built_at', models.DateTimeField(verbose_name='Calculé le')),
+            ],
+            options={
+                'verbose_name': "Agrégat quotidien d'organisateur",
+                'verbose_name_plural': "Agrégats quotidiens d'organisateurs",
+            },
+        ),
+        migrations.CreateModel(
+            name='PlatformDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pending_count', models.IntegerField(default=0, verbose_name='Inscriptions en attente')),
+                ('confirmed_count', models.IntegerField(default=0, verbose_name='Inscriptions confirmées')),
+                ('cancelled_count', models.IntegerField(default=0, verbose_name='Inscriptions annulées')),
+                ('attended_count', models.IntegerField(default=0, verbose_name='Participants présents')),
+                ('no_show_count', models.IntegerField(default=0, verbose_name='Participants absents')),
+                ('waitlisted_count', models.IntegerField(default=0, verbose_name="Inscriptions en liste d'attente")),
+                ('paid_count', models.IntegerField(default=0, verbose_name='Inscriptions payées')),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Revenus payés')),
+                ('refunds_processed', models.IntegerField(default=0, verbose_name='Remboursements traités')),
+                ('refund_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Montant remboursé')),
+                ('refunded_paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Revenus payés remboursés')),
+                ('new_events', models.IntegerField(default=0, verbose_name='Événements créés')),
+                ('built_at', models.DateTimeField(verbose_name='Calculé le')),
+                ('day', models.DateField(unique=True, verbose_name='Jour')),
+                ('new_users', models.IntegerField(default=0, verbose_name='Nouveaux utilisateurs')),
+            ],
+            options={
+                'verbose_name': 'Agrégat quotidien de la plateforme',
+                'verbose_name_plural': 'Agrégats quotidiens de la plateforme',
+                'ordering': ['day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['updated_at'], name='events_even_updated_f5fdeb_idx'),
+        ),
+        migrations.AddField(
+            model_name='organizerdailyrollup',
+            name='organizer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL, verbose_name='Organisateur'),
+        ),
+        migrations.AddField(
+            model_name='eventdailyrollup',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='events.event', verbose_name='Événement'),
+        ),
+        migrations.AddField(
+            model_name='categorydailyrollup',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_rollups', to='events.category', verbose_name='Catégorie'),
+        ),
+        migrations.AddIndex(
+            model_name='organizerdailyrollup',
+            index=models.Index(fields=['day'], name='events_orga_day_53d5cb_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='organizerdailyrollup',
+            constraint=models.UniqueConstraint(fields=('organizer', 'day'), name='unique_organizer_daily_rollup'),
+        ),
+        migrations.AddIndex(
+            model_name='eventdailyrollup',
+            index=models.Index(fields=['day'], name='events_even_day_d6879d_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventdailyrollup',
+            constraint=models.UniqueConstraint(fields=('event', 'day'), name='unique_event_daily_rollup'),
+        ),
+        migrations.AddIndex(
+            model_name='categorydailyrollup',
+            index=models.Index(fields=['day', 'category'], name='events_cate_day_58c399_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0031_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(default='fill_rate_predictor', max_length=100)),
+                ('force_retrain', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('completed', 'Terminé'), ('failed', 'Échec')], default='pending', max_length=20)),
+                ('stage', models.CharField(blank=True, choices=[('', ''), ('extraction', 'Extraction des données'), ('training', 'Entraînement'), ('saving', 'Sauvegarde')], default='', max_length=20)),
+                ('mode', models.CharField(blank=True, choices=[('', ''), ('full', 'Complet'), ('warm_start', 'Incrémental')], default='', max_length=20)),
+                ('total_rows', models.PositiveIntegerField(default=0)),
+                ('processed_rows', models.PositiveIntegerField(default=0)),
+                ('total_trees', models.PositiveIntegerField(default=0)),
+                ('built_trees', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='training_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Entraînement',
+                'verbose_name_plural': 'Entraînements',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='events_trai_status_f6d251_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0032_training_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(max_length=50)),
+                ('predicted_fill_rate', models.FloatField()),
+                ('confidence', models.FloatField()),
+                ('predicted_registrations', models.PositiveIntegerField(default=0)),
+                ('current_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('optimal_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('optimal_fill_rate', models.FloatField(blank=True, null=True)),
+                ('predicted_revenue', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('price_change_percent', models.FloatField(blank=True, null=True)),
+                ('competition_level', models.CharField(choices=[('low', 'Faible'), ('medium', 'Moyenne'), ('high', 'Forte')], default='low', max_length=10)),
+                ('price_position', models.CharField(choices=[('low', 'Bas'), ('competitive', 'Compétitif'), ('high', 'Élevé'), ('unknown', 'Inconnu')], default='unknown', max_length=15)),
+                ('avg_market_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('similar_events_count', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_snapshot', to='events.event')),
+            ],
+            options={
+                'verbose_name': 'Prédiction',
+                'verbose_name_plural': 'Prédictions',
+                'indexes': [models.Index(fields=['predicted_fill_rate'], name='events_pred_predict_477c6d_idx'), models.Index(fields=['computed_at'], name='events_pred_compute_45fab5_idx')],
+            },
+        ),
+    ]
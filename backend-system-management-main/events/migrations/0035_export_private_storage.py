@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:51
+
+import uuid
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+import events.models
+
+
+def move_exports(apps, schema_editor):
+    # Fichiers déjà générés dans MEDIA_ROOT (publics) : déplacés dans le stockage privé sous un nom aléatoire
+    ExportJob = apps.get_model('events', 'ExportJob')
+    storage = events.models.export_storage()
+    for job in ExportJob.objects.exclude(file='').exclude(file__isnull=True):
+        if not default_storage.exists(job.file.name):
+            continue
+        with default_storage.open(job.file.name, 'rb') as f:
+            name = storage.save(f"exports/{uuid.uuid4().hex}.{job.format}", f)
+        default_storage.delete(job.file.name)
+        ExportJob.objects.filter(pk=job.pk).update(file=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0034_cache_table'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=events.models.export_storage, upload_to='exports/'),
+        ),
+        migrations.RunPython(move_exports, migrations.RunPython.noop),
+    ]
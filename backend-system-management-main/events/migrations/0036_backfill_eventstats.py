@@ -0,0 +1,60 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+REGISTRATION_STATUS_FIELDS = {
+    'pending': 'pending_count',
+    'confirmed': 'confirmed_count',
+    'cancelled': 'cancelled_count',
+    'attended': 'attended_count',
+    'no_show': 'no_show_count',
+    'waitlisted': 'waitlisted_count',
+}
+INTERACTION_TYPE_FIELDS = {
+    'like': 'like_count',
+    'comment': 'comment_count',
+    'share': 'share_count',
+}
+CHUNK_SIZE = 1000
+
+
+def backfill_stats(apps, schema_editor):
+    # Une ligne EventStats par événement existant : les inscriptions ne font plus que des UPDATE F()
+    Event = apps.get_model('events', 'Event')
+    EventStats = apps.get_model('events', 'EventStats')
+    EventRegistration = apps.get_model('events', 'EventRegistration')
+    VirtualEventInteraction = apps.get_model('events', 'VirtualEventInteraction')
+
+    missing = list(Event.objects.filter(stats__isnull=True).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(missing), CHUNK_SIZE):
+        event_ids = missing[start:start + CHUNK_SIZE]
+        rows = {event_id: EventStats(event_id=event_id) for event_id in event_ids}
+
+        for row in (EventRegistration.objects.filter(event_id__in=event_ids)
+                    .order_by().values('event_id', 'status').annotate(count=Count('pk'))):
+            field = REGISTRATION_STATUS_FIELDS.get(row['status'])
+            if field:
+                setattr(rows[row['event_id']], field, row['count'])
+        for row in (EventRegistration.objects.filter(event_id__in=event_ids, payment_status='paid')
+                    .order_by().values('event_id').annotate(total=Sum('price_paid'))):
+            rows[row['event_id']].paid_revenue = row['total'] or 0
+        for row in (VirtualEventInteraction.objects.filter(event_id__in=event_ids)
+                    .order_by().values('event_id', 'interaction_type')
+                    .annotate(count=Count('pk'), rated=Count('rating'), rating_total=Sum('rating'))):
+            if row['interaction_type'] == 'rating':
+                rows[row['event_id']].rating_count = row['rated']
+                rows[row['event_id']].rating_sum = row['rating_total'] or 0
+            elif row['interaction_type'] in INTERACTION_TYPE_FIELDS:
+                setattr(rows[row['event_id']], INTERACTION_TYPE_FIELDS[row['interaction_type']], row['count'])
+
+        EventStats.objects.bulk_create(rows.values(), ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0035_export_private_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0037_analytics_export_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingjob',
+            name='scheduled',
+            field=models.BooleanField(default=False),
+        ),
+    ]
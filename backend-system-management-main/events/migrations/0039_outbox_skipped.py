@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0038_training_job_scheduled'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('processing', 'En cours'), ('sent', 'Envoyé'), ('skipped', 'Ignoré'), ('failed', 'Échec définitif')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0039_outbox_skipped'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionsnapshot',
+            name='price_percentile',
+            field=models.FloatField(default=50),
+        ),
+    ]
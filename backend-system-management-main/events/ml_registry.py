@@ -0,0 +1,184 @@
+"""
+Registre des modèles de machine learning (fichiers joblib de ml_models/) :
+chaque modèle est désérialisé une fois par processus, puis rechargé quand le
+fichier change (mtime, taille ou inode) — un nouvel entraînement est pris en
+compte sans redémarrage.
+
+`compiled(name)` retourne la forêt compilée du modèle (events.forest,
+tableaux en mmap) quand elle a été exportée : les prédictions n'ont alors
+pas besoin du fichier joblib.
+
+`preload()` est appelé par wsgi.py : avec `gunicorn --preload`, les modèles
+sont chargés dans le maître avant le fork et partagés par les workers en
+copie sur écriture.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import joblib
+from django.conf import settings
+from django.utils import timezone
+
+from . import forest
+
+logger = logging.getLogger(__name__)
+
+EXTENSION = '.joblib'
+# Intervalle minimal entre deux stat() du même fichier
+CHECK_INTERVAL = 2.0
+
+
+class LoadedModel:
+    """Contenu d'un fichier de modèle et ses métadonnées de version"""
+
+    def __init__(self, name, path, data, signature, load_seconds):
+        self.name = name
+        self.path = path
+        self.data = data
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.loaded_at = timezone.now()
+        self.checked_at = time.monotonic()
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    @property
+    def version(self):
+        # Anciens fichiers sans version : dérivée de la date de modification
+        return self.data.get('version') or f"mtime-{int(self.signature[0] / 1e9)}"
+
+    def metadata(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'trained_at': self.data.get('trained_at'),
+            'metrics': self.data.get('metrics'),
+            'file_modified_at': datetime.fromtimestamp(self.signature[0] / 1e9, tz=dt_timezone.utc).isoformat(),
+            'loaded_at': self.loaded_at.isoformat(),
+            'load_ms': round(self.load_seconds * 1000, 1),
+            'pid': os.getpid(),
+        }
+
+
+class ModelRegistry:
+    def __init__(self, directory=None, check_interval=CHECK_INTERVAL):
+        self._directory = directory
+        self.check_interval = check_interval
+        self._models = {}
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return self._directory or os.path.join(settings.BASE_DIR, 'ml_models')
+
+    def path(self, name):
+        return os.path.join(self.directory, f'{name}{EXTENSION}')
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def get(self, name):
+        """Modèle `name` (LoadedModel), rechargé si le fichier a changé ; None s'il n'existe pas"""
+        loaded = self._models.get(name)
+        if loaded is not None and time.monotonic() - loaded.checked_at < self.check_interval:
+            return loaded
+
+        path = self.path(name)
+        try:
+            signature = self._signature(path)
+        except FileNotFoundError:
+            self._models.pop(name, None)
+            return None
+        if loaded is not None and loaded.signature == signature:
+            loaded.checked_at = time.monotonic()
+            return loaded
+
+        with self._lock:
+            # Un autre thread a pu recharger pendant l'attente du verrou
+            loaded = self._models.get(name)
+            if loaded is not None and loaded.signature == signature:
+                return loaded
+            started = time.perf_counter()
+            data = joblib.load(path)
+            loaded = LoadedModel(name, path, data, signature, time.perf_counter() - started)
+            self._models[name] = loaded
+        logger.info(f"Modèle {name} chargé (version {loaded.version}, {loaded.load_seconds * 1000:.0f} ms)")
+        return loaded
+
+    def compiled(self, name):
+        """Forêt compilée du modèle `name`, rechargée quand current.json change ; None sans export"""
+        entry = self._compiled.get(name)
+        if entry is not None and time.monotonic() - entry[2] < self.check_interval:
+            return entry[0]
+
+        meta_path = os.path.join(forest.directory_for(self.path(name)), forest.META_NAME)
+        try:
+            signature = self._signature(meta_path)
+        except FileNotFoundError:
+            self._compiled.pop(name, None)
+            return None
+        if entry is not None and entry[1] == signature:
+            self._compiled[name] = (entry[0], signature, time.monotonic())
+            return entry[0]
+
+        with self._lock:
+            compiled = forest.load(forest.directory_for(self.path(name)))
+            self._compiled[name] = (compiled, signature, time.monotonic())
+        if compiled is not None:
+            logger.info(f"Forêt compilée {name} ouverte (version {compiled.version}, {compiled.n_trees} arbres)")
+        return compiled
+
+    def save(self, name, data, version=None):
+        """
+        Écrire un modèle avec sa version et sa date d'entraînement. Écriture
+        atomique (fichier temporaire + rename) : un processus ne lit jamais un
+        fichier à moitié écrit, et tous rechargent au prochain get().
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        trained_at = timezone.now()
+        data = dict(data, version=version or trained_at.strftime('%Y%m%d%H%M%S'), trained_at=trained_at.isoformat())
+        path = self.path(name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        joblib.dump(data, tmp_path)
+        os.replace(tmp_path, path)
+        self._models.pop(name, None)
+        return self.get(name)
+
+    def names(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(entry[:-len(EXTENSION)] for entry in os.listdir(self.directory) if entry.endswith(EXTENSION))
+
+    def preload(self, names=None):
+        """
+        Charger les modèles (défaut : tous ceux du répertoire) : la forêt
+        compilée si elle existe, sinon le fichier joblib ; les erreurs sont
+        journalisées
+        """
+        loaded = []
+        for name in names or self.names():
+            try:
+                if self.compiled(name) is not None or self.get(name) is not None:
+                    loaded.append(name)
+            except Exception as e:
+                logger.error(f"Préchargement du modèle {name} impossible: {e}")
+        return loaded
+
+    def metadata(self, name):
+        """Métadonnées du modèle (chargé au besoin) ; None s'il n'existe pas"""
+        loaded = self.get(name)
+        return loaded.metadata() if loaded is not None else None
+
+    def clear(self):
+        self._models.clear()
+        self._compiled.clear()
+
+
+registry = ModelRegistry()
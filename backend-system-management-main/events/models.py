@@ -1,13 +1,76 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.conf import settings
+import contextlib
+from collections import Counter
 import uuid
-import io
 from decimal import Decimal
 
-class UserProfile(models.Model):
+from . import price_index, qr
+
+
+class FieldTrackerMixin:
+    """
+    Mémorise les valeurs des champs suivis au chargement (from_db) pour savoir
+    ce qui a changé sans relire la ligne avant chaque save().
+
+    Les noms de `tracked_fields` sont des attname (`ticket_type_id`, pas
+    `ticket_type`). Une ligne modifiée par QuerySet.update() après le
+    chargement n'est pas vue : recharger l'instance dans ce cas.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.tracked_fields
+        }
+        return instance
+
+    def get_loaded_values(self):
+        """Valeurs chargées depuis la base, ou None si elles ne sont pas toutes connues"""
+        loaded = self.__dict__.get('_loaded_values')
+        if loaded is None or len(loaded) != len(self.tracked_fields):
+            return None
+        return dict(loaded)
+
+    def has_field_changed(self, attname):
+        """Un champ dont la valeur d'origine est inconnue est considéré comme modifié"""
+        loaded = self.__dict__.get('_loaded_values') or {}
+        if self.pk is None or attname not in loaded:
+            return True
+        return getattr(self, attname) != loaded[attname]
+
+    def changed_fields(self):
+        return [attname for attname in self.tracked_fields if self.has_field_changed(attname)]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot_tracked_fields(fields)
+
+    def _snapshot_tracked_fields(self, field_names=None):
+        if field_names is None:
+            self._loaded_values = {attname: getattr(self, attname) for attname in self.tracked_fields}
+            return
+        loaded = self.__dict__.get('_loaded_values')
+        if loaded is None:
+            return
+        attnames = {self._meta.get_field(name).attname for name in field_names}
+        for attname in self.tracked_fields:
+            if attname in attnames:
+                loaded[attname] = getattr(self, attname)
+
+
+class UserProfile(FieldTrackerMixin, models.Model):
     ROLE_CHOICES = [
         ('super_admin', 'Super Administrateur'),  # 👑 Niveau le plus élevé
         ('organizer', 'Organisateur'),           # 🎪 Niveau intermédiaire
@@ -30,14 +93,20 @@ class UserProfile(models.Model):
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_profiles')
     rejection_reason = models.TextField(blank=True)
 
+    tracked_fields = ('status_approval',)
+
     def __str__(self) -> str:
         return f"{self.user.username} ({self.role})"
     
     def save(self, *args, **kwargs):
         # Si le statut passe à 'approved', enregistrer la date et l'approbateur
-        if self.status_approval == 'approved' and not self.approval_date:
-            from django.utils import timezone
+        loaded = self.get_loaded_values()
+        newly_approved = loaded is not None and loaded['status_approval'] != 'approved'
+        if self.status_approval == 'approved' and (not self.approval_date or newly_approved):
             self.approval_date = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'approval_date' not in update_fields:
+                kwargs['update_fields'] = list(update_fields) + ['approval_date']
         super().save(*args, **kwargs)
     
     @property
@@ -76,14 +145,6 @@ class UserProfile(models.Model):
         return self.status_approval == 'approved'
 
 
-try:
-    import qrcode
-    from PIL import Image
-except Exception:  # pragma: no cover - handled by requirements
-    qrcode = None
-    Image = None
-
-
 class Category(models.Model):
     """Modèle pour les catégories d'événements"""
     name = models.CharField(max_length=100, unique=True)
@@ -119,7 +180,83 @@ class Tag(models.Model):
         return self.name
 
 
-class Event(models.Model):
+def _related_aggregate_subquery(model, aggregate, *conditions, **filters):
+    """Sous-requête corrélée qui agrège les lignes liées à l'événement courant.
+
+    Une sous-requête par agrégat évite la multiplication des lignes qu'entraînerait
+    un double JOIN sur les inscriptions et les interactions.
+    """
+    queryset = (
+        model.objects.filter(*conditions, event=models.OuterRef('pk'), **filters)
+        .order_by()
+        .values('event')
+        .annotate(value=aggregate)
+        .values('value')[:1]
+    )
+    return Coalesce(
+        models.Subquery(queryset),
+        models.Value(0),
+        output_field=models.IntegerField(),
+    )
+
+
+class EventQuerySet(models.QuerySet):
+    """QuerySet des événements avec les agrégats nécessaires aux listes"""
+
+    def with_list_stats(self):
+        """
+        Annoter chaque événement avec ses compteurs d'inscriptions et d'interactions.
+
+        Le coût d'une page d'événements reste constant quel que soit le nombre
+        d'événements : EventListSerializer lit ces annotations au lieu de lancer
+        une requête par compteur et par ligne.
+        """
+        return self.select_related('category', 'organizer').annotate(
+            stats_registration_count=_related_aggregate_subquery(
+                EventRegistration, models.Count('pk'), status__in=['confirmed', 'attended']
+            ),
+            stats_confirmed_count=_related_aggregate_subquery(
+                EventRegistration, models.Count('pk'), status='confirmed'
+            ),
+            stats_likes=_related_aggregate_subquery(
+                VirtualEventInteraction, models.Count('pk'), interaction_type='like'
+            ),
+            stats_comments=_related_aggregate_subquery(
+                VirtualEventInteraction, models.Count('pk'), interaction_type='comment'
+            ),
+            stats_shares=_related_aggregate_subquery(
+                VirtualEventInteraction, models.Count('pk'), interaction_type='share'
+            ),
+            stats_ratings=_related_aggregate_subquery(
+                VirtualEventInteraction, models.Count('rating'), interaction_type='rating'
+            ),
+            stats_rating_sum=_related_aggregate_subquery(
+                VirtualEventInteraction, models.Sum('rating'), interaction_type='rating'
+            ),
+            stats_interactions=_related_aggregate_subquery(
+                VirtualEventInteraction, models.Count('pk')
+            ),
+        )
+
+    def with_detail(self):
+        """
+        Précharger tout ce que lit EventSerializer (inscriptions, billets,
+        sessions, historique, tags) : une liste d'événements détaillés coûte un
+        nombre fixe de requêtes au lieu de plusieurs par événement.
+        """
+        return self.with_list_stats().select_related('virtual_details').prefetch_related(
+            'tags',
+            'ticket_types',
+            'session_types',
+            models.Prefetch('history', queryset=EventHistory.objects.select_related('user')),
+            models.Prefetch(
+                'registrations',
+                queryset=EventRegistration.objects.select_related('user__profile', 'ticket_type', 'session_type'),
+            ),
+        )
+
+
+class Event(FieldTrackerMixin, models.Model):
     """Modèle principal pour les événements"""
     STATUS_CHOICES = [
         ('draft', 'Brouillon'),
@@ -210,7 +347,10 @@ class Event(models.Model):
     
     # Slug pour URL
     slug = models.SlugField(max_length=200, unique=True, blank=True)
-    
+
+    objects = EventQuerySet.as_manager()
+    tracked_fields = ('price', 'status', 'category_id', 'start_date')
+
     class Meta:
         verbose_name = "Événement"
         verbose_name_plural = "Événements"
@@ -227,18 +367,44 @@ class Event(models.Model):
             self.published_at = timezone.now()
 
         # 🎯 NOUVELLE LOGIQUE : Déterminer si l'événement est gratuit
-        try:
-            # Si des types de billets existent, vérifier s'ils sont tous gratuits
-            if self.ticket_types.exists():
-                # L'événement est gratuit seulement si TOUS les types de billets sont gratuits
-                self.is_free = all(Decimal(ticket_type.price or 0) == Decimal('0') for ticket_type in self.ticket_types.all())
-            else:
-                # Pas de types de billets, utiliser le prix par défaut
-                self.is_free = (Decimal(self.price or 0) == Decimal('0'))
-        except Exception:
-            pass
+        # 🎯 PERF : Recalcul seulement à la création ou si le prix change ; les
+        # types de billets tiennent is_free à jour eux-mêmes (TicketType.save/delete)
+        if self.pk is None:
+            self.is_free = (Decimal(self.price or 0) == Decimal('0'))
+        elif self.has_field_changed('price'):
+            self.is_free = self.compute_is_free()
+        
+        # Index des prix du marché : seulement si un champ qu'il utilise a changé
+        market_changed = self.changed_fields()
+        previous_category_ids = []
+        if 'category_id' in market_changed and self.pk is not None:
+            loaded = self.__dict__.get('_loaded_values') or {}
+            if 'category_id' in loaded:
+                previous_category_ids.append(loaded['category_id'])
         
+        creating = self.pk is None
         super().save(*args, **kwargs)
+        if creating:
+            # Ligne de statistiques créée avec l'événement : les inscriptions ne font que des UPDATE F()
+            EventStats.objects.bulk_create([EventStats(event_id=self.pk)], ignore_conflicts=True)
+        
+        if market_changed:
+            event_id = self.pk
+            transaction.on_commit(lambda: price_index.refresh_event(event_id, previous_category_ids))
+
+    def compute_is_free(self):
+        """Gratuit si TOUS les types de billets sont gratuits, sinon selon le prix par défaut"""
+        prices = list(self.ticket_types.values_list('price', flat=True))
+        if prices:
+            return all(Decimal(price or 0) == Decimal('0') for price in prices)
+        return Decimal(self.price or 0) == Decimal('0')
+
+    @classmethod
+    def sync_is_free(cls, event_id):
+        """Recalculer is_free après une modification des types de billets"""
+        event = cls.objects.only('id', 'price').filter(pk=event_id).first()
+        if event is not None:
+            cls.objects.filter(pk=event_id).update(is_free=event.compute_is_free())
 
     @property
     def is_full(self):
@@ -262,10 +428,17 @@ class Event(models.Model):
             return None
         
         # 🎯 CORRECTION MAJEURE : Compter SEULEMENT les inscriptions confirmées SANS type de billet spécifique
-        default_confirmed_registrations = self.registrations.filter(
-            status__in=['confirmed', 'attended'],
-            ticket_type__isnull=True  # Seulement les billets par défaut
-        ).count()
+        prefetched = self._prefetched_registrations()
+        if prefetched is not None:
+            default_confirmed_registrations = sum(
+                1 for registration in prefetched
+                if registration.status in ('confirmed', 'attended') and registration.ticket_type_id is None
+            )
+        else:
+            default_confirmed_registrations = self.registrations.filter(
+                status__in=['confirmed', 'attended'],
+                ticket_type__isnull=True  # Seulement les billets par défaut
+            ).count()
         
         print(f"🔍 DEBUG: default_ticket_available_places - Total: {self.max_capacity}, Billets par défaut confirmés: {default_confirmed_registrations}")
         
@@ -278,6 +451,10 @@ class Event(models.Model):
             return False
         return self.default_ticket_available_places <= 0
 
+    def _prefetched_registrations(self):
+        """Inscriptions préchargées par Event.objects.with_detail(), sinon None"""
+        return getattr(self, '_prefetched_objects_cache', {}).get('registrations')
+
     def get_ticket_type_availability(self):
         """Retourne la disponibilité de chaque type de billet"""
         availability = {}
@@ -301,12 +478,22 @@ class Event(models.Model):
         """Retourne la disponibilité de chaque session"""
         availability = {}
         
+        # Inscriptions confirmées par session : préchargées (with_detail) ou un seul GROUP BY
+        prefetched = self._prefetched_registrations()
+        if prefetched is not None:
+            session_counts = Counter(
+                registration.session_type_id for registration in prefetched
+                if registration.status in ('confirmed', 'attended')
+            )
+        else:
+            session_counts = dict(
+                self.registrations.filter(status__in=['confirmed', 'attended'])
+                .order_by().values('session_type').annotate(count=models.Count('pk'))
+                .values_list('session_type', 'count')
+            )
+
         for session in self.session_types.all():
-            # Compter les inscriptions confirmées pour cette session
-            confirmed_count = self.registrations.filter(
-                status__in=['confirmed', 'attended'],
-                session_type=session
-            ).count()
+            confirmed_count = session_counts.get(session.id, 0)
             
             availability[session.id] = {
                 'name': session.name,
@@ -542,6 +729,18 @@ class TicketType(models.Model):
     def __str__(self):
         return f"{self.name} - {self.event.title}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'price' in update_fields:
+            Event.sync_is_free(self.event_id)
+
+    def delete(self, *args, **kwargs):
+        event_id = self.event_id
+        result = super().delete(*args, **kwargs)
+        Event.sync_is_free(event_id)
+        return result
+
     @property
     def available_quantity(self):
         """Retourne le nombre de places disponibles (calculé dynamiquement)"""
@@ -637,7 +836,87 @@ class SessionType(models.Model):
     # Le champ current_participants est conservé pour compatibilité mais n'est plus utilisé
 
 
-class EventRegistration(models.Model):
+class SeatUnavailable(Exception):
+    """Plus aucune place dans le contingent et pas de liste d'attente possible"""
+
+
+class SeatReservation:
+    """
+    Moteur de réservation des places.
+
+    Chaque inscription confirmée occupe une place dans un contingent :
+    `TicketType.sold_count` pour un billet à quantité limitée, sinon
+    `Event.current_registrations` (billet par défaut). La réservation est un
+    UPDATE conditionnel (`SET n = n + 1 WHERE n < limite`) : c'est la base de
+    données qui arbitre les inscriptions concurrentes, le nombre de lignes
+    modifiées indique si la place a été obtenue.
+    """
+
+    @staticmethod
+    def uses_ticket_pool(ticket_type):
+        return ticket_type is not None and ticket_type.quantity is not None
+
+    @classmethod
+    def reserve(cls, event_id, ticket_type=None, allow_overbooking=False):
+        """Réserve une place ; retourne False si le contingent est épuisé"""
+        if cls.uses_ticket_pool(ticket_type):
+            queryset = TicketType.objects.filter(pk=ticket_type.pk)
+            if not allow_overbooking:
+                queryset = queryset.filter(sold_count__lt=models.F('quantity'))
+            return queryset.update(sold_count=models.F('sold_count') + 1) == 1
+
+        queryset = Event.objects.filter(pk=event_id)
+        if not allow_overbooking:
+            queryset = queryset.filter(
+                models.Q(place_type='unlimited')
+                | models.Q(max_capacity__isnull=True)
+                | models.Q(current_registrations__lt=models.F('max_capacity'))
+            )
+        return queryset.update(current_registrations=models.F('current_registrations') + 1) == 1
+
+    @classmethod
+    def rebuild_counters(cls, event_ids=None):
+        """
+        Recalculer tous les compteurs de places en deux UPDATE ensemblistes
+        (sous-requêtes corrélées), sans charger les événements en Python.
+        Utilisé après un chargement en masse qui contourne save().
+        """
+        holding = EventRegistration.SEAT_HOLDING_STATUSES
+        events = Event.objects.all()
+        ticket_types = TicketType.objects.filter(quantity__isnull=False)
+        if event_ids is not None:
+            events = events.filter(pk__in=event_ids)
+            ticket_types = ticket_types.filter(event_id__in=event_ids)
+
+        events.update(current_registrations=_related_aggregate_subquery(
+            EventRegistration,
+            models.Count('pk'),
+            models.Q(ticket_type__isnull=True) | models.Q(ticket_type__quantity__isnull=True),
+            status__in=holding,
+        ))
+        sold = (
+            EventRegistration.objects.filter(ticket_type=models.OuterRef('pk'), status__in=holding)
+            .order_by()
+            .values('ticket_type')
+            .annotate(value=models.Count('pk'))
+            .values('value')[:1]
+        )
+        ticket_types.update(sold_count=Coalesce(models.Subquery(sold), models.Value(0)))
+
+    @classmethod
+    def release(cls, event_id, ticket_type=None):
+        """Libère une place (sans jamais descendre sous zéro)"""
+        if cls.uses_ticket_pool(ticket_type):
+            TicketType.objects.filter(pk=ticket_type.pk, sold_count__gt=0).update(
+                sold_count=models.F('sold_count') - 1
+            )
+        else:
+            Event.objects.filter(pk=event_id, current_registrations__gt=0).update(
+                current_registrations=models.F('current_registrations') - 1
+            )
+
+
+class EventRegistration(FieldTrackerMixin, models.Model):
     """Modèle pour les inscriptions aux événements"""
     STATUS_CHOICES = [
         ('pending', 'En attente'),
@@ -647,6 +926,9 @@ class EventRegistration(models.Model):
         ('no_show', 'Absent'),
         ('waitlisted', 'Liste d\'attente'),
     ]
+    # Statuts qui occupent une place dans le contingent
+    SEAT_HOLDING_STATUSES = ('confirmed', 'attended')
+    tracked_fields = ('status', 'ticket_type_id', 'payment_status', 'price_paid')
 
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='registrations', verbose_name="Événement")
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='registrations', verbose_name="Utilisateur")
@@ -671,6 +953,7 @@ class EventRegistration(models.Model):
     payment_reference = models.CharField(max_length=100, blank=True, verbose_name="Référence de paiement")
     qr_token = models.CharField(max_length=64, unique=True, blank=True, null=True)
     qr_code = models.ImageField(upload_to='tickets/qr/', blank=True, null=True, verbose_name="QR Code")
+    qr_version = models.PositiveIntegerField(default=1, verbose_name="Version du QR code")
     
     # Code d'accès virtuel
     virtual_access_code = models.CharField(max_length=100, blank=True, null=True, verbose_name="Code d'accès virtuel")
@@ -710,6 +993,10 @@ class EventRegistration(models.Model):
                 condition=models.Q(guest_phone__isnull=False)
             )
         ]
+        indexes = [
+            # Détection des jours à réagréger (events.rollups)
+            models.Index(fields=['updated_at']),
+        ]
         ordering = ['-registered_at']
 
     def __str__(self):
@@ -719,193 +1006,174 @@ class EventRegistration(models.Model):
             return f"{self.guest_full_name} (Invité) - {self.event.title}"
 
     def save(self, *args, **kwargs):
+        """
+        Coût en requêtes d'une instance chargée (voir les opérations de
+        check_query_budgets) :
+        - sans changement de statut, de billet ni de paiement : un seul UPDATE ;
+        - confirmation, annulation : trois écritures dans une transaction,
+          l'UPDATE de réservation ou de libération de la place (contrôle de
+          capacité atomique sur le compteur de l'événement ou du billet),
+          l'UPDATE de l'inscription et l'UPDATE F() d'EventStats, plus le
+          SAVEPOINT et son RELEASE sous une transaction englobante ;
+        - plus la lecture de l'événement (code d'accès virtuel) et du billet
+          s'ils ne sont pas chargés par select_related.
+        """
         # 🔍 LOG CRITIQUE: Vérifier si le stream se lance automatiquement lors de la sauvegarde
         import logging
         logger = logging.getLogger(__name__)
         logger.info(f"🔍 LOG CRITIQUE: EventRegistration.save() appelé pour inscription {self.id if self.id else 'NEW'}")
-        logger.info(f"🔍 LOG CRITIQUE: Event {self.event_id if hasattr(self, 'event_id') else 'N/A'} - is_virtual: {getattr(self.event, 'is_virtual', 'N/A') if hasattr(self, 'event') else 'N/A'}")
-        
+        logger.info(f"🔍 LOG CRITIQUE: Event {self.event_id}")
+
         # 🎯 CORRECTION MAJEURE : Détecter si c'est une nouvelle inscription ou une mise à jour
         is_new = self.pk is None
-        old_status = None
-        old_ticket_type_id = None
-        
+        old_values = {}
+
         # Vérifier si on doit mettre à jour les compteurs
         update_counters = kwargs.pop('update_counters', True)
-        
+        # Approbation manuelle par l'organisateur : la capacité peut être dépassée
+        allow_overbooking = kwargs.pop('allow_overbooking', False)
+
         if not is_new:
-            try:
-                old_instance = EventRegistration.objects.get(pk=self.pk)
-                old_status = old_instance.status
-                old_ticket_type_id = old_instance.ticket_type_id
-            except EventRegistration.DoesNotExist:
-                is_new = True
-        
-        if self.status == 'confirmed' and not self.confirmed_at:
-            self.confirmed_at = timezone.now()
-        elif self.status == 'cancelled' and not self.cancelled_at:
-            self.cancelled_at = timezone.now()
+            # 🎯 PERF : Anciennes valeurs mémorisées au chargement (from_db), sans SELECT
+            old_values = self.get_loaded_values()
+            if old_values is None:
+                # Instance construite à la main ou champs différés : relire l'ancienne ligne
+                old_values = EventRegistration.objects.filter(pk=self.pk).values(*self.tracked_fields).first()
+                if old_values is None:
+                    is_new = True
+                    old_values = {}
+
+        old_status = old_values.get('status')
+        old_ticket_type_id = old_values.get('ticket_type_id')
+        status_changed = is_new or old_status != self.status
+        seat_change = update_counters and (status_changed or old_ticket_type_id != self.ticket_type_id)
+
+        old_stats_delta = {}
+        if not is_new:
+            old_stats_delta = EventStats.registration_delta(
+                old_status, old_values['payment_status'], old_values['price_paid'], sign=-1
+            )
 
-        # Ensure a token exists
-        if not self.qr_token:
-            self.qr_token = uuid.uuid4().hex
+        old_ticket_type = None
+        if seat_change:
+            # Charger l'événement et les billets avant la transaction : l'UPDATE de
+            # réservation doit être la première requête de la transaction
+            self.event
+            if self.ticket_type_id is not None and old_ticket_type_id == self.ticket_type_id:
+                old_ticket_type = self.ticket_type
+            else:
+                self.ticket_type  # met la relation en cache
+                if old_ticket_type_id is not None:
+                    old_ticket_type = TicketType.objects.filter(pk=old_ticket_type_id).first()
 
-        # Générer le code d'accès virtuel si c'est un événement virtuel
-        if self.event.is_virtual and not self.virtual_access_code:
-            self.virtual_access_code = self._generate_virtual_access_code()
+        stats_delta = EventStats.merge_deltas(
+            old_stats_delta,
+            EventStats.registration_delta(self.status, self.payment_status, self.price_paid)
+        )
+        needs_transaction = seat_change or any(stats_delta.values())
+
+        # Une simple modification (notes, besoins spécifiques...) n'écrit qu'une ligne
+        with transaction.atomic() if needs_transaction else contextlib.nullcontext():
+            # 🎯 Réserver/libérer la place AVANT d'écrire l'inscription : le statut final
+            # (confirmé ou liste d'attente) est connu au moment de l'INSERT/UPDATE, et
+            # un échec de l'écriture annule aussi la réservation.
+            if seat_change:
+                status_before = self.status
+                self._update_ticket_counters(is_new, old_status, old_ticket_type, allow_overbooking)
+                if self.status != status_before:
+                    update_fields = kwargs.get('update_fields')
+                    if update_fields is not None and 'status' not in update_fields:
+                        kwargs['update_fields'] = list(update_fields) + ['status']
+                    stats_delta = EventStats.merge_deltas(
+                        old_stats_delta,
+                        EventStats.registration_delta(self.status, self.payment_status, self.price_paid)
+                    )
+
+            if self.status == 'confirmed' and not self.confirmed_at:
+                self.confirmed_at = timezone.now()
+            elif self.status == 'cancelled' and not self.cancelled_at:
+                self.cancelled_at = timezone.now()
+
+            # Ensure a token exists
+            if not self.qr_token:
+                self.qr_token = uuid.uuid4().hex
+
+            # 🎯 Billet révoqué (annulation, remboursement...) : les QR signés déjà émis
+            # portent l'ancienne version et sont refusés à l'entrée
+            revoke_qr = not is_new and old_status in self.SEAT_HOLDING_STATUSES and self.status not in self.SEAT_HOLDING_STATUSES
+            if revoke_qr:
+                self.qr_version += 1
+                self.qr_code = None
+                update_fields = kwargs.get('update_fields')
+                if update_fields is not None:
+                    kwargs['update_fields'] = list(update_fields) + ['qr_version', 'qr_code']
+
+            # Générer le code d'accès virtuel si c'est un événement virtuel
+            if status_changed and not self.virtual_access_code and self.event.is_virtual:
+                self.virtual_access_code = self._generate_virtual_access_code()
+
+            super().save(*args, **kwargs)
+
+            # 🎯 PERF : Statistiques dénormalisées (UPDATE atomique avec F())
+            EventStats.apply_delta(self.event_id, **stats_delta)
+
+            if status_changed:
+                # Postes de contrôle : billet révoqué, confirmé ou sorti de la liste d'attente
+                version, status = self.qr_version, self.status
+                transaction.on_commit(lambda: qr.publish_state(self.pk, version, status))
+
+        # 🎯 PERF : Le QR code n'est plus rendu ici ; il est généré au premier accès
+        # (action qr, email, outbox) ou pré-généré en lot (voir events/qr.py)
 
-        super().save(*args, **kwargs)
-        
-        # 🎯 CORRECTION MAJEURE : Mettre à jour les compteurs après sauvegarde
-        # Seulement si c'est nécessaire (nouvelle inscription ou changement de statut) ET si update_counters est True
-        if update_counters and (is_new or (old_status != self.status)):
-            self._update_ticket_counters(is_new, old_status, old_ticket_type_id)
-
-        # Generate QR after we have an ID and token (seulement pour événements physiques)
-        if (self.event.is_physical and 
-            self.status in ['confirmed', 'attended'] and 
-            qrcode is not None and 
-            not self.qr_code):
-            self._generate_and_store_qr()
-            
         # 🔍 LOG CRITIQUE: Après sauvegarde
         logger.info(f"🔍 LOG CRITIQUE: EventRegistration.save() terminé - Aucun appel à configure_stream ou start_stream effectué")
 
-    def _update_ticket_counters(self, is_new, old_status, old_ticket_type_id):
-        """Met à jour les compteurs de billets selon le statut et le type de billet"""
-        print(f"🔍 DEBUG: ===== _update_ticket_counters DÉBUT =====")
-        print(f"🔍 DEBUG: _update_ticket_counters - is_new: {is_new}, old_status: {old_status}, current_status: {self.status}")
-        print(f"🔍 DEBUG: _update_ticket_counters - ticket_type: {self.ticket_type}")
-        print(f"🔍 DEBUG: _update_ticket_counters - ticket_type_id: {self.ticket_type_id if hasattr(self, 'ticket_type_id') else 'N/A'}")
-        print(f"🔍 DEBUG: _update_ticket_counters - event_id: {self.event_id}")
-        
-        if self.ticket_type:
-            print(f"🔍 DEBUG: _update_ticket_counters - ticket_type.name: {self.ticket_type.name}")
-            print(f"🔍 DEBUG: _update_ticket_counters - ticket_type.quantity: {self.ticket_type.quantity}")
-            print(f"🔍 DEBUG: _update_ticket_counters - ticket_type.sold_count: {self.ticket_type.sold_count}")
-            print(f"🔍 DEBUG: _update_ticket_counters - ticket_type.is_available: {self.ticket_type.is_available}")
-        else:
-            print(f"🔍 DEBUG: _update_ticket_counters - Pas de ticket_type (billet par défaut)")
-            print(f"🔍 DEBUG: _update_ticket_counters - event.max_capacity: {self.event.max_capacity}")
-            print(f"🔍 DEBUG: _update_ticket_counters - event.current_registrations: {self.event.current_registrations}")
-        
-        # 🎯 CORRECTION MAJEURE : Gérer la liste d'attente pour les billets par défaut
-        if self.status == 'confirmed' and not self.ticket_type:
-            # Vérifier si l'événement a encore de la place
-            if (self.event.place_type == 'limited' and 
-                self.event.max_capacity is not None and 
-                self.event.current_registrations >= self.event.max_capacity):
-                
-                # Événement complet - mettre en liste d'attente si activée
-                if self.event.enable_waitlist:
-                    print(f"🔍 DEBUG: Événement complet - Mise en liste d'attente")
-                    self.status = 'waitlisted'
-                    # Sauvegarder le changement de statut
-                    self.save(update_fields=['status'])
-                    # Ne pas incrémenter les compteurs
-                    return
-                else:
-                    print(f"🔍 DEBUG: Événement complet - Pas de liste d'attente")
-                    # L'événement est complet et pas de liste d'attente
-                    # Ne pas incrémenter les compteurs
-                    return
-        
-        # Si c'est une nouvelle inscription confirmée
-        if is_new and self.status == 'confirmed':
-            print(f"🔍 DEBUG: ===== NOUVELLE INSCRIPTION CONFIRMÉE =====")
-            print(f"🔍 DEBUG: Registration ID: {self.id}")
-            print(f"🔍 DEBUG: Event: {self.event.title}")
-            print(f"🔍 DEBUG: User: {self.user if self.user else 'Guest'}")
-            print(f"🔍 DEBUG: Guest: {self.guest_full_name if self.guest_full_name else 'N/A'}")
-            
-            # Incrémenter les compteurs pour les nouvelles inscriptions confirmées
-            if self.ticket_type and self.ticket_type.quantity is not None:
-                print(f"🔍 DEBUG: ===== INCREMENTATION BILLET PERSONNALISE (NOUVELLE INSCRIPTION) =====")
-                print(f"🔍 DEBUG: BILLET PERSONNALISÉ - {self.ticket_type.name}")
-                print(f"🔍 DEBUG: AVANT INCREMENTATION - sold_count: {self.ticket_type.sold_count}")
-                
-                # Billet personnalisé - incrémenter le compteur
-                self.ticket_type.sold_count += 1
-                self.ticket_type.save(update_fields=['sold_count'])
-                
-                print(f"🔍 DEBUG: APRÈS INCREMENTATION - sold_count: {self.ticket_type.sold_count}")
-                print(f"🔍 DEBUG: ===== FIN INCREMENTATION BILLET PERSONNALISE (NOUVELLE INSCRIPTION) =====")
-            else:
-                print(f"🔍 DEBUG: ===== INCREMENTATION BILLET PAR DÉFAUT (NOUVELLE INSCRIPTION) =====")
-                print(f"🔍 DEBUG: Avant - current_registrations: {self.event.current_registrations}")
-                # Billet par défaut - incrémenter le compteur global
-                self.event.current_registrations += 1
-                self.event.save(update_fields=['current_registrations'])
-                print(f"🔍 DEBUG: Après - current_registrations: {self.event.current_registrations}")
-                print(f"🔍 DEBUG: ===== FIN INCREMENTATION BILLET PAR DÉFAUT (NOUVELLE INSCRIPTION) =====")
-            
-            print(f"🔍 DEBUG: ===== FIN NOUVELLE INSCRIPTION CONFIRMÉE =====")
-        
-        # 🎯 NOUVELLE LOGIQUE : Si c'est une nouvelle inscription en attente, ne pas compter encore
-        elif is_new and self.status == 'pending':
-            print(f"🔍 DEBUG: NOUVELLE INSCRIPTION EN ATTENTE - Pas de mise à jour des compteurs")
-            if self.ticket_type:
-                print(f"🔍 DEBUG: Billet personnalisé en attente - {self.ticket_type.name}")
-            else:
-                print(f"🔍 DEBUG: Billet par défaut en attente")
-        
-        # Si le statut change de non-confirmé à confirmé
-        elif not is_new and old_status != 'confirmed' and self.status == 'confirmed':
-            print(f"🔍 DEBUG: ===== STATUT CHANGÉ VERS CONFIRMÉ =====")
-            print(f"🔍 DEBUG: Registration ID: {self.id}")
-            print(f"🔍 DEBUG: Old Status: {old_status} -> New Status: {self.status}")
-            
-            if self.ticket_type and self.ticket_type.quantity is not None:
-                print(f"🔍 DEBUG: ===== INCREMENTATION BILLET PERSONNALISE (CHANGEMENT STATUT) =====")
-                print(f"🔍 DEBUG: BILLET PERSONNALISÉ - {self.ticket_type.name}")
-                print(f"🔍 DEBUG: AVANT INCREMENTATION - sold_count: {self.ticket_type.sold_count}")
-                print(f"🔍 DEBUG: Ticket Type ID: {self.ticket_type.id}")
-                
-                # Billet personnalisé - incrémenter le compteur
-                self.ticket_type.sold_count += 1
-                self.ticket_type.save(update_fields=['sold_count'])
-                
-                print(f"🔍 DEBUG: APRÈS INCREMENTATION - sold_count: {self.ticket_type.sold_count}")
-                print(f"🔍 DEBUG: ===== FIN INCREMENTATION BILLET PERSONNALISE (CHANGEMENT STATUT) =====")
-                print(f"🔍 DEBUG: Statut changé vers confirmé - {self.ticket_type.name}: {self.ticket_type.sold_count}/{self.ticket_type.quantity}")
-            else:
-                print(f"🔍 DEBUG: BILLET PAR DÉFAUT")
-                print(f"🔍 DEBUG: Avant - current_registrations: {self.event.current_registrations}")
-                # Billet par défaut - incrémenter le compteur global
-                self.event.current_registrations += 1
-                self.event.save(update_fields=['current_registrations'])
-                print(f"🔍 DEBUG: Après - current_registrations: {self.event.current_registrations}")
-                print(f"🔍 DEBUG: Statut changé vers confirmé (par défaut) - {self.event.current_registrations}/{self.event.max_capacity}")
-        
-        # Si le statut change de confirmé à non-confirmé (annulation)
-        # MAIS PAS si c'est juste un changement vers 'attended' (confirmation de présence)
-        elif not is_new and old_status == 'confirmed' and self.status not in ['confirmed', 'attended']:
-            print(f"🔍 DEBUG: INSCRIPTION ANNULÉE")
-            if old_ticket_type_id:
-                try:
-                    old_ticket_type = TicketType.objects.get(id=old_ticket_type_id)
-                    print(f"🔍 DEBUG: BILLET PERSONNALISÉ ANCIEN - {old_ticket_type.name}")
-                    print(f"🔍 DEBUG: Avant - sold_count: {old_ticket_type.sold_count}")
-                    old_ticket_type.sold_count = max(0, old_ticket_type.sold_count - 1)
-                    old_ticket_type.save(update_fields=['sold_count'])
-                    print(f"🔍 DEBUG: Après - sold_count: {old_ticket_type.sold_count}")
-                    print(f"🔍 DEBUG: Inscription annulée - {old_ticket_type.name}: {old_ticket_type.sold_count}/{old_ticket_type.quantity}")
-                except TicketType.DoesNotExist:
-                    print(f"🔍 DEBUG: Ancien type de billet non trouvé: {old_ticket_type_id}")
-                    pass
-            else:
-                print(f"🔍 DEBUG: BILLET PAR DÉFAUT ANCIEN")
-                print(f"🔍 DEBUG: Avant - current_registrations: {self.event.current_registrations}")
-                # Billet par défaut - décrémenter le compteur global
-                self.event.current_registrations = max(0, self.event.current_registrations - 1)
-                self.event.save(update_fields=['current_registrations'])
-                print(f"🔍 DEBUG: Après - current_registrations: {self.event.current_registrations}")
-                print(f"🔍 DEBUG: Inscription par défaut annulée - {self.event.current_registrations}/{self.event.max_capacity}")
-        else:
-            print(f"🔍 DEBUG: AUCUNE MISE À JOUR NÉCESSAIRE")
-            print(f"🔍 DEBUG: is_new: {is_new}, old_status: {old_status}, current_status: {self.status}")
-        
-        print(f"🔍 DEBUG: ===== _update_ticket_counters FIN =====")
+    def delete(self, *args, **kwargs):
+        event_id = self.event_id
+        stats_delta = EventStats.registration_delta(self.status, self.payment_status, self.price_paid, sign=-1)
+        holds_seat = self.status in self.SEAT_HOLDING_STATUSES
+        ticket_type = self.ticket_type
+        registration_id = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if holds_seat:
+                SeatReservation.release(event_id, ticket_type)
+            EventStats.apply_delta(event_id, **stats_delta)
+            transaction.on_commit(lambda: qr.forget_states([registration_id]))
+        return result
+
+    def _update_ticket_counters(self, is_new, old_status, old_ticket_type, allow_overbooking=False):
+        """
+        Réserve ou libère la place de l'inscription selon la transition de statut.
+        Une inscription occupe une place tant qu'elle est confirmée ou présente ;
+        si le contingent est épuisé, elle bascule en liste d'attente.
+        """
+        held_before = not is_new and old_status in self.SEAT_HOLDING_STATUSES
+        holds_now = self.status in self.SEAT_HOLDING_STATUSES
+
+        if held_before and holds_now and getattr(old_ticket_type, 'pk', None) == self.ticket_type_id:
+            return
+
+        if held_before:
+            print(f"🔍 DEBUG: Libération de la place - {old_status} -> {self.status}")
+            SeatReservation.release(self.event_id, old_ticket_type)
+
+        if not holds_now:
+            return
+
+        if SeatReservation.reserve(self.event_id, self.ticket_type, allow_overbooking=allow_overbooking):
+            print(f"🔍 DEBUG: Place réservée - inscription {self.pk or 'NEW'} ({self.status})")
+            return
+
+        # Contingent épuisé : liste d'attente, sauf nouvelle inscription à un billet
+        # par défaut sans liste d'attente (refusée, comme à la validation)
+        if not is_new or SeatReservation.uses_ticket_pool(self.ticket_type) or self.event.enable_waitlist:
+            print(f"🔍 DEBUG: Contingent épuisé - Mise en liste d'attente")
+            self.status = 'waitlisted'
+            return
+
+        print(f"🔍 DEBUG: Événement complet - Pas de liste d'attente")
+        raise SeatUnavailable("L'événement est complet.")
 
     def _generate_virtual_access_code(self):
         """Génère un code d'accès unique pour les événements virtuels"""
@@ -914,24 +1182,8 @@ class EventRegistration(models.Model):
         return str(uuid.uuid4().hex[:8]).upper()
 
     def _generate_and_store_qr(self):
-        """Generate and store a QR code image for the registration."""
-        qr_payload = {
-            'event_id': self.event_id,
-            'registration_id': self.id,
-            'user_id': self.user_id,
-            'token': self.qr_token,
-        }
-        data = f"EMSv1|{qr_payload['event_id']}|{qr_payload['registration_id']}|{qr_payload['user_id']}|{qr_payload['token']}"
-
-        qr_img = qrcode.make(data)
-        buffer = io.BytesIO()
-        qr_img.save(buffer, format='PNG')
-        buffer.seek(0)
-
-        from django.core.files.base import ContentFile
-        filename = f"qr_{self.qr_token}.png"
-        self.qr_code.save(filename, ContentFile(buffer.read()), save=False)
-        super().save(update_fields=['qr_code'])
+        """Générer (si besoin) et stocker l'image du QR code de l'inscription"""
+        return qr.ensure_file(self)
 
 
 class VirtualEventInteraction(models.Model):
@@ -968,6 +1220,345 @@ class VirtualEventInteraction(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.interaction_type} - {self.event.title}"
 
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        old_values = None
+        if not is_new:
+            old_values = VirtualEventInteraction.objects.filter(pk=self.pk).values(
+                'event_id', 'interaction_type', 'rating'
+            ).first()
+
+        super().save(*args, **kwargs)
+
+        # 🎯 Maintenir EventStats de façon incrémentale
+        if old_values is None:
+            EventStats.apply_delta(self.event_id, **EventStats.interaction_delta(self.interaction_type, self.rating))
+        elif (old_values['event_id'], old_values['interaction_type'], old_values['rating']) != (self.event_id, self.interaction_type, self.rating):
+            EventStats.apply_delta(
+                old_values['event_id'],
+                **EventStats.interaction_delta(old_values['interaction_type'], old_values['rating'], sign=-1)
+            )
+            EventStats.apply_delta(self.event_id, **EventStats.interaction_delta(self.interaction_type, self.rating))
+
+    def delete(self, *args, **kwargs):
+        event_id, interaction_type, rating = self.event_id, self.interaction_type, self.rating
+        result = super().delete(*args, **kwargs)
+        EventStats.apply_delta(event_id, **EventStats.interaction_delta(interaction_type, rating, sign=-1))
+        return result
+
+
+class EventStats(models.Model):
+    """
+    Statistiques dénormalisées d'un événement (une ligne par événement).
+
+    La ligne est créée avec l'événement (Event.save, migration 0036 pour les
+    événements existants). Les compteurs sont mis à jour de façon atomique
+    avec des expressions F() depuis EventRegistration.save() et les
+    interactions. Les mises à jour en masse (QuerySet.update, suppressions en
+    cascade) ne passent pas par ces méthodes : la commande
+    `reconcile_event_stats` reconstruit la table.
+    """
+    REGISTRATION_STATUS_FIELDS = {
+        'pending': 'pending_count',
+        'confirmed': 'confirmed_count',
+        'cancelled': 'cancelled_count',
+        'attended': 'attended_count',
+        'no_show': 'no_show_count',
+        'waitlisted': 'waitlisted_count',
+    }
+    INTERACTION_TYPE_FIELDS = {
+        'like': 'like_count',
+        'comment': 'comment_count',
+        'share': 'share_count',
+        'rating': 'rating_count',
+    }
+
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name="Événement")
+
+    # Inscriptions par statut
+    pending_count = models.IntegerField(default=0, verbose_name="Inscriptions en attente")
+    confirmed_count = models.IntegerField(default=0, verbose_name="Inscriptions confirmées")
+    cancelled_count = models.IntegerField(default=0, verbose_name="Inscriptions annulées")
+    attended_count = models.IntegerField(default=0, verbose_name="Participants présents")
+    no_show_count = models.IntegerField(default=0, verbose_name="Participants absents")
+    waitlisted_count = models.IntegerField(default=0, verbose_name="Inscriptions en liste d'attente")
+
+    # Interactions par type
+    like_count = models.IntegerField(default=0, verbose_name="J'aime")
+    comment_count = models.IntegerField(default=0, verbose_name="Commentaires")
+    share_count = models.IntegerField(default=0, verbose_name="Partages")
+    rating_count = models.IntegerField(default=0, verbose_name="Évaluations")
+    rating_sum = models.IntegerField(default=0, verbose_name="Somme des notes")
+
+    # Revenus
+    paid_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Revenus payés")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Statistiques d'événement"
+        verbose_name_plural = "Statistiques d'événements"
+
+    def __str__(self):
+        return f"Statistiques - {self.event_id}"
+
+    @property
+    def registration_count(self):
+        """Inscriptions confirmées ou présentes"""
+        return self.confirmed_count + self.attended_count
+
+    @property
+    def total_registrations(self):
+        return sum(getattr(self, field) for field in self.REGISTRATION_STATUS_FIELDS.values())
+
+    @property
+    def total_interactions(self):
+        return sum(getattr(self, field) for field in self.INTERACTION_TYPE_FIELDS.values())
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return 0
+        return self.rating_sum / self.rating_count
+
+    @classmethod
+    def total_registrations_expression(cls, prefix='stats__'):
+        """Total des inscriptions (tous statuts) lu dans EventStats, pour annoter des événements"""
+        fields = [models.F(prefix + field) for field in cls.REGISTRATION_STATUS_FIELDS.values()]
+        total = fields[0]
+        for field in fields[1:]:
+            total = total + field
+        return Coalesce(total, 0)
+
+    def as_interaction_dict(self):
+        """Même format que EventListSerializer.get_interaction_count"""
+        return {
+            'likes': self.like_count,
+            'comments': self.comment_count,
+            'shares': self.share_count,
+            'ratings': self.rating_count,
+            'total': self.total_interactions,
+            'average_rating': round(self.average_rating, 1)
+        }
+
+    @classmethod
+    def registration_delta(cls, status, payment_status, price_paid, sign=1):
+        """Contribution d'une inscription aux compteurs (sign=-1 pour la retirer)"""
+        delta = {}
+        field = cls.REGISTRATION_STATUS_FIELDS.get(status)
+        if field:
+            delta[field] = sign
+        if payment_status == 'paid' and price_paid:
+            delta['paid_revenue'] = Decimal(price_paid) * sign
+        return delta
+
+    @classmethod
+    def interaction_delta(cls, interaction_type, rating, sign=1):
+        """Contribution d'une interaction aux compteurs (sign=-1 pour la retirer)"""
+        delta = {}
+        field = cls.INTERACTION_TYPE_FIELDS.get(interaction_type)
+        if interaction_type == 'rating':
+            # Seules les évaluations notées comptent : rating_count est le diviseur de la moyenne
+            if rating is not None:
+                delta[field] = sign
+                delta['rating_sum'] = rating * sign
+        elif field:
+            delta[field] = sign
+        return delta
+
+    @classmethod
+    def merge_deltas(cls, *deltas):
+        merged = {}
+        for delta in deltas:
+            for field, value in delta.items():
+                merged[field] = merged.get(field, 0) + value
+        return {field: value for field, value in merged.items() if value}
+
+    @classmethod
+    def apply_delta(cls, event_id, **delta):
+        """
+        Appliquer un delta en un seul UPDATE atomique (col = col + delta).
+        Si la ligne manque (événement créé sans Event.save), elle est insérée
+        vide sans écraser une insertion concurrente, puis mise à jour :
+        reconcile_event_stats complète ses compteurs.
+        """
+        delta = {field: value for field, value in delta.items() if value}
+        if not delta or event_id is None:
+            return
+        changes = {field: models.F(field) + value for field, value in delta.items()}
+        updated = cls.objects.filter(event_id=event_id).update(updated_at=timezone.now(), **changes)
+        if not updated:
+            cls.objects.bulk_create([cls(event_id=event_id)], ignore_conflicts=True)
+            cls.objects.filter(event_id=event_id).update(updated_at=timezone.now(), **changes)
+
+    @classmethod
+    def ensure(cls, event_ids):
+        """
+        Construire depuis la base les lignes manquantes, sans supprimer ni
+        écraser les lignes existantes (lectures des tableaux de bord)
+        """
+        event_ids = set(event_ids)
+        missing = event_ids - set(cls.objects.filter(event_id__in=event_ids).values_list('event_id', flat=True))
+        if missing:
+            cls.objects.bulk_create(cls._build_rows(missing).values(), ignore_conflicts=True)
+
+    @classmethod
+    def rebuild(cls, event_ids=None, chunk_size=1000):
+        """
+        Reconstruire les statistiques en masse avec des GROUP BY, par lots d'événements.
+        Retourne le nombre de lignes écrites.
+        """
+        if event_ids is None:
+            event_ids = Event.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+
+        written = 0
+        chunk = []
+        for event_id in event_ids:
+            chunk.append(event_id)
+            if len(chunk) >= chunk_size:
+                written += cls._rebuild_chunk(chunk)
+                chunk = []
+        if chunk:
+            written += cls._rebuild_chunk(chunk)
+        return written
+
+    @classmethod
+    def _rebuild_chunk(cls, event_ids):
+        rows = cls._build_rows(event_ids)
+        with transaction.atomic():
+            cls.objects.filter(event_id__in=list(rows)).delete()
+            cls.objects.bulk_create(rows.values())
+        return len(rows)
+
+    @classmethod
+    def _build_rows(cls, event_ids):
+        """Lignes (non enregistrées) calculées par GROUP BY : {event_id: EventStats}"""
+        event_ids = list(Event.objects.filter(pk__in=event_ids).values_list('pk', flat=True))
+        rows = {event_id: cls(event_id=event_id) for event_id in event_ids}
+
+        registration_counts = (
+            EventRegistration.objects.filter(event_id__in=event_ids)
+            .order_by().values('event_id', 'status').annotate(count=models.Count('pk'))
+        )
+        for row in registration_counts:
+            field = cls.REGISTRATION_STATUS_FIELDS.get(row['status'])
+            if field:
+                setattr(rows[row['event_id']], field, row['count'])
+
+        revenues = (
+            EventRegistration.objects.filter(event_id__in=event_ids, payment_status='paid')
+            .order_by().values('event_id').annotate(total=models.Sum('price_paid'))
+        )
+        for row in revenues:
+            rows[row['event_id']].paid_revenue = row['total'] or 0
+
+        interaction_counts = (
+            VirtualEventInteraction.objects.filter(event_id__in=event_ids)
+            .order_by().values('event_id', 'interaction_type')
+            .annotate(count=models.Count('pk'), rated=models.Count('rating'), rating_total=models.Sum('rating'))
+        )
+        for row in interaction_counts:
+            field = cls.INTERACTION_TYPE_FIELDS.get(row['interaction_type'])
+            if row['interaction_type'] == 'rating':
+                # Count('rating') ignore les évaluations sans note, comme interaction_delta
+                rows[row['event_id']].rating_count = row['rated']
+                rows[row['event_id']].rating_sum = row['rating_total'] or 0
+            elif field:
+                setattr(rows[row['event_id']], field, row['count'])
+        return rows
+
+
+class DailyRollup(models.Model):
+    """
+    Agrégats quotidiens (jour local) pour les tableaux de bord, reconstruits
+    par events.rollups pour les seuls jours modifiés.
+
+    Les inscriptions sont comptées au jour de `registered_at` avec leur statut
+    actuel, les remboursements traités au jour de `processed_at`.
+    """
+    day = models.DateField(verbose_name="Jour")
+
+    # Inscriptions par statut (mêmes noms que EventStats)
+    pending_count = models.IntegerField(default=0, verbose_name="Inscriptions en attente")
+    confirmed_count = models.IntegerField(default=0, verbose_name="Inscriptions confirmées")
+    cancelled_count = models.IntegerField(default=0, verbose_name="Inscriptions annulées")
+    attended_count = models.IntegerField(default=0, verbose_name="Participants présents")
+    no_show_count = models.IntegerField(default=0, verbose_name="Participants absents")
+    waitlisted_count = models.IntegerField(default=0, verbose_name="Inscriptions en liste d'attente")
+
+    # Revenus (inscriptions payées) et remboursements traités
+    paid_count = models.IntegerField(default=0, verbose_name="Inscriptions payées")
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Revenus payés")
+    refunds_processed = models.IntegerField(default=0, verbose_name="Remboursements traités")
+    refund_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Montant remboursé")
+    refunded_paid_revenue = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Revenus payés remboursés"
+    )
+
+    new_events = models.IntegerField(default=0, verbose_name="Événements créés")
+    built_at = models.DateTimeField(verbose_name="Calculé le")
+
+    SUM_FIELDS = (
+        'pending_count', 'confirmed_count', 'cancelled_count', 'attended_count', 'no_show_count',
+        'waitlisted_count', 'paid_count', 'paid_revenue', 'refunds_processed', 'refund_amount',
+        'refunded_paid_revenue', 'new_events',
+    )
+
+    class Meta:
+        abstract = True
+
+    @property
+    def total_registrations(self):
+        return sum(getattr(self, field) for field in EventStats.REGISTRATION_STATUS_FIELDS.values())
+
+
+class EventDailyRollup(DailyRollup):
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='daily_rollups', verbose_name="Événement")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'day'], name='unique_event_daily_rollup'),
+        ]
+        indexes = [models.Index(fields=['day'])]
+        verbose_name = "Agrégat quotidien d'événement"
+        verbose_name_plural = "Agrégats quotidiens d'événements"
+
+
+class OrganizerDailyRollup(DailyRollup):
+    organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups', verbose_name="Organisateur")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['organizer', 'day'], name='unique_organizer_daily_rollup'),
+        ]
+        indexes = [models.Index(fields=['day'])]
+        verbose_name = "Agrégat quotidien d'organisateur"
+        verbose_name_plural = "Agrégats quotidiens d'organisateurs"
+
+
+class CategoryDailyRollup(DailyRollup):
+    # NULL : événements sans catégorie
+    category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_rollups', verbose_name="Catégorie"
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'category'])]
+        verbose_name = "Agrégat quotidien de catégorie"
+        verbose_name_plural = "Agrégats quotidiens de catégories"
+
+
+class PlatformDailyRollup(DailyRollup):
+    day = models.DateField(unique=True, verbose_name="Jour")
+    new_users = models.IntegerField(default=0, verbose_name="Nouveaux utilisateurs")
+
+    SUM_FIELDS = DailyRollup.SUM_FIELDS + ('new_users',)
+
+    class Meta:
+        ordering = ['day']
+        verbose_name = "Agrégat quotidien de la plateforme"
+        verbose_name_plural = "Agrégats quotidiens de la plateforme"
+
 
 class EventHistory(models.Model):
     """Modèle pour l'historique des changements d'événements"""
@@ -1137,6 +1728,358 @@ class NotificationLog(models.Model):
         return f"{self.event_id} - {self.type} - {self.created_at:%Y-%m-%d %H:%M}"
 
 
+class OutboxMessage(models.Model):
+    """
+    Outbox transactionnelle : effets de bord d'une inscription (email, SMS, QR)
+    écrits dans la même transaction que l'inscription, puis livrés par Celery.
+    """
+    KIND_CHOICES = [
+        ('registration_email', 'Email d\'inscription'),
+        ('registration_sms', 'SMS d\'inscription'),
+        ('registration_qr', 'Génération du QR code'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('processing', 'En cours'),
+        ('sent', 'Envoyé'),
+        ('skipped', 'Ignoré'),
+        ('failed', 'Échec définitif'),
+    ]
+    MAX_ATTEMPTS = 5
+
+    registration = models.ForeignKey(EventRegistration, on_delete=models.CASCADE, related_name='outbox_messages')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    # Clé de déduplication : un même effet n'est jamais mis en file deux fois
+    dedup_key = models.CharField(max_length=100, unique=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+        ordering = ['created_at']
+        verbose_name = 'Message outbox'
+        verbose_name_plural = 'Messages outbox'
+
+    def __str__(self) -> str:
+        return f"{self.kind} - inscription {self.registration_id} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, registration, kind, payload=None):
+        """
+        Écrire un message dans la transaction courante ; la tâche Celery n'est
+        publiée qu'après le COMMIT. Retourne None si le message existe déjà.
+        """
+        from .tasks import publish_outbox_message
+
+        message, created = cls.objects.get_or_create(
+            dedup_key=f"{kind}:{registration.pk}:{registration.status}",
+            defaults={'registration': registration, 'kind': kind, 'payload': payload or {}},
+        )
+        if not created:
+            return None
+        transaction.on_commit(lambda: publish_outbox_message(message.pk))
+        return message
+
+    def retry_delay(self):
+        """Délai exponentiel avant la prochaine tentative (1, 2, 4, 8... minutes)"""
+        return 60 * (2 ** max(0, self.attempts - 1))
+
+
+def export_storage():
+    """Stockage privé des exports (settings.EXPORTS_ROOT), hors de MEDIA_ROOT"""
+    return FileSystemStorage(location=settings.EXPORTS_ROOT)
+
+
+class ExportJob(models.Model):
+    """
+    Export des inscriptions d'un événement généré par Celery (voir
+    events.exports) : le worker web ne fait que créer le job, le fichier est
+    écrit dans un stockage privé sous un nom aléatoire et téléchargé une
+    fois prêt, uniquement par export_job_download.
+    """
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('completed', 'Terminé'),
+        ('failed', 'Échec'),
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='export_jobs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='xlsx')
+    # Filtres de events.exports.registrations (status, ticket_type, date_from, date_to)
+    filters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', storage=export_storage, blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        ordering = ['-created_at']
+        verbose_name = 'Export'
+        verbose_name_plural = 'Exports'
+
+    def __str__(self) -> str:
+        return f"Export {self.format} - événement {self.event_id} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, event, user, filters=None, format='xlsx'):
+        """Créer le job ; la tâche Celery n'est publiée qu'après le COMMIT"""
+        from .tasks import publish_export_job
+
+        job = cls.objects.create(event=event, requested_by=user, format=format, filters=filters or {})
+        transaction.on_commit(lambda: publish_export_job(job.pk))
+        return job
+
+    @property
+    def progress(self):
+        """Avancement en pourcentage"""
+        if self.status == 'completed':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(100 * self.processed_rows / self.total_rows))
+
+
+class TrainingJob(models.Model):
+    """
+    Entraînement d'un modèle de machine learning exécuté par Celery (voir
+    events.training) : la requête HTTP ne fait que créer le job, le worker
+    Celery extrait les données, entraîne et publie le modèle dans le registre.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('completed', 'Terminé'),
+        ('failed', 'Échec'),
+    ]
+    STAGE_CHOICES = [
+        ('', ''),
+        ('extraction', 'Extraction des données'),
+        ('training', 'Entraînement'),
+        ('saving', 'Sauvegarde'),
+    ]
+    MODE_CHOICES = [
+        ('', ''),
+        ('full', 'Complet'),
+        ('warm_start', 'Incrémental'),
+    ]
+
+    model_name = models.CharField(max_length=100, default='fill_rate_predictor')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='training_jobs')
+    force_retrain = models.BooleanField(default=False)
+    # Réentraînement hebdomadaire (beat) : toujours exécuté, sans test d'âge du modèle
+    scheduled = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, default='', blank=True)
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='', blank=True)
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    total_trees = models.PositiveIntegerField(default=0)
+    built_trees = models.PositiveIntegerField(default=0)
+    # Retour de train_fill_rate_predictor (statut, métriques, version du modèle)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        ordering = ['-created_at']
+        verbose_name = 'Entraînement'
+        verbose_name_plural = 'Entraînements'
+
+    def __str__(self) -> str:
+        return f"Entraînement {self.model_name} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, model_name='fill_rate_predictor', user=None, force_retrain=False, scheduled=False, backoff=None):
+        """
+        Créer le job, ou retourner celui déjà en attente / en cours pour ce
+        modèle ; la tâche Celery n'est publiée qu'après le COMMIT. Avec
+        `backoff` (timedelta), retourner aussi le dernier job terminé dans ce
+        délai plutôt que d'en créer un nouveau.
+        """
+        from .tasks import publish_training_job
+
+        cls.fail_stale()
+        active = cls.objects.filter(model_name=model_name, status__in=['pending', 'running']).first()
+        if active is not None:
+            return active
+        if backoff is not None:
+            recent = cls.objects.filter(model_name=model_name, finished_at__gte=timezone.now() - backoff).first()
+            if recent is not None:
+                return recent
+        job = cls.objects.create(
+            model_name=model_name, requested_by=user, force_retrain=force_retrain, scheduled=scheduled
+        )
+        transaction.on_commit(lambda: publish_training_job(job.pk))
+        return job
+
+    @classmethod
+    def fail_stale(cls):
+        """
+        Passer en échec les jobs restés en cours au-delà de la limite de temps
+        des tâches Celery (worker tué) : un nouvel entraînement peut être
+        demandé. Retourne le nombre de jobs passés en échec.
+        """
+        now = timezone.now()
+        stale = cls.objects.filter(
+            status='running', started_at__lt=now - timezone.timedelta(seconds=settings.CELERY_TASK_TIME_LIMIT)
+        ).update(status='failed', error='Entraînement interrompu (worker arrêté)', finished_at=now)
+        return stale
+
+    @property
+    def progress(self):
+        """Avancement en pourcentage : extraction 0-40, entraînement 40-95"""
+        if self.status == 'completed':
+            return 100
+        progress = 0
+        if self.total_rows:
+            progress = 40 * min(self.processed_rows, self.total_rows) / self.total_rows
+        if self.total_trees:
+            progress = 40 + 55 * min(self.built_trees, self.total_trees) / self.total_trees
+        if self.stage == 'saving':
+            progress = 95
+        return min(99, int(progress))
+
+
+class AnalyticsExportJob(models.Model):
+    """
+    Export analytique Parquet demandé depuis l'administration (voir
+    events.columnar) : la requête HTTP ne fait que créer le job, le worker
+    Celery écrit les partitions ; un job perdu est repris par le balayage.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('completed', 'Terminé'),
+        ('failed', 'Échec'),
+    ]
+
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='analytics_export_jobs')
+    # Tables de columnar.TABLES (vide : toutes) et premier mois réécrit (AAAA-MM, vide : export complet)
+    tables = models.JSONField(default=list, blank=True)
+    since = models.CharField(max_length=7, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Lignes écrites par table
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        ordering = ['-created_at']
+        verbose_name = 'Export analytique'
+        verbose_name_plural = 'Exports analytiques'
+
+    def __str__(self) -> str:
+        return f"Export analytique {self.pk} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, tables=None, since=None, user=None):
+        """
+        Créer le job, ou retourner celui déjà en attente / en cours (un seul
+        export à la fois) ; la tâche Celery n'est publiée qu'après le COMMIT
+        """
+        from .tasks import publish_analytics_export_job
+
+        cls.fail_stale()
+        active = cls.objects.filter(status__in=['pending', 'running']).first()
+        if active is not None:
+            return active
+        job = cls.objects.create(tables=tables or [], since=since or '', requested_by=user)
+        transaction.on_commit(lambda: publish_analytics_export_job(job.pk))
+        return job
+
+    @classmethod
+    def fail_stale(cls):
+        """
+        Passer en échec les jobs restés en cours au-delà de la limite de temps
+        des tâches Celery (worker tué). Retourne le nombre de jobs concernés.
+        """
+        now = timezone.now()
+        return cls.objects.filter(
+            status='running', started_at__lt=now - timezone.timedelta(seconds=settings.CELERY_TASK_TIME_LIMIT)
+        ).update(status='failed', error='Export interrompu (worker arrêté)', finished_at=now)
+
+
+class PredictionSnapshot(models.Model):
+    """
+    Dernières prédictions d'un événement à venir, calculées chaque nuit pour
+    tous les événements publiés en un seul passage du modèle (voir
+    PredictiveAnalyticsService.score_upcoming_events) : les tableaux de bord
+    les lisent au lieu de prédire à chaque requête.
+    """
+    COMPETITION_CHOICES = [
+        ('low', 'Faible'),
+        ('medium', 'Moyenne'),
+        ('high', 'Forte'),
+    ]
+    PRICE_POSITION_CHOICES = [
+        ('low', 'Bas'),
+        ('competitive', 'Compétitif'),
+        ('high', 'Élevé'),
+        ('unknown', 'Inconnu'),
+    ]
+
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='prediction_snapshot')
+    model_version = models.CharField(max_length=50)
+    predicted_fill_rate = models.FloatField()
+    confidence = models.FloatField()
+    predicted_registrations = models.PositiveIntegerField(default=0)
+    # Optimisation du prix (vide pour les événements gratuits)
+    current_price = models.DecimalField(max_digits=10, decimal_places=2)
+    optimal_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    optimal_fill_rate = models.FloatField(null=True, blank=True)
+    predicted_revenue = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    price_change_percent = models.FloatField(null=True, blank=True)
+    # Concurrence : événements publiés de la même catégorie entre J-30 et J+90
+    competition_level = models.CharField(max_length=10, choices=COMPETITION_CHOICES, default='low')
+    price_position = models.CharField(max_length=15, choices=PRICE_POSITION_CHOICES, default='unknown')
+    avg_market_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    similar_events_count = models.PositiveIntegerField(default=0)
+    # Rang centile du prix parmi les concurrents (0-100, 50 sans concurrent)
+    price_percentile = models.FloatField(default=50)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['predicted_fill_rate']),
+            models.Index(fields=['computed_at']),
+        ]
+        verbose_name = 'Prédiction'
+        verbose_name_plural = 'Prédictions'
+
+    def __str__(self) -> str:
+        return f"Prédiction événement {self.event_id} ({self.predicted_fill_rate:.0%}, modèle {self.model_version})"
+
+
 
 class SocialAccount(models.Model):
     """Modèle pour gérer l'authentification via réseaux sociaux"""
@@ -1269,7 +2212,7 @@ class CustomReminder(models.Model):
         """Marque le rappel comme envoyé"""
         self.status = 'sent'
         self.sent_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'sent_at', 'updated_at'])
     
     def save(self, *args, **kwargs):
         """Override save pour gérer automatiquement le statut"""
@@ -1285,6 +2228,9 @@ class CustomReminder(models.Model):
                 if self.scheduled_at > timezone.now():
                     # Si l'heure est dans le futur, passer automatiquement en statut 'scheduled'
                     self.status = 'scheduled'
+                    update_fields = kwargs.get('update_fields')
+                    if update_fields is not None and 'status' not in update_fields:
+                        kwargs['update_fields'] = list(update_fields) + ['status']
                     print(f"🔍 DEBUG: Statut automatiquement changé de 'draft' à 'scheduled' pour le rappel {self.id}")
         
         super().save(*args, **kwargs)
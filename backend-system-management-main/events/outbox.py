@@ -0,0 +1,195 @@
+"""
+Livraison des messages de l'outbox transactionnelle (email, SMS, QR d'inscription)
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import qr
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Un message resté "en cours" plus longtemps est considéré comme abandonné (worker tué)
+STALE_LOCK_DELAY = timedelta(minutes=10)
+
+
+def enqueue_registration_side_effects(registration, base_url):
+    """
+    Écrire dans l'outbox les effets de bord d'une nouvelle inscription.
+    À appeler dans la transaction qui crée l'inscription.
+    """
+    payload = {'base_url': base_url}
+
+    if registration.event.is_physical and registration.status in ['confirmed', 'attended']:
+        OutboxMessage.enqueue(registration, 'registration_qr')
+
+    has_phone = bool(
+        registration.guest_phone
+        or (registration.user and getattr(getattr(registration.user, 'profile', None), 'phone', None))
+    )
+    if has_phone:
+        OutboxMessage.enqueue(registration, 'registration_sms')
+
+    # Email immédiat seulement pour les inscriptions gratuites (les payantes sont notifiées au paiement)
+    if (registration.price_paid or 0) == 0:
+        OutboxMessage.enqueue(registration, 'registration_email', payload)
+
+
+class SkipMessage(Exception):
+    """Message sans objet (canal non configuré, destinataire absent) : abandonné sans nouvelle tentative"""
+
+
+def deliver(message_id):
+    """
+    Livrer un message. Le message est d'abord réservé par un UPDATE conditionnel :
+    si deux workers reçoivent le même identifiant, un seul l'envoie.
+    Retourne True (envoyé), False (échec, nouvelle tentative prévue) ou None
+    (rien à faire, ou message ignoré par SkipMessage).
+    """
+    now = timezone.now()
+    claimed = OutboxMessage.objects.filter(
+        pk=message_id, status='pending', available_at__lte=now
+    ).update(status='processing', attempts=F('attempts') + 1, locked_at=now)
+    if not claimed:
+        return None
+
+    message = OutboxMessage.objects.select_related(
+        'registration__event', 'registration__user__profile', 'registration__ticket_type', 'registration__session_type'
+    ).get(pk=message_id)
+
+    try:
+        HANDLERS[message.kind](message)
+    except SkipMessage as e:
+        logger.info(f"Outbox: {message.kind} #{message.pk} ignoré: {e}")
+        message.status = 'skipped'
+        message.last_error = str(e)
+        message.locked_at = None
+        message.save(update_fields=['status', 'last_error', 'locked_at'])
+        return None
+    except Exception as e:
+        logger.warning(f"Outbox: échec {message.kind} #{message.pk} (tentative {message.attempts}): {e}")
+        message.last_error = str(e)
+        message.locked_at = None
+        if message.attempts >= OutboxMessage.MAX_ATTEMPTS:
+            message.status = 'failed'
+        else:
+            message.status = 'pending'
+            message.available_at = timezone.now() + timedelta(seconds=message.retry_delay())
+        message.save(update_fields=['status', 'last_error', 'locked_at', 'available_at'])
+        return False
+
+    message.status = 'sent'
+    message.sent_at = timezone.now()
+    message.locked_at = None
+    message.last_error = ''
+    message.save(update_fields=['status', 'sent_at', 'locked_at', 'last_error'])
+    return True
+
+
+def due_message_ids(limit=500):
+    """Messages à livrer maintenant (y compris ceux dont le worker a disparu)"""
+    now = timezone.now()
+    OutboxMessage.objects.filter(
+        status='processing', locked_at__lt=now - STALE_LOCK_DELAY
+    ).update(status='pending', locked_at=None)
+    return list(
+        OutboxMessage.objects.filter(status='pending', available_at__lte=now)
+        .order_by('available_at').values_list('pk', flat=True)[:limit]
+    )
+
+
+def _deliver_qr(message):
+    qr.ensure_file(message.registration)
+
+
+def _deliver_sms(message):
+    from .sms_service import sms_service
+
+    registration = message.registration
+    # SMS désactivé ou sans fournisseur configuré : aucune tentative ne réussirait
+    if not sms_service.is_configured():
+        raise SkipMessage("aucun fournisseur SMS configuré")
+    profile = getattr(registration.user, 'profile', None) if registration.user else None
+    if not (registration.guest_phone or getattr(profile, 'phone', None)):
+        raise SkipMessage(f"aucun numéro pour l'inscription {registration.id}")
+    if not sms_service.send_confirmation_sms(registration):
+        raise RuntimeError(f"SMS non envoyé pour l'inscription {registration.id}")
+
+
+def _deliver_email(message):
+    registration = message.registration
+    event = registration.event
+    recipient_email = registration.user.email if registration.user else registration.guest_email
+    if not recipient_email:
+        logger.info(f"Outbox: aucun email pour l'inscription {registration.id}")
+        return
+
+    qr.ensure_file(registration)
+    qr_url = None
+    if registration.qr_code:
+        qr_url = message.payload.get('base_url', '').rstrip('/') + registration.qr_code.url
+
+    context = {
+        'event': event,
+        'qr_url': qr_url,
+        'registration': registration,
+        'ticket_type': registration.ticket_type,
+        'session_type': registration.session_type,
+    }
+    if registration.user:
+        context['user'] = registration.user
+        prefix = 'registration'
+    else:
+        context['guest_full_name'] = registration.guest_full_name
+        # Noms utilisés par les templates guest_registration_*
+        context['guest_name'] = registration.guest_full_name
+        context['guest_email'] = registration.guest_email
+        prefix = 'guest_registration'
+
+    # Adapter le sujet et le template selon le statut
+    if registration.status == 'confirmed':
+        subject = f"Confirmation d'inscription - {event.title}"
+        template = f'emails/{prefix}_confirmation'
+    elif registration.status == 'waitlisted':
+        subject = f"Inscription en liste d'attente - {event.title}"
+        template = f'emails/{prefix}_waitlisted'
+    else:
+        subject = f"Inscription en attente - {event.title}"
+        template = f'emails/{prefix}_pending'
+
+    msg = EmailMultiAlternatives(
+        subject,
+        render_to_string(f'{template}.txt', context),
+        getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+        [recipient_email],
+    )
+    msg.attach_alternative(render_to_string(f'{template}.html', context), 'text/html')
+
+    # Attacher le QR code si disponible
+    if registration.qr_code and hasattr(registration.qr_code, 'path'):
+        try:
+            with open(registration.qr_code.path, 'rb') as f:
+                img_data = f.read()
+            from email.mime.image import MIMEImage
+            img = MIMEImage(img_data)
+            img.add_header('Content-ID', '<qr_cid>')
+            img.add_header('Content-Disposition', 'inline', filename='qr.png')
+            msg.attach(img)
+        except Exception:
+            pass
+
+    # Les erreurs SMTP remontent pour déclencher une nouvelle tentative
+    msg.send(fail_silently=False)
+
+
+HANDLERS = {
+    'registration_email': _deliver_email,
+    'registration_sms': _deliver_sms,
+    'registration_qr': _deliver_qr,
+}
@@ -0,0 +1,176 @@
+"""
+Pagination par curseur (keyset) pour les listes d'événements et d'inscriptions
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination keyset sur un couple (champ de tri, id).
+
+    Contrairement à un découpage par OFFSET, chaque page est obtenue par un
+    filtre `WHERE (champ, id) < (valeur, id)` sur l'index : la page 500 coûte
+    le même prix que la page 1. Le curseur est opaque (JSON encodé en base64)
+    et reste stable même si des lignes sont insérées entre deux requêtes.
+
+    La pagination est opt-in : sans `cursor` ni `page_size` dans la requête,
+    `paginate_queryset` retourne None et la vue renvoie la liste complète
+    (tableau JSON), comme avant, pour les écrans qui ne suivent pas les curseurs.
+    """
+    ordering = ('-id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Curseur invalide'
+
+    # Les endpoints d'administration (wants_keyset_pagination) paginent toujours
+    opt_in = True
+
+    def is_requested(self, request):
+        params = request.query_params
+        return not self.opt_in or self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        field = self.ordering[0].lstrip('-')
+        descending = self.ordering[0].startswith('-')
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+
+        # En mode "précédent", on parcourt l'index dans l'autre sens puis on
+        # remet la page dans l'ordre d'affichage.
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._invert(item) for item in self.ordering)
+        queryset = queryset.order_by(*ordering)
+
+        if cursor:
+            queryset = queryset.filter(
+                self._position_filter(field, cursor['value'], cursor['id'], descending != reverse)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.field = field
+        if reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link_for(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link_for(self.page[0], reverse=True)
+
+    def encode_cursor(self, value, pk, reverse):
+        payload = {'v': value, 'id': pk}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            value = payload['v']
+            if isinstance(value, str):
+                value = parse_datetime(value) or value
+            return {'value': value, 'id': int(payload['id']), 'reverse': bool(payload.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _link_for(self, instance, reverse):
+        value = getattr(instance, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        cursor = self.encode_cursor(value, instance.pk, reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    @staticmethod
+    def _position_filter(field, value, pk, descending):
+        """Condition (champ, id) strictement après la position du curseur"""
+        lookup = 'lt' if descending else 'gt'
+        return Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': pk})
+
+    @staticmethod
+    def _invert(item):
+        return item[1:] if item.startswith('-') else f'-{item}'
+
+
+class EventKeysetPagination(KeysetPagination):
+    """Événements triés par (start_date, id), les plus récents d'abord"""
+    ordering = ('-start_date', '-id')
+
+
+class RegistrationKeysetPagination(KeysetPagination):
+    """Inscriptions triées par (registered_at, id), les plus récentes d'abord"""
+    ordering = ('-registered_at', '-id')
+
+
+def wants_keyset_pagination(request):
+    """
+    Les endpoints d'administration historiques paginent par numéro de page.
+    Le mode keyset est utilisé dès qu'un curseur est fourni ou que `page` est absent.
+    """
+    params = request.query_params
+    return KeysetPagination.cursor_query_param in params or 'page' not in params
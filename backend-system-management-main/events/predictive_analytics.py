@@ -13,19 +13,42 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
-from django.db.models import Q, Count, Avg, Sum, F, Min, Max, StdDev
+from django.db.models import Q, Count, Avg, Sum, F, Min, Max, StdDev, IntegerField, FloatField, ExpressionWrapper, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.conf import settings
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score, accuracy_score
-import joblib
+from threadpoolctl import threadpool_limits
+import copy
 import os
 import json
+from collections import defaultdict
+from itertools import islice
+
+from . import features as event_features
+from . import forest, price_index, snapshots
+from .ml_registry import registry
 
 logger = logging.getLogger(__name__)
 
+
+def _count_subquery(queryset, group_field):
+    """Nombre de lignes de `queryset` (corrélé par OuterRef) pour la ligne courante, 0 si aucune"""
+    counts = queryset.order_by().values(group_field).annotate(value=Count('pk')).values('value')[:1]
+    return Coalesce(Subquery(counts), Value(0), output_field=IntegerField())
+
+FILL_RATE_MODEL = 'fill_rate_predictor'
+PRICE_CANDIDATES = 20
+FILL_RATE_TREES = 100
+# Arbres ajoutés par appel à fit() pendant l'entraînement (avancement)
+TREE_BATCH = 10
+TRAINING_CHUNK_SIZE = 2000
+# Périodes d'analyse des tendances proposées par le tableau de bord (instantanés tenus à jour)
+TREND_WINDOWS = (30, 60, 90, 180)
+
 class PredictiveAnalyticsService:
     """
     Service d'analytics prédictifs utilisant le machine learning
@@ -46,7 +69,7 @@ class PredictiveAnalyticsService:
         if not os.path.exists(self.models_dir):
             os.makedirs(self.models_dir)
     
-    def prepare_event_features(self, event_data: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    def prepare_event_features(self, event_data) -> Tuple[np.ndarray, np.ndarray]:
         """
         Prépare les features pour l'entraînement des modèles ML
         
@@ -56,165 +79,163 @@ class PredictiveAnalyticsService:
         - Données géographiques (ville, pays)
         - Données de l'organisateur (réputation, historique)
         - Données de catégorie et tags
+        
+        Calcul vectorisé et encodages identiques d'un processus à l'autre :
+        voir events/features.py. `event_data` : liste de dicts ou DataFrame.
         """
-        features = []
-        targets = []
-        
-        for event in event_data:
-            # Features de base
-            price = float(event.get('price', 0))
-            max_capacity = int(event.get('max_capacity', 10))
-            duration_hours = float(event.get('duration_hours', 2))
-            organizer_events_count = int(event.get('organizer_events_count', 0))
-            organizer_avg_rating = float(event.get('organizer_avg_rating', 0))
-            days_until_event = int(event.get('days_until_event', 0))
-            category_popularity = int(event.get('category_popularity', 5))
-            tags_count = int(event.get('tags_count', 0))
-            
-            feature_vector = [
-                price, max_capacity, duration_hours, organizer_events_count,
-                organizer_avg_rating, days_until_event, category_popularity, tags_count
-            ]
-            
-            # Features temporelles
-            if event.get('start_date') and hasattr(event['start_date'], 'weekday'):
-                start_date = event['start_date']
-                weekday = start_date.weekday()
-                month = start_date.month
-                hour = start_date.hour
-                winter = int(month in [12, 1, 2])
-                spring = int(month in [3, 4, 5])
-                summer = int(month in [6, 7, 8])
-                autumn = int(month in [9, 10, 11])
-                feature_vector.extend([weekday, month, hour, winter, spring, summer, autumn])
-            else:
-                # Valeurs par défaut pour août (été)
-                feature_vector.extend([0, 8, 12, 0, 0, 1, 0])
-            
-            # Features géographiques (encodage simple mais sécurisé)
-            city = str(event.get('city', '')).strip()
-            country = str(event.get('country', '')).strip()
-            category = str(event.get('category', '')).strip()
-            
-            city_encoding = abs(hash(city)) % 1000 if city else 0
-            country_encoding = abs(hash(country)) % 100 if country else 0
-            category_encoding = abs(hash(category)) % 50 if category else 0
-            
-            feature_vector.extend([city_encoding, country_encoding, category_encoding])
-            
-            # Features de prix relatif
-            avg_price_similar_events = float(event.get('avg_price_similar_events', price))
-            price_ratio = price / max(avg_price_similar_events, 1.0) if avg_price_similar_events > 0 else 1.0
-            feature_vector.append(price_ratio)
-            
-            # Target : taux de remplissage (0-1)
-            fill_rate = event.get('fill_rate', 0)
-            if isinstance(fill_rate, (int, float)):
-                # Normaliser le taux de remplissage entre 0 et 1
-                if fill_rate > 1:
-                    target = min(1.0, fill_rate / max_capacity)  # Si c'est un nombre absolu
-                else:
-                    target = min(1.0, max(0.0, float(fill_rate)))  # Si c'est déjà un ratio
-            else:
-                target = 0.0
-            
-            features.append(feature_vector)
-            targets.append(target)
+        return event_features.build(event_data)
+    
+    @staticmethod
+    def _events_queryset(**filters):
+        """
+        Lignes d'événements pour l'entraînement et le scoring par lot. Un
+        comptage par sous-requête : trois JOIN (inscriptions, événements de
+        l'organisateur, tags) multipliaient les lignes et les comptes.
+        """
+        from .models import Event, EventRegistration
         
-        return np.array(features), np.array(targets)
+        return Event.objects.filter(**filters).annotate(
+            total_registrations=_count_subquery(EventRegistration.objects.filter(event=OuterRef('pk')), 'event'),
+            organizer_events_count=_count_subquery(Event.objects.filter(organizer=OuterRef('organizer')), 'organizer'),
+            tags_count=_count_subquery(Event.tags.through.objects.filter(event=OuterRef('pk')), 'event')
+        ).values(
+            'id', 'price', 'max_capacity', 'start_date', 'created_at',
+            'location', 'category__name', 'total_registrations',
+            'organizer_events_count', 'tags_count'
+        ).order_by('pk')
+    
+    @staticmethod
+    def _events_frame(rows: List[Dict]) -> pd.DataFrame:
+        """Nettoyage d'un paquet de lignes d'événements (_events_queryset), colonne par colonne"""
+        df = pd.DataFrame.from_records(rows)
+        df['duration_hours'] = 2  # Valeur par défaut
+        df['organizer_avg_rating'] = 0  # Valeur par défaut
+        df['days_until_event'] = (pd.to_datetime(df['start_date'], utc=True) - pd.to_datetime(df['created_at'], utc=True)).dt.days
+        # Taux de remplissage calculé en flottant (division entière en SQL)
+        capacity = pd.to_numeric(df['max_capacity'], errors='coerce')
+        df['fill_rate'] = (df['total_registrations'] / capacity.where(capacity > 0)).fillna(0.0)
+        df['category_popularity'] = 5  # Valeur par défaut
+        df['avg_price_similar_events'] = df['price'].astype(float)  # Utiliser le prix de l'événement
+        location = df['location'].fillna('').str.split(',')
+        df['city'] = location.str[0]
+        df['country'] = location.str[-1].str.strip()
+        df['category'] = df['category__name'].fillna('').replace('', 'Unknown')
+        return df
+    
+    def _training_rows(self, queryset, total: int, progress) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Features et cibles extraites par paquets (`.iterator()`) dans des
+        tableaux NumPy alloués une fois pour `total` lignes ; les événements
+        apparus après le comptage attendront le prochain entraînement.
+        """
+        X = np.empty((total, len(event_features.FEATURE_NAMES)))
+        y = np.empty(total)
+        filled = 0
+        rows = queryset.iterator(chunk_size=TRAINING_CHUNK_SIZE)
+        try:
+            while filled < total:
+                chunk = list(islice(rows, min(TRAINING_CHUNK_SIZE, total - filled)))
+                if not chunk:
+                    break
+                X[filled:filled + len(chunk)], y[filled:filled + len(chunk)] = self.prepare_event_features(
+                    self._events_frame(chunk)
+                )
+                filled += len(chunk)
+                progress('extraction', filled, total)
+        finally:
+            rows.close()
+        return X[:filled], y[:filled]
     
-    def train_fill_rate_predictor(self, force_retrain: bool = False) -> Dict:
+    def train_fill_rate_predictor(self, force_retrain: bool = False, progress=None, check_age: bool = True) -> Dict:
         """
         Entraîne le modèle de prédiction du taux de remplissage
         
+        Exécuté par la tâche Celery train_model (TrainingJob), jamais dans une
+        requête HTTP. Un modèle existant du même pipeline de features est
+        complété (warm_start) de ML_WARM_START_TREES arbres entraînés sur les
+        données actuelles ; réentraînement complet avec force_retrain, sans
+        modèle compatible ou au-delà de ML_MAX_TREES arbres.
+        
+        Args:
+            progress: callable(étape, fait, total, mode=None) pour l'avancement
+            check_age: ne rien faire si le modèle a moins d'une semaine ; faux
+                pour le réentraînement hebdomadaire planifié, dont le modèle a
+                toujours un peu moins d'une semaine
+        
         Returns:
             Dict avec métriques de performance et statut
         """
+        progress = progress or (lambda *args, **kwargs: None)
         try:
             self.ensure_models_directory()
-            model_path = os.path.join(self.models_dir, 'fill_rate_predictor.joblib')
+            model_path = registry.path(FILL_RATE_MODEL)
             
             # Vérifier si le modèle existe et est récent
-            if not force_retrain and os.path.exists(model_path):
+            current_model = registry.get(FILL_RATE_MODEL)
+            if current_model is not None and current_model.data.get('feature_pipeline') != event_features.PIPELINE:
+                # Modèle entraîné avec d'autres encodages (hash() salé) : réentraînement complet
+                logger.info("Modèle de prédiction de remplissage entraîné avec un ancien pipeline de features")
+                current_model = None
+            elif check_age and not force_retrain and current_model is not None:
                 model_age = timezone.now() - datetime.fromtimestamp(os.path.getmtime(model_path), tz=timezone.utc)
                 if model_age.days < 7:  # Retraîner si plus d'une semaine
                     logger.info("Modèle de prédiction de remplissage déjà à jour")
                     return {'status': 'up_to_date', 'message': 'Modèle déjà entraîné et à jour'}
-            
-            # Récupérer les données d'entraînement
-            from .models import Event, EventRegistration, UserProfile
+            warm_start = (
+                not force_retrain and current_model is not None
+                and len(current_model['model'].estimators_) + settings.ML_WARM_START_TREES <= settings.ML_MAX_TREES
+            )
+            mode = 'warm_start' if warm_start else 'full'
             
             # Événements passés avec données de remplissage
-            past_events = Event.objects.filter(
-                start_date__lt=timezone.now(),
-                status='published'
-            ).annotate(
-                total_registrations=Count('registrations'),
-                fill_rate=F('total_registrations') / F('max_capacity'),
-                organizer_events_count=Count('organizer__events_organized'),
-                days_until_event=F('start_date') - F('created_at'),
-                tags_count=Count('tags')
-            ).values(
-                'id', 'price', 'max_capacity', 'start_date',
-                'location', 'category__name', 'fill_rate',
-                'organizer_events_count',
-                'days_until_event', 'tags_count'
-            )
+            past_events = self._events_queryset(start_date__lt=timezone.now(), status='published')
             
-            if len(past_events) < 50:
+            total = past_events.count()
+            if total < 50:
                 return {
                     'status': 'insufficient_data',
-                    'message': f'Données insuffisantes pour l\'entraînement: {len(past_events)} événements (minimum: 50)'
+                    'message': f'Données insuffisantes pour l\'entraînement: {total} événements (minimum: 50)'
                 }
             
-            # Préparation des features
-            event_list = list(past_events)
-            
-            for i, event in enumerate(event_list):
-                # Nettoyage et conversion des données
-                event['duration_hours'] = 2  # Valeur par défaut
-                event['organizer_avg_rating'] = 0  # Valeur par défaut
-                
-                # Conversion sécurisée de days_until_event
-                days_until_event = event.get('days_until_event')
-                if isinstance(days_until_event, timedelta):
-                    event['days_until_event'] = days_until_event.days
-                else:
-                    event['days_until_event'] = 0
-                
-                event['category_popularity'] = 5  # Valeur par défaut
-                event['tags_count'] = int(event.get('tags_count', 0))
-                event['avg_price_similar_events'] = float(event.get('price', 0))  # Utiliser le prix de l'événement
-                event['city'] = event.get('location', '').split(',')[0] if event.get('location') else ''
-                event['country'] = event.get('location', '').split(',')[-1].strip() if event.get('location') else ''
-                event['category'] = event.get('category__name', '') or 'Unknown'
-                
-                # Nettoyage des valeurs None
-                if event.get('max_capacity') is None:
-                    event['max_capacity'] = 10  # Valeur par défaut
-                if event.get('fill_rate') is None:
-                    event['fill_rate'] = 0.0  # Valeur par défaut
-            
-            X, y = self.prepare_event_features(event_list)
+            progress('extraction', 0, total, mode=mode)
+            X, y = self._training_rows(past_events, total, progress)
             
             # Division train/test
             X_train, X_test, y_train, y_test = train_test_split(
                 X, y, test_size=0.2, random_state=42
             )
             
-            # Standardisation des features
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
-            
-            # Entraînement du modèle
-            model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42,
-                n_jobs=-1
-            )
-            
-            model.fit(X_train_scaled, y_train)
+            if warm_start:
+                # Les arbres existants ont été entraînés dans l'espace de ce scaler
+                model = copy.deepcopy(current_model['model'])
+                scaler = current_model['scaler']
+                X_train_scaled = scaler.transform(X_train)
+                initial_trees = len(model.estimators_)
+                target_trees = initial_trees + settings.ML_WARM_START_TREES
+            else:
+                # Standardisation des features (scaler propre à cet entraînement : le service est partagé)
+                scaler = StandardScaler()
+                X_train_scaled = scaler.fit_transform(X_train)
+                model = RandomForestRegressor(
+                    n_estimators=FILL_RATE_TREES,
+                    max_depth=10,
+                    random_state=42
+                )
+                initial_trees = 0
+                target_trees = FILL_RATE_TREES
+            X_test_scaled = scaler.transform(X_test)
+            
+            # Entraînement par lots d'arbres (warm_start) pour suivre l'avancement,
+            # avec un budget CPU borné : le worker Celery partage la machine
+            model.set_params(warm_start=True, n_jobs=settings.ML_TRAINING_N_JOBS)
+            with threadpool_limits(limits=settings.ML_TRAINING_N_JOBS):
+                built_trees = initial_trees
+                while built_trees < target_trees:
+                    built_trees = min(built_trees + TREE_BATCH, target_trees)
+                    model.set_params(n_estimators=built_trees)
+                    model.fit(X_train_scaled, y_train)
+                    progress('training', built_trees - initial_trees, target_trees - initial_trees)
+            model.set_params(warm_start=False, n_jobs=None)
             
             # Évaluation
             y_pred = model.predict(X_test_scaled)
@@ -222,31 +243,42 @@ class PredictiveAnalyticsService:
             r2 = r2_score(y_test, y_pred)
             
             # Sauvegarde du modèle et du scaler
+            progress('saving')
+            metrics = {
+                'mae': round(mae, 4),
+                'r2': round(r2, 4),
+                'training_samples': len(X_train),
+                'test_samples': len(X_test),
+                'mode': mode,
+                'trees': len(model.estimators_)
+            }
             model_data = {
                 'model': model,
-                'scaler': self.scaler,
-                'feature_names': [
-                    'price', 'max_capacity', 'duration_hours', 'organizer_events_count',
-                    'organizer_avg_rating', 'days_until_event', 'category_popularity',
-                    'tags_count', 'weekday', 'month', 'hour', 'winter', 'spring',
-                    'summer', 'autumn', 'city_encoding', 'country_encoding',
-                    'category_encoding', 'price_ratio'
-                ]
+                'scaler': scaler,
+                'metrics': metrics,
+                'feature_names': event_features.FEATURE_NAMES,
+                'feature_pipeline': event_features.PIPELINE,
             }
             
-            joblib.dump(model_data, model_path)
+            # Forêt compilée d'abord (même version) : les prédictions ne
+            # tombent jamais sur une forêt plus ancienne que le fichier joblib
+            version = timezone.now().strftime('%Y%m%d%H%M%S')
+            forest.export(
+                registry.path(FILL_RATE_MODEL), model, scaler, version,
+                metrics=metrics,
+                feature_names=event_features.FEATURE_NAMES,
+                feature_pipeline=event_features.PIPELINE,
+            )
+            # Les autres processus rechargent les nouveaux fichiers au prochain appel
+            loaded = registry.save(FILL_RATE_MODEL, model_data, version=version)
             
-            logger.info(f"Modèle de prédiction entraîné avec succès. MAE: {mae:.4f}, R²: {r2:.4f}")
+            logger.info(f"Modèle de prédiction entraîné avec succès ({mode}). MAE: {mae:.4f}, R²: {r2:.4f}")
             
             return {
                 'status': 'success',
                 'message': 'Modèle entraîné avec succès',
-                'metrics': {
-                    'mae': round(mae, 4),
-                    'r2': round(r2, 4),
-                    'training_samples': len(X_train),
-                    'test_samples': len(X_test)
-                }
+                'model_version': loaded.version,
+                'metrics': metrics
             }
             
         except Exception as e:
@@ -256,65 +288,111 @@ class PredictiveAnalyticsService:
                 'message': f'Erreur lors de l\'entraînement: {str(e)}'
             }
     
-    def predict_event_fill_rate(self, event_data: Dict) -> Dict:
+    def _fill_rate_model(self):
         """
-        Prédit le taux de remplissage d'un événement
+        Modèle de remplissage du registre ; None s'il est indisponible, un
+        entraînement est alors demandé à Celery (jamais dans la requête)
+        """
+        # Modèle chargé une fois par processus (registre), pas à chaque prédiction :
+        # la forêt compilée (mmap) si elle a été exportée, sinon le modèle sklearn
+        # (gros lots : voir predict_fill_rates)
+        model_data = registry.compiled(FILL_RATE_MODEL)
+        if model_data is None or model_data.data.get('feature_pipeline') != event_features.PIPELINE:
+            model_data = registry.get(FILL_RATE_MODEL)
+        # Un modèle d'un ancien pipeline de features ne comprend pas les encodages actuels
+        if model_data is None or model_data.data.get('feature_pipeline') != event_features.PIPELINE:
+            from .models import TrainingJob
+            # Au plus une demande par période : un job terminé sans modèle (données
+            # insuffisantes) ne doit pas être recréé à chaque appel du tableau de bord
+            TrainingJob.enqueue(FILL_RATE_MODEL, backoff=timedelta(hours=settings.ML_TRAINING_BACKOFF_HOURS))
+            return None
+        return model_data
+    
+    def predict_fill_rates(self, features: np.ndarray, model_data=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Prédictions par lot sur une matrice de features (une ligne par
+        événement ou par prix candidat) : un seul predict par arbre sur toute
+        la matrice, moyenne et écart-type vectorisés.
         
-        Args:
-            event_data: Données de l'événement
-            
         Returns:
-            Dict avec prédiction et confiance
+            (taux de remplissage bornés à [0, 1], confiances) — un élément par ligne
+        """
+        model_data = model_data or self._fill_rate_model()
+        if model_data is None:
+            raise RuntimeError('Modèle non disponible')
+        
+        # Gros lot : tree.predict de sklearn est plus rapide que la forêt compilée,
+        # si le modèle joblib est de la même version
+        if isinstance(model_data, forest.CompiledForest) and len(features) >= forest.SKLEARN_MIN_ROWS:
+            sklearn_model = registry.get(FILL_RATE_MODEL)
+            if sklearn_model is not None and sklearn_model.version == model_data.version:
+                model_data = sklearn_model
+        
+        # Matrice (arbres, lignes) : sa moyenne est la prédiction de la forêt
+        if isinstance(model_data, forest.CompiledForest):
+            predictions_trees = model_data.predict_trees(features)
+        else:
+            features_scaled = model_data['scaler'].transform(features)
+            predictions_trees = np.stack([tree.predict(features_scaled) for tree in model_data['model'].estimators_])
+        predictions = predictions_trees.mean(axis=0)
+        
+        # Confiance basée sur la variance des prédictions des arbres
+        confidences = 1.0 - predictions_trees.std(axis=0) / np.maximum(predictions, 0.1)
+        return np.clip(predictions, 0.0, 1.0), np.clip(confidences, 0.1, 1.0)
+    
+    def predict_events_fill_rate(self, events: List[Dict]) -> List[Dict]:
+        """
+        Prédit le taux de remplissage de plusieurs événements (ou variantes
+        d'un même événement) en un seul passage du modèle
+        
+        Returns:
+            Liste de Dict avec prédiction et confiance, dans l'ordre de `events`
         """
         try:
-            self.ensure_models_directory()
-            model_path = os.path.join(self.models_dir, 'fill_rate_predictor.joblib')
-            
-            if not os.path.exists(model_path):
-                # Entraîner le modèle si nécessaire
-                train_result = self.train_fill_rate_predictor()
-                if train_result['status'] != 'success':
-                    return {
-                        'status': 'error',
-                        'message': 'Modèle non disponible',
-                        'prediction': None,
-                        'confidence': 0
-                    }
-            
-            # Charger le modèle
-            model_data = joblib.load(model_path)
-            model = model_data['model']
-            scaler = model_data['scaler']
-            
-            # Préparer les features de l'événement
-            features, _ = self.prepare_event_features([event_data])
-            features_scaled = scaler.transform(features)
-            
-            # Prédiction
-            prediction = model.predict(features_scaled)[0]
-            prediction = max(0.0, min(1.0, prediction))  # Clamp entre 0 et 1
+            model_data = self._fill_rate_model()
+            if model_data is None:
+                return [{
+                    'status': 'error',
+                    'message': 'Modèle non disponible (entraînement en cours)',
+                    'prediction': None,
+                    'confidence': 0
+                } for _ in events]
             
-            # Calcul de la confiance (basé sur la variance des prédictions des arbres)
-            predictions_trees = [tree.predict(features_scaled)[0] for tree in model.estimators_]
-            confidence = 1.0 - (np.std(predictions_trees) / max(np.mean(predictions_trees), 0.1))
-            confidence = max(0.1, min(1.0, confidence))
+            features, _ = self.prepare_event_features(events)
+            predictions, confidences = self.predict_fill_rates(features, model_data)
             
-            return {
-                'status': 'success',
-                'prediction': round(prediction, 4),
-                'confidence': round(confidence, 4),
-                'predicted_registrations': int(prediction * event_data.get('max_capacity', 0)),
-                'message': f'Prédiction: {prediction*100:.1f}% de remplissage'
-            }
+            return [
+                {
+                    'status': 'success',
+                    'prediction': round(float(prediction), 4),
+                    'confidence': round(float(confidence), 4),
+                    'predicted_registrations': int(prediction * event_data.get('max_capacity', 0)),
+                    'model_version': model_data.version,
+                    'message': f'Prédiction: {prediction*100:.1f}% de remplissage'
+                }
+                for event_data, prediction, confidence in zip(events, predictions, confidences)
+            ]
             
         except Exception as e:
             logger.error(f"Erreur lors de la prédiction: {str(e)}")
-            return {
+            return [{
                 'status': 'error',
                 'message': f'Erreur lors de la prédiction: {str(e)}',
                 'prediction': None,
                 'confidence': 0
-            }
+            } for _ in events]
+    
+    def predict_event_fill_rate(self, event_data: Dict) -> Dict:
+        """
+        Prédit le taux de remplissage d'un événement
+        
+        Args:
+            event_data: Données de l'événement
+            
+        Returns:
+            Dict avec prédiction et confiance
+        """
+        return self.predict_events_fill_rate([event_data])[0]
     
     def optimize_event_pricing(self, event_data: Dict, target_fill_rate: float = 0.8) -> Dict:
         """
@@ -335,16 +413,12 @@ class PredictiveAnalyticsService:
                     'message': 'Prix actuel invalide pour l\'optimisation'
                 }
             
-            # Analyse de la sensibilité au prix
-            price_variations = np.linspace(current_price * 0.5, current_price * 2.0, 20)
+            # Analyse de la sensibilité au prix : tous les prix candidats en un seul lot
+            price_variations = np.linspace(current_price * 0.5, current_price * 2.0, PRICE_CANDIDATES)
+            test_events = [dict(event_data, price=price) for price in price_variations]
             predictions = []
             
-            for price in price_variations:
-                test_data = event_data.copy()
-                test_data['price'] = price
-                
-                # Prédire le taux de remplissage pour ce prix
-                prediction_result = self.predict_event_fill_rate(test_data)
+            for price, prediction_result in zip(price_variations, self.predict_events_fill_rate(test_events)):
                 if prediction_result['status'] == 'success':
                     predictions.append({
                         'price': price,
@@ -381,17 +455,10 @@ class PredictiveAnalyticsService:
             market_analysis = self.analyze_market_competition(event_data)
             
             # Recommandations
-            recommendations = []
-            if optimal_price < current_price:
-                recommendations.append("💡 Réduire le prix pour augmenter le taux de remplissage")
-            elif optimal_price > current_price:
-                recommendations.append("💰 Augmenter le prix pour maximiser les revenus")
-            
-            if market_analysis.get('status') == 'success':
-                if market_analysis['price_position'] == 'high':
-                    recommendations.append("⚠️ Prix plus élevé que la concurrence - risque de faible remplissage")
-                elif market_analysis['price_position'] == 'low':
-                    recommendations.append("✅ Prix compétitif par rapport à la concurrence")
+            recommendations = self._pricing_recommendations(
+                current_price, optimal_price,
+                market_analysis['price_position'] if market_analysis.get('status') == 'success' else None
+            )
             
             return {
                 'status': 'success',
@@ -413,6 +480,21 @@ class PredictiveAnalyticsService:
                 'message': f'Erreur lors de l\'optimisation: {str(e)}'
             }
     
+    @staticmethod
+    def _pricing_recommendations(current_price: float, optimal_price: float, price_position: Optional[str]) -> List[str]:
+        """Recommandations de prix à partir du prix optimal et de la position sur le marché"""
+        recommendations = []
+        if optimal_price < current_price:
+            recommendations.append("💡 Réduire le prix pour augmenter le taux de remplissage")
+        elif optimal_price > current_price:
+            recommendations.append("💰 Augmenter le prix pour maximiser les revenus")
+        
+        if price_position == 'high':
+            recommendations.append("⚠️ Prix plus élevé que la concurrence - risque de faible remplissage")
+        elif price_position == 'low':
+            recommendations.append("✅ Prix compétitif par rapport à la concurrence")
+        return recommendations
+    
     def analyze_market_competition(self, event_data: Dict) -> Dict:
         """
         Analyse la concurrence sur le marché pour un événement
@@ -424,17 +506,13 @@ class PredictiveAnalyticsService:
             Dict avec analyse de la concurrence
         """
         try:
-            from .models import Event
+            current_price = float(event_data.get('price', 0))
             
-            # Événements similaires (même catégorie, période proche)
-            similar_events = Event.objects.filter(
-                category__name=event_data.get('category'),
-                start_date__gte=timezone.now() - timedelta(days=30),
-                start_date__lte=timezone.now() + timedelta(days=90),
-                status='published'
-            ).exclude(id=event_data.get('id')).values('price', 'max_capacity')
+            # Événements similaires (même catégorie, période proche) : index des
+            # prix triés en cache, pas de requête ni de parcours des prix
+            market = price_index.market_stats(event_data.get('category'), current_price, event_data.get('id'))
             
-            if not similar_events:
+            if market is None:
                 return {
                     'status': 'success',
                     'competition_level': 'low',
@@ -443,35 +521,12 @@ class PredictiveAnalyticsService:
                     'price_percentile': 50
                 }
             
-            # Statistiques de prix
-            prices = [float(event['price']) for event in similar_events]
-            avg_market_price = np.mean(prices)
-            current_price = float(event_data.get('price', 0))
-            
-            # Position de prix
-            if current_price < avg_market_price * 0.8:
-                price_position = 'low'
-            elif current_price > avg_market_price * 1.2:
-                price_position = 'high'
-            else:
-                price_position = 'competitive'
-            
-            # Percentile de prix
-            price_percentile = np.percentile(prices, current_price)
-            
-            # Niveau de concurrence
-            competition_level = 'high' if len(similar_events) > 10 else 'medium' if len(similar_events) > 5 else 'low'
-            
             return {
                 'status': 'success',
-                'competition_level': competition_level,
-                'price_position': price_position,
-                'avg_market_price': round(avg_market_price, 2),
-                'price_percentile': round(price_percentile, 1),
-                'similar_events_count': len(similar_events),
+                **self._competition(current_price, market),
                 'price_range': {
-                    'min': round(min(prices), 2),
-                    'max': round(max(prices), 2)
+                    'min': round(market['min'], 2),
+                    'max': round(market['max'], 2)
                 }
             }
             
@@ -485,10 +540,175 @@ class PredictiveAnalyticsService:
                 'price_percentile': 50
             }
     
+    @staticmethod
+    def _competition(current_price: float, market: Dict) -> Dict:
+        """Niveau de concurrence et position du prix face aux statistiques de price_index.market_stats"""
+        avg_market_price = market['avg']
+        
+        # Position de prix
+        if current_price < avg_market_price * 0.8:
+            price_position = 'low'
+        elif current_price > avg_market_price * 1.2:
+            price_position = 'high'
+        else:
+            price_position = 'competitive'
+        
+        # Niveau de concurrence
+        similar_events_count = market['count']
+        competition_level = 'high' if similar_events_count > 10 else 'medium' if similar_events_count > 5 else 'low'
+        
+        return {
+            'competition_level': competition_level,
+            'price_position': price_position,
+            'avg_market_price': round(avg_market_price, 2),
+            # Rang centile du prix parmi les concurrents (0-100)
+            'price_percentile': round(market['percentile'], 1),
+            'similar_events_count': similar_events_count,
+        }
+    
+    def _market_competition(self, df: pd.DataFrame) -> List[Dict]:
+        """
+        Concurrence de chaque événement de `df`, calculée comme
+        analyze_market_competition par l'index des prix (une lecture du cache
+        par catégorie)
+        """
+        ids = df['id'].tolist()
+        prices = df['price'].astype(float).tolist()
+        by_category = defaultdict(list)
+        for position, category in enumerate(df['category__name'].tolist()):
+            # Événements sans catégorie : concurrents entre eux
+            by_category[category if isinstance(category, str) else None].append(position)
+        
+        competition = [None] * len(df)
+        for category, positions in by_category.items():
+            markets = price_index.market_stats_many(category, [(ids[p], prices[p]) for p in positions])
+            for position, market in zip(positions, markets):
+                competition[position] = self._competition(prices[position], market) if market else {
+                    'competition_level': 'low',
+                    'price_position': 'unknown',
+                    'avg_market_price': 0,
+                    'price_percentile': 50,
+                    'similar_events_count': 0,
+                }
+        return competition
+    
+    def _score_chunk(self, df: pd.DataFrame, model_data, target_fill_rate: float) -> List[Dict]:
+        """Remplissage, prix optimal et concurrence d'un paquet d'événements, par lot"""
+        capacity = pd.to_numeric(df['max_capacity'], errors='coerce')
+        df['max_capacity'] = capacity.where(capacity > 0, 100)  # Comme les prédictions unitaires
+        features, _ = self.prepare_event_features(df)
+        predictions, confidences = self.predict_fill_rates(features, model_data)
+        predictions, confidences = predictions.round(4), confidences.round(4)
+        capacities = df['max_capacity'].to_numpy(dtype=float)
+        prices = df['price'].astype(float).to_numpy()
+        
+        # Prix candidats de tous les événements payants dans une seule matrice
+        priced = np.flatnonzero(prices > 0)
+        optimal = {}
+        if len(priced):
+            candidates = np.linspace(prices[priced] * 0.5, prices[priced] * 2.0, PRICE_CANDIDATES, axis=1)
+            grid = df.iloc[np.repeat(priced, PRICE_CANDIDATES)].copy()
+            grid['price'] = candidates.ravel()
+            grid['avg_price_similar_events'] = grid['price']
+            grid_features, _ = self.prepare_event_features(grid)
+            fill_rates = self.predict_fill_rates(grid_features, model_data)[0].round(4).reshape(len(priced), PRICE_CANDIDATES)
+            revenues = candidates * capacities[priced, None] * fill_rates
+            
+            # Revenu maximum parmi les prix qui atteignent le taux cible, sinon parmi tous
+            reaches_target = fill_rates >= target_fill_rate
+            best = np.where(
+                reaches_target.any(axis=1),
+                np.where(reaches_target, revenues, -np.inf).argmax(axis=1),
+                revenues.argmax(axis=1)
+            )
+            rows = np.arange(len(priced))
+            for position, best_index, row in zip(priced, best, rows):
+                optimal[position] = (
+                    candidates[row, best_index], fill_rates[row, best_index], revenues[row, best_index]
+                )
+        
+        competition = self._market_competition(df)
+        results = []
+        for position, (event_id, price) in enumerate(zip(df['id'], prices)):
+            result = {
+                'event_id': int(event_id),
+                'predicted_fill_rate': float(predictions[position]),
+                'confidence': float(confidences[position]),
+                'predicted_registrations': int(predictions[position] * capacities[position]),
+                'current_price': round(float(price), 2),
+                'optimal_price': None,
+                'optimal_fill_rate': None,
+                'predicted_revenue': None,
+                'price_change_percent': None,
+                **competition[position],
+            }
+            if position in optimal:
+                optimal_price, optimal_fill_rate, optimal_revenue = optimal[position]
+                result.update({
+                    'optimal_price': round(float(optimal_price), 2),
+                    'optimal_fill_rate': round(float(optimal_fill_rate), 4),
+                    'predicted_revenue': round(float(optimal_revenue), 2),
+                    'price_change_percent': round(float((optimal_price - price) / price * 100), 1),
+                })
+            results.append(result)
+        return results
+    
+    def score_upcoming_events(self, target_fill_rate: float = 0.8) -> Dict:
+        """
+        Scoring par lot de tous les événements publiés à venir (tâche de
+        nuit) : features, remplissage, prix optimal et concurrence calculés
+        par paquets de TRAINING_CHUNK_SIZE événements, un passage du modèle
+        pour les événements et un pour leurs prix candidats, puis écrits dans
+        PredictionSnapshot.
+        
+        Returns:
+            Dict avec statut, nombre d'événements et version du modèle
+        """
+        from .models import PredictionSnapshot
+        
+        model_data = self._fill_rate_model()
+        if model_data is None:
+            return {'status': 'error', 'message': 'Modèle non disponible (entraînement en cours)'}
+        
+        now = timezone.now()
+        upcoming = self._events_queryset(start_date__gte=now, status='published')
+        fields = [
+            'model_version', 'predicted_fill_rate', 'confidence', 'predicted_registrations',
+            'current_price', 'optimal_price', 'optimal_fill_rate', 'predicted_revenue',
+            'price_change_percent', 'competition_level', 'price_position', 'avg_market_price',
+            'similar_events_count', 'price_percentile', 'computed_at',
+        ]
+        scored = 0
+        rows = upcoming.iterator(chunk_size=TRAINING_CHUNK_SIZE)
+        while True:
+            chunk = list(islice(rows, TRAINING_CHUNK_SIZE))
+            if not chunk:
+                break
+            results = self._score_chunk(self._events_frame(chunk), model_data, target_fill_rate)
+            PredictionSnapshot.objects.bulk_create(
+                [PredictionSnapshot(model_version=model_data.version, computed_at=now, **result) for result in results],
+                update_conflicts=True,
+                unique_fields=['event'],
+                update_fields=fields,
+            )
+            scored += len(results)
+        
+        logger.info(f"Prédictions par lot: {scored} événement(s), modèle {model_data.version}")
+        return {'status': 'success', 'scored': scored, 'model_version': model_data.version}
+    
+    @staticmethod
+    def _trends_key(days_back: int) -> str:
+        return f"trends:{days_back}"
+    
     def detect_emerging_trends(self, days_back: int = 90) -> Dict:
         """
         Détecte les tendances émergentes dans les événements
         
+        Résultat servi depuis un instantané par fenêtre (events.snapshots),
+        recalculé toutes les 10 minutes par la tâche refresh_trend_snapshots
+        dans le cache partagé (settings.CACHES) : le tableau de bord ne lance
+        aucun calcul sur les tables. Sans instantané, le premier appel calcule.
+        
         Args:
             days_back: Nombre de jours à analyser
             
@@ -496,116 +716,13 @@ class PredictiveAnalyticsService:
             Dict avec tendances détectées
         """
         try:
-            from .models import Event, EventRegistration, Category, Tag
-            
-            end_date = timezone.now()
-            start_date = end_date - timedelta(days=days_back)
-            
-            # Tendances par catégorie - CORRIGÉ avec distinct=True
-            category_trends = Category.objects.annotate(
-                recent_events=Count('event', filter=Q(event__created_at__gte=start_date), distinct=True),
-                total_events=Count('event', distinct=True),
-                recent_registrations=Count('event__registrations', filter=Q(event__registrations__registered_at__gte=start_date), distinct=True),
-                avg_price=Avg('event__price'),
-                avg_fill_rate=Avg('event__registrations') / F('event__max_capacity')
-            ).filter(recent_events__gt=0).order_by('-recent_events')[:10]
-            
-            # Tendances par tags - CORRIGÉ avec distinct=True
-            tag_trends = Tag.objects.annotate(
-                recent_usage=Count('event', filter=Q(event__created_at__gte=start_date), distinct=True),
-                total_usage=Count('event', distinct=True),
-                growth_rate=(F('recent_usage') * 100.0) / F('total_usage')
-            ).filter(recent_usage__gt=0).order_by('-growth_rate')[:10]
-            
-            # Tendances temporelles
-            temporal_trends = []
-            for i in range(0, days_back, 7):  # Par semaine
-                week_start = start_date + timedelta(days=i)
-                week_end = week_start + timedelta(days=7)
-                
-                week_events = Event.objects.filter(
-                    created_at__gte=week_start,
-                    created_at__lt=week_end
-                ).count()
-                
-                week_registrations = EventRegistration.objects.filter(
-                    registered_at__gte=week_start,
-                    registered_at__lt=week_end
-                ).count()
-                
-                temporal_trends.append({
-                    'week': week_start.strftime('%Y-%m-%d'),
-                    'events_created': week_events,
-                    'registrations': week_registrations
-                })
-            
-            # Tendances de prix
-            price_trends = Event.objects.filter(
-                created_at__gte=start_date
-            ).aggregate(
-                avg_price=Avg('price'),
-                min_price=Min('price'),
-                max_price=Max('price'),
-                price_std=StdDev('price')
+            snapshot = snapshots.get(
+                self._trends_key(days_back),
+                lambda: self._compute_emerging_trends(days_back),
+                ttl=settings.TRENDS_SNAPSHOT_TTL,
+                max_stale=settings.TRENDS_SNAPSHOT_MAX_STALE,
             )
-            
-            # Détection de tendances émergentes
-            emerging_trends = []
-            
-            # Catégories en forte croissance
-            for category in category_trends:
-                if category.recent_events > 0 and category.total_events > 0:
-                    growth_rate = (category.recent_events / category.total_events) * 100
-                    if growth_rate > 20:  # Croissance > 20%
-                        emerging_trends.append({
-                            'type': 'category_growth',
-                            'name': category.name,
-                            'growth_rate': round(growth_rate, 1),
-                            'recent_events': category.recent_events,
-                            'avg_price': round(float(category.avg_price or 0), 2),
-                            'avg_fill_rate': round(float(category.avg_fill_rate or 0), 4)
-                        })
-            
-            # Tags émergents
-            for tag in tag_trends:
-                if tag.growth_rate > 30:  # Croissance > 30%
-                    emerging_trends.append({
-                        'type': 'tag_emerging',
-                        'name': tag.name,
-                        'growth_rate': round(tag.growth_rate, 1),
-                        'recent_usage': tag.recent_usage,
-                        'total_usage': tag.total_usage
-                    })
-            
-            # Tendances de prix
-            if price_trends['avg_price']:
-                price_trends_clean = {
-                    'avg_price': round(float(price_trends['avg_price']), 2),
-                    'min_price': round(float(price_trends['min_price'] or 0), 2),
-                    'max_price': round(float(price_trends['max_price'] or 0), 2),
-                    'price_volatility': round(float(price_trends['price_std'] or 0), 2)
-                }
-            else:
-                price_trends_clean = {}
-            
-            return {
-                'status': 'success',
-                'analysis_period': f'{days_back} jours',
-                'emerging_trends': emerging_trends,
-                'category_trends': self.validate_category_data(category_trends),
-                'tag_trends': [
-                    {
-                        'name': tag.name,
-                        'recent_usage': tag.recent_usage,
-                        'total_usage': tag.total_usage,
-                        'growth_rate': round(tag.growth_rate, 1)
-                    }
-                    for tag in tag_trends
-                ],
-                'temporal_trends': temporal_trends,
-                'price_trends': price_trends_clean,
-                'insights': self._generate_trend_insights(emerging_trends, category_trends, tag_trends)
-            }
+            return dict(snapshot.data, snapshot=snapshot.meta())
             
         except Exception as e:
             logger.error(f"Erreur lors de la détection des tendances: {str(e)}")
@@ -614,6 +731,142 @@ class PredictiveAnalyticsService:
                 'message': f'Erreur lors de la détection des tendances: {str(e)}'
             }
     
+    def refresh_emerging_trends(self, days_back: int):
+        """Recalculer l'instantané des tendances d'une fenêtre (None si un calcul est en cours)"""
+        return snapshots.refresh(
+            self._trends_key(days_back),
+            lambda: self._compute_emerging_trends(days_back),
+            max_stale=settings.TRENDS_SNAPSHOT_MAX_STALE,
+        )
+    
+    def _compute_emerging_trends(self, days_back: int) -> Dict:
+        """
+        Tendances d'une fenêtre en cinq requêtes, quel que soit le volume :
+        événements créés par catégorie et inscriptions par semaine depuis les
+        agrégats quotidiens (events.rollups), prix et remplissage des
+        catégories retenues, usage des tags, statistiques de prix.
+        """
+        from . import rollups, timeseries
+        from .models import CategoryDailyRollup, Event
+        
+        # Jours locaux complets, la granularité des agrégats
+        today = timezone.localdate()
+        first_day = today - timedelta(days=days_back)
+        start_date = rollups.day_start(first_day)
+        end_date = rollups.day_start(today + timedelta(days=1))
+        
+        # Tendances par catégorie : une ligne d'agrégats par catégorie et par jour
+        recent = Q(day__gte=first_day)
+        category_rows = list(
+            CategoryDailyRollup.objects.filter(category__isnull=False)
+            .order_by().values('category_id', 'category__name')
+            .annotate(
+                recent_events=Sum('new_events', filter=recent),
+                total_events=Sum('new_events'),
+            )
+            .filter(recent_events__gt=0).order_by('-recent_events', 'category__name')[:10]
+        )
+        # Prix et remplissage moyens des seules catégories retenues
+        fill_rate = ExpressionWrapper(F('current_registrations') * 1.0 / F('max_capacity'), output_field=FloatField())
+        category_prices = {
+            row['category_id']: row
+            for row in Event.objects.filter(category_id__in=[row['category_id'] for row in category_rows])
+            .order_by().values('category_id')
+            .annotate(avg_price=Avg('price'), avg_fill_rate=Avg(fill_rate, filter=Q(max_capacity__gt=0)))
+        }
+        category_trends = self.validate_category_data([
+            dict(
+                row,
+                name=row['category__name'],
+                avg_price=category_prices.get(row['category_id'], {}).get('avg_price'),
+                avg_fill_rate=category_prices.get(row['category_id'], {}).get('avg_fill_rate'),
+            )
+            for row in category_rows
+        ])
+        
+        # Tendances par tags : une ligne par couple (événement, tag), sans doublons
+        tag_trends = [
+            {
+                'name': row['tag__name'],
+                'recent_usage': row['recent_usage'],
+                'total_usage': row['total_usage'],
+                'growth_rate': round(row['growth_rate'], 1)
+            }
+            for row in Event.tags.through.objects.order_by().values('tag_id', 'tag__name')
+            .annotate(
+                recent_usage=Count('pk', filter=Q(event__created_at__gte=start_date)),
+                total_usage=Count('pk'),
+            )
+            .annotate(growth_rate=(F('recent_usage') * 100.0) / F('total_usage'))
+            .filter(recent_usage__gt=0).order_by('-growth_rate', 'tag__name')[:10]
+        ]
+        
+        # Tendances temporelles : semaines ISO, depuis les agrégats quotidiens de la plateforme
+        weeks = timeseries.buckets(start_date, end_date, 'week')
+        by_week = {week: {'events_created': 0, 'registrations': 0} for week in weeks}
+        for row in rollups.daily(weeks[0].date(), today) if weeks else []:
+            week = by_week.get(timeseries.floor(datetime.combine(row['day'], datetime.min.time()), 'week'))
+            if week is not None:
+                week['events_created'] += row['new_events']
+                week['registrations'] += row['registrations']
+        temporal_trends = [
+            dict(by_week[week], week=week.strftime(timeseries.DATE_FORMATS['week']))
+            for week in weeks
+        ]
+        
+        # Tendances de prix
+        price_trends = Event.objects.filter(
+            created_at__gte=start_date
+        ).aggregate(
+            avg_price=Avg('price'),
+            min_price=Min('price'),
+            max_price=Max('price'),
+            price_std=StdDev('price')
+        )
+        
+        # Détection de tendances émergentes
+        emerging_trends = []
+        
+        # Catégories en forte croissance
+        for category in category_trends:
+            if category['recent_events'] > 0 and category['total_events'] > 0:
+                if category['growth_rate'] > 20:  # Croissance > 20%
+                    emerging_trends.append({
+                        'type': 'category_growth',
+                        'name': category['name'],
+                        'growth_rate': category['growth_rate'],
+                        'recent_events': category['recent_events'],
+                        'avg_price': category['avg_price'],
+                        'avg_fill_rate': category['avg_fill_rate']
+                    })
+        
+        # Tags émergents
+        for tag in tag_trends:
+            if tag['growth_rate'] > 30:  # Croissance > 30%
+                emerging_trends.append(dict(tag, type='tag_emerging'))
+        
+        # Tendances de prix
+        if price_trends['avg_price']:
+            price_trends_clean = {
+                'avg_price': round(float(price_trends['avg_price']), 2),
+                'min_price': round(float(price_trends['min_price'] or 0), 2),
+                'max_price': round(float(price_trends['max_price'] or 0), 2),
+                'price_volatility': round(float(price_trends['price_std'] or 0), 2)
+            }
+        else:
+            price_trends_clean = {}
+        
+        return {
+            'status': 'success',
+            'analysis_period': f'{days_back} jours',
+            'emerging_trends': emerging_trends,
+            'category_trends': category_trends,
+            'tag_trends': tag_trends,
+            'temporal_trends': temporal_trends,
+            'price_trends': price_trends_clean,
+            'insights': self._generate_trend_insights(emerging_trends, category_trends, tag_trends)
+        }
+    
     def _generate_trend_insights(self, emerging_trends: List, category_trends: List, tag_trends: List) -> List[str]:
         """Génère des insights basés sur les tendances détectées"""
         insights = []
@@ -621,12 +874,12 @@ class PredictiveAnalyticsService:
         # Insights sur les catégories
         if category_trends:
             top_category = category_trends[0]
-            insights.append(f"🔥 {top_category.name} est la catégorie la plus active avec {top_category.recent_events} événements récents")
+            insights.append(f"🔥 {top_category['name']} est la catégorie la plus active avec {top_category['recent_events']} événements récents")
         
         # Insights sur les tags
         if tag_trends:
             top_tag = tag_trends[0]
-            insights.append(f"🚀 Le tag '{top_tag.name}' connaît une croissance de {top_tag.growth_rate:.1f}%")
+            insights.append(f"🚀 Le tag '{top_tag['name']}' connaît une croissance de {top_tag['growth_rate']:.1f}%")
         
         # Insights sur les tendances émergentes
         if emerging_trends:
@@ -680,8 +933,16 @@ class PredictiveAnalyticsService:
                         f"🏷️ Utilisez le tag '{top_tag['name']}' pour améliorer la visibilité de vos événements"
                     )
             
-            # Insights spécifiques à un événement
+            # Insights spécifiques à un événement : prédictions de la nuit si disponibles
+            snapshot = None
             if event_id:
+                from .models import PredictionSnapshot
+                snapshot = PredictionSnapshot.objects.filter(event_id=event_id).first()
+            if snapshot is not None:
+                event_insights, recommendations = self._snapshot_insights(snapshot)
+                insights['event_specific_insights'].extend(event_insights)
+                insights['recommendations'].extend(recommendations)
+            elif event_id:
                 from .models import Event
                 try:
                     event = Event.objects.get(id=event_id)
@@ -738,6 +999,27 @@ class PredictiveAnalyticsService:
                 'message': f'Erreur lors de la génération des insights: {str(e)}'
             }
 
+    def _snapshot_insights(self, snapshot) -> Tuple[List[str], List[str]]:
+        """Insights et recommandations d'un événement à partir de son PredictionSnapshot"""
+        event_insights = [
+            f"🎯 Taux de remplissage prédit: {snapshot.predicted_fill_rate*100:.1f}% (confiance: {snapshot.confidence*100:.1f}%)"
+        ]
+        recommendations = []
+        if snapshot.optimal_price is not None:
+            event_insights.append(
+                f"💰 Prix optimal suggéré: {float(snapshot.optimal_price)}€ (changement: {snapshot.price_change_percent}%)"
+            )
+            recommendations = self._pricing_recommendations(
+                float(snapshot.current_price), float(snapshot.optimal_price), snapshot.price_position
+            )
+        event_insights.append(
+            f"🏆 Niveau de concurrence: {snapshot.competition_level} (prix: {snapshot.price_position})"
+        )
+        event_insights.append(
+            f"🕒 Prédictions du {timezone.localtime(snapshot.computed_at):%d/%m/%Y %H:%M} (modèle {snapshot.model_version})"
+        )
+        return event_insights, recommendations
+    
     def validate_category_data(self, category_trends: List) -> List:
         """
         Valide et corrige les données des catégories pour éviter les anomalies
@@ -746,8 +1028,8 @@ class PredictiveAnalyticsService:
         
         for cat in category_trends:
             # Vérifier que les comptages sont raisonnables
-            recent_events = min(cat.recent_events, 1000) if cat.recent_events else 0
-            total_events = min(cat.total_events, 1000) if cat.total_events else 0
+            recent_events = min(cat['recent_events'], 1000) if cat['recent_events'] else 0
+            total_events = min(cat['total_events'], 1000) if cat['total_events'] else 0
             
             # S'assurer que recent_events <= total_events
             if recent_events > total_events:
@@ -760,19 +1042,23 @@ class PredictiveAnalyticsService:
                 growth_rate = 0.0
             
             validated_trends.append({
-                'name': cat.name,
+                'name': cat['name'],
                 'recent_events': recent_events,
                 'total_events': total_events,
                 'growth_rate': round(growth_rate, 1),
-                'avg_price': round(float(cat.avg_price or 0), 2),
-                'avg_fill_rate': round(float(cat.avg_fill_rate or 0), 4)
+                'avg_price': round(float(cat['avg_price'] or 0), 2),
+                'avg_fill_rate': round(float(cat['avg_fill_rate'] or 0), 4)
             })
         
         return validated_trends
 
-def get_predictive_service():
-    """Retourne une instance du service d'analytics prédictifs"""
-    return PredictiveAnalyticsService()
-
-# Instance globale du service (pour compatibilité)
+# Instance globale du service (partagée par les requêtes du processus)
 predictive_service = None
+
+
+def get_predictive_service():
+    """Retourne l'instance du service d'analytics prédictifs du processus"""
+    global predictive_service
+    if predictive_service is None:
+        predictive_service = PredictiveAnalyticsService()
+    return predictive_service
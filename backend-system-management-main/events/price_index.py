@@ -0,0 +1,184 @@
+"""
+Index des prix du marché : pour chaque catégorie, les prix triés des
+événements publiés de la fenêtre de concurrence (début entre J-30 et J+90),
+mis en cache sous une clé par catégorie et par jour de référence.
+
+Une consultation (moyenne, bornes, rang centile d'un prix) ne lit qu'une
+entrée du cache : np.searchsorted sur le tableau trié, O(log n). L'entrée est
+construite par une requête au premier appel du jour, puis corrigée après
+Event.save (publication, changement de prix, de catégorie, de date ou de
+statut).
+
+Ces corrections ne sont vues par tous les workers que si le cache est partagé
+(settings.CACHES : Redis ou table de cache) ; avec un cache local au
+processus, chaque worker garde sa propre entrée et ne voit que ses propres
+enregistrements. Même partagé, l'index reste approché : deux corrections
+simultanées d'une même entrée peuvent en perdre une, et les modifications par
+QuerySet.update() et les suppressions ne sont pas suivies. La seule garantie
+est la reconstruction au changement de jour.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+WINDOW_BEFORE = timedelta(days=30)
+WINDOW_AFTER = timedelta(days=90)
+# Une entrée ne sert que le jour de sa fenêtre
+CACHE_TIMEOUT = 2 * 24 * 60 * 60
+LOCK_TIMEOUT = 10
+
+
+def window():
+    """Fenêtre de concurrence [début, fin] (même période que analyze_market_competition)"""
+    now = timezone.now()
+    return now - WINDOW_BEFORE, now + WINDOW_AFTER
+
+
+def _keys(category, day):
+    # Noms de catégorie libres (espaces, accents) : clé de cache hachée
+    digest = hashlib.blake2b((category or '').encode(), digest_size=8).hexdigest()
+    key = f"price_index:{day.isoformat()}:{digest}"
+    return key, f"{key}:lock"
+
+
+def _build(category):
+    """Prix de la catégorie dans la fenêtre du jour, triés, avec le prix de chaque événement"""
+    from .models import Event
+
+    start, end = window()
+    queryset = Event.objects.filter(start_date__gte=start, start_date__lte=end, status='published')
+    # Événements sans catégorie : concurrents entre eux
+    if category:
+        queryset = queryset.filter(category__name=category)
+    else:
+        queryset = queryset.filter(category__isnull=True)
+    prices = {event_id: float(price) for event_id, price in queryset.values_list('id', 'price')}
+    return {
+        'prices': np.sort(np.fromiter(prices.values(), dtype=np.float64, count=len(prices))),
+        'by_event': prices,
+        'total': float(sum(prices.values())),
+    }
+
+
+def _entry(category):
+    day = timezone.localdate()
+    key, lock_key = _keys(category, day)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _build(category)
+        # Une mise à jour concurrente garde la main : l'entrée construite sert seulement cet appel
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            try:
+                cache.add(key, entry, CACHE_TIMEOUT)
+            finally:
+                cache.delete(lock_key)
+    return entry
+
+
+def _update(category, event_id, price):
+    """Placer (ou retirer si `price` est None) le prix d'un événement dans l'entrée de sa catégorie"""
+    key, lock_key = _keys(category, timezone.localdate())
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        # Entrée en cours de modification : la supprimer, elle sera reconstruite
+        cache.delete(key)
+        return
+    try:
+        entry = cache.get(key)
+        if entry is None:
+            return
+        prices, by_event = entry['prices'], entry['by_event']
+        old_price = by_event.pop(event_id, None)
+        if old_price is not None:
+            prices = np.delete(prices, np.searchsorted(prices, old_price))
+            entry['total'] -= old_price
+        if price is not None:
+            prices = np.insert(prices, np.searchsorted(prices, price), price)
+            by_event[event_id] = price
+            entry['total'] += price
+        entry['prices'] = prices
+        cache.set(key, entry, CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+
+
+def refresh_event(event_id, previous_category_ids=()):
+    """
+    Mettre à jour l'index après l'enregistrement d'un événement (appelé après
+    le commit). `previous_category_ids` : anciennes catégories (None : sans
+    catégorie) dont l'entrée doit perdre l'événement.
+    """
+    from .models import Category, Event
+
+    try:
+        event = Event.objects.filter(pk=event_id).values(
+            'category_id', 'category__name', 'price', 'status', 'start_date'
+        ).first()
+        if event is None:
+            return
+        for category_id in set(previous_category_ids) - {event['category_id']}:
+            previous = Category.objects.filter(pk=category_id).values_list('name', flat=True).first() if category_id else None
+            _update(previous, event_id, None)
+        category = event['category__name']
+        start, end = window()
+        listed = event['status'] == 'published' and start <= event['start_date'] <= end
+        _update(category, event_id, float(event['price']) if listed else None)
+    except Exception as e:
+        # L'index n'est qu'un cache : une erreur ne doit pas faire échouer l'enregistrement
+        logger.error(f"Index des prix : mise à jour de l'événement {event_id} impossible: {e}")
+
+
+def market_stats(category, price, exclude_id=None):
+    """
+    Statistiques de prix des événements concurrents d'une catégorie (sans
+    l'événement `exclude_id`) et rang centile de `price` parmi eux : part
+    des prix inférieurs, les prix égaux comptant pour moitié. None si aucun
+    concurrent.
+    """
+    return _stats(_entry(category), price, exclude_id)
+
+
+def market_stats_many(category, events):
+    """
+    market_stats de plusieurs événements d'une même catégorie, `events` étant
+    des couples (id, prix) : une seule lecture de l'entrée du cache
+    """
+    entry = _entry(category)
+    return [_stats(entry, price, event_id) for event_id, price in events]
+
+
+def _stats(entry, price, exclude_id):
+    prices, total = entry['prices'], entry['total']
+    count = len(prices)
+    below = int(np.searchsorted(prices, price, side='left'))
+    not_above = int(np.searchsorted(prices, price, side='right'))
+
+    # L'événement lui-même n'est pas son propre concurrent
+    own_price = entry['by_event'].get(exclude_id) if exclude_id is not None else None
+    low, high = 0, count - 1
+    if own_price is not None:
+        own_index = int(np.searchsorted(prices, own_price))
+        count -= 1
+        total -= own_price
+        if own_price < price:
+            below -= 1
+            not_above -= 1
+        elif own_price == price:
+            not_above -= 1
+        low = 1 if own_index == 0 else 0
+        high = count - 1 if own_index == count else count
+    if count <= 0:
+        return None
+
+    return {
+        'count': count,
+        'avg': total / count,
+        'min': float(prices[low]),
+        'max': float(prices[high]),
+        'percentile': (below + not_above) / 2 / count * 100,
+    }
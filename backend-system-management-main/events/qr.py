@@ -0,0 +1,219 @@
+"""
+QR codes des inscriptions : un seul format de contenu (jeton signé vérifiable
+sans la base), rendu à la demande, images (PNG/SVG) mises en cache par jeton
+si settings.QR_IMAGE_CACHE (Redis ; pas d'images dans la table de cache).
+
+Seules les inscriptions confirmées ou présentes reçoivent un jeton ; un billet
+qui perd sa place change de version. La version et le statut courants de
+chaque billet sont publiés dans le cache partagé (settings.CACHES), la base
+restant la référence quand l'entrée manque. Avec la table de cache en base
+(sans REDIS_URL), ces lectures sont elles-mêmes des requêtes SQL.
+
+Le rendu est une fonction pure (contenu -> octets) : il peut tourner dans un
+pool de processus pour la pré-génération des grands événements.
+"""
+import base64
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+try:
+    import qrcode
+    import qrcode.image.svg
+except Exception:  # pragma: no cover - handled by requirements
+    qrcode = None
+
+logger = logging.getLogger(__name__)
+
+# Le contenu d'un QR ne change jamais pour un jeton et une version donnés
+QR_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+QR_STATUSES = ('confirmed', 'attended')
+TICKET_STATE_TIMEOUT = 60 * 60 * 24
+
+TOKEN_PREFIX = 'EMS1'
+TOKEN_SALT = 'events.qr.ticket'
+# 12 octets de HMAC-SHA256 : 16 caractères, assez pour un billet, QR plus petit
+SIGNATURE_BYTES = 12
+
+
+def sign_token(event_id, registration_id, version):
+    """Jeton compact signé (HMAC) : EMS1.<événement>.<inscription>.<version>.<signature>"""
+    message = f"{event_id}.{registration_id}.{version}"
+    return f"{TOKEN_PREFIX}.{message}.{_signature(message)}"
+
+
+def _signature(message):
+    digest = salted_hmac(TOKEN_SALT, message, algorithm='sha256').digest()[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def is_signed_token(token):
+    return token.startswith(TOKEN_PREFIX + '.')
+
+
+def parse_token(token):
+    """
+    Vérifier un jeton signé sans accès à la base.
+    Retourne (event_id, registration_id, version), ou None si le jeton est falsifié.
+    """
+    parts = token.split('.')
+    if len(parts) != 5 or parts[0] != TOKEN_PREFIX:
+        return None
+    message = '.'.join(parts[1:4])
+    if not constant_time_compare(parts[4], _signature(message)):
+        return None
+    try:
+        return int(parts[1]), int(parts[2]), int(parts[3])
+    except ValueError:
+        return None
+
+
+def _state_key(registration_id):
+    return f"qr:ticket:{registration_id}"
+
+
+def ticket_state(registration_id):
+    """
+    (version, statut) courants d'un billet pour les postes de contrôle : lus
+    dans le cache partagé, relus en base si l'entrée manque (expirée, évincée).
+    None si l'inscription n'existe plus.
+    """
+    from .models import EventRegistration
+
+    key = _state_key(registration_id)
+    state = cache.get(key)
+    if state is None:
+        state = EventRegistration.objects.filter(pk=registration_id).values_list('qr_version', 'status').first()
+        if state is None:
+            return None
+        cache.add(key, tuple(state), TICKET_STATE_TIMEOUT)
+    return tuple(state)
+
+
+def publish_state(registration_id, version, status):
+    """Diffuser la version et le statut d'un billet après son enregistrement (révocation, confirmation...)"""
+    cache.set(_state_key(registration_id), (version, status), TICKET_STATE_TIMEOUT)
+
+
+def forget_states(registration_ids):
+    """Oublier l'état de billets modifiés sans save() (UPDATE en masse, suppression) : relu en base au prochain scan"""
+    cache.delete_many([_state_key(registration_id) for registration_id in registration_ids])
+
+
+def build_payload(registration):
+    """
+    Contenu encodé dans le QR (lu par verify_qr et envoyé par SMS). None tant
+    que l'inscription n'occupe pas de place : une inscription en attente ou en
+    liste d'attente n'a pas de billet.
+    """
+    if registration.status not in QR_STATUSES:
+        return None
+    return sign_token(registration.event_id, registration.pk, registration.qr_version)
+
+
+def is_eligible(registration):
+    """Seules les inscriptions confirmées à un événement physique ont un billet QR"""
+    return (
+        qrcode is not None
+        and bool(registration.qr_token)
+        and registration.status in QR_STATUSES
+        and registration.event.is_physical
+    )
+
+
+def render(payload, fmt='png'):
+    """Générer l'image du QR code (octets PNG ou SVG)"""
+    if qrcode is None:
+        raise RuntimeError("La bibliothèque qrcode n'est pas installée")
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Format de QR code inconnu: {fmt}")
+
+    qr = qrcode.QRCode(box_size=10, border=4)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    if fmt == 'svg':
+        img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = io.BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+def _cache_key(registration, fmt):
+    return f"qr:{fmt}:{registration.qr_token}:{registration.qr_version}"
+
+
+def get_image(registration, fmt='png'):
+    """Octets de l'image, rendus au premier accès puis servis depuis le cache (QR_IMAGE_CACHE)"""
+    if not settings.QR_IMAGE_CACHE:
+        return render(build_payload(registration), fmt)
+    key = _cache_key(registration, fmt)
+    data = cache.get(key)
+    if data is None:
+        data = render(build_payload(registration), fmt)
+        cache.set(key, data, QR_CACHE_TIMEOUT)
+    return data
+
+
+def _store_png(registration, data):
+    """Écrire le PNG dans MEDIA_ROOT (URL et pièce jointe des emails) sans repasser par save()"""
+    registration.qr_code.save(
+        f"qr_{registration.qr_token}_v{registration.qr_version}.png", ContentFile(data), save=False
+    )
+    type(registration).objects.filter(pk=registration.pk).update(qr_code=registration.qr_code.name)
+
+
+def ensure_file(registration):
+    """
+    Garantir que le fichier PNG du QR existe pour une inscription éligible.
+    Retourne le champ qr_code (vide si l'inscription n'a pas de billet QR).
+    """
+    if not registration.qr_code and is_eligible(registration):
+        _store_png(registration, get_image(registration, 'png'))
+    return registration.qr_code
+
+
+def _render_png(payload):
+    # Exécuté dans un processus du pool : aucun accès à la base
+    return render(payload, 'png')
+
+
+def pregenerate(registrations, workers=None, chunksize=32):
+    """
+    Pré-générer les PNG d'un lot d'inscriptions. Le rendu (CPU) est réparti
+    sur `workers` processus ; l'écriture des fichiers et du cache reste dans
+    le processus appelant. Retourne le nombre de QR codes générés.
+    """
+    registrations = [r for r in registrations if not r.qr_code and is_eligible(r)]
+    if not registrations:
+        return 0
+
+    payloads = [build_payload(r) for r in registrations]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(payloads) > chunksize:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            images = executor.map(_render_png, payloads, chunksize=chunksize)
+            for registration, data in zip(registrations, images):
+                _store_rendered(registration, data)
+    else:
+        for registration, payload in zip(registrations, payloads):
+            _store_rendered(registration, _render_png(payload))
+    return len(registrations)
+
+
+def _store_rendered(registration, data):
+    if settings.QR_IMAGE_CACHE:
+        cache.set(_cache_key(registration, 'png'), data, QR_CACHE_TIMEOUT)
+    _store_png(registration, data)
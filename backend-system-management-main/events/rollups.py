@@ -0,0 +1,297 @@
+"""
+Agrégats quotidiens des tableaux de bord (événement, organisateur, catégorie,
+plateforme), construits par GROUP BY sur des plages de jours contiguës.
+
+La tâche périodique ne recalcule que les jours touchés depuis le dernier
+calcul (inscriptions, événements et remboursements modifiés, nouveaux
+utilisateurs), plus les derniers jours. Les suppressions ne laissent pas de
+trace : la commande `build_daily_rollups --all` recalcule tout l'historique.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import (
+    CategoryDailyRollup, Event, EventDailyRollup, EventRegistration, EventStats,
+    OrganizerDailyRollup, PlatformDailyRollup, RefundRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+LEVELS = (
+    (EventDailyRollup, 'event_id'),
+    (OrganizerDailyRollup, 'organizer_id'),
+    (CategoryDailyRollup, 'category_id'),
+    (PlatformDailyRollup, None),
+)
+# Modifications commitées après le début du calcul précédent avec un updated_at antérieur
+SAFETY_MARGIN = timedelta(minutes=10)
+RECENT_DAYS = 2
+MAX_RANGE_DAYS = 31
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _ranges(days, max_length=MAX_RANGE_DAYS):
+    """Regrouper des jours en plages contiguës [premier, dernier]"""
+    ranges = []
+    for day in sorted(set(days)):
+        if ranges and day == ranges[-1][1] + timedelta(days=1) and (day - ranges[-1][0]).days < max_length:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return ranges
+
+
+def last_build():
+    return PlatformDailyRollup.objects.aggregate(last=Max('built_at'))['last']
+
+
+def changed_days(since):
+    """Jours dont les agrégats ont pu changer depuis `since`"""
+    days = set(
+        EventRegistration.objects.filter(Q(updated_at__gte=since) | Q(event__updated_at__gte=since))
+        .annotate(day=TruncDate('registered_at')).order_by().values_list('day', flat=True).distinct()
+    )
+    days.update(
+        RefundRequest.objects.filter(updated_at__gte=since, processed_at__isnull=False)
+        .annotate(day=TruncDate('processed_at')).order_by().values_list('day', flat=True).distinct()
+    )
+    days.update(
+        Event.objects.filter(updated_at__gte=since)
+        .annotate(day=TruncDate('created_at')).order_by().values_list('day', flat=True).distinct()
+    )
+    days.update(
+        User.objects.filter(date_joined__gte=since)
+        .annotate(day=TruncDate('date_joined')).order_by().values_list('day', flat=True).distinct()
+    )
+    return days
+
+
+def refresh():
+    """Tâche périodique : recalculer les jours modifiés. Retourne le nombre de jours recalculés."""
+    built_at = timezone.now()
+    since = last_build()
+    if since is None:
+        return backfill(built_at=built_at)
+    today = timezone.localdate()
+    days = changed_days(since - SAFETY_MARGIN)
+    days.update(today - timedelta(days=i) for i in range(RECENT_DAYS))
+    return build_days(days, built_at=built_at)
+
+
+def backfill(first=None, last=None, built_at=None):
+    """Recalculer tous les jours de `first` à `last` (défaut : tout l'historique)"""
+    if first is None:
+        candidates = [
+            EventRegistration.objects.aggregate(first=Min('registered_at'))['first'],
+            Event.objects.aggregate(first=Min('created_at'))['first'],
+            User.objects.aggregate(first=Min('date_joined'))['first'],
+        ]
+        candidates = [timezone.localdate(value) for value in candidates if value]
+        first = min(candidates) if candidates else timezone.localdate()
+    last = last or timezone.localdate()
+    return build_days(
+        (first + timedelta(days=i) for i in range((last - first).days + 1)),
+        built_at=built_at,
+    )
+
+
+def build_days(days, built_at=None):
+    built_at = built_at or timezone.now()
+    count = 0
+    for first, last in _ranges(days):
+        _build_range(first, last, built_at)
+        count += (last - first).days + 1
+    logger.info(f"Agrégats quotidiens: {count} jour(s) recalculé(s)")
+    return count
+
+
+def _build_range(first, last, built_at):
+    start, end = day_start(first), day_start(last + timedelta(days=1))
+    # rows[(modèle, clé)][jour] = {champ: valeur}
+    rows = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+
+    def add(day, event_id, organizer_id, category_id, **values):
+        keys = {'event_id': event_id, 'organizer_id': organizer_id, 'category_id': category_id}
+        for model, key in LEVELS:
+            target = rows[(model, keys[key] if key else None)][day]
+            for field, value in values.items():
+                target[field] += value
+
+    registrations = (
+        EventRegistration.objects.filter(registered_at__gte=start, registered_at__lt=end)
+        .annotate(day=TruncDate('registered_at'))
+        .order_by()
+        .values('day', 'event_id', 'event__organizer_id', 'event__category_id', 'status')
+        .annotate(
+            count=Count('pk'),
+            paid_count=Count('pk', filter=Q(payment_status='paid')),
+            paid_revenue=Sum('price_paid', filter=Q(payment_status='paid')),
+        )
+    )
+    for row in registrations:
+        values = {'paid_count': row['paid_count'], 'paid_revenue': row['paid_revenue'] or Decimal('0')}
+        field = EventStats.REGISTRATION_STATUS_FIELDS.get(row['status'])
+        if field:
+            values[field] = row['count']
+        add(row['day'], row['event_id'], row['event__organizer_id'], row['event__category_id'], **values)
+
+    refunds = (
+        RefundRequest.objects.filter(status='processed', processed_at__gte=start, processed_at__lt=end)
+        .annotate(day=TruncDate('processed_at'))
+        .order_by()
+        .values('day', 'registration__event_id', 'registration__event__organizer_id', 'registration__event__category_id')
+        .annotate(
+            count=Count('pk'),
+            amount=Sum('refund_amount'),
+            refunded_paid_revenue=Sum(
+                'registration__price_paid', filter=Q(registration__payment_status='paid')
+            ),
+        )
+    )
+    for row in refunds:
+        add(
+            row['day'], row['registration__event_id'], row['registration__event__organizer_id'],
+            row['registration__event__category_id'],
+            refunds_processed=row['count'],
+            refund_amount=row['amount'] or Decimal('0'),
+            refunded_paid_revenue=row['refunded_paid_revenue'] or Decimal('0'),
+        )
+
+    events = (
+        Event.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate('created_at'))
+        .values_list('day', 'pk', 'organizer_id', 'category_id')
+    )
+    for day, event_id, organizer_id, category_id in events:
+        add(day, event_id, organizer_id, category_id, new_events=1)
+
+    new_users = (
+        User.objects.filter(date_joined__gte=start, date_joined__lt=end)
+        .annotate(day=TruncDate('date_joined'))
+        .order_by()
+        .values('day')
+        .annotate(count=Count('pk'))
+    )
+    platform = rows[(PlatformDailyRollup, None)]
+    for row in new_users:
+        platform[row['day']]['new_users'] += row['count']
+    # Une ligne plateforme par jour, même vide : elle porte la date du calcul
+    for i in range((last - first).days + 1):
+        platform[first + timedelta(days=i)]
+
+    objects = defaultdict(list)
+    for (model, key_value), by_day in rows.items():
+        key = dict(LEVELS)[model]
+        for day, values in by_day.items():
+            fields = dict(values, day=day, built_at=built_at)
+            if key:
+                fields[key] = key_value
+            objects[model].append(model(**fields))
+
+    with transaction.atomic():
+        for model, _ in LEVELS:
+            model.objects.filter(day__gte=first, day__lte=last).delete()
+            model.objects.bulk_create(objects[model], batch_size=1000)
+
+
+# ---------------------------------------------------------------- lecture
+
+
+def _period(queryset, first=None, last=None):
+    if first is not None:
+        queryset = queryset.filter(day__gte=first)
+    if last is not None:
+        queryset = queryset.filter(day__lte=last)
+    return queryset
+
+
+def _clean(row, model):
+    """Sommes NULL (aucune ligne) ramenées à 0, clés de regroupement inchangées"""
+    return {
+        field: 0 if value is None and field in model.SUM_FIELDS else value
+        for field, value in row.items()
+    }
+
+
+def registrations(row):
+    """Total des inscriptions (tous statuts) d'une ligne d'agrégats"""
+    return sum(row[field] for field in EventStats.REGISTRATION_STATUS_FIELDS.values())
+
+
+def _sums(model):
+    return {field: Sum(field) for field in model.SUM_FIELDS}
+
+
+def totals(first=None, last=None, model=PlatformDailyRollup, **filters):
+    """Sommes des agrégats sur une période (jours inclus), plus `registrations` (tous statuts)"""
+    queryset = _period(model.objects.filter(**filters), first, last)
+    row = _clean(queryset.aggregate(**_sums(model)), model)
+    row['registrations'] = registrations(row)
+    return row
+
+
+def daily(first, last, model=PlatformDailyRollup, **filters):
+    """Lignes par jour (jours vides complétés) de `first` à `last` inclus"""
+    queryset = _period(model.objects.filter(**filters), first, last)
+    by_day = {row.pop('day'): _clean(row, model) for row in queryset.order_by().values('day').annotate(**_sums(model))}
+    empty = {field: 0 for field in model.SUM_FIELDS}
+    rows = []
+    for i in range((last - first).days + 1):
+        day = first + timedelta(days=i)
+        row = dict(by_day.get(day, empty), day=day)
+        row['registrations'] = registrations(row)
+        rows.append(row)
+    return rows
+
+
+def monthly(first, last, model=PlatformDailyRollup, **filters):
+    """Lignes par mois (mois sans agrégat absents)"""
+    queryset = _period(model.objects.filter(**filters), first, last)
+    return [
+        _clean(row, model)
+        for row in queryset.annotate(month=TruncMonth('day')).order_by('month').values('month').annotate(**_sums(model))
+    ]
+
+
+def by_key(key, first=None, last=None, model=OrganizerDailyRollup, **filters):
+    """Sommes par organisateur / catégorie / événement sur une période"""
+    queryset = _period(model.objects.filter(**filters), first, last)
+    return [_clean(row, model) for row in queryset.order_by().values(key).annotate(**_sums(model))]
+
+
+def revenue_breakdown(level, first=None, last=None):
+    """
+    Revenus payés par organisateur ou par catégorie, triés par revenus :
+    [{<clé>, paid_revenue, paid_count, event_count}]. Deux requêtes sur les agrégats.
+    """
+    model, key = {
+        'organizer': (OrganizerDailyRollup, 'organizer_id'),
+        'category': (CategoryDailyRollup, 'category_id'),
+    }[level]
+    event_counts = dict(
+        _period(EventDailyRollup.objects.filter(paid_count__gt=0), first, last)
+        .order_by().values_list(f'event__{key}').annotate(count=Count('event', distinct=True))
+    )
+    rows = [
+        dict(row, event_count=event_counts.get(row[key], 0))
+        for row in by_key(key, first, last, model=model)
+        if row['paid_count']
+    ]
+    return sorted(rows, key=lambda row: row['paid_revenue'], reverse=True)
+
+
+def last_days(days):
+    """(premier, dernier) des `days` derniers jours, aujourd'hui inclus"""
+    today = timezone.localdate()
+    return today - timedelta(days=days - 1), today
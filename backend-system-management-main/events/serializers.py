@@ -2,7 +2,38 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.db import models
-from .models import Event, Category, Tag, EventRegistration, EventHistory, TicketType, SessionType, VirtualEvent, VirtualEventInteraction, CustomReminder, CustomReminderRecipient
+from .models import Event, Category, Tag, EventRegistration, EventHistory, TicketType, SessionType, VirtualEvent, VirtualEventInteraction, CustomReminder, CustomReminderRecipient, EventStats, SeatUnavailable, PredictionSnapshot
+
+
+def get_annotated_interaction_stats(event):
+    """
+    Construire les statistiques d'interaction à partir des annotations posées par
+    Event.objects.with_list_stats(). Retourne None si l'événement n'a pas été annoté.
+    """
+    if getattr(event, 'stats_interactions', None) is None:
+        return None
+
+    ratings = event.stats_ratings or 0
+    avg_rating = 0
+    if ratings:
+        avg_rating = round((event.stats_rating_sum or 0) / ratings, 1)
+
+    return {
+        'likes': event.stats_likes or 0,
+        'comments': event.stats_comments or 0,
+        'shares': event.stats_shares or 0,
+        'ratings': ratings,
+        'total': event.stats_interactions,
+        'average_rating': avg_rating
+    }
+
+
+def get_event_stats(event):
+    """Ligne EventStats de l'événement, ou None si elle n'a pas encore été construite"""
+    try:
+        return event.stats
+    except EventStats.DoesNotExist:
+        return None
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -100,6 +131,16 @@ class EventRegistrationSerializer(serializers.ModelSerializer):
         return obj.event.is_virtual
 
 
+class PredictionSnapshotSerializer(serializers.ModelSerializer):
+    """Sérialiseur des prédictions calculées chaque nuit (lecture seule)"""
+    event_title = serializers.CharField(source='event.title', read_only=True)
+    event_start_date = serializers.DateTimeField(source='event.start_date', read_only=True)
+
+    class Meta:
+        model = PredictionSnapshot
+        exclude = ['id']
+
+
 class EventHistorySerializer(serializers.ModelSerializer):
     """Sérialiseur pour l'historique des événements"""
     user = UserSerializer(read_only=True)
@@ -160,27 +201,48 @@ class EventSerializer(serializers.ModelSerializer):
         ]
 
     def get_registration_count(self, obj):
+        annotated = getattr(obj, 'stats_registration_count', None)
+        if annotated is not None:
+            return annotated
+        stats = get_event_stats(obj)
+        if stats is not None:
+            return stats.registration_count
         return obj.registrations.filter(status__in=['confirmed', 'attended']).count()
 
     def get_confirmed_registration_count(self, obj):
+        annotated = getattr(obj, 'stats_confirmed_count', None)
+        if annotated is not None:
+            return annotated
+        stats = get_event_stats(obj)
+        if stats is not None:
+            return stats.confirmed_count
         return obj.registrations.filter(status='confirmed').count()
 
     def get_interaction_count(self, obj):
         """Retourner des statistiques détaillées par type d'interaction"""
+        annotated = get_annotated_interaction_stats(obj)
+        if annotated is not None:
+            return annotated
+        stats = get_event_stats(obj)
+        if stats is not None:
+            return stats.as_interaction_dict()
+
         interactions = obj.interactions.all()
         
         # Compter par type
         likes = interactions.filter(interaction_type='like').count()
         comments = interactions.filter(interaction_type='comment').count()
         shares = interactions.filter(interaction_type='share').count()
-        ratings = interactions.filter(interaction_type='rating').count()
+        # Seules les évaluations notées comptent, comme EventStats.interaction_delta
+        rated = interactions.filter(interaction_type='rating', rating__isnull=False).aggregate(
+            count=models.Count('pk'), total=models.Sum('rating')
+        )
+        ratings = rated['count']
         
         # Calculer la note moyenne
-        rating_interactions = interactions.filter(interaction_type='rating')
         avg_rating = 0
-        if rating_interactions.exists():
-            total_rating = sum(interaction.rating for interaction in rating_interactions if interaction.rating)
-            avg_rating = round(total_rating / rating_interactions.count(), 1)
+        if ratings:
+            avg_rating = round((rated['total'] or 0) / ratings, 1)
         
         return {
             'likes': likes,
@@ -735,27 +797,34 @@ class EventRegistrationCreateSerializer(serializers.ModelSerializer):
             payment_status = 'pending'  # En attente si en liste d'attente
         
         # 🎯 NOUVELLE LOGIQUE : Créer l'inscription selon le type (utilisateur ou invité)
-        if is_guest:
-            # Créer une inscription d'invité
-            registration = EventRegistration.objects.create(
-                user=None,  # Pas d'utilisateur pour les invités
-                event=event,
-                status=status,
-                payment_status=payment_status,
-                is_guest_registration=True,
-                **data_for_create
-            )
-            print(f"🔍 DEBUG: Guest registration created - ID: {registration.id}, Guest: {guest_full_name}")
-        else:
-            # Créer une inscription d'utilisateur connecté
-            registration = EventRegistration.objects.create(
-                user=user,
-                event=event,
-                status=status,
-                payment_status=payment_status,
-                **data_for_create
-            )
-            print(f"🔍 DEBUG: User registration created - ID: {registration.id}, User: {user.username}")
+        # La place est réservée atomiquement dans EventRegistration.save() : sous forte
+        # concurrence, l'inscription peut basculer en liste d'attente ou être refusée.
+        try:
+            if is_guest:
+                # Créer une inscription d'invité
+                registration = EventRegistration.objects.create(
+                    user=None,  # Pas d'utilisateur pour les invités
+                    event=event,
+                    status=status,
+                    payment_status=payment_status,
+                    is_guest_registration=True,
+                    **data_for_create
+                )
+                print(f"🔍 DEBUG: Guest registration created - ID: {registration.id}, Guest: {guest_full_name}")
+            else:
+                # Créer une inscription d'utilisateur connecté
+                registration = EventRegistration.objects.create(
+                    user=user,
+                    event=event,
+                    status=status,
+                    payment_status=payment_status,
+                    **data_for_create
+                )
+                print(f"🔍 DEBUG: User registration created - ID: {registration.id}, User: {user.username}")
+        except SeatUnavailable:
+            raise serializers.ValidationError({
+                'event': "L'événement est complet."
+            })
         
         print(f"🔍 DEBUG: Registration created - ID: {registration.id}, Status: {registration.status}, Payment: {registration.payment_status}")
         
@@ -829,24 +898,40 @@ class EventListSerializer(serializers.ModelSerializer):
         ]
 
     def get_registration_count(self, obj):
+        # 🎯 PERF : Utiliser l'annotation de Event.objects.with_list_stats() si disponible
+        annotated = getattr(obj, 'stats_registration_count', None)
+        if annotated is not None:
+            return annotated
+        stats = get_event_stats(obj)
+        if stats is not None:
+            return stats.registration_count
         return obj.registrations.filter(status__in=['confirmed', 'attended']).count()
 
     def get_interaction_count(self, obj):
         """Retourner des statistiques détaillées par type d'interaction"""
+        annotated = get_annotated_interaction_stats(obj)
+        if annotated is not None:
+            return annotated
+        stats = get_event_stats(obj)
+        if stats is not None:
+            return stats.as_interaction_dict()
+
         interactions = obj.interactions.all()
         
         # Compter par type
         likes = interactions.filter(interaction_type='like').count()
         comments = interactions.filter(interaction_type='comment').count()
         shares = interactions.filter(interaction_type='share').count()
-        ratings = interactions.filter(interaction_type='rating').count()
+        # Seules les évaluations notées comptent, comme EventStats.interaction_delta
+        rated = interactions.filter(interaction_type='rating', rating__isnull=False).aggregate(
+            count=models.Count('pk'), total=models.Sum('rating')
+        )
+        ratings = rated['count']
         
         # Calculer la note moyenne
-        rating_interactions = interactions.filter(interaction_type='rating')
         avg_rating = 0
-        if rating_interactions.exists():
-            total_rating = sum(interaction.rating for interaction in rating_interactions if interaction.rating)
-            avg_rating = round(total_rating / rating_interactions.count(), 1)
+        if ratings:
+            avg_rating = round((rated['total'] or 0) / ratings, 1)
         
         return {
             'likes': likes,
@@ -9,7 +9,7 @@ from django.conf import settings
 from django.utils import timezone
 from django.db.models import Q, Count, Avg, OuterRef, F
 from django.core.files.storage import default_storage
-from .models import Event, EventRegistration, NotificationLog, VirtualEvent, VirtualEventInteraction
+from .models import Event, EventRegistration, EventStats, NotificationLog, VirtualEvent, VirtualEventInteraction
 
 logger = logging.getLogger(__name__)
 
@@ -426,21 +426,23 @@ class VirtualEventAnalyticsService:
     def get_event_interaction_stats(event_id):
         """Récupère les statistiques d'interaction pour un événement"""
         try:
-            event = Event.objects.get(id=event_id, event_type='virtual')
+            event = Event.objects.select_related('stats').get(id=event_id, event_type='virtual')
             
-            interactions = VirtualEventInteraction.objects.filter(event=event)
+            # 🎯 PERF : Lire la ligne EventStats au lieu d'agréger toutes les interactions
+            try:
+                event_stats = event.stats
+            except EventStats.DoesNotExist:
+                EventStats.ensure([event.id])
+                event_stats = EventStats.objects.get(event_id=event.id)
             
             stats = {
-                'total_interactions': interactions.count(),
-                'likes': interactions.filter(interaction_type='like').count(),
-                'comments': interactions.filter(interaction_type='comment').count(),
-                'shares': interactions.filter(interaction_type='share').count(),
-                'ratings': interactions.filter(interaction_type='rating').count(),
-                'average_rating': interactions.filter(
-                    interaction_type='rating',
-                    rating__isnull=False
-                ).aggregate(avg=Avg('rating'))['avg'] or 0,
-                'unique_users': interactions.values('user').distinct().count()
+                'total_interactions': event_stats.total_interactions,
+                'likes': event_stats.like_count,
+                'comments': event_stats.comment_count,
+                'shares': event_stats.share_count,
+                'ratings': event_stats.rating_count,
+                'average_rating': event_stats.average_rating,
+                'unique_users': VirtualEventInteraction.objects.filter(event=event).values('user').distinct().count()
             }
             
             return stats
@@ -1,9 +1,8 @@
 import logging
 import requests
 from django.conf import settings
-from django.core.files.base import ContentFile
-import qrcode
-import io
+
+from . import qr
 
 logger = logging.getLogger(__name__)
 
@@ -27,31 +26,21 @@ class SMSService:
             }
         }
     
+    def is_configured(self):
+        """Au moins un fournisseur activé et renseigné (identifiants, numéro d'envoi)"""
+        twilio = self.providers['twilio']
+        africastalking = self.providers['africastalking']
+        return bool(
+            twilio['enabled'] and twilio['account_sid'] and twilio['auth_token'] and twilio['from_number']
+            or africastalking['enabled'] and africastalking['api_key'] and africastalking['username']
+        )
+    
     def generate_qr_code(self, registration):
         """Génère un QR-code pour l'inscription"""
         try:
-            # Créer le contenu du QR-code
-            qr_content = f"EVENT:{registration.event.id}|REG:{registration.id}|TOKEN:{registration.qr_token}"
-            
-            # Générer le QR-code
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(qr_content)
-            qr.make(fit=True)
-            
-            # Créer l'image
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convertir en bytes
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            # Sauvegarder l'image
-            filename = f"qr_code_registration_{registration.id}.png"
-            registration.qr_code.save(filename, ContentFile(buffer.getvalue()), save=True)
-            
+            qr.ensure_file(registration)
             logger.info(f"QR-code généré pour l'inscription {registration.id}")
-            return True
+            return bool(registration.qr_code)
             
         except Exception as e:
             logger.error(f"Erreur lors de la génération du QR-code: {e}")
@@ -271,16 +260,17 @@ class SMSService:
                 logger.warning(f"🚨 BLOCAGE: Numéro de téléphone identique au numéro d'envoi: {formatted_phone}")
                 return False
             
-            # Générer le QR-code si pas déjà fait
-            if not registration.qr_code:
-                self.generate_qr_code(registration)
-            
             # Créer le message
             event = registration.event
             
-            # 🎯 NOUVEAU : Message avec QR-code texte intégré
-            qr_content = f"EVENT:{event.id}|REG:{registration.id}|TOKEN:{registration.qr_token}"
-            short_message = f"🎉 Confirmation: {event.title} - {event.start_date.strftime('%d/%m')} - ID:{registration.id}\n\n📱 SCANNEZ CE CODE:\n{qr_content}"
+            # 🎯 NOUVEAU : Message avec QR-code texte intégré (l'image n'est pas nécessaire ici)
+            qr_content = qr.build_payload(registration)
+            short_message = f"🎉 Confirmation: {event.title} - {event.start_date.strftime('%d/%m')} - ID:{registration.id}"
+            if qr_content:
+                short_message += f"\n\n📱 SCANNEZ CE CODE:\n{qr_content}"
+            else:
+                # Inscription en attente ou en liste d'attente : pas de billet à scanner
+                short_message += f"\n\nStatut: {registration.get_status_display()}"
             
             logger.info(f"🔍 SMS DEBUG: Message préparé: {short_message}")
             logger.info(f"🎯 LONGUEUR MESSAGE: {len(short_message)} caractères")
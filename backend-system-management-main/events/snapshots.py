@@ -0,0 +1,146 @@
+"""
+Instantanés des tableaux de bord : le résultat d'un calcul coûteux est mis en
+cache sous une clé, servi tel quel pendant `ttl` secondes, puis servi périmé
+(jusqu'à `max_stale`) pendant qu'un seul recalcul tourne en arrière-plan.
+
+Un verrou `cache.add` par clé garantit qu'un cache froid ou périmé ne
+déclenche qu'un calcul à la fois, même avec plusieurs administrateurs.
+Instantanés et verrous doivent vivre dans un cache partagé par les workers
+gunicorn et Celery (settings.CACHES : Redis ou table de cache en base) : avec
+un cache local au processus, chaque worker calcule et sert son propre
+instantané.
+
+Les vérifications qui doivent refléter l'état courant (santé du système) ne
+passent pas par un instantané.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TTL = getattr(settings, 'DASHBOARD_SNAPSHOT_TTL', 60)
+SNAPSHOT_MAX_STALE = getattr(settings, 'DASHBOARD_SNAPSHOT_MAX_STALE', 60 * 60)
+# Durée maximale d'un calcul : au-delà, le verrou expire et un autre calcul peut démarrer
+LOCK_TIMEOUT = 60
+WAIT_INTERVAL = 0.05
+
+
+class Snapshot:
+    """Données d'un instantané et son âge en secondes"""
+
+    def __init__(self, data, computed_at, stale=False):
+        self.data = data
+        self.computed_at = computed_at
+        self.stale = stale
+
+    @property
+    def age(self):
+        return max(0, int(time.time() - self.computed_at))
+
+    def meta(self):
+        return {
+            'age': self.age,
+            'computed_at': self.computed_at,
+            'stale': self.stale,
+        }
+
+
+def _keys(key):
+    return f"snapshot:{key}", f"snapshot:lock:{key}"
+
+
+def _compute(key, compute, max_stale):
+    cache_key, lock_key = _keys(key)
+    try:
+        data = compute()
+        computed_at = time.time()
+        cache.set(cache_key, (data, computed_at), max_stale)
+        return Snapshot(data, computed_at)
+    finally:
+        cache.delete(lock_key)
+
+
+def _refresh_in_background(key, compute, max_stale):
+    def run():
+        try:
+            _compute(key, compute, max_stale)
+        except Exception as e:
+            logger.error(f"Instantané {key}: recalcul en arrière-plan impossible: {e}")
+        finally:
+            # Le thread a sa propre connexion : la fermer plutôt que la laisser fuir
+            connection.close()
+
+    close_old_connections()
+    thread = threading.Thread(target=run, name=f"snapshot-{key}", daemon=True)
+    thread.start()
+    return thread
+
+
+def get(key, compute, ttl=None, max_stale=None, background=True):
+    """
+    Instantané `key`, calculé par `compute()` (sans argument, résultat
+    picklable). Frais : servi directement. Périmé : servi, un seul recalcul
+    part en arrière-plan. Absent : un seul calcul, les autres requêtes
+    attendent son résultat (au plus LOCK_TIMEOUT secondes).
+    """
+    ttl = SNAPSHOT_TTL if ttl is None else ttl
+    max_stale = SNAPSHOT_MAX_STALE if max_stale is None else max_stale
+    cache_key, lock_key = _keys(key)
+
+    entry = cache.get(cache_key)
+    if entry is not None:
+        data, computed_at = entry
+        if time.time() - computed_at < ttl:
+            return Snapshot(data, computed_at)
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            if background:
+                _refresh_in_background(key, compute, max_stale)
+            else:
+                return _compute(key, compute, max_stale)
+        return Snapshot(data, computed_at, stale=True)
+
+    # Cache froid : un seul calcul (single-flight)
+    deadline = time.time() + LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        if time.time() >= deadline:
+            break
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return Snapshot(*entry)
+    # Calcul terminé entre la première lecture et la prise du verrou
+    entry = cache.get(cache_key)
+    if entry is not None:
+        cache.delete(lock_key)
+        return Snapshot(*entry)
+    return _compute(key, compute, max_stale)
+
+
+def refresh(key, compute, max_stale=None):
+    """
+    Recalculer l'instantané `key` maintenant (tâche périodique) : les
+    requêtes le trouvent frais. Ignoré si un calcul est déjà en cours.
+    """
+    max_stale = SNAPSHOT_MAX_STALE if max_stale is None else max_stale
+    if not cache.add(_keys(key)[1], 1, LOCK_TIMEOUT):
+        return None
+    return _compute(key, compute, max_stale)
+
+
+def response(snapshot, status=200):
+    """Réponse DRF : données de l'instantané, `snapshot` (âge, périmé) et en-tête Age"""
+    from rest_framework.response import Response
+
+    data = dict(snapshot.data, snapshot=snapshot.meta())
+    resp = Response(data, status=status)
+    resp['Age'] = str(snapshot.age)
+    return resp
+
+
+def invalidate(key):
+    cache.delete(_keys(key)[0])
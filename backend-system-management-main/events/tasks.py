@@ -301,3 +301,215 @@ def check_scheduled_reminders():
         traceback.print_exc()
         return f"Erreur: {str(e)}"
 
+
+
+# ===== OUTBOX TRANSACTIONNELLE (email / SMS / QR des inscriptions) =====
+
+@shared_task(bind=True, max_retries=5)
+def deliver_outbox_message(self, message_id):
+    """
+    Livrer un message de l'outbox. En cas d'échec, la tâche est relancée après
+    le délai exponentiel du message ; le balayage périodique sert de filet.
+    """
+    from .models import OutboxMessage
+    from .outbox import deliver
+
+    delivered = deliver(message_id)
+    if delivered is False:
+        message = OutboxMessage.objects.filter(pk=message_id, status='pending').first()
+        if message and self.request.retries < self.max_retries:
+            raise self.retry(countdown=message.retry_delay())
+    return delivered
+
+
+@shared_task
+def dispatch_outbox_messages():
+    """
+    Tâche périodique : livrer les messages en attente (publication perdue,
+    nouvelle tentative arrivée à échéance, worker interrompu).
+    """
+    from .outbox import deliver, due_message_ids
+
+    results = [deliver(message_id) for message_id in due_message_ids()]
+    return f"Outbox: {results.count(True)} envoyé(s), {results.count(False)} échec(s)"
+
+
+def publish_outbox_message(message_id):
+    """Publier la tâche de livraison ; si le broker est indisponible, le balayage prendra le relais"""
+    try:
+        deliver_outbox_message.delay(message_id)
+    except Exception as e:
+        logger.warning(f"Outbox: publication impossible pour le message {message_id}: {e}")
+
+
+# ===== QR CODES DES INSCRIPTIONS =====
+
+QR_TASK_CHUNK_SIZE = 200
+
+
+@shared_task
+def pregenerate_qr_codes(registration_ids):
+    """
+    Générer les QR codes d'un lot d'inscriptions en arrière-plan.
+    Un worker Celery ne peut pas lancer de sous-processus : le rendu est séquentiel
+    ici, la parallélisation vient des lots répartis sur les workers.
+    """
+    from .models import EventRegistration
+    from . import qr
+
+    registrations = EventRegistration.objects.select_related('event').filter(id__in=registration_ids)
+    generated = qr.pregenerate(registrations, workers=1)
+    return f"QR codes: {generated} généré(s)"
+
+
+def publish_qr_pregeneration(registration_ids):
+    """Répartir les inscriptions en lots ; sans broker, les QR seront rendus au premier accès"""
+    registration_ids = list(registration_ids)
+    for start in range(0, len(registration_ids), QR_TASK_CHUNK_SIZE):
+        chunk = registration_ids[start:start + QR_TASK_CHUNK_SIZE]
+        try:
+            pregenerate_qr_codes.delay(chunk)
+        except Exception as e:
+            logger.warning(f"QR: publication impossible pour {len(chunk)} inscription(s): {e}")
+
+
+# ===== AGRÉGATS QUOTIDIENS DES TABLEAUX DE BORD =====
+
+@shared_task
+def refresh_daily_rollups():
+    """Tâche périodique : recalculer les agrégats quotidiens des jours modifiés"""
+    from . import rollups
+
+    days = rollups.refresh()
+    return f"Agrégats quotidiens: {days} jour(s) recalculé(s)"
+
+
+# ===== EXPORTS DES INSCRIPTIONS =====
+
+@shared_task
+def generate_export(job_id):
+    """Générer le fichier d'un ExportJob (Excel) hors du worker web"""
+    from .exports import run_job
+
+    result = run_job(job_id)
+    return f"Export {job_id}: {result or 'déjà traité'}"
+
+
+@shared_task
+def dispatch_export_jobs():
+    """Tâche périodique : traiter les exports dont la publication s'est perdue, clore les exports interrompus"""
+    from .exports import due_job_ids, run_job
+
+    results = [run_job(job_id) for job_id in due_job_ids()]
+    return f"Exports: {results.count('completed')} terminé(s), {results.count('failed')} échec(s)"
+
+
+@shared_task
+def purge_export_jobs():
+    """Tâche périodique : supprimer les exports expirés et leurs fichiers (données personnelles)"""
+    from .exports import purge_expired
+
+    return f"Exports: {purge_expired()} job(s) expiré(s) supprimé(s)"
+
+
+def publish_export_job(job_id):
+    """Publier la tâche d'export ; si le broker est indisponible, le balayage prendra le relais"""
+    try:
+        generate_export.delay(job_id)
+    except Exception as e:
+        logger.warning(f"Export: publication impossible pour le job {job_id}: {e}")
+
+
+# ===== ENTRAÎNEMENT DES MODÈLES ML =====
+
+@shared_task
+def train_model(job_id):
+    """Exécuter un TrainingJob hors du worker web"""
+    from .training import run_job
+
+    result = run_job(job_id)
+    return f"Entraînement {job_id}: {result or 'déjà traité'}"
+
+
+@shared_task
+def dispatch_training_jobs():
+    """Tâche périodique : exécuter les entraînements dont la publication s'est perdue"""
+    from .training import due_job_ids, run_job
+
+    results = [run_job(job_id) for job_id in due_job_ids()]
+    return f"Entraînements: {results.count('completed')} terminé(s), {results.count('failed')} échec(s)"
+
+
+@shared_task
+def schedule_model_training():
+    """Tâche périodique : réentraînement hebdomadaire (incrémental) du modèle de remplissage"""
+    from .models import TrainingJob
+    from .predictive_analytics import FILL_RATE_MODEL
+
+    job = TrainingJob.enqueue(FILL_RATE_MODEL, scheduled=True)
+    return f"Entraînement {job.pk} demandé"
+
+
+@shared_task
+def score_upcoming_events():
+    """Tâche de nuit : prédictions par lot de tous les événements à venir (PredictionSnapshot)"""
+    from .predictive_analytics import get_predictive_service
+
+    result = get_predictive_service().score_upcoming_events()
+    if result['status'] != 'success':
+        return f"Prédictions par lot: {result['message']}"
+    return f"Prédictions par lot: {result['scored']} événement(s), modèle {result['model_version']}"
+
+
+@shared_task
+def refresh_trend_snapshots():
+    """
+    Tâche périodique : recalculer les tendances émergentes des fenêtres du
+    tableau de bord. Les instantanés sont écrits dans le cache partagé
+    (settings.CACHES) où les workers web les lisent ; un cache local au
+    worker Celery les rendrait invisibles.
+    """
+    from .predictive_analytics import TREND_WINDOWS, get_predictive_service
+
+    backend = settings.CACHES['default']['BACKEND']
+    if backend.endswith(('LocMemCache', 'DummyCache')):
+        logger.warning(f"Tendances: cache {backend} non partagé, instantanés invisibles des workers web")
+    service = get_predictive_service()
+    refreshed = [days_back for days_back in TREND_WINDOWS if service.refresh_emerging_trends(days_back)]
+    return f"Tendances: {len(refreshed)} fenêtre(s) recalculée(s)"
+
+
+def publish_training_job(job_id):
+    """Publier la tâche d'entraînement ; si le broker est indisponible, le balayage prendra le relais"""
+    try:
+        train_model.delay(job_id)
+    except Exception as e:
+        logger.warning(f"Entraînement: publication impossible pour le job {job_id}: {e}")
+
+
+# ===== EXPORT ANALYTIQUE PARQUET =====
+
+@shared_task
+def export_analytics_dataset(job_id):
+    """Écrire l'export Parquet d'un AnalyticsExportJob (events.columnar)"""
+    from .columnar import run_job
+
+    result = run_job(job_id)
+    return f"Export Parquet {job_id}: {result or 'non exécuté (déjà pris ou export en cours)'}"
+
+
+@shared_task
+def dispatch_analytics_export_jobs():
+    """Tâche périodique : exécuter les exports Parquet dont la publication s'est perdue"""
+    from .columnar import due_job_ids, run_job
+
+    results = [run_job(job_id) for job_id in due_job_ids()]
+    return f"Exports Parquet: {results.count('completed')} terminé(s), {results.count('failed')} échec(s)"
+
+
+def publish_analytics_export_job(job_id):
+    """Publier la tâche d'export Parquet ; si le broker est indisponible, le balayage prendra le relais"""
+    try:
+        export_analytics_dataset.delay(job_id)
+    except Exception as e:
+        logger.warning(f"Export Parquet: publication impossible pour le job {job_id}: {e}")
@@ -0,0 +1,167 @@
+"""
+Séries temporelles des statistiques : un GROUP BY par table sur la date
+tronquée (heure, jour, semaine, mois), quelle que soit la longueur de la
+période, puis complétion des intervalles vides en Python.
+
+Les intervalles sont exprimés en heure locale (TIME_ZONE), comme les
+anciens filtres `registered_at__date`. Le premier intervalle est toujours
+complet : la période commence au début de l'intervalle contenant `start`.
+"""
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+GRANULARITIES = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+DATE_FORMATS = {
+    'hour': '%Y-%m-%dT%H:00',
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',
+    'month': '%Y-%m',
+}
+PAID_REGISTRATIONS = Q(payment_status='paid')
+
+
+def _local(value):
+    """Datetime naïf en heure locale (clé des intervalles)"""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.replace(tzinfo=None)
+
+
+def _aware(value):
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def floor(value, granularity):
+    """Début de l'intervalle contenant `value` (naïf, heure locale)"""
+    value = _local(value).replace(minute=0, second=0, microsecond=0)
+    if granularity == 'hour':
+        return value
+    value = value.replace(hour=0)
+    if granularity == 'week':
+        # Semaines ISO (lundi), comme TruncWeek
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def next_bucket(bucket, granularity):
+    if granularity == 'hour':
+        return bucket + timedelta(hours=1)
+    if granularity == 'day':
+        return bucket + timedelta(days=1)
+    if granularity == 'week':
+        return bucket + timedelta(days=7)
+    if bucket.month == 12:
+        return bucket.replace(year=bucket.year + 1, month=1)
+    return bucket.replace(month=bucket.month + 1)
+
+
+def buckets(start, end, granularity):
+    """Débuts des intervalles couvrant [start, end)"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularité inconnue: {granularity}")
+    result = []
+    bucket = floor(start, granularity)
+    end = _local(end)
+    while bucket < end:
+        result.append(bucket)
+        bucket = next_bucket(bucket, granularity)
+    return result
+
+
+def aggregate(queryset, date_field, start, end, granularity, **aggregates):
+    """
+    {début d'intervalle: {nom: valeur}} en une requête GROUP BY.
+    Les intervalles sans ligne sont absents (voir series() pour la complétion).
+    """
+    trunc = GRANULARITIES[granularity]
+    rows = (
+        queryset.filter(**{
+            f'{date_field}__gte': _aware(floor(start, granularity)),
+            f'{date_field}__lt': _aware(_local(end)),
+        })
+        .annotate(bucket=trunc(date_field))
+        .order_by()
+        .values('bucket')
+        .annotate(**aggregates)
+    )
+    return {_local(row.pop('bucket')): row for row in rows}
+
+
+def series(start, end, granularity='day', registrations=None, events=None, users=None):
+    """
+    Lignes {bucket, date, registrations, revenue, events, users} de `start` à
+    `end` (exclu). Chaque source fournie (queryset d'inscriptions,
+    d'événements, d'utilisateurs) coûte une requête, quel que soit le nombre
+    d'intervalles ; les métriques d'une source absente ne figurent pas dans
+    les lignes.
+    """
+    sources = {}
+    if registrations is not None:
+        sources['registrations'] = aggregate(
+            registrations, 'registered_at', start, end, granularity,
+            registrations=Count('pk'),
+            revenue=Sum('price_paid', filter=PAID_REGISTRATIONS),
+        )
+    if events is not None:
+        sources['events'] = aggregate(events, 'created_at', start, end, granularity, events=Count('pk'))
+    if users is not None:
+        sources['users'] = aggregate(users, 'date_joined', start, end, granularity, users=Count('pk'))
+
+    date_format = DATE_FORMATS[granularity]
+    rows = []
+    for bucket in buckets(start, end, granularity):
+        row = {'bucket': bucket, 'date': bucket.strftime(date_format)}
+        if 'registrations' in sources:
+            values = sources['registrations'].get(bucket, {})
+            row['registrations'] = values.get('registrations', 0)
+            row['revenue'] = float(values.get('revenue') or 0)
+        if 'events' in sources:
+            row['events'] = sources['events'].get(bucket, {}).get('events', 0)
+        if 'users' in sources:
+            row['users'] = sources['users'].get(bucket, {}).get('users', 0)
+        rows.append(row)
+    return rows
+
+
+def last_days(days, now=None):
+    """(début, fin) des `days` jours locaux précédant aujourd'hui"""
+    today = floor(now or timezone.now(), 'day')
+    return today - timedelta(days=days), today
+
+
+def parse_range(params, default_days=30, max_days=366, default_granularity='day'):
+    """
+    Période et granularité depuis les paramètres de requête
+    (`days`, `granularity`, ou `start`/`end` au format AAAA-MM-JJ).
+    Lève ValueError si les paramètres sont invalides.
+    """
+    granularity = params.get('granularity') or default_granularity
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity doit valoir {', '.join(GRANULARITIES)}")
+
+    if params.get('start'):
+        start = datetime.strptime(params['start'], '%Y-%m-%d')
+        end = datetime.strptime(params['end'], '%Y-%m-%d') + timedelta(days=1) if params.get('end') \
+            else floor(timezone.now(), 'day') + timedelta(days=1)
+    else:
+        days = int(params.get('days') or default_days)
+        if days <= 0:
+            raise ValueError("days doit être positif")
+        start, end = last_days(days)
+    if end <= start:
+        raise ValueError("end doit être postérieur à start")
+    if (end - start).days > max_days:
+        raise ValueError(f"Période limitée à {max_days} jours")
+    if granularity == 'hour' and (end - start).days > 31:
+        raise ValueError("Granularité horaire limitée à 31 jours")
+    return start, end, granularity
@@ -0,0 +1,89 @@
+"""
+Entraînement des modèles de machine learning dans Celery (TrainingJob) : le
+worker web ne fait que créer le job, la tâche events.tasks.train_model
+extrait les données, entraîne le modèle et le publie dans le registre
+(events.ml_registry), où les workers web le rechargent au prochain appel.
+"""
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import TrainingJob
+
+logger = logging.getLogger(__name__)
+
+# Intervalle minimal entre deux écritures de l'avancement
+PROGRESS_INTERVAL = 1.0
+
+
+class _Progress:
+    """Reporte l'avancement de l'entraînement sur le job, au plus une écriture par seconde"""
+
+    def __init__(self, job):
+        self.job = job
+        self.saved_at = None
+
+    def __call__(self, stage, done=0, total=0, mode=None):
+        job = self.job
+        if stage == 'extraction':
+            job.processed_rows, job.total_rows = done, total
+        elif stage == 'training':
+            job.built_trees, job.total_trees = done, total
+        if mode:
+            job.mode = mode
+        changed_stage = stage != job.stage
+        job.stage = stage
+        now = timezone.now()
+        if changed_stage or self.saved_at is None or (now - self.saved_at).total_seconds() >= PROGRESS_INTERVAL:
+            job.save(update_fields=['stage', 'mode', 'processed_rows', 'total_rows', 'built_trees', 'total_trees'])
+            self.saved_at = now
+
+
+def run_job(job_id):
+    """
+    Exécuter un TrainingJob en attente. Le passage pending -> running est
+    atomique : un job publié deux fois (tâche + balayage) n'est exécuté
+    qu'une fois. Retourne le statut final, ou None si le job était déjà pris.
+    """
+    from .predictive_analytics import FILL_RATE_MODEL, get_predictive_service
+
+    claimed = TrainingJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    job = TrainingJob.objects.get(pk=job_id)
+
+    if job.model_name != FILL_RATE_MODEL:
+        job.status = 'failed'
+        job.error = f'Modèle inconnu : {job.model_name}'
+    else:
+        result = get_predictive_service().train_fill_rate_predictor(
+            job.force_retrain, progress=_Progress(job), check_age=not job.scheduled
+        )
+        job.result = result
+        if result['status'] == 'error':
+            job.status = 'failed'
+            job.error = result['message']
+        else:
+            job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save()
+    logger.info(f"Entraînement {job_id} ({job.model_name}): {job.status}")
+    return job.status
+
+
+def due_job_ids(delay=timedelta(minutes=1), limit=5):
+    """
+    Jobs en attente dont la publication a pu se perdre (broker indisponible,
+    worker arrêté). Les jobs restés en cours au-delà de la limite de temps des
+    tâches Celery passent d'abord en échec (TrainingJob.fail_stale).
+    """
+    stale = TrainingJob.fail_stale()
+    if stale:
+        logger.warning(f"Entraînements: {stale} job(s) interrompu(s) marqué(s) en échec")
+    return list(
+        TrainingJob.objects.filter(status='pending', created_at__lte=timezone.now() - delay)
+        .order_by('created_at').values_list('pk', flat=True)[:limit]
+    )
@@ -20,9 +20,10 @@ from .admin_views import (
     SuperAdminViewSet, platform_analytics, pending_moderation,
     super_admin_refunds_list, super_admin_process_refund, super_admin_bulk_process_refunds,
     pending_registrations, confirm_registration, reject_registration, bulk_confirm_registrations,
-    predictive_analytics_dashboard, train_ml_models, predict_event_fill_rate,
+    predictive_analytics_dashboard, train_ml_models, training_job_status, predict_event_fill_rate,
     optimize_event_pricing, get_emerging_trends, get_market_analysis, get_predictive_insights,
-    generate_event_content, pending_organizer_approvals, approve_organizer_account, reject_organizer_account
+    generate_event_content, pending_organizer_approvals, approve_organizer_account, reject_organizer_account,
+    analytics_export, analytics_export_job_status, analytics_export_file
 )
 from .streaming_views import (
     create_stream, get_stream_status, update_stream, delete_stream,
@@ -76,6 +77,9 @@ urlpatterns = [
     # Super Admin routes
     path('admin/analytics/', platform_analytics, name='admin_analytics'),
     path('admin/moderation/', pending_moderation, name='admin_moderation'),
+    path('admin/analytics_export/', analytics_export, name='analytics_export'),
+    path('admin/analytics_export/jobs/<int:job_id>/', analytics_export_job_status, name='analytics_export_job_status'),
+    path('admin/analytics_export/<str:table>/<str:month>/', analytics_export_file, name='analytics_export_file'),
     
     # Nouvelles routes Super Admin
     path('admin/global_stats/', views.super_admin_global_stats, name='super_admin_global_stats'),
@@ -107,6 +111,8 @@ urlpatterns = [
     
     # 🆕 NOUVELLES ROUTES POUR LA GESTION DES REMBOURSEMENTS D'ÉVÉNEMENTS ANNULÉS
     path('organizer/events/<int:event_id>/create_missing_refunds/', views.create_missing_refunds_for_cancelled_event, name='create_missing_refunds_for_cancelled_event'),
+    path('organizer/events/<int:event_id>/export_csv/', views.organizer_export_registrations_csv, name='organizer_export_csv'),
+    path('organizer/predictions/', views.organizer_predictions, name='organizer_predictions'),
 
     # Routes pour la gestion des inscriptions en attente
     path('admin/pending_registrations/', pending_registrations, name='pending_registrations'),
@@ -117,6 +123,8 @@ urlpatterns = [
     # Routes pour l'export des inscriptions (Super Admin)
     path('admin/events/<int:event_id>/export_csv/', views.super_admin_export_registrations_csv, name='super_admin_export_csv'),
     path('admin/events/<int:event_id>/export_excel/', views.super_admin_export_registrations_excel, name='super_admin_export_excel'),
+    path('exports/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
     
     # Routes pour la gestion de la liste d'attente (organisateurs)
     path('registrations/<int:registration_id>/approve_waitlist/', views.approve_waitlist_registration, name='approve_waitlist'),
@@ -132,6 +140,7 @@ urlpatterns = [
     # 🎯 ANALYTICS PRÉDICTIFS AVANCÉS
     path('admin/predictive_analytics/', predictive_analytics_dashboard, name='predictive_analytics_dashboard'),
     path('admin/train_ml_models/', train_ml_models, name='train_ml_models'),
+    path('admin/training_jobs/<int:job_id>/', training_job_status, name='training_job_status'),
     path('admin/predict_fill_rate/', predict_event_fill_rate, name='predict_event_fill_rate'),
     path('admin/optimize_pricing/', optimize_event_pricing, name='optimize_event_pricing'),
     path('admin/emerging_trends/', get_emerging_trends, name='get_emerging_trends'),
@@ -3,9 +3,12 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from .permissions import IsSuperAdmin
+from .pagination import EventKeysetPagination, RegistrationKeysetPagination, wants_keyset_pagination
+from .outbox import enqueue_registration_side_effects
+from . import checkin, exports, qr, rollups, snapshots, timeseries
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import connection, transaction
 from django.db.models import Q, Count, Sum, Avg
-from django.db.models.functions import TruncDate
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.conf import settings
@@ -15,26 +18,23 @@ from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.http import HttpResponse
 from django.http import FileResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from django.core.mail import send_mail, EmailMultiAlternatives
 from django.template.loader import render_to_string
-import csv
 import stripe
 import time
 from decimal import Decimal
 
-try:
-    from openpyxl import Workbook
-except Exception:  # pragma: no cover
-    Workbook = None
-
-from .models import Event, Category, Tag, EventRegistration, EventHistory, TicketType, SessionType, RefundRequest, UserProfile, VirtualEvent, VirtualEventInteraction, CustomReminder
+from .models import Event, Category, Tag, EventRegistration, EventHistory, TicketType, SessionType, RefundRequest, UserProfile, VirtualEvent, VirtualEventInteraction, CustomReminder, EventStats, ExportJob, PredictionSnapshot
 from .serializers import (
     EventSerializer, EventListSerializer,
     CategorySerializer, TagSerializer, EventRegistrationSerializer,
     EventRegistrationCreateSerializer, EventHistorySerializer,
     TicketTypeSerializer, SessionTypeSerializer, VirtualEventSerializer, VirtualEventCreateSerializer,
     VirtualEventUpdateSerializer, VirtualEventInteractionSerializer,
-    VirtualEventInteractionCreateSerializer, CustomReminderSerializer, CustomReminderCreateSerializer
+    VirtualEventInteractionCreateSerializer, CustomReminderSerializer, CustomReminderCreateSerializer,
+    PredictionSnapshotSerializer
 )
 from rest_framework.permissions import IsAuthenticated
 
@@ -142,7 +142,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def events(self, request, pk=None):
         """Récupérer tous les événements d'une catégorie"""
         category = self.get_object()
-        events = Event.objects.filter(category=category, status='published')
+        events = Event.objects.filter(category=category, status='published').with_list_stats()
         serializer = EventListSerializer(events, many=True)
         return Response(serializer.data)
 
@@ -161,7 +161,7 @@ class TagViewSet(viewsets.ModelViewSet):
     def events(self, request, pk=None):
         """Récupérer tous les événements avec un tag spécifique"""
         tag = self.get_object()
-        events = Event.objects.filter(tags=tag, status='published')
+        events = Event.objects.filter(tags=tag, status='published').with_list_stats()
         serializer = EventListSerializer(events, many=True)
         return Response(serializer.data)
 
@@ -346,23 +346,24 @@ class VirtualEventInteractionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Compter les interactions par type
-        stats = VirtualEventInteraction.objects.filter(event=event).values('interaction_type').annotate(
-            count=Count('id')
-        )
+        # 🎯 PERF : Lire les compteurs dénormalisés (une ligne EventStats)
+        event_stats = EventStats.objects.filter(event=event).first()
+        if event_stats is None:
+            EventStats.ensure([event.id])
+            event_stats = EventStats.objects.get(event=event)
         
-        # Calculer la note moyenne
-        avg_rating = VirtualEventInteraction.objects.filter(
-            event=event, 
-            interaction_type='rating'
-        ).aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
+        interaction_counts = [
+            {'interaction_type': interaction_type, 'count': getattr(event_stats, field)}
+            for interaction_type, field in EventStats.INTERACTION_TYPE_FIELDS.items()
+            if getattr(event_stats, field)
+        ]
         
         response_data = {
             'event_id': event_id,
             'event_title': event.title,
-            'interaction_counts': list(stats),
-            'average_rating': round(avg_rating, 2),
-            'total_interactions': VirtualEventInteraction.objects.filter(event=event).count()
+            'interaction_counts': interaction_counts,
+            'average_rating': round(event_stats.average_rating, 2),
+            'total_interactions': event_stats.total_interactions
         }
         
         return Response(response_data)
@@ -413,12 +414,14 @@ class EventViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'description', 'location', 'organizer__username']
     ordering_fields = ['start_date', 'end_date', 'created_at', 'price', 'title']
     ordering = ['-start_date']
+    pagination_class = EventKeysetPagination
 
     def get_queryset(self):
         """Filtrer les événements selon l'action et l'utilisateur"""
         if self.action == 'list':
             # Pour la liste publique, ne montrer que les événements publiés
-            return Event.objects.filter(status='published')
+            # 🎯 PERF : compteurs annotés pour éviter les requêtes N+1 du serializer
+            return Event.objects.filter(status='published').with_list_stats()
         elif self.action == 'create':
             # Pour la création, permettre l'accès à tous les événements (nécessaire pour la validation)
             return Event.objects.all()
@@ -481,8 +484,7 @@ class EventViewSet(viewsets.ModelViewSet):
             # Utilisateur non connecté voit seulement les événements publiés
             virtual_events = Event.objects.filter(event_type='virtual', status='published')
         
-        serializer = EventListSerializer(virtual_events, many=True)
-        return Response(serializer.data)
+        return self._event_list_response(virtual_events.with_list_stats())
 
     @action(detail=False, methods=['get'])
     def my_events(self, request):
@@ -498,11 +500,8 @@ class EventViewSet(viewsets.ModelViewSet):
         
         # Utiliser EventSerializer pour avoir les interactions détaillées
         if hasattr(request.user, 'profile') and request.user.profile.role == 'organizer':
-            serializer = EventSerializer(my_events, many=True)
-        else:
-            serializer = EventListSerializer(my_events, many=True)
-        
-        return Response(serializer.data)
+            return self._event_list_response(my_events.with_detail(), EventSerializer)
+        return self._event_list_response(my_events.with_list_stats())
 
     @action(detail=False, methods=['get'])
     def physical_events(self, request):
@@ -523,8 +522,7 @@ class EventViewSet(viewsets.ModelViewSet):
             # Utilisateur non connecté voit seulement les événements publiés
             physical_events = Event.objects.filter(event_type='physical', status='published')
         
-        serializer = EventListSerializer(physical_events, many=True)
-        return Response(serializer.data)
+        return self._event_list_response(physical_events.with_list_stats())
 
     @action(detail=True, methods=['get'])
     def virtual_details(self, request, pk=None):
@@ -601,16 +599,41 @@ class EventViewSet(viewsets.ModelViewSet):
         event = self.get_object()
         # 🎯 CORRECTION : Inclure les inscriptions confirmées ET en liste d'attente
         participants = event.registrations.filter(status__in=['confirmed', 'attended', 'waitlisted'])
-        serializer = EventRegistrationSerializer(participants, many=True)
         
-        print(f"🔍 DEBUG: participants - Event: {event.title}, Count: {participants.count()}")
-        for p in participants:
-            if p.is_guest_registration:
-                print(f"🔍 DEBUG: Guest participant - Name: {p.guest_full_name}, Email: {p.guest_email}, Status: {p.status}")
-            else:
-                print(f"🔍 DEBUG: User participant - User: {p.user.username}, Status: {p.status}")
+        print(f"🔍 DEBUG: participants - Event: {event.title}")
         
-        return Response(serializer.data)
+        return self._paginated_registrations(participants)
+
+    @action(detail=True, methods=['get'])
+    def checkin_manifest(self, request, pk=None):
+        """
+        Manifeste hors ligne des billets valides (empreintes triées, billet, session)
+        pour les scanners sans connexion (pour l'organisateur)
+        """
+        event = self.get_object()
+        if event.organizer != request.user and not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        return Response(checkin.build_manifest(event))
+
+    @action(detail=True, methods=['post'])
+    def bulk_checkin(self, request, pk=None):
+        """
+        Synchroniser les scans d'un poste hors ligne. Body: { tokens: [...] }
+        Les présences sont appliquées en un seul UPDATE ; renvoyer le même lot est sans effet.
+        """
+        event = self.get_object()
+        if event.organizer != request.user and not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+
+        tokens = request.data.get('tokens')
+        if not isinstance(tokens, list) or not tokens:
+            return Response({'error': 'Liste de jetons requise'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(tokens) > checkin.MAX_SYNC_SCANS:
+            return Response(
+                {'error': f'Au plus {checkin.MAX_SYNC_SCANS} scans par lot'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(checkin.bulk_check_in(event.pk, tokens))
 
     @action(detail=True, methods=['get'])
     def waitlisted_registrations(self, request, pk=None):
@@ -639,12 +662,27 @@ class EventViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Accès non autorisé'}, status=403)
         
         # Récupérer toutes les inscriptions avec statuts
-        all_registrations = event.registrations.all().order_by('-created_at')
-        serializer = EventRegistrationSerializer(all_registrations, many=True)
+        all_registrations = event.registrations.all().order_by('-registered_at')
         
-        print(f"🔍 DEBUG: all_registrations - Event: {event.title}, Count: {all_registrations.count()}")
+        print(f"🔍 DEBUG: all_registrations - Event: {event.title}")
         
-        return Response(serializer.data)
+        return self._paginated_registrations(all_registrations)
+
+    def _event_list_response(self, events, serializer_class=EventListSerializer):
+        """Liste complète, ou une page keyset si la requête passe `cursor` / `page_size`"""
+        page = self.paginate_queryset(events)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page, many=True).data)
+        return Response(serializer_class(events, many=True).data)
+
+    def _paginated_registrations(self, registrations):
+        """Inscriptions : liste complète, ou une page keyset (registered_at, id) si demandée"""
+        registrations = registrations.select_related('user', 'user__profile', 'event', 'ticket_type', 'session_type')
+        paginator = RegistrationKeysetPagination()
+        page = paginator.paginate_queryset(registrations, self.request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(EventRegistrationSerializer(page, many=True).data)
+        return Response(EventRegistrationSerializer(registrations, many=True).data)
 
     @action(detail=False, methods=['get'])
     def statistics(self, request):
@@ -653,6 +691,19 @@ class EventViewSet(viewsets.ModelViewSet):
         
         print(f"🔍 DEBUG: statistics - User: {user.username}")
         
+        try:
+            start, end, granularity = timeseries.parse_range(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 🎯 Instantané par organisateur et période, recalculé en arrière-plan une fois périmé
+        snapshot = snapshots.get(
+            f"statistics:{user.pk}:{start:%Y%m%d%H}:{end:%Y%m%d%H}:{granularity}",
+            lambda: self._statistics_data(user, start, end, granularity),
+        )
+        return snapshots.response(snapshot)
+
+    def _statistics_data(self, user, start, end, granularity):
         # Récupérer les événements de l'utilisateur
         user_events = Event.objects.filter(organizer=user)
         total_events = user_events.count()
@@ -660,7 +711,7 @@ class EventViewSet(viewsets.ModelViewSet):
         print(f"🔍 DEBUG: statistics - Total events: {total_events}")
         
         if total_events == 0:
-            return Response({
+            return {
                 'total_events': 0,
                 'published_events': 0,
                 'total_registrations': 0,
@@ -670,7 +721,7 @@ class EventViewSet(viewsets.ModelViewSet):
                 'status_distribution': {},
                 'category_distribution': {},
                 'timeseries': []
-            })
+            }
         
         # Statistiques de base
         published_events = user_events.filter(status='published').count()
@@ -716,34 +767,15 @@ class EventViewSet(viewsets.ModelViewSet):
             category_name = stat['category__name'] or 'Sans catégorie'
             category_distribution[category_name] = stat['count']
         
-        # Données de série temporelle (30 derniers jours)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        timeseries = []
-        
-        for i in range(30):
-            date = thirty_days_ago + timedelta(days=i)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            # Inscriptions pour ce jour
-            daily_registrations = user_registrations.filter(
-                registered_at__date=date.date()
-            ).count()
-            
-            # Revenus pour ce jour
-            daily_revenue = user_registrations.filter(
-                registered_at__date=date.date(),
-                payment_status='paid'
-            ).aggregate(total=Sum('price_paid'))['total'] or 0
-            
-            timeseries.append({
-                'date': date_str,
-                'registrations': daily_registrations,
-                'revenue': float(daily_revenue)
-            })
+        # Série temporelle (30 derniers jours par défaut) : une requête GROUP BY
+        timeseries_data = [
+            {'date': row['date'], 'registrations': row['registrations'], 'revenue': row['revenue']}
+            for row in timeseries.series(start, end, granularity, registrations=user_registrations)
+        ]
         
         print(f"🔍 DEBUG: statistics - Response data prepared")
         
-        return Response({
+        return {
             'total_events': total_events,
             'published_events': published_events,
             'total_registrations': total_registrations,
@@ -753,8 +785,8 @@ class EventViewSet(viewsets.ModelViewSet):
             'ongoing_events': ongoing_events,
             'status_distribution': status_distribution,
             'category_distribution': category_distribution,
-            'timeseries': timeseries
-        })
+            'timeseries': timeseries_data
+        }
 
     @action(detail=True, methods=['post'], permission_classes=[])
     def create_temp_payment_intent(self, request, pk=None):
@@ -1050,6 +1082,7 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status', 'event']
     ordering_fields = ['registered_at', 'updated_at']
     ordering = ['-registered_at']
+    pagination_class = RegistrationKeysetPagination
 
     def create(self, request, *args, **kwargs):
         # 🎯 NOUVEAU : Logs de débogage pour la vue
@@ -1080,7 +1113,12 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
             validated_data['status'] = 'pending'
             validated_data['payment_status'] = 'pending'
         
-        registration = serializer.save()
+        # 🎯 PERF : Outbox transactionnelle - l'inscription et ses effets de bord (email,
+        # SMS, QR) sont écrits dans la même transaction ; la livraison est faite par
+        # Celery après le COMMIT, la réponse HTTP n'attend ni SMTP ni Twilio.
+        with transaction.atomic():
+            registration = serializer.save()
+            enqueue_registration_side_effects(registration, request.build_absolute_uri('/'))
 
         # 🔍 LOG CRITIQUE: Vérifier si le stream se lance automatiquement lors de la création
         import logging
@@ -1102,136 +1140,6 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
         except Exception:
             pass
 
-        # 🎯 NOUVEAU : Envoyer confirmation pour TOUTES les inscriptions (gratuites ET payantes)
-        # Envoyer SMS immédiatement après création de l'inscription
-        try:
-            from .sms_service import sms_service
-            print(f"🔍 DEBUG: ===== DÉBUT ENVOI SMS UNIVERSEL =====")
-            print(f"🔍 DEBUG: Inscription ID: {registration.id}")
-            print(f"🔍 DEBUG: Statut: {registration.status}")
-            print(f"🔍 DEBUG: Prix payé: {registration.price_paid}")
-            print(f"🔍 DEBUG: Événement payant: {registration.event.price > 0}")
-            print(f"🔍 DEBUG: Type d'inscription: {'Utilisateur connecté' if registration.user else 'Invité'}")
-            
-            sms_sent = sms_service.send_confirmation_sms(registration)
-            
-            if sms_sent:
-                print(f"🔍 DEBUG: ✅ SMS envoyé avec succès pour l'inscription {registration.id}")
-            else:
-                print(f"🔍 DEBUG: ❌ Échec envoi SMS pour l'inscription {registration.id}")
-            print(f"🔍 DEBUG: ===== FIN ENVOI SMS UNIVERSEL =====")
-        except Exception as e:
-            print(f"🔍 DEBUG: Erreur envoi SMS universel: {e}")
-
-        # Envoyer confirmation EMAIL pour toutes les inscriptions (confirmées ET en liste d'attente)
-        if (registration.price_paid or 0) == 0:
-            try:
-                qr_url = None
-                if registration.qr_code:
-                    qr_url = request.build_absolute_uri(registration.qr_code.url)
-                
-                # 🎯 CORRECTION : Déterminer l'email du destinataire (utilisateur ou invité)
-                recipient_email = None
-                if registration.user:
-                    recipient_email = registration.user.email
-                elif registration.guest_email:
-                    recipient_email = registration.guest_email
-                
-                if recipient_email:
-                    # 🎯 CORRECTION : Préparer le contexte selon le type d'inscription
-                    if registration.user:
-                        # Utilisateur connecté
-                        context = {
-                            'user': registration.user,
-                            'event': registration.event,
-                            'qr_url': qr_url,
-                            'registration': registration,
-                            'ticket_type': getattr(registration, 'ticket_type', None),
-                            'session_type': getattr(registration, 'session_type', None),
-                        }
-                        # Adapter le sujet et le template selon le statut
-                        if registration.status == 'confirmed':
-                            subject = f"Confirmation d'inscription - {registration.event.title}"
-                            text_body = render_to_string('emails/registration_confirmation.txt', context)
-                            html_body = render_to_string('emails/registration_confirmation.html', context)
-                        elif registration.status == 'waitlisted':
-                            subject = f"Inscription en liste d'attente - {registration.event.title}"
-                            text_body = render_to_string('emails/registration_waitlisted.txt', context)
-                            html_body = render_to_string('emails/registration_waitlisted.html', context)
-                        else:
-                            subject = f"Inscription en attente - {registration.event.title}"
-                            text_body = render_to_string('emails/registration_pending.txt', context)
-                            html_body = render_to_string('emails/registration_pending.html', context)
-                    else:
-                        # Invité
-                        context = {
-                            'guest_full_name': registration.guest_full_name,
-                            'event': registration.event,
-                            'qr_url': qr_url,
-                            'registration': registration,
-                            'ticket_type': getattr(registration, 'ticket_type', None),
-                            'session_type': getattr(registration, 'session_type', None),
-                        }
-                        # Adapter le sujet et le template selon le statut
-                        if registration.status == 'confirmed':
-                            subject = f"Confirmation d'inscription - {registration.event.title}"
-                            text_body = render_to_string('emails/guest_registration_confirmation.txt', context)
-                            html_body = render_to_string('emails/guest_registration_confirmation.html', context)
-                        elif registration.status == 'waitlisted':
-                            subject = f"Inscription en liste d'attente - {registration.event.title}"
-                            text_body = render_to_string('emails/guest_registration_waitlisted.txt', context)
-                            html_body = render_to_string('emails/guest_registration_waitlisted.html', context)
-                        else:
-                            subject = f"Inscription en attente - {registration.event.title}"
-                            text_body = render_to_string('emails/guest_registration_pending.txt', context)
-                            html_body = render_to_string('emails/guest_registration_pending.html', context)
-                    
-                    msg = EmailMultiAlternatives(subject, text_body, getattr(settings, 'DEFAULT_FROM_EMAIL', None), [recipient_email])
-                    msg.attach_alternative(html_body, 'text/html')
-                    
-                    # Attacher le QR code si disponible
-                    if registration.qr_code and hasattr(registration.qr_code, 'path'):
-                        try:
-                            with open(registration.qr_code.path, 'rb') as f:
-                                img_data = f.read()
-                            from email.mime.image import MIMEImage
-                            img = MIMEImage(img_data)
-                            img.add_header('Content-ID', '<qr_cid>')
-                            img.add_header('Content-Disposition', 'inline', filename='qr.png')
-                            msg.attach(img)
-                        except Exception:
-                            pass
-                    
-                    msg.send(fail_silently=True)
-                    print(f"🔍 DEBUG: Email de confirmation envoyé à {recipient_email} pour l'inscription {registration.id}")
-                    
-                    # 🎯 NOUVEAU : Envoyer le SMS de confirmation avec logs détaillés
-                    try:
-                        from .sms_service import sms_service
-                        print(f"🔍 DEBUG: ===== DÉBUT ENVOI SMS =====")
-                        print(f"🔍 DEBUG: Inscription ID: {registration.id}")
-                        print(f"🔍 DEBUG: Statut: {registration.status}")
-                        print(f"🔍 DEBUG: Email: {registration.guest_email}")
-                        print(f"🔍 DEBUG: Téléphone: {registration.guest_phone}")
-                        print(f"🔍 DEBUG: Pays: {registration.guest_country}")
-                        print(f"🔍 DEBUG: Twilio activé: {sms_service.providers['twilio']['enabled']}")
-                        print(f"🔍 DEBUG: Numéro Twilio: {sms_service.providers['twilio']['from_number']}")
-                        
-                        sms_sent = sms_service.send_confirmation_sms(registration)
-                        
-                        if sms_sent:
-                            print(f"🔍 DEBUG: ✅ SMS envoyé avec succès pour l'inscription {registration.id}")
-                        else:
-                            print(f"🔍 DEBUG: ❌ Échec envoi SMS pour l'inscription {registration.id}")
-                        print(f"🔍 DEBUG: ===== FIN ENVOI SMS =====")
-                    except Exception as e:
-                        print(f"🔍 DEBUG: Erreur envoi SMS: {e}")
-                else:
-                    print(f"🔍 DEBUG: Aucun email trouvé pour l'inscription {registration.id} (user: {registration.user}, guest: {registration.guest_email})")
-            except Exception as e:
-                print(f"🔍 DEBUG: Erreur envoi email de confirmation: {e}")
-                pass
-
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
@@ -1278,7 +1186,6 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
             )
         
         event = registration.event
-        previous_status = registration.status
         
         # 💰 NOUVEAU: Créer automatiquement une demande de remboursement si payée OU en attente de paiement OU avec un prix défini
         refund_request = None
@@ -1349,33 +1256,19 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
                 print(f"❌ Erreur création demande remboursement: {e}")
                 import traceback
                 traceback.print_exc()
+        # 🎯 La place est libérée atomiquement par EventRegistration.save()
         registration.status = 'cancelled'
         registration.save()
-        
-        # Mettre à jour le compteur d'inscriptions de l'événement
-        event = registration.event
-        if previous_status in ['confirmed', 'attended']:
-            event.current_registrations = max(0, event.current_registrations - 1)
-            event.save(update_fields=['current_registrations'])
-
-        # Diminuer le compteur de tickets vendus
-        if registration.ticket_type and previous_status in ['confirmed', 'attended']:
-            tt = registration.ticket_type
-            tt.sold_count = max(0, tt.sold_count - 1)
-            tt.save(update_fields=['sold_count'])
+        event.refresh_from_db(fields=['current_registrations'])
 
         # Promouvoir le premier en liste d'attente s'il existe
         waitlisted = EventRegistration.objects.filter(event=event, status='waitlisted').order_by('registered_at').first()
         if waitlisted and (event.place_type == 'unlimited' or (event.max_capacity or 0) > event.current_registrations):
             # Vérifier la disponibilité du type de billet
             if not waitlisted.ticket_type or waitlisted.ticket_type.quantity is None or waitlisted.ticket_type.sold_count < waitlisted.ticket_type.quantity:
+                # La réservation atomique laisse l'inscription en liste d'attente si la place a été prise entre-temps
                 waitlisted.status = 'confirmed'
-                # 🎯 CORRECTION : Les compteurs sont gérés par EventRegistration.save()
                 waitlisted.save()
-                if waitlisted.ticket_type:
-                    tt = waitlisted.ticket_type
-                    tt.sold_count = tt.sold_count + 1
-                    tt.save(update_fields=['sold_count'])
         
         # Notifier l'utilisateur de l'annulation de son billet
         try:
@@ -1439,12 +1332,10 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
                 return Response({"error": "Plus de billets disponibles pour ce type"}, status=status.HTTP_400_BAD_REQUEST)
 
             registration.status = 'confirmed'
-            # 🎯 CORRECTION : Les compteurs sont gérés par EventRegistration.save()
+            # 🎯 Réservation atomique dans EventRegistration.save()
             registration.save()
-            if registration.ticket_type:
-                tt = registration.ticket_type
-                tt.sold_count = tt.sold_count + 1
-                tt.save(update_fields=['sold_count'])
+            if registration.status != 'confirmed':
+                return Response({"error": "Capacité maximale atteinte"}, status=status.HTTP_400_BAD_REQUEST)
         return Response(self.get_serializer(registration).data)
 
     @action(detail=True, methods=['post'])
@@ -1519,7 +1410,7 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
             # Approuver l'inscription
             print(f"APPROVE DEBUG: All checks passed, approving registration...")
             registration.status = 'confirmed'
-            registration.save()
+            registration.save(allow_overbooking=True)
             print(f"APPROVE DEBUG: Registration status updated to 'confirmed'")
             
             # Forcer la régénération du QR code si nécessaire
@@ -1531,11 +1422,6 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
             
             # 🎯 CORRECTION : Les compteurs sont gérés par EventRegistration.save()
             
-            if registration.ticket_type:
-                tt = registration.ticket_type
-                tt.sold_count = tt.sold_count + 1
-                tt.save(update_fields=['sold_count'])
-            
             # Envoyer l'email de confirmation avec QR code
             try:
                 qr_url = None
@@ -1972,13 +1858,41 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def qr(self, request, pk=None):
-        """Retourner l'URL du QR code pour l'inscription confirmée"""
+        """
+        Retourner l'URL du QR code pour l'inscription confirmée.
+        Avec ?image=png ou ?image=svg, l'image est servie directement. Le
+        navigateur revalide l'image par ETag à chaque affichage ; une URL qui
+        porte la version courante (&v=<qr_version>) est mise en cache
+        longue durée, une réémission du billet changeant l'URL.
+        """
         registration = self.get_object()
         if registration.user != request.user and registration.event.organizer != request.user:
             return Response({"error": "Non autorisé"}, status=status.HTTP_403_FORBIDDEN)
-        if registration.qr_code:
-            return Response({"qr_code": request.build_absolute_uri(registration.qr_code.url)})
-        return Response({"qr_code": None})
+
+        image_format = request.query_params.get('image')
+        if image_format is None:
+            if qr.ensure_file(registration):
+                return Response({"qr_code": request.build_absolute_uri(registration.qr_code.url)})
+            return Response({"qr_code": None})
+
+        if image_format not in qr.CONTENT_TYPES:
+            return Response({"error": "Format invalide (png ou svg)"}, status=status.HTTP_400_BAD_REQUEST)
+        if not qr.is_eligible(registration):
+            return Response({"error": "Aucun QR code pour cette inscription"}, status=status.HTTP_404_NOT_FOUND)
+
+        # L'image ne dépend que du jeton et de sa version : l'ETag est stable tant qu'ils ne changent pas
+        etag = f'"{registration.qr_token}-{registration.qr_version}-{image_format}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(qr.get_image(registration, image_format), content_type=qr.CONTENT_TYPES[image_format])
+        response['ETag'] = etag
+        if request.query_params.get('v') == str(registration.qr_version):
+            patch_cache_control(response, private=True, max_age=qr.QR_CACHE_TIMEOUT, immutable=True)
+        else:
+            # URL sans version : un billet révoqué puis réémis doit être revalidé
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     @action(detail=True, methods=['post'])
     def create_payment_intent(self, request, pk=None):
@@ -2152,17 +2066,9 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
                     registration.status = 'waitlisted'
                 else:
                     # Billet disponible - confirmer l'inscription
+                    # (sold_count est réservé atomiquement par EventRegistration.save())
                     print(f"🔍 DEBUG: Custom ticket available - confirming registration")
                     registration.status = 'confirmed'
-                    
-                    # Mettre à jour SEULEMENT le compteur du billet personnalisé
-                    tt = registration.ticket_type
-                    tt.sold_count = tt.sold_count + 1
-                    tt.save(update_fields=['sold_count'])
-                    print(f"🔍 DEBUG: Updated custom ticket sold count to: {tt.sold_count}")
-                    
-                    # NE PAS toucher au compteur global de l'événement
-                    print(f"🔍 DEBUG: Custom ticket - NOT updating global event counter")
             else:
                 # 🎯 BILLET PAR DÉFAUT : Vérifier la capacité globale de l'événement
                 # Compter seulement les billets par défaut confirmés
@@ -2396,15 +2302,12 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
                 if registration.ticket_type and registration.ticket_type.quantity is not None:
                     ticket_ok = registration.ticket_type.sold_count < registration.ticket_type.quantity
 
-                if capacity_ok and ticket_ok:
-                    registration.status = 'confirmed'
-                    registration.save(update_fields=['payment_status', 'payment_provider', 'payment_reference', 'price_paid', 'status', 'updated_at'])
-                    # 🎯 CORRECTION : Les compteurs sont gérés par EventRegistration.save()
-                    if registration.ticket_type:
-                        tt = registration.ticket_type
-                        tt.sold_count = tt.sold_count + 1
-                        tt.save(update_fields=['sold_count'])
-                    
+                registration.status = 'confirmed' if capacity_ok and ticket_ok else 'waitlisted'
+                # 🎯 La place est réservée atomiquement par EventRegistration.save(),
+                # qui bascule l'inscription en liste d'attente si le contingent est épuisé
+                registration.save(update_fields=['payment_status', 'payment_provider', 'payment_reference', 'price_paid', 'status', 'updated_at'])
+
+                if registration.status == 'confirmed':
                     # Générer le QR code pour les inscriptions confirmées
                     try:
                         registration._generate_and_store_qr()
@@ -2508,9 +2411,7 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
                         print(f"Erreur envoi email: {email_error}")
                         
                 else:
-                    # Paiement OK mais mettre en liste d'attente si pas de capacité
-                    registration.status = 'waitlisted'
-                    registration.save(update_fields=['payment_status', 'payment_provider', 'payment_reference', 'price_paid', 'status', 'updated_at'])
+                    # Paiement OK mais mis en liste d'attente faute de capacité
                     
                     # Envoyer l'email de liste d'attente
                     try:
@@ -2593,7 +2494,12 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
         mark_attended = bool(request.data.get('mark_attended', True))
         if not token:
             return Response({"valid": False, "error": "Token manquant"}, status=status.HTTP_400_BAD_REQUEST)
-        
+
+        # 🎯 PERF : QR signé -> validation sans lecture en base, présence écrite par lot
+        if qr.is_signed_token(token):
+            data, http_status = checkin.scan_signed_token(token, request.user, mark_attended)
+            return Response(data, status=http_status)
+
         # 🎯 CORRECTION : Extraire le token QR du format complet
         print(f"🔍 DEBUG: Token reçu: {token}")
         if '|' in token:
@@ -2664,9 +2570,11 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
         registrations = self.get_queryset().filter(
             event__start_date__gt=timezone.now(),
             status__in=['pending', 'confirmed']
-        )
-        serializer = self.get_serializer(registrations, many=True)
-        return Response(serializer.data)
+        ).select_related('user', 'user__profile', 'event', 'ticket_type', 'session_type')
+        page = self.paginate_queryset(registrations)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(registrations, many=True).data)
 
 
 @api_view(['GET'])
@@ -2684,7 +2592,12 @@ def verify_qr_endpoint(request):
     
     if not token:
         return Response({"valid": False, "error": "Token manquant"}, status=status.HTTP_400_BAD_REQUEST)
-    
+
+    # 🎯 PERF : QR signé -> validation sans lecture en base, présence écrite par lot
+    if qr.is_signed_token(token):
+        data, http_status = checkin.scan_signed_token(token, request.user, mark_attended)
+        return Response(data, status=http_status)
+
     try:
         registration = EventRegistration.objects.select_related('event', 'user').get(qr_token=token)
     except EventRegistration.DoesNotExist:
@@ -3451,13 +3364,17 @@ def super_admin_dashboard_stats(request):
     if not IsSuperAdmin().has_permission(request, None):
         return Response({'error': 'Accès réservé aux Super Administrateurs'}, status=403)
     
+    return snapshots.response(snapshots.get('admin:dashboard_stats', _dashboard_stats_data))
+
+
+def _dashboard_stats_data():
+    """Calcul de l'instantané de super_admin_dashboard_stats"""
     # Statistiques des utilisateurs
     total_users = User.objects.count()
     total_organizers = UserProfile.objects.filter(role='organizer').count()
     total_participants = UserProfile.objects.filter(role='participant').count()
-    new_users_this_month = User.objects.filter(
-        date_joined__gte=timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    ).count()
+    today = timezone.localdate()
+    new_users_this_month = rollups.totals(first=today.replace(day=1))['new_users']
     
     # Statistiques des événements
     total_events = Event.objects.count()
@@ -3465,46 +3382,41 @@ def super_admin_dashboard_stats(request):
     draft_events = Event.objects.filter(status='draft').count()
     cancelled_events = Event.objects.filter(status='cancelled').count()
     
-    # Statistiques des inscriptions
-    total_registrations = EventRegistration.objects.count()
-    confirmed_registrations = EventRegistration.objects.filter(status='confirmed').count()
-    waitlisted_registrations = EventRegistration.objects.filter(status='waitlisted').count()
-    
-    # Statistiques financières
-    total_revenue = EventRegistration.objects.filter(
-        status='confirmed',
-        price_paid__isnull=False
-    ).aggregate(total=Sum('price_paid'))['total'] or 0
+    # Statistiques des inscriptions et financières : agrégats quotidiens
+    platform = rollups.totals()
+    total_registrations = platform['registrations']
+    confirmed_registrations = platform['confirmed_count']
+    waitlisted_registrations = platform['waitlisted_count']
+    total_revenue = platform['paid_revenue']
     
     # Événements par mois (6 derniers mois)
-    six_months_ago = timezone.now() - timedelta(days=180)
-    events_by_month = Event.objects.filter(
-        created_at__gte=six_months_ago
-    ).annotate(
-        month=TruncDate('created_at', 'month')
-    ).values('month').annotate(
-        count=Count('id')
-    ).order_by('month')
+    events_by_month = [
+        {'month': row['month'], 'count': row['new_events']}
+        for row in rollups.monthly(today - timedelta(days=180), today)
+    ]
     
     # Top organisateurs
-    top_organizers = User.objects.filter(
-        events__isnull=False
+    top_organizers = list(User.objects.filter(
+        events_organized__isnull=False
     ).annotate(
-        event_count=Count('events')
-    ).order_by('-event_count')[:10]
+        event_count=Count('events_organized')
+    ).order_by('-event_count')[:10])
+    registrations_by_organizer = {
+        row['organizer_id']: row
+        for row in rollups.by_key('organizer_id', organizer_id__in=[user.pk for user in top_organizers])
+    }
     
     organizer_stats = []
     for user in top_organizers:
+        totals = registrations_by_organizer.get(user.pk)
         organizer_stats.append({
             'username': user.username,
             'email': user.email,
             'event_count': user.event_count,
-            'total_registrations': EventRegistration.objects.filter(
-                event__organizer=user
-            ).count()
+            'total_registrations': rollups.registrations(totals) if totals else 0
         })
     
-    return Response({
+    return {
         'users': {
             'total': total_users,
             'organizers': total_organizers,
@@ -3529,7 +3441,7 @@ def super_admin_dashboard_stats(request):
             'events_by_month': list(events_by_month),
             'top_organizers': organizer_stats
         }
-    })
+    }
 
 
 @api_view(['GET'])
@@ -3686,14 +3598,26 @@ def super_admin_events_list(request):
             Q(location__icontains=search_query)
         )
     
-    # Pagination
-    page = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('page_size', 20))
-    start = (page - 1) * page_size
-    end = start + page_size
+    events = events.annotate(
+        confirmed_participants=Count('registrations', filter=Q(registrations__status='confirmed')),
+        confirmed_revenue=Sum('registrations__price_paid', filter=Q(registrations__status='confirmed'))
+    )
     
-    total_events = events.count()
-    events_page = events[start:end]
+    # Pagination : keyset (start_date, id) par défaut, numéro de page si `page` est fourni
+    keyset_paginator = None
+    if wants_keyset_pagination(request):
+        keyset_paginator = EventKeysetPagination()
+        keyset_paginator.opt_in = False
+        keyset_paginator.page_size = 20
+        events_page = keyset_paginator.paginate_queryset(events, request)
+    else:
+        page = int(request.query_params.get('page', 1))
+        page_size = int(request.query_params.get('page_size', 20))
+        start = (page - 1) * page_size
+        end = start + page_size
+        
+        total_events = events.count()
+        events_page = events[start:end]
     
     event_data = []
     for event in events_page:
@@ -3710,19 +3634,22 @@ def super_admin_events_list(request):
             'start_date': event.start_date,
             'end_date': event.end_date,
             'location': event.location,
-            'max_participants': event.max_participants,
-            'current_participants': EventRegistration.objects.filter(
-                event=event, 
-                status='confirmed'
-            ).count(),
-            'revenue': float(EventRegistration.objects.filter(
-                event=event,
-                status='confirmed',
-                price_paid__isnull=False
-            ).aggregate(total=Sum('price_paid'))['total'] or 0),
+            'max_participants': event.max_capacity,
+            'current_participants': event.confirmed_participants,
+            'revenue': float(event.confirmed_revenue or 0),
             'created_at': event.created_at
         })
     
+    if keyset_paginator is not None:
+        return Response({
+            'events': event_data,
+            'pagination': {
+                'page_size': keyset_paginator.page_size,
+                'next': keyset_paginator.get_next_link(),
+                'previous': keyset_paginator.get_previous_link()
+            }
+        })
+    
     return Response({
         'events': event_data,
         'pagination': {
@@ -3871,48 +3798,43 @@ def super_admin_financial_report(request):
     
     # Période
     period = request.query_params.get('period', 'month')
-    if period == 'week':
-        start_date = timezone.now() - timedelta(days=7)
-    elif period == 'month':
-        start_date = timezone.now() - timedelta(days=30)
-    elif period == 'year':
-        start_date = timezone.now() - timedelta(days=365)
-    else:
-        start_date = timezone.now() - timedelta(days=30)
+    days = {'week': 7, 'month': 30, 'year': 365}.get(period, 30)
+    first, last = rollups.last_days(days)
     
-    # Revenus par période
-    revenue_by_date = EventRegistration.objects.filter(
-        status='confirmed',
-        price_paid__isnull=False,
-        created_at__gte=start_date
-    ).annotate(
-        date=TruncDate('created_at', 'day')
-    ).values('date').annotate(
-        revenue=Sum('price_paid'),
-        count=Count('id')
-    ).order_by('date')
+    # Revenus par jour, par organisateur et par catégorie : agrégats quotidiens
+    revenue_by_date = [
+        {'date': row['day'], 'revenue': row['paid_revenue'], 'count': row['paid_count']}
+        for row in rollups.daily(first, last)
+        if row['paid_count']
+    ]
     
-    # Revenus par organisateur
-    revenue_by_organizer = EventRegistration.objects.filter(
-        status='confirmed',
-        price_paid__isnull=False,
-        created_at__gte=start_date
-    ).values('event__organizer__username').annotate(
-        revenue=Sum('price_paid'),
-        event_count=Count('event', distinct=True),
-        registration_count=Count('id')
-    ).order_by('-revenue')
+    by_organizer = rollups.revenue_breakdown('organizer', first, last)
+    usernames = dict(
+        User.objects.filter(pk__in=[row['organizer_id'] for row in by_organizer]).values_list('pk', 'username')
+    )
+    revenue_by_organizer = [
+        {
+            'event__organizer__username': usernames.get(row['organizer_id']),
+            'revenue': row['paid_revenue'],
+            'event_count': row['event_count'],
+            'registration_count': row['paid_count'],
+        }
+        for row in by_organizer
+    ]
     
-    # Revenus par catégorie
-    revenue_by_category = EventRegistration.objects.filter(
-        status='confirmed',
-        price_paid__isnull=False,
-        created_at__gte=start_date
-    ).values('event__category__name').annotate(
-        revenue=Sum('price_paid'),
-        event_count=Count('event', distinct=True),
-        registration_count=Count('id')
-    ).order_by('-revenue')
+    by_category = rollups.revenue_breakdown('category', first, last)
+    category_names = dict(
+        Category.objects.filter(pk__in=[row['category_id'] for row in by_category]).values_list('pk', 'name')
+    )
+    revenue_by_category = [
+        {
+            'event__category__name': category_names.get(row['category_id']),
+            'revenue': row['paid_revenue'],
+            'event_count': row['event_count'],
+            'registration_count': row['paid_count'],
+        }
+        for row in by_category
+    ]
     
     # Statistiques globales
     total_revenue = sum(item['revenue'] for item in revenue_by_date)
@@ -3921,7 +3843,7 @@ def super_admin_financial_report(request):
     
     return Response({
         'period': {
-            'start_date': start_date,
+            'start_date': rollups.day_start(first),
             'end_date': timezone.now()
         },
         'summary': {
@@ -3929,12 +3851,16 @@ def super_admin_financial_report(request):
             'total_registrations': total_registrations,
             'avg_ticket_price': float(avg_ticket_price)
         },
-        'revenue_by_date': list(revenue_by_date),
-        'revenue_by_organizer': list(revenue_by_organizer),
-        'revenue_by_category': list(revenue_by_category)
+        'revenue_by_date': revenue_by_date,
+        'revenue_by_organizer': revenue_by_organizer,
+        'revenue_by_category': revenue_by_category
     })
 
 
+# Comptages de la page santé : instantané court, les vérifications ne sont jamais mises en cache
+SYSTEM_HEALTH_SNAPSHOT_TTL = 15
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsSuperAdmin])
 def super_admin_system_health(request):
@@ -3944,6 +3870,15 @@ def super_admin_system_health(request):
     if not IsSuperAdmin().has_permission(request, None):
         return Response({'error': 'Accès réservé aux Super Administrateurs'}, status=403)
     
+    # Vérifications calculées à chaque appel : seules les statistiques viennent de l'instantané
+    snapshot = snapshots.get('admin:system_stats', _system_stats_data, ttl=SYSTEM_HEALTH_SNAPSHOT_TTL)
+    response = snapshots.response(snapshot)
+    response.data.update(system_health=_system_checks(), timestamp=timezone.now())
+    return response
+
+
+def _system_checks():
+    """Vérifications de super_admin_system_health (jamais mises en cache)"""
     # Vérifications système
     system_checks = {
         'database': True,
@@ -3954,7 +3889,8 @@ def super_admin_system_health(request):
     
     # Vérification base de données
     try:
-        User.objects.count()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
     except Exception:
         system_checks['database'] = False
     
@@ -3981,7 +3917,11 @@ def super_admin_system_health(request):
     except Exception:
         system_checks['payment_service'] = False
     
-    # Statistiques système
+    return system_checks
+
+
+def _system_stats_data():
+    """Calcul de l'instantané des statistiques de super_admin_system_health"""
     system_stats = {
         'total_users': User.objects.count(),
         'total_events': Event.objects.count(),
@@ -3991,11 +3931,9 @@ def super_admin_system_health(request):
         'system_uptime': 'N/A'  # À implémenter si nécessaire
     }
     
-    return Response({
-        'system_health': system_checks,
+    return {
         'system_stats': system_stats,
-        'timestamp': timezone.now()
-    })
+    }
 
 # ============================================================================
 # VUES POUR CATÉGORIES ET TAGS
@@ -4351,58 +4289,23 @@ def super_admin_global_stats(request):
         from django.utils import timezone
         from datetime import timedelta
         
-        # Période de calcul (30 derniers jours)
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=30)
-        
         # Statistiques générales
         total_users = User.objects.count()
         active_users = User.objects.filter(is_active=True).count()
         total_events = Event.objects.count()
         published_events = Event.objects.filter(status='published').count()
         pending_events = Event.objects.filter(status='pending').count()
-        total_registrations = EventRegistration.objects.count()
-        confirmed_registrations = EventRegistration.objects.filter(status='confirmed').count()
         
-        # Revenus (si applicable)
-        total_revenue = EventRegistration.objects.aggregate(
-            total=Sum('price_paid')
-        )['total'] or 0
+        # Inscriptions et revenus : agrégats quotidiens
+        platform = rollups.totals()
+        total_registrations = platform['registrations']
+        confirmed_registrations = platform['confirmed_count']
+        total_revenue = platform['paid_revenue']
         
-        # Nouveaux utilisateurs ce mois
-        new_users_this_month = User.objects.filter(
-            date_joined__gte=start_date
-        ).count()
-        
-        # Nouveaux événements ce mois
-        new_events_this_month = Event.objects.filter(
-            created_at__gte=start_date
-        ).count()
-        
-        # Répartition des rôles
-        role_distribution = {}
-        for role_choice in UserProfile.ROLE_CHOICES:
-            role_value = role_choice[0]
-            role_name = role_choice[1]
-            count = UserProfile.objects.filter(role=role_value).count()
-            role_distribution[role_value] = {
-                'name': role_name,
-                'count': count
-            }
-        
-        # Top événements par participants
-        top_events = Event.objects.annotate(
-            participant_count=Count('registrations')
-        ).order_by('-participant_count')[:5]
-        
-        top_events_data = []
-        for event in top_events:
-            top_events_data.append({
-                'id': event.id,
-                'title': event.title,
-                'participants': event.participant_count,
-                'revenue': 0  # À implémenter si nécessaire
-            })
+        # Nouveaux utilisateurs et événements (30 derniers jours)
+        recent = rollups.totals(*rollups.last_days(30))
+        new_users_this_month = recent['new_users']
+        new_events_this_month = recent['new_events']
         
         stats = {
             'general_stats': {
@@ -4431,7 +4334,7 @@ def super_admin_global_stats(request):
 def super_admin_analytics(request):
     """Analytics avancées pour le Super Admin"""
     try:
-        from django.db.models import Count, Sum, Q
+        from django.db.models import Count, F, Sum, Q
         from django.utils import timezone
         from datetime import timedelta
         
@@ -4446,29 +4349,14 @@ def super_admin_analytics(request):
         else:
             days = 30
         
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=days)
-        
-        # Croissance des utilisateurs
-        user_growth = []
-        for i in range(days):
-            date = start_date + timedelta(days=i)
-            count = User.objects.filter(date_joined__date=date.date()).count()
-            user_growth.append(count)
-        
-        # Croissance des revenus
-        revenue_growth = []
-        for i in range(days):
-            date = start_date + timedelta(days=i)
-            revenue = EventRegistration.objects.filter(
-                registered_at__date=date.date()
-            ).aggregate(total=Sum('price_paid'))['total'] or 0
-            revenue_growth.append(revenue)
-        
-        # Top événements par revenus
-        top_revenue_events = Event.objects.annotate(
-            total_revenue=Sum('registrations__price_paid')
-        ).filter(total_revenue__gt=0).order_by('-total_revenue')[:10]
+        first, last = rollups.last_days(days)
+        
+        # Top événements par revenus (statistiques dénormalisées par événement)
+        top_revenue_events = Event.objects.select_related('organizer').filter(
+            stats__paid_revenue__gt=0
+        ).annotate(
+            total_revenue=F('stats__paid_revenue')
+        ).order_by('-total_revenue')[:10]
         
         top_revenue_data = []
         for event in top_revenue_events:
@@ -4480,31 +4368,33 @@ def super_admin_analytics(request):
                 'total_revenue': event.total_revenue or 0
             })
         
+        # Répartition des rôles : un seul GROUP BY
+        role_counts = dict(UserProfile.objects.order_by().values_list('role').annotate(count=Count('pk')))
+        
+        # Séries et totaux : agrégats quotidiens
         analytics = {
             'summary': {
                 'total_platform_users': User.objects.count(),
-                'active_organizers': UserProfile.objects.filter(role='organizer').count(),
+                'active_organizers': role_counts.get('organizer', 0),
                 'published_events': Event.objects.filter(status='published').count(),
-                            'this_month_revenue': EventRegistration.objects.filter(
-                registered_at__gte=start_date
-            ).aggregate(total=Sum('price_paid'))['total'] or 0
+                'this_month_revenue': rollups.totals(first, last)['paid_revenue']
             },
             'daily_stats': [
                 {
-                    'date': (start_date + timedelta(days=i)).strftime('%Y-%m-%d'),
-                    'new_users': User.objects.filter(date_joined__date=(start_date + timedelta(days=i)).date()).count(),
-                    'new_events': Event.objects.filter(created_at__date=(start_date + timedelta(days=i)).date()).count(),
-                    'new_registrations': EventRegistration.objects.filter(registered_at__date=(start_date + timedelta(days=i)).date()).count(),
-                    'revenue': EventRegistration.objects.filter(registered_at__date=(start_date + timedelta(days=i)).date()).aggregate(total=Sum('price_paid'))['total'] or 0
+                    'date': row['day'].strftime('%Y-%m-%d'),
+                    'new_users': row['new_users'],
+                    'new_events': row['new_events'],
+                    'new_registrations': row['registrations'],
+                    'revenue': row['paid_revenue']
                 }
-                for i in range(min(days, 7))  # Limiter à 7 jours pour l'affichage
+                for row in rollups.daily(first, min(last, first + timedelta(days=6)))  # Limiter à 7 jours pour l'affichage
             ],
             'role_distribution': {
                 role: {
-                    'name': dict(UserProfile.ROLE_CHOICES)[role],
-                    'count': UserProfile.objects.filter(role=role).count()
+                    'name': name,
+                    'count': role_counts.get(role, 0)
                 }
-                for role, _ in UserProfile.ROLE_CHOICES
+                for role, name in UserProfile.ROLE_CHOICES
             },
             'top_revenue_events': top_revenue_data
         }
@@ -4918,12 +4808,12 @@ def super_admin_event_detail(request, event_id):
             registrations_data.append(registration_data)
 
         # Historique des modifications
-        event_history = event.history.all().order_by('-timestamp')[:10]
+        event_history = event.history.select_related('user').order_by('-timestamp')[:10]
         history_data = [
             {
                 'id': h.id,
                 'action': h.action,
-                'details': h.details,
+                'details': f"{h.field_name}: {h.old_value} → {h.new_value}" if h.field_name else '',
                 'timestamp': h.timestamp.isoformat(),
                 'user': h.user.username if h.user else 'Système'
             }
@@ -5279,127 +5169,140 @@ def _notify_participants_event_cancelled(event, reason):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsSuperAdmin])
 def super_admin_export_registrations_csv(request, event_id):
-    """Exporter la liste des participants en CSV (Super Admin)"""
+    """
+    Exporter la liste des participants en CSV (Super Admin), en streaming.
+    Filtres optionnels : status, ticket_type, date_from, date_to (voir events.exports)
+    """
     try:
         event = Event.objects.get(id=event_id)
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="registrations_event_{event_id}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'ID Inscription', 'Username', 'Email', 'Nom', 'Prénom', 'Status', 
-            'Type de Billet', 'Prix Payé', 'Date d\'inscription', 'Statut Paiement',
-            'Demande de Remboursement', 'Statut Remboursement'
-        ])
-        
-        for reg in event.registrations.select_related('user', 'ticket_type').prefetch_related('refund_request').all():
-            refund_status = reg.refund_request.status if hasattr(reg, 'refund_request') and reg.refund_request else 'Aucune'
-            writer.writerow([
-                reg.id,
-                reg.user.username,
-                reg.user.email,
-                reg.user.first_name or '',
-                reg.user.last_name or '',
-                reg.status,
-                getattr(reg.ticket_type, 'name', 'Standard'),
-                str(reg.price_paid or 0),
-                reg.registered_at.strftime('%Y-%m-%d %H:%M'),
-                reg.payment_status or 'Non défini',
-                'Oui' if hasattr(reg, 'refund_request') and reg.refund_request else 'Non',
-                refund_status
-            ])
-        
-        return response
-        
     except Event.DoesNotExist:
         return Response(
             {'error': 'Événement non trouvé'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Exception as e:
-        return Response(
-            {'error': f'Erreur lors de l\'export: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    return _export_registrations_csv(request, event)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def organizer_export_registrations_csv(request, event_id):
+    """Exporter en CSV les participants d'un de ses événements (organisateur ou Super Admin)"""
+    try:
+        event = Event.objects.get(id=event_id)
+    except Event.DoesNotExist:
+        return Response({'error': 'Événement non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+
+    user = request.user
+    if not (event.organizer_id == user.id or user.is_staff or user.is_superuser or
+            hasattr(user, 'profile') and user.profile.is_super_admin):
+        return Response({'error': 'Accès non autorisé'}, status=status.HTTP_403_FORBIDDEN)
+    return _export_registrations_csv(request, event)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def organizer_predictions(request):
+    """
+    Prédictions de la nuit (remplissage, prix optimal, concurrence) des
+    événements publiés à venir de l'organisateur connecté
+    """
+    predictions = PredictionSnapshot.objects.filter(
+        event__organizer=request.user,
+        event__status='published',
+        event__start_date__gte=timezone.now(),
+    ).select_related('event').order_by('event__start_date')
+    data = PredictionSnapshotSerializer(predictions, many=True).data
+    return Response({'count': len(data), 'results': data})
+
+
+def _export_registrations_csv(request, event):
+    try:
+        queryset = exports.registrations(event, request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return exports.csv_response(queryset, f"registrations_event_{event.id}.csv")
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsSuperAdmin])
 def super_admin_export_registrations_excel(request, event_id):
-    """Exporter la liste des participants en Excel (Super Admin)"""
+    """
+    Lancer l'export Excel des participants (Super Admin). Le fichier est généré
+    en arrière-plan : la réponse 202 donne l'URL de suivi du job.
+    """
     try:
-        if Workbook is None:
-            return Response(
-                {"error": "openpyxl non installé pour l'export Excel"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        
         event = Event.objects.get(id=event_id)
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Inscriptions'
-        
-        # En-têtes
-        headers = [
-            'ID Inscription', 'Username', 'Email', 'Nom', 'Prénom', 'Status', 
-            'Type de Billet', 'Prix Payé', 'Date d\'inscription', 'Statut Paiement',
-            'Demande de Remboursement', 'Statut Remboursement'
-        ]
-        ws.append(headers)
-        
-        # Données
-        for reg in event.registrations.select_related('user', 'ticket_type').prefetch_related('refund_request').all():
-            refund_status = reg.refund_request.status if hasattr(reg, 'refund_request') and reg.refund_request else 'Aucune'
-            ws.append([
-                reg.id,
-                reg.user.username,
-                reg.user.email,
-                reg.user.first_name or '',
-                reg.user.last_name or '',
-                reg.status,
-                getattr(reg.ticket_type, 'name', 'Standard'),
-                float(reg.price_paid or 0),
-                reg.registered_at.strftime('%Y-%m-%d %H:%M'),
-                reg.payment_status or 'Non défini',
-                'Oui' if hasattr(reg, 'refund_request') and reg.refund_request else 'Non',
-                refund_status
-            ])
-        
-        # Ajuster la largeur des colonnes
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        from io import BytesIO
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        response = HttpResponse(
-            output.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="registrations_event_{event_id}.xlsx"'
-        return response
-        
     except Event.DoesNotExist:
         return Response(
             {'error': 'Événement non trouvé'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Exception as e:
-        return Response(
-            {'error': f'Erreur lors de l\'export: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+
+    try:
+        exports.registrations(event, request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    job = ExportJob.enqueue(event, request.user, exports.job_filters(request.query_params))
+    return Response(_export_job_data(request, job), status=status.HTTP_202_ACCEPTED)
+
+
+def _export_job_data(request, job):
+    data = {
+        'id': job.id,
+        'event_id': job.event_id,
+        'format': job.format,
+        'status': job.status,
+        'progress': job.progress,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'filters': job.filters,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'status_url': request.build_absolute_uri(reverse('export_job_status', args=[job.id])),
+        'download_url': None,
+    }
+    if job.status == 'completed' and job.file:
+        data['download_url'] = request.build_absolute_uri(reverse('export_job_download', args=[job.id]))
+    return data
+
+
+def _get_export_job(request, job_id):
+    """Job d'export visible par son auteur et les Super Admins (None sinon)"""
+    job = ExportJob.objects.filter(id=job_id).first()
+    user = request.user
+    if job is None or not (job.requested_by_id == user.id or user.is_staff or user.is_superuser or
+                           hasattr(user, 'profile') and user.profile.is_super_admin):
+        return None
+    return job
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_job_status(request, job_id):
+    """Statut, avancement et lien de téléchargement d'un export"""
+    job = _get_export_job(request, job_id)
+    if job is None:
+        return Response({'error': 'Export non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_export_job_data(request, job))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_job_download(request, job_id):
+    """Télécharger le fichier d'un export terminé"""
+    job = _get_export_job(request, job_id)
+    if job is None:
+        return Response({'error': 'Export non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    if job.status != 'completed' or not job.file:
+        return Response({'error': 'Export pas encore disponible', 'status': job.status},
+                        status=status.HTTP_409_CONFLICT)
+    return FileResponse(
+        job.file.open('rb'),
+        as_attachment=True,
+        filename=f"registrations_event_{job.event_id}.{job.format}",
+    )
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
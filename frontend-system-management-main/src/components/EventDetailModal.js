@@ -175,13 +175,26 @@ const EventDetailModal = ({ open, onClose, eventId, onEventAction }) => {
       console.log('🔍 Début export Excel pour événement:', eventId);
       setError(null);
       
-      const response = await api.get(`/api/admin/events/${eventId}/export_excel/`, {
+      setActionLoading(true);
+      const response = await api.get(`/api/admin/events/${eventId}/export_excel/`);
+
+      // Le fichier est généré en arrière-plan : suivre le job jusqu'à la fin
+      let job = response.data;
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        job = (await api.get(job.status_url)).data;
+      }
+      if (job.status !== 'completed' || !job.download_url) {
+        throw new Error(job.error || 'Export Excel échoué');
+      }
+
+      const file = await api.get(job.download_url, {
         responseType: 'blob'
       });
       
-      console.log('✅ Export Excel réussi:', response);
+      console.log('✅ Export Excel réussi:', file);
       
-      const url = window.URL.createObjectURL(new Blob([response.data]));
+      const url = window.URL.createObjectURL(new Blob([file.data]));
       const link = document.createElement('a');
       link.href = url;
       link.setAttribute('download', `inscriptions_event_${eventId}.xlsx`);
@@ -221,6 +234,8 @@ const EventDetailModal = ({ open, onClose, eventId, onEventAction }) => {
       }
       
       setError(errorMessage);
+    } finally {
+      setActionLoading(false);
     }
   };
 
@@ -182,11 +182,21 @@ const PredictiveAnalytics = () => {
       const response = await api.post('/admin/train_ml_models/', {
         force_retrain: true
       });
-      
-      if (response.data.status === 'success') {
+
+      // L'entraînement tourne en arrière-plan : suivre le job jusqu'à la fin
+      let job = response.data.job;
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        job = (await api.get(`/admin/training_jobs/${job.id}/`)).data;
+      }
+
+      if (job.status === 'completed') {
         setTrainingStatus('success');
         setTimeout(() => setTrainingStatus('idle'), 3000);
         loadPredictiveAnalytics(); // Recharger les données
+      } else {
+        setTrainingStatus('error');
+        setTimeout(() => setTrainingStatus('idle'), 3000);
       }
     } catch (error) {
       console.error('Erreur lors de l\'entraînement:', error);